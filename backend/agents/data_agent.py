@@ -24,14 +24,14 @@ from agno.learn import (
     UserMemoryConfig,
     UserProfileConfig,
 )
-from agno.tools.postgres import PostgresTools
 
 from backend.context.business_rules import BUSINESS_CONTEXT
 from backend.context.semantic_model import SEMANTIC_MODEL_STR
 from backend.db import create_knowledge, db_url, get_postgres_db
 from backend.models import get_model
+from backend.tools.cached_postgres import CachedPostgresTools
 from backend.tools.introspect import create_introspect_schema_tool
-from backend.tools.save_query import create_save_validated_query_tool
+from backend.tools.save_query import create_lookup_validated_query_tool, create_save_validated_query_tool
 
 # ---------------------------------------------------------------------------
 # Setup
@@ -54,6 +54,7 @@ DB_DATABASE = getenv("DB_DATABASE", "ai")
 # Tools
 # ---------------------------------------------------------------------------
 save_validated_query = create_save_validated_query_tool(data_knowledge)
+lookup_validated_query = create_lookup_validated_query_tool(data_knowledge)
 introspect_schema = create_introspect_schema_tool(db_url)
 
 # ---------------------------------------------------------------------------
@@ -75,7 +76,10 @@ You remember the gotchas, the type mismatches, the date formats that tripped you
 **Knowledge** (static, curated):
 - Table schemas, validated queries, business rules
 - Searched automatically before each response
-- Add successful queries with `save_validated_query`
+- Add successful queries with `save_validated_query` (saving the same SQL again updates it)
+- Look up a saved query by exact question or SQL with `lookup_validated_query`
+- Tables loaded from uploaded CSV files are described there as "CSV table <schema.table>",
+  with their column types and sample rows; query them like any other table
 
 **Learnings** (dynamic, discovered):
 - Patterns YOU discover through errors and fixes
@@ -84,8 +88,9 @@ You remember the gotchas, the type mismatches, the date formats that tripped you
 
 ## Workflow
 
-1. Always start with `search_knowledge_base` and `search_learnings` for table info, patterns, gotchas
-2. Write SQL (LIMIT 50 default, no SELECT *, ORDER BY for rankings)
+1. Always start with `lookup_validated_query` for the user's question. If it returns a query, reuse it
+   (adjusting literal values). Otherwise `search_knowledge_base` and `search_learnings` for table info, patterns, gotchas
+2. Write SQL and run it with `run_query` (LIMIT 50 default, no SELECT *, ORDER BY for rankings)
 3. If error -> `introspect_schema` -> fix -> `save_learning`
 4. Provide **insights**, not just data, based on context
 5. Offer `save_validated_query` if the query is reusable
@@ -143,15 +148,17 @@ data_agent = Agent(
     knowledge=data_knowledge,
     search_knowledge=True,
     tools=[
-        PostgresTools(
+        CachedPostgresTools(
             host=DB_HOST,
             port=DB_PORT,
             user=DB_USER,
             password=DB_PASS,
             db_name=DB_DATABASE,
-            include_tools=["show_tables", "describe_table", "summarize_table", "inspect_query"],
+            db_url=db_url,
+            include_tools=["show_tables", "describe_table", "summarize_table", "run_query", "inspect_query"],
         ),
         save_validated_query,
+        lookup_validated_query,
         introspect_schema,
     ],
     pre_hooks=[PIIDetectionGuardrail(mask_pii=False), PromptInjectionGuardrail()],
@@ -21,7 +21,6 @@ from agno.learn import (
     UserMemoryConfig,
     UserProfileConfig,
 )
-from agno.tools.file import FileTools
 
 from backend.context.intent_routing import INTENT_ROUTING
 from backend.context.source_registry import SOURCE_REGISTRY
@@ -30,6 +29,7 @@ from backend.models import get_model
 from backend.tools import approved_ops, awareness, save_discovery, search
 from backend.tools.approved_ops import add_knowledge_source
 from backend.tools.awareness import list_knowledge_sources
+from backend.tools.documents import DocumentTools
 from backend.tools.save_discovery import save_intent_discovery
 from backend.tools.search import search_content
 
@@ -43,7 +43,9 @@ knowledge_learnings = create_knowledge("Knowledge Learnings", "knowledge_learnin
 # ---------------------------------------------------------------------------
 # Documents directory for file browsing
 # ---------------------------------------------------------------------------
-DOCUMENTS_DIR = Path(getenv("DOCUMENTS_DIR", str(Path(__file__).parent.parent.parent / "data" / "docs")))
+DOCUMENTS_DIR: Path = Path(getenv("DOCUMENTS_DIR", str(Path(__file__).parent.parent.parent / "data" / "docs")))
+# Inverted index for search_documents (kept outside DOCUMENTS_DIR so file listings do not show it)
+DOCUMENTS_INDEX_PATH: Path = Path(getenv("DOCUMENTS_INDEX_PATH", str(DOCUMENTS_DIR.parent / ".documents_index.sqlite")))
 PATTERNS_DIR = Path(__file__).parent.parent / "knowledge" / "patterns"
 
 # Wire tools to the knowledge base instance
@@ -69,6 +71,7 @@ You are a knowledge assistant. You answer questions by searching your knowledge
 
 - Provide **answers**, not just file paths or source names
 - Read full documents when available — never answer from snippets alone
+- Find files by content with `search_documents`, then read around the returned line numbers with `read_file_chunk`
 - Include source paths and section references in every answer
 - Include specifics from the source: numbers, dates, names, code examples
 - Don't hallucinate content that doesn't exist in the sources
@@ -153,8 +156,9 @@ knowledge_agent = Agent(
     knowledge=knowledge,
     instructions=instructions,
     tools=[
-        FileTools(
+        DocumentTools(
             base_dir=DOCUMENTS_DIR,
+            index_path=DOCUMENTS_INDEX_PATH,
             enable_read_file=True,
             enable_list_files=True,
             enable_search_files=True,
@@ -194,21 +198,15 @@ def load_default_documents() -> None:
 
     Loads URL-based documents and any PDF/CSV files from data/docs/.
     """
-    from backend.knowledge.loaders import load_csv_documents, load_pdf_documents
-
-    knowledge.insert(
-        name="Agno Introduction",
-        url="https://docs.agno.com/introduction.md",
-        skip_if_exists=True,
-    )
-    knowledge.insert(
-        name="Agno First Agent",
-        url="https://docs.agno.com/first-agent.md",
-        skip_if_exists=True,
-    )
-
-    load_pdf_documents(knowledge)
-    load_csv_documents(knowledge)
+    from backend.knowledge.loaders import sync_documents
+    from backend.knowledge.url_refresh import DEFAULT_URL_SOURCES, insert_url_source
+
+    # URL sources record their URL so refresh_url_sources() can re-check them
+    for name, url in DEFAULT_URL_SOURCES:
+        insert_url_source(knowledge, name, url)
+
+    # PDFs and CSVs from data/docs/ — only new or changed files are embedded
+    sync_documents(knowledge)
 
     # Load search strategy patterns (curated "how to find things" docs)
     if PATTERNS_DIR.exists():
@@ -218,6 +216,19 @@ def load_default_documents() -> None:
             skip_if_exists=True,
         )
 
+    # ANN and full-text indexes are built after the bulk load (no-op when they already exist)
+    if knowledge.vector_db is not None:
+        from backend.db.full_text import migrate_full_text
+        from backend.db.vector_index import build_index
+
+        build_index(knowledge.vector_db)
+        migrate_full_text(knowledge.vector_db)
+
+    # Warm the search_documents index so the first search does not build it
+    from backend.knowledge.file_index import FileIndex
+
+    FileIndex(DOCUMENTS_DIR, DOCUMENTS_INDEX_PATH).refresh()
+
 
 if __name__ == "__main__":
     import sys
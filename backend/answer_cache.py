@@ -0,0 +1,551 @@
+"""
+Answer Cache
+------------
+
+Opt-in semantic answer cache in front of agent runs.
+
+``AnswerCacheMiddleware`` sits on ``POST /agents/{agent_id}/runs`` for the
+agents listed in ``ANSWER_CACHE_AGENTS``. The incoming message is embedded
+and matched (cosine similarity >= ``ANSWER_CACHE_THRESHOLD``) against
+earlier answers of the same agent that:
+
+- were given to the same user and role scopes (or, with
+  ``ANSWER_CACHE_SCOPE=role``, to anyone with the same role scopes);
+- were computed at the current versions of the agent's knowledge tables
+  (see ``backend/db/table_versions.py``), so new documents or learnings
+  invalidate them. For an agent with SQL tools, every table of the tools'
+  schema counts too (through its query cache, ``backend/db/query_cache.py``);
+  SQL tools without a query cache turn the answer cache off for the agent;
+- were validated, and are younger than ``ANSWER_CACHE_TTL`` seconds.
+
+Only the first message of a session is looked up or stored: an answer to a
+follow-up depends on the turns before it. Requests to a session that already
+has runs go straight to the agent.
+
+A hit is returned straight away in the same shape as a real run (SSE events
+or a ``RunOutput`` JSON), with ``metadata.answer_cache`` and an
+``X-Answer-Cache: hit`` header. It is saved as a run of the session first,
+so follow-ups see it in the history. On a miss the run goes through and its
+answer is kept if it completed cleanly. It is served to later questions only
+once validated: right away if the run saved a validated query
+(``save_validated_query``), otherwise when a user it would be served to sends
+``POST /answer-cache/{agent_id}/runs/{run_id}/approve``. Requests with files,
+``background`` or a ``version`` bypass the cache.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from os import getenv
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import uuid4
+
+from agno.db.base import SessionType
+from agno.models.message import Message as ChatMessage
+from agno.run.agent import RunInput, RunOutput
+from agno.run.base import RunStatus
+from agno.session.agent import AgentSession
+from agno.tools.postgres import PostgresTools
+from fastapi import APIRouter, HTTPException
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text, delete, select, text
+from sqlalchemy import update as sql_update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.db.engine import get_engine
+from backend.db.search_cache import get_search_cache, qualified_table, table_version
+from backend.db.session import EMBEDDING_DIMENSIONS, get_embedder
+from backend.db.url import db_url
+from backend.tools.cached_postgres import CachedPostgresTools
+
+log = logging.getLogger(__name__)
+
+ANSWER_CACHE_AGENTS = [a.strip() for a in getenv("ANSWER_CACHE_AGENTS", "").split(",") if a.strip()]
+ANSWER_CACHE_THRESHOLD = float(getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SCOPE = getenv("ANSWER_CACHE_SCOPE", "user").lower()
+
+CACHE_HEADER = b"x-answer-cache"
+
+# Tools whose successful call in a run validates the run's answer
+VALIDATING_TOOLS = ("save_validated_query",)
+
+_RUNS_PATH = re.compile(r"^/agents/([^/]+)/runs/?$")
+
+_metadata = MetaData(schema="ai")
+
+answer_cache_table = Table(
+    "answer_cache",
+    _metadata,
+    Column("id", String(36), primary_key=True),
+    Column("agent_id", String(255), nullable=False),
+    Column("scope_key", String(64), nullable=False),
+    Column("question", Text, nullable=False),
+    Column("answer", Text, nullable=False),
+    Column("embedding", Vector(EMBEDDING_DIMENSIONS), nullable=False),
+    Column("versions", JSONB, nullable=False),
+    Column("run_id", String(64)),
+    Column("validated", Boolean, nullable=False, default=False),
+    Column("hits", Integer, nullable=False, default=0),
+    Column("created_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)),
+    Index("idx_answer_cache_agent_scope", "agent_id", "scope_key"),
+    Index("idx_answer_cache_run", "run_id"),
+)
+
+# Tables created before answers needed validating: their rows stay unvalidated, so are never served
+_UPGRADE_DDL = [
+    "ALTER TABLE ai.answer_cache ADD COLUMN IF NOT EXISTS run_id VARCHAR(64)",
+    "ALTER TABLE ai.answer_cache ADD COLUMN IF NOT EXISTS validated BOOLEAN NOT NULL DEFAULT false",
+    "CREATE INDEX IF NOT EXISTS idx_answer_cache_run ON ai.answer_cache (run_id)",
+]
+
+
+def scope_key(agent_id: str, user_id: Optional[str], scopes: Sequence[str], mode: str = "user") -> str:
+    """Partition key for cached answers: agent + role scopes, plus the user unless ``mode`` is ``role``."""
+    parts = [agent_id, ",".join(sorted(scopes))]
+    if mode != "role":
+        parts.append(user_id or "")
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def knowledge_vector_dbs(agent: Any) -> List[Any]:
+    """Vector DBs an agent's answers depend on: its knowledge and its learning machine's knowledge."""
+    learning = getattr(agent, "learning", None)
+    learned = getattr(learning, "learned_knowledge", None)
+    candidates = [
+        getattr(agent, "knowledge", None),
+        getattr(learning, "knowledge", None),
+        getattr(learned, "knowledge", None),
+    ]
+    found: Dict[str, Any] = {}
+    for knowledge in candidates:
+        vector_db = getattr(knowledge, "vector_db", None)
+        if vector_db is not None and getattr(vector_db, "table_name", None):
+            found[qualified_table(vector_db)] = vector_db
+    return list(found.values())
+
+
+def sql_table_versions(agent: Any) -> Optional[Dict[str, Any]]:
+    """(oid, version) of every table the agent's SQL tools can read, or None if they cannot all be versioned."""
+    versions: Dict[str, Any] = {}
+    for tool in getattr(agent, "tools", None) or []:
+        if not isinstance(tool, PostgresTools):
+            continue
+        cache = tool.query_cache if isinstance(tool, CachedPostgresTools) else None
+        stamp = cache.schema_stamp() if cache is not None else None
+        if cache is None or stamp is None:
+            return None
+        versions.update((f"{cache.schema}.{table}", (oid, version)) for table, oid, version in stamp)
+    return versions
+
+
+def session_has_runs(agent: Any, session_id: str, user_id: Optional[str]) -> bool:
+    """Whether the agent's storage already holds runs of this session."""
+    db = getattr(agent, "db", None)
+    if db is None:
+        return False
+    session = db.get_session(session_id, SessionType.AGENT, user_id=user_id)
+    return bool(getattr(session, "runs", None))
+
+
+@dataclass
+class CompletedRun:
+    run_id: Optional[str]
+    answer: str
+    # Whether the run called one of ``VALIDATING_TOOLS`` successfully
+    validated: bool
+
+
+def _validates(tools: List[Any]) -> bool:
+    return any(
+        isinstance(tool, dict)
+        and tool.get("tool_name") in VALIDATING_TOOLS
+        and not tool.get("tool_call_error")
+        and not str(tool.get("result") or "").startswith("Error")
+        for tool in tools
+    )
+
+
+def completed_run(body: bytes, streamed: bool) -> Optional[CompletedRun]:
+    """The final answer of a captured run response, or None unless it completed cleanly with text."""
+    try:
+        if not streamed:
+            payload = json.loads(body)
+            content = payload.get("content")
+            if payload.get("status") != "COMPLETED" or not isinstance(content, str):
+                return None
+            return CompletedRun(payload.get("run_id"), content, _validates(payload.get("tools") or []))
+        run: Optional[CompletedRun] = None
+        tools: List[Any] = []
+        for block in body.decode("utf-8").split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+            event = lines.get("event")
+            if event in ("RunError", "RunPaused", "RunCancelled"):
+                return None
+            if event == "ToolCallCompleted":
+                tools.append(json.loads(lines.get("data", "{}")).get("tool"))
+            if event == "RunCompleted":
+                data = json.loads(lines.get("data", "{}"))
+                content = data.get("content")
+                run = CompletedRun(data.get("run_id"), content, False) if isinstance(content, str) else None
+        if run is not None:
+            run.validated = _validates(tools)
+        return run
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return None
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    """Receive callable that yields the buffered body once, then defers to the client (for disconnects)."""
+    sent = False
+
+    async def replayed() -> Message:
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replayed
+
+
+@dataclass
+class CachedAnswer:
+    id: str
+    question: str
+    answer: str
+    similarity: float
+    created_at: datetime
+
+
+class AnswerCache:
+    """Cached answers in ``ai.answer_cache``, matched by embedding similarity."""
+
+    def __init__(self, threshold: float = 0.95, ttl: int = 86400, url: str = db_url):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._url = url
+        self._engine: Optional[Engine] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _get_engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_engine(self._url)
+            _metadata.create_all(self._engine, tables=[answer_cache_table], checkfirst=True)
+            with self._engine.begin() as conn:
+                for statement in _UPGRADE_DDL:
+                    conn.execute(text(statement))
+        return self._engine
+
+    def lookup(
+        self, agent_id: str, key: str, embedding: List[float], versions: Dict[str, Any]
+    ) -> Optional[CachedAnswer]:
+        """Closest fresh answer for this agent and scope at the current table versions, if similar enough."""
+        t = answer_cache_table
+        distance = t.c.embedding.cosine_distance(embedding)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        with self._get_engine().begin() as conn:
+            row = conn.execute(
+                select(t.c.id, t.c.question, t.c.answer, t.c.created_at, distance.label("distance"))
+                .where(
+                    t.c.agent_id == agent_id,
+                    t.c.scope_key == key,
+                    t.c.validated.is_(True),
+                    t.c.versions == versions,
+                    t.c.created_at > cutoff,
+                )
+                .order_by(distance)
+                .limit(1)
+            ).first()
+            if row is None or 1 - row.distance < self.threshold:
+                self.misses += 1
+                return None
+            conn.execute(sql_update(t).where(t.c.id == row.id).values(hits=t.c.hits + 1))
+        self.hits += 1
+        return CachedAnswer(
+            id=row.id, question=row.question, answer=row.answer, similarity=1 - row.distance, created_at=row.created_at
+        )
+
+    def store(
+        self,
+        agent_id: str,
+        key: str,
+        question: str,
+        answer: str,
+        embedding: List[float],
+        versions: Dict[str, Any],
+        run_id: Optional[str] = None,
+        validated: bool = False,
+    ) -> None:
+        """Save a run's answer (served once validated), dropping this scope's entries from older versions or past the TTL."""
+        t = answer_cache_table
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        with self._get_engine().begin() as conn:
+            conn.execute(
+                delete(t).where(
+                    t.c.agent_id == agent_id,
+                    t.c.scope_key == key,
+                    (t.c.versions != versions) | (t.c.created_at <= cutoff),
+                )
+            )
+            conn.execute(
+                t.insert().values(
+                    id=str(uuid4()),
+                    agent_id=agent_id,
+                    scope_key=key,
+                    question=question,
+                    answer=answer,
+                    embedding=embedding,
+                    versions=versions,
+                    run_id=run_id,
+                    validated=validated,
+                )
+            )
+
+    def validate(self, agent_id: str, run_id: str, key: str) -> bool:
+        """Let the answer of ``run_id`` be served within its scope. Returns whether there was one."""
+        t = answer_cache_table
+        with self._get_engine().begin() as conn:
+            result = conn.execute(
+                sql_update(t)
+                .where(t.c.agent_id == agent_id, t.c.run_id == run_id, t.c.scope_key == key)
+                .values(validated=True)
+            )
+        return result.rowcount > 0
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide answer cache (created on first use)."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL)
+    return _answer_cache
+
+
+class AnswerCacheMiddleware:
+    """ASGI middleware answering repeat questions to selected agents from ``AnswerCache``.
+
+    Must run inside ``EntraJWTMiddleware`` so ``request.state`` carries the user and scopes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        agents: Sequence[Any],
+        agent_ids: Optional[Sequence[str]] = None,
+        cache: Optional[AnswerCache] = None,
+        embedder: Any = None,
+        scope_mode: str = ANSWER_CACHE_SCOPE,
+    ) -> None:
+        self.app = app
+        enabled = set(ANSWER_CACHE_AGENTS if agent_ids is None else agent_ids)
+        self.agents = {agent.id: agent for agent in agents if agent.id in enabled}
+        self.cache = cache or get_answer_cache()
+        self.embedder = embedder
+        self.scope_mode = scope_mode
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match = _RUNS_PATH.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if match is None or scope["method"] != "POST" or match.group(1) not in self.agents:
+            await self.app(scope, receive, send)
+            return
+
+        body = await Request(scope, receive).body()
+        try:
+            plan = await self._plan(scope, _replay(body, receive), self.agents[match.group(1)])
+        except Exception as exc:
+            log.warning("Answer cache skipped: %s", exc)
+            plan = None
+        if plan is None:
+            await self.app(scope, _replay(body, receive), send)
+            return
+        if plan["hit"] is not None:
+            try:
+                run = await asyncio.to_thread(self._save_hit, plan)
+            except Exception as exc:
+                # A hit missing from the session would break follow-ups; answer it for real instead
+                log.warning("Could not save cached answer to session %s: %s", plan["session_id"], exc)
+            else:
+                await self._send_hit(send, plan, run)
+                return
+        await self._run_and_store(scope, _replay(body, receive), send, plan)
+
+    async def _plan(self, scope: Scope, receive: Receive, agent: Any) -> Optional[Dict[str, Any]]:
+        form = await Request(scope, receive).form()
+        if any(not isinstance(value, str) for _, value in form.multi_items()):
+            return None  # file uploads
+        if str(form.get("background", "false")).lower() == "true" or form.get("version"):
+            return None
+        message = str(form.get("message") or "").strip()
+        if not message:
+            return None
+
+        state = scope.get("state", {})
+        user_id = state.get("user_id") or form.get("user_id")
+        user_id = str(user_id) if user_id else None
+        session_id = state.get("session_id") or form.get("session_id")
+        # Follow-ups depend on the turns before them
+        if session_id and await asyncio.to_thread(session_has_runs, agent, str(session_id), user_id):
+            return None
+
+        vector_dbs = knowledge_vector_dbs(agent)
+        search_cache = get_search_cache()
+        versions: Dict[str, Any] = {}
+        for vector_db in vector_dbs:
+            # Without a version trigger the table's changes could not invalidate cached answers
+            if not await asyncio.to_thread(search_cache.is_tracked, vector_db):
+                return None
+            version = await asyncio.to_thread(table_version, vector_db)
+            if version is None:
+                return None
+            versions[qualified_table(vector_db)] = version
+        sql_versions = await asyncio.to_thread(sql_table_versions, agent)
+        if sql_versions is None:
+            return None
+        versions.update(sql_versions)
+
+        key = scope_key(agent.id, str(user_id or ""), state.get("scopes") or [], self.scope_mode)
+        embedder = self.embedder or get_embedder()
+        embedding = await embedder.async_get_embedding(message)
+        if not embedding:
+            return None
+        hit = await asyncio.to_thread(self.cache.lookup, agent.id, key, embedding, versions)
+        return {
+            "agent": agent,
+            "message": message,
+            "stream": str(form.get("stream", "true")).lower() != "false",
+            "session_id": str(session_id or uuid4()),
+            "user_id": user_id,
+            "key": key,
+            "embedding": embedding,
+            "versions": versions,
+            "hit": hit,
+        }
+
+    def _save_hit(self, plan: Dict[str, Any]) -> RunOutput:
+        """The hit as a completed run, saved to the session like a run of the agent."""
+        agent, hit = plan["agent"], plan["hit"]
+        run = RunOutput(
+            run_id=str(uuid4()),
+            agent_id=agent.id,
+            agent_name=agent.name or "",
+            session_id=plan["session_id"],
+            user_id=plan["user_id"],
+            input=RunInput(input_content=plan["message"]),
+            content=hit.answer,
+            messages=[
+                ChatMessage(role="user", content=plan["message"]),
+                ChatMessage(role="assistant", content=hit.answer),
+            ],
+            status=RunStatus.completed,
+            metadata={
+                "answer_cache": {
+                    "hit": True,
+                    "similarity": round(hit.similarity, 4),
+                    "cached_question": hit.question,
+                    "cached_at": hit.created_at.isoformat(),
+                }
+            },
+            created_at=int(time.time()),
+        )
+        db = getattr(agent, "db", None)
+        if db is not None:
+            session = db.get_session(plan["session_id"], SessionType.AGENT, user_id=plan["user_id"])
+            if not isinstance(session, AgentSession):
+                session = AgentSession(
+                    session_id=plan["session_id"], agent_id=agent.id, user_id=plan["user_id"], created_at=run.created_at
+                )
+            session.upsert_run(run)
+            session.updated_at = run.created_at
+            db.upsert_session(session)
+        return run
+
+    async def _send_hit(self, send: Send, plan: Dict[str, Any], run: RunOutput) -> None:
+        from agno.os.utils import format_sse_event
+        from agno.run.agent import RunCompletedEvent, RunContentEvent, RunStartedEvent
+
+        if plan["stream"]:
+            ids: Dict[str, Any] = {
+                "agent_id": run.agent_id,
+                "agent_name": run.agent_name,
+                "run_id": run.run_id,
+                "session_id": run.session_id,
+            }
+            events: List[Any] = [
+                RunStartedEvent(**ids),
+                RunContentEvent(**ids, content=run.content),
+                RunCompletedEvent(**ids, content=run.content, metadata=run.metadata),
+            ]
+            payload = "".join(format_sse_event(event) for event in events).encode("utf-8")
+            content_type = b"text/event-stream"
+        else:
+            payload = json.dumps(run.to_dict(), default=str).encode("utf-8")
+            content_type = b"application/json"
+
+        headers = [
+            (b"content-type", content_type),
+            (b"content-length", str(len(payload)).encode()),
+            (CACHE_HEADER, b"hit"),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": payload, "more_body": False})
+
+    async def _run_and_store(self, scope: Scope, receive: Receive, send: Send, plan: Dict[str, Any]) -> None:
+        status = 0
+        chunks: List[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (CACHE_HEADER, b"miss")]}
+            elif message["type"] == "http.response.body" and status == 200:
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+        if status != 200:
+            return
+        run = completed_run(b"".join(chunks), plan["stream"])
+        if run is None or not run.answer:
+            return
+        try:
+            await asyncio.to_thread(
+                self.cache.store,
+                plan["agent"].id,
+                plan["key"],
+                plan["message"],
+                run.answer,
+                plan["embedding"],
+                plan["versions"],
+                run.run_id,
+                run.validated,
+            )
+        except Exception as exc:
+            log.warning("Could not store answer for %s: %s", plan["agent"].id, exc)
+
+
+answer_cache_router = APIRouter(prefix="/answer-cache", tags=["answer-cache"])
+
+
+@answer_cache_router.post("/{agent_id}/runs/{run_id}/approve")
+async def approve_answer(request: Request, agent_id: str, run_id: str, user_id: Optional[str] = None) -> dict:
+    """Validate the answer of a run, so it is served to repeat questions in the scope it was given in."""
+    state = request.state
+    user = getattr(state, "user_id", None) or user_id
+    key = scope_key(agent_id, str(user or ""), getattr(state, "scopes", None) or [], ANSWER_CACHE_SCOPE)
+    if not await asyncio.to_thread(get_answer_cache().validate, agent_id, run_id, key):
+        raise HTTPException(status_code=404, detail="No cached answer for this run in your scope")
+    return {"agent_id": agent_id, "run_id": run_id, "validated": True}
@@ -18,12 +18,13 @@ async def auth_lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Agno-compatible lifespan for auth subsystem initialization.
 
     On startup:  initializes JWKS cache, creates auth DB tables, starts background tasks.
-    On shutdown: cancels background tasks, closes HTTP clients.
+    On shutdown: cancels background tasks, closes HTTP clients and database pools.
 
     Pass to AgentOS(lifespan=auth_lifespan) — Agno wraps existing lifespans.
     When auth_config.enabled is False, startup/shutdown are no-ops (local dev passthrough).
     """
     from backend.auth.database import create_auth_tables
+    from backend.db.engine import dispose_engines
 
     jwks_task: asyncio.Task | None = None
     sync_task: asyncio.Task | None = None
@@ -49,6 +50,8 @@ async def auth_lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         sync_task.cancel()
     if auth_config.enabled:
         await jwks_cache.close()
+    # Close the shared database pools (backend/db/engine.py)
+    await dispose_engines()
 
 
 __all__ = [
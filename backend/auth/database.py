@@ -1,19 +1,12 @@
 from collections.abc import AsyncGenerator
-from os import getenv
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from backend.auth.models import AuthBase
+from backend.db.engine import get_async_engine
 
-# Build DB URL from project env vars (matches docker-compose.yaml / mise.toml defaults)
-_db_url = (
-    "postgresql+psycopg://"
-    f"{getenv('DB_USER', 'ai')}:{getenv('DB_PASS', 'ai')}"
-    f"@{getenv('DB_HOST', 'apollos-db')}:{getenv('DB_PORT', '5432')}"
-    f"/{getenv('DB_DATABASE', 'ai')}"
-)
-
-_engine = create_async_engine(_db_url, pool_pre_ping=True)
+# The process-wide async pool (see backend/db/engine.py)
+_engine = get_async_engine()
 auth_session_factory = async_sessionmaker(_engine, expire_on_commit=False)
 
 
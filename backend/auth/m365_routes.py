@@ -19,6 +19,7 @@ from sqlalchemy import select
 
 from backend.auth.m365_token_service import decrypt_cache, encrypt_cache, get_obo_service
 from backend.auth.routes import limiter
+from backend.auth.user_id_cache import user_id_cache
 
 log = logging.getLogger(__name__)
 
@@ -99,15 +100,14 @@ async def m365_disconnect(request: Request) -> dict:  # type: ignore[return]
 async def _persist_connection(user_oid: str, scopes: list[str], cache_state: str | None) -> None:
     """Upsert M365Connection row with encrypted cache."""
     from backend.auth.database import auth_session_factory
-    from backend.auth.models import AuthUser, M365Connection
+    from backend.auth.models import M365Connection
 
     async with auth_session_factory() as session:
-        user_row = await session.execute(select(AuthUser).where(AuthUser.oid == user_oid))
-        user = user_row.scalar_one_or_none()
-        if not user:
+        user_id = await user_id_cache.resolve(session, user_oid)
+        if not user_id:
             return
 
-        result = await session.execute(select(M365Connection).where(M365Connection.user_id == user.id))
+        result = await session.execute(select(M365Connection).where(M365Connection.user_id == user_id))
         conn = result.scalar_one_or_none()
 
         now = datetime.now(timezone.utc)
@@ -121,7 +121,7 @@ async def _persist_connection(user_oid: str, scopes: list[str], cache_state: str
             conn.is_active = True
         else:
             conn = M365Connection(
-                user_id=user.id,
+                user_id=user_id,
                 connected_at=now,
                 last_refreshed=now,
                 scopes=" ".join(scopes),
@@ -136,15 +136,14 @@ async def _persist_connection(user_oid: str, scopes: list[str], cache_state: str
 async def _clear_connection(user_oid: str) -> None:
     """Mark M365Connection as inactive, clear cache."""
     from backend.auth.database import auth_session_factory
-    from backend.auth.models import AuthUser, M365Connection
+    from backend.auth.models import M365Connection
 
     async with auth_session_factory() as session:
-        user_row = await session.execute(select(AuthUser).where(AuthUser.oid == user_oid))
-        user = user_row.scalar_one_or_none()
-        if not user:
+        user_id = await user_id_cache.resolve(session, user_oid)
+        if not user_id:
             return
 
-        result = await session.execute(select(M365Connection).where(M365Connection.user_id == user.id))
+        result = await session.execute(select(M365Connection).where(M365Connection.user_id == user_id))
         conn = result.scalar_one_or_none()
         if conn:
             conn.is_active = False
@@ -167,6 +166,7 @@ async def warm_m365_cache() -> None:
         rows = result.all()
         restored = 0
         for conn, user_oid in rows:
+            user_id_cache.prime(user_oid, conn.user_id)
             if conn.cache_state:
                 try:
                     cache_state = decrypt_cache(conn.cache_state)
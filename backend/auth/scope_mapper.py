@@ -145,6 +145,17 @@ ROLE_SCOPE_MAP: dict[str, list[str]] = {
 # Cache the default mappings once (they don't change)
 _ROUTE_SCOPE_MAP: dict[str, list[str]] = get_default_scope_mappings()
 
+# Custom knowledge routes (added on top of Agno defaults)
+_ROUTE_SCOPE_MAP["POST /knowledge/refresh-urls"] = ["knowledge:write"]
+_ROUTE_SCOPE_MAP["POST /knowledge/compact-learnings"] = ["knowledge:write"]
+
+# Connection pool and query cache metrics
+_ROUTE_SCOPE_MAP["GET /db/pools"] = ["metrics:read"]
+_ROUTE_SCOPE_MAP["GET /db/query-cache"] = ["metrics:read"]
+
+# Answer cache: approving a run's answer is part of running the agent
+_ROUTE_SCOPE_MAP["POST /answer-cache/*/runs/*/approve"] = ["agents:run"]
+
 # MCP Gateway route scopes (added on top of Agno defaults)
 _ROUTE_SCOPE_MAP.update(
     {
@@ -164,6 +175,8 @@ _ROUTE_SCOPE_MAP.update(
         "PUT /mcp/tools/*": ["mcp:tools:write"],
         "DELETE /mcp/tools/*": ["mcp:tools:delete"],
         "POST /mcp/tools/*/state": ["mcp:tools:write"],
+        "POST /mcp/tools/bulk/state": ["mcp:tools:write"],
+        "POST /mcp/tools/bulk/delete": ["mcp:tools:delete"],
         # Virtual servers
         "GET /mcp/virtual-servers": ["mcp:virtual-servers:read"],
         "GET /mcp/virtual-servers/*": ["mcp:virtual-servers:read"],
@@ -182,6 +195,8 @@ _ROUTE_SCOPE_MAP.update(
         "PUT /mcp/resources/*": ["mcp:resources:write"],
         "DELETE /mcp/resources/*": ["mcp:resources:delete"],
         "POST /mcp/resources/*/state": ["mcp:resources:write"],
+        "POST /mcp/resources/bulk/state": ["mcp:resources:write"],
+        "POST /mcp/resources/bulk/delete": ["mcp:resources:delete"],
         # Resource sub-routes (HIGH-1 fix: previously missing)
         "GET /mcp/resources/*/info": ["mcp:resources:read"],
         "GET /mcp/resources/templates": ["mcp:resources:read"],
@@ -192,11 +207,14 @@ _ROUTE_SCOPE_MAP.update(
         "PUT /mcp/prompts/*": ["mcp:prompts:write"],
         "DELETE /mcp/prompts/*": ["mcp:prompts:delete"],
         "POST /mcp/prompts/*/state": ["mcp:prompts:write"],
+        "POST /mcp/prompts/bulk/state": ["mcp:prompts:write"],
+        "POST /mcp/prompts/bulk/delete": ["mcp:prompts:delete"],
         # Tags — any authenticated user (MEDIUM-5 fix)
         "GET /mcp/tags": [],
         "GET /mcp/tags/*": [],
         # Import/Export
         "GET /mcp/export": ["mcp:config:read"],
+        "GET /mcp/export/stream": ["mcp:config:read"],
         "POST /mcp/import": ["mcp:config:write"],
         "GET /mcp/import/status": ["mcp:config:read"],
         "GET /mcp/import/status/*": ["mcp:config:read"],
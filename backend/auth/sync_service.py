@@ -9,6 +9,7 @@ from backend.auth.config import auth_config
 from backend.auth.database import auth_session_factory
 from backend.auth.graph import GraphClient
 from backend.auth.models import AuthDeniedToken, AuthTeam, AuthTeamMembership, AuthUser
+from backend.auth.user_id_cache import user_id_cache
 
 
 class SyncService:
@@ -55,12 +56,10 @@ class SyncService:
                         "last_synced": datetime.now(timezone.utc),
                     },
                 )
+                .returning(AuthUser.id)
             )
-            await session.execute(stmt)
-
-            # Get internal user ID
-            result = await session.execute(select(AuthUser).where(AuthUser.oid == oid))
-            user = result.scalar_one()
+            # Internal user ID comes back from the upsert — no follow-up SELECT
+            user_id = (await session.execute(stmt)).scalar_one()
 
             # Sync team memberships from groups
             group_ids = {g["id"] for g in groups}
@@ -75,7 +74,7 @@ class SyncService:
                     insert(AuthTeamMembership)
                     .values(
                         team_id=team.id,
-                        user_id=user.id,
+                        user_id=user_id,
                         role="member",
                         joined_at=datetime.now(timezone.utc),
                     )
@@ -85,6 +84,8 @@ class SyncService:
 
             await session.commit()
 
+        user_id_cache.prime(oid, user_id)
+
     async def run_background_sync(self) -> None:
         """Background task: periodically re-sync active users."""
         while True:
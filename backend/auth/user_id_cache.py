@@ -0,0 +1,69 @@
+"""
+Process-wide Entra OID -> internal ``auth_users.id`` cache.
+
+Most per-user endpoints (M365 connection state, MCP preferences) only need the
+internal UUID for an OID. The mapping never changes once a user row exists, so
+positive entries live for ``ttl`` seconds. Unknown OIDs are cached for the much
+shorter ``negative_ttl`` so a burst of requests from a not-yet-synced user does
+not hit the DB each time. ``SyncService.sync_user_on_login`` primes the entry
+after the user upsert, which also clears any negative entry in this process.
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.auth.models import AuthUser
+
+
+class UserIdCache:
+    def __init__(self, ttl: float = 3600.0, negative_ttl: float = 30.0, max_entries: int = 10_000):
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+        # oid → (expires_at, user_id or None for a negative entry); insertion order doubles as LRU order
+        self._entries: OrderedDict[str, tuple[float, uuid.UUID | None]] = OrderedDict()
+
+    def lookup(self, oid: str) -> tuple[bool, uuid.UUID | None]:
+        """Return ``(hit, user_id)``. A hit with ``None`` is a cached "no such user"."""
+        entry = self._entries.get(oid)
+        if entry is None:
+            return False, None
+        expires_at, user_id = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[oid]
+            return False, None
+        self._entries.move_to_end(oid)
+        return True, user_id
+
+    def prime(self, oid: str, user_id: uuid.UUID | None) -> None:
+        """Record a resolved mapping (or a negative result when ``user_id`` is None)."""
+        ttl = self._ttl if user_id is not None else self._negative_ttl
+        self._entries[oid] = (time.monotonic() + ttl, user_id)
+        self._entries.move_to_end(oid)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, oid: str | None = None) -> None:
+        """Drop one OID, or every entry when ``oid`` is None."""
+        if oid is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(oid, None)
+
+    async def resolve(self, session: AsyncSession, oid: str) -> uuid.UUID | None:
+        """Return the internal user ID for an OID, querying ``auth_users`` only on a miss."""
+        hit, user_id = self.lookup(oid)
+        if hit:
+            return user_id
+        result = await session.execute(select(AuthUser.id).where(AuthUser.oid == oid))
+        user_id = result.scalar_one_or_none()
+        self.prime(oid, user_id)
+        return user_id
+
+
+# Module-level singleton shared by auth, M365 and MCP modules
+user_id_cache = UserIdCache()
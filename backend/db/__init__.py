@@ -5,11 +5,12 @@ Database Module
 Database connection utilities.
 """
 
-from backend.db.session import create_knowledge, get_postgres_db
+from backend.db.session import create_knowledge, get_knowledge_bases, get_postgres_db
 from backend.db.url import db_url
 
 __all__ = [
     "create_knowledge",
     "db_url",
+    "get_knowledge_bases",
     "get_postgres_db",
 ]
@@ -0,0 +1,212 @@
+"""
+Embedding Cache
+---------------
+
+Content-addressed cache for knowledge embeddings.
+
+Vectors are keyed by (model id, dimensions, sha256 of the text) and stored in
+``ai.embedding_cache`` with an in-process LRU in front. ``create_knowledge``
+wraps its embedder in ``CachedEmbedder``, so re-ingesting unchanged documents
+and re-saving learnings or validated queries skips the embedding API entirely.
+The cache is best-effort: if Postgres is unavailable, lookups fall through to
+the wrapped embedder.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from os import getenv
+from typing import Dict, List, Optional, Tuple
+
+from agno.knowledge.embedder.base import Embedder
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, REAL, insert
+from sqlalchemy.engine import Engine
+
+from backend.db.engine import get_engine
+from backend.db.url import db_url
+
+log = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_ENABLED = getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+EMBEDDING_CACHE_LRU_SIZE = int(getenv("EMBEDDING_CACHE_LRU_SIZE", "10000"))
+
+CacheKey = Tuple[str, int, str]
+
+_metadata = MetaData(schema="ai")
+
+embedding_cache_table = Table(
+    "embedding_cache",
+    _metadata,
+    Column("model", String(255), primary_key=True),
+    Column("dimensions", Integer, primary_key=True),
+    Column("content_hash", String(64), primary_key=True),
+    Column("embedding", ARRAY(REAL), nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)),
+)
+
+
+def content_hash(text: str) -> str:
+    """Return the sha256 hex digest used as the cache key for ``text``."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-level (LRU + Postgres) embedding store shared by every ``CachedEmbedder``."""
+
+    def __init__(self, lru_size: int = 10_000, persist: bool = True, url: str = db_url):
+        self._lru_size = lru_size
+        self._persist = persist
+        self._url = url
+        self._lru: OrderedDict[CacheKey, List[float]] = OrderedDict()
+        self._engine: Optional[Engine] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _get_engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_engine(self._url)
+            _metadata.create_all(self._engine, tables=[embedding_cache_table], checkfirst=True)
+        return self._engine
+
+    def _remember(self, key: CacheKey, embedding: List[float]) -> None:
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: List[CacheKey]) -> Dict[CacheKey, List[float]]:
+        """Return cached embeddings for ``keys``; missing keys are absent from the result."""
+        found: Dict[CacheKey, List[float]] = {}
+        pending: List[CacheKey] = []
+        for key in keys:
+            embedding = self._lru.get(key)
+            if embedding is not None:
+                self._lru.move_to_end(key)
+                found[key] = embedding
+            else:
+                pending.append(key)
+
+        if pending and self._persist:
+            try:
+                t = embedding_cache_table
+                with self._get_engine().connect() as conn:
+                    rows = conn.execute(
+                        select(t.c.model, t.c.dimensions, t.c.content_hash, t.c.embedding).where(
+                            tuple_(t.c.model, t.c.dimensions, t.c.content_hash).in_(pending)
+                        )
+                    )
+                    for model, dimensions, digest, embedding in rows:
+                        key = (model, dimensions, digest)
+                        found[key] = list(embedding)
+                        self._remember(key, found[key])
+            except Exception as exc:
+                log.warning("Embedding cache lookup failed: %s", exc)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[CacheKey, List[float]]) -> None:
+        """Store freshly computed embeddings. Empty vectors (embedder errors) are skipped."""
+        items = {key: embedding for key, embedding in items.items() if embedding}
+        if not items:
+            return
+        for key, embedding in items.items():
+            self._remember(key, embedding)
+        if not self._persist:
+            return
+        try:
+            rows = [
+                {"model": model, "dimensions": dimensions, "content_hash": digest, "embedding": embedding}
+                for (model, dimensions, digest), embedding in items.items()
+            ]
+            with self._get_engine().begin() as conn:
+                conn.execute(insert(embedding_cache_table).values(rows).on_conflict_do_nothing())
+        except Exception as exc:
+            log.warning("Embedding cache write failed: %s", exc)
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Embedder wrapper that consults ``EmbeddingCache`` before calling ``inner``."""
+
+    inner: Embedder = field(default_factory=Embedder)
+    cache: EmbeddingCache = field(default_factory=lambda: get_embedding_cache())
+    id: str = ""
+
+    def __post_init__(self) -> None:
+        self.id = getattr(self.inner, "id", "") or type(self.inner).__name__
+        self.dimensions = self.inner.dimensions
+        self.enable_batch = self.inner.enable_batch
+        self.batch_size = self.inner.batch_size
+
+    def _key(self, text: str) -> CacheKey:
+        return (self.id, self.dimensions or 0, content_hash(text))
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        key = self._key(text)
+        cached = self.cache.get_many([key]).get(key)
+        if cached is not None:
+            return cached, None
+        embedding, usage = self.inner.get_embedding_and_usage(text)
+        self.cache.put_many({key: embedding})
+        return embedding, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embedding_and_usage(text))[0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        key = self._key(text)
+        cached = (await asyncio.to_thread(self.cache.get_many, [key])).get(key)
+        if cached is not None:
+            return cached, None
+        embedding, usage = await self.inner.async_get_embedding_and_usage(text)
+        await asyncio.to_thread(self.cache.put_many, {key: embedding})
+        return embedding, usage
+
+    async def async_get_embeddings_batch_and_usage(
+        self, texts: List[str]
+    ) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        """Embed ``texts``, sending only cache misses (deduplicated) to the wrapped embedder."""
+        keys = [self._key(text) for text in texts]
+        found = await asyncio.to_thread(self.cache.get_many, list(dict.fromkeys(keys)))
+
+        missing: Dict[CacheKey, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        usage_by_key: Dict[CacheKey, Optional[Dict]] = {}
+        if missing:
+            miss_texts = list(missing.values())
+            batch = getattr(self.inner, "async_get_embeddings_batch_and_usage", None)
+            if batch is not None:
+                embeddings, usages = await batch(miss_texts)
+            else:
+                results = [await self.inner.async_get_embedding_and_usage(text) for text in miss_texts]
+                embeddings = [embedding for embedding, _ in results]
+                usages = [usage for _, usage in results]
+            computed = dict(zip(missing.keys(), embeddings))
+            usage_by_key = dict(zip(missing.keys(), usages))
+            await asyncio.to_thread(self.cache.put_many, computed)
+            found = {**found, **computed}
+
+        return [found.get(key, []) for key in keys], [usage_by_key.get(key) for key in keys]
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache (created on first use)."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(lru_size=EMBEDDING_CACHE_LRU_SIZE)
+    return _embedding_cache
@@ -0,0 +1,108 @@
+"""
+Database Engines
+----------------
+
+Process-wide SQLAlchemy engines, so every database client shares one pool.
+
+``PostgresDb`` and ``PgVector`` each build their own engine from a URL, and
+the app creates dozens of them (every agent, team, workflow and knowledge
+base), so a worker used to hold a dozen or more independent pools. Instead:
+
+- ``get_engine()`` returns the one sync engine for ``db_url``. It is handed to
+  every ``PostgresDb`` and ``PgVector`` (see ``backend/db/session.py``) and
+  used by ``introspect_schema`` and the embedding and answer caches.
+- ``get_async_engine()`` returns the one async engine, used by the auth
+  sessions.
+
+A worker then holds at most ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` sync and
+``DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW`` async connections, and a
+deployment at most that times workers times replicas. ``pool_stats()``
+reports current usage and is served at ``GET /db/pools``.
+"""
+
+import threading
+from os import getenv
+from typing import Any, Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from backend.db.url import db_url
+
+DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(getenv("DB_MAX_OVERFLOW", "10"))
+DB_ASYNC_POOL_SIZE = int(getenv("DB_ASYNC_POOL_SIZE", "5"))
+DB_ASYNC_MAX_OVERFLOW = int(getenv("DB_ASYNC_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE", "3600"))
+
+_lock = threading.Lock()
+_engines: Dict[str, Engine] = {}
+_async_engines: Dict[str, AsyncEngine] = {}
+
+
+def _pool_options(pool_size: int, max_overflow: int) -> Dict[str, Any]:
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def get_engine(url: str = db_url) -> Engine:
+    """Return the process-wide sync engine for ``url``, creating it on first use."""
+    engine = _engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = create_engine(url, **_pool_options(DB_POOL_SIZE, DB_MAX_OVERFLOW))
+                _engines[url] = engine
+    return engine
+
+
+def get_async_engine(url: str = db_url) -> AsyncEngine:
+    """Return the process-wide async engine for ``url``, creating it on first use."""
+    engine = _async_engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _async_engines.get(url)
+            if engine is None:
+                engine = create_async_engine(url, **_pool_options(DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW))
+                _async_engines[url] = engine
+    return engine
+
+
+def _pool_status(pool: Any) -> Dict[str, int]:
+    # QueuePool's overflow counter starts at -pool_size; only connections beyond the pool count as overflow
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    }
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Usage of every shared pool, plus the most connections this process can open."""
+    pools: Dict[str, Dict[str, int]] = {}
+    engines = [("sync", engine) for engine in _engines.values()]
+    engines += [("async", engine.sync_engine) for engine in _async_engines.values()]
+    for kind, engine in engines:
+        pools[f"{kind}:{engine.url.render_as_string(hide_password=True)}"] = _pool_status(engine.pool)
+    return {
+        "pools": pools,
+        "max_connections": (DB_POOL_SIZE + DB_MAX_OVERFLOW) * len(_engines)
+        + (DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW) * len(_async_engines),
+    }
+
+
+async def dispose_engines() -> None:
+    """Close every pooled connection (on shutdown); engines reconnect if used again."""
+    for async_engine in list(_async_engines.values()):
+        await async_engine.dispose()
+    for engine in list(_engines.values()):
+        engine.dispose()
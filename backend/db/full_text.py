@@ -0,0 +1,470 @@
+"""
+Full-Text Search
+----------------
+
+Indexed keyword and hybrid search for PgVector knowledge tables.
+
+Agno's ``PgVector`` computes ``to_tsvector(content)`` for every row on every
+keyword or hybrid search and orders the whole table by rank, so both scan the
+table. ``FullTextPgVector`` adds a stored generated ``content_tsv`` column
+with a GIN index and searches that instead:
+
+- keyword search matches ``content_tsv @@ query`` through the GIN index and
+  ranks only the matching rows;
+- hybrid search takes the top candidates from the ANN index and from the GIN
+  index, and scores only their union with agno's weighted formula.
+
+Tables are created on first use rather than when the knowledge base is
+built, so importing the agents does not touch the database: every session
+goes through ``ensure_table()``, which creates a missing table once per
+process and checks the embedding dimensions of an existing one.
+
+New tables get the column and index on create. ``migrate_full_text`` adds
+them to existing tables (and re-creates the column when
+``TEXT_SEARCH_CONFIG`` changes); ``ensure_table()`` runs it on first use of
+a table that has no column yet. If that fails (e.g. no ALTER permission),
+keyword and hybrid search fall back to agno's query-time ``to_tsvector``.
+
+With a reduced ``vector_storage`` (``halfvec`` or ``binary``, see
+``backend/db/vector_index.py``) the ANN pass orders by the quantized
+expression the index is built on, and the candidates are rescored with the
+float32 embedding.
+
+Searches go through the process-wide ``SearchCache`` (see
+``backend/db/search_cache.py``), keyed by query and invalidated by table version.
+A failed search (embedding or SQL error) returns an empty ``Uncached`` list,
+which the cache skips, as are results of agno's fallback search.
+
+Usage:
+    python -m backend.scripts.build_indexes
+"""
+
+import logging
+import re
+import threading
+import time
+from os import getenv
+from typing import Any, Dict, List, Optional, Union
+
+from agno.filters import FilterExpr
+from agno.knowledge.document import Document
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from pgvector.sqlalchemy import BIT, HALFVEC, VECTOR
+from sqlalchemy import Column, Computed, Index, and_, bindparam, cast, desc, func, select, text, union
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from backend.db.search_cache import (
+    SEARCH_CACHE_ENABLED,
+    bump_table_version,
+    ensure_version_trigger,
+    filters_key,
+    get_search_cache,
+    normalize_query,
+    table_version,
+)
+from backend.db.vector_index import VECTOR_RESCORE_CANDIDATES, IndexBuildResult, index_status
+from backend.db.vector_index import vector_storage as storage_mode
+
+log = logging.getLogger(__name__)
+
+TEXT_SEARCH_CONFIG = getenv("TEXT_SEARCH_CONFIG", "english")
+TEXT_SEARCH_HYBRID_CANDIDATES = int(getenv("TEXT_SEARCH_HYBRID_CANDIDATES", "40"))
+
+TSV_COLUMN = "content_tsv"
+
+Filters = Optional[Union[Dict[str, Any], List[FilterExpr]]]
+
+_CONFIG_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def tsv_expression(config: str) -> str:
+    """Generated-column expression for ``content_tsv`` under a text-search config."""
+    if not _CONFIG_NAME.match(config):
+        raise ValueError(f"Invalid text search config: {config!r}")
+    return f"to_tsvector('{config}'::regconfig, coalesce(content, ''))"
+
+
+def tsv_index_name(vector_db: Any) -> str:
+    return f"{vector_db.table_name}_{TSV_COLUMN}_index"
+
+
+class Uncached(list):
+    """Search result that ``FullTextPgVector.search`` must not cache.
+
+    Returned empty for a failed search, and around the results of agno's own
+    searches, which also report failures as ``[]``.
+    """
+
+
+class FullTextPgVector(PgVector):
+    """PgVector whose keyword and hybrid searches use a stored tsvector column and its GIN index.
+
+    Args:
+        vector_storage: ``full``, ``halfvec`` or ``binary``; what the ANN index is built on.
+        **kwargs: Passed to ``PgVector``.
+    """
+
+    def __init__(self, *, vector_storage: str = "full", **kwargs: Any):
+        self.vector_storage = storage_mode(vector_storage)
+        self._dimensions_checked = False
+        self._table_ready = False
+        # False while content_tsv is missing and could not be added: search with agno's query-time tsvector
+        self._full_text = True
+        self._ensuring = False
+        self._table_lock = threading.RLock()
+        super().__init__(**kwargs)
+        # Every session (agno's and ours) first makes sure the table exists
+        self._sessions = self.Session
+        self.Session = self._session  # type: ignore[assignment]
+
+    def _session(self):
+        self.ensure_table()
+        return self._sessions()
+
+    def ensure_table(self) -> None:
+        """Create the table if it is missing, or add ``content_tsv`` to an older one, once per process."""
+        if self._table_ready:
+            return
+        with self._table_lock:
+            # create() opens sessions itself; only this thread can get here while it runs
+            if self._table_ready or self._ensuring:
+                return
+            self._ensuring = True
+            try:
+                if not self.exists():
+                    self.create()
+                else:
+                    self._ensure_full_text_column()
+                self.check_dimensions()
+                self._table_ready = True
+            finally:
+                self._ensuring = False
+
+    def _ensure_full_text_column(self) -> None:
+        """Add ``content_tsv`` and its index to a table created before they existed."""
+        try:
+            if tsv_column_expression(self) is None:
+                log.info("Adding %s to %s.%s", TSV_COLUMN, self.schema, self.table_name)
+                migrate_full_text(self)
+            self._full_text = True
+        except Exception as exc:
+            log.warning(
+                "%s.%s has no %s, so keyword and hybrid search compute tsvectors per query until "
+                "`mise run maintenance:build-indexes` adds it: %s",
+                self.schema,
+                self.table_name,
+                TSV_COLUMN,
+                exc,
+            )
+            self._full_text = False
+
+    def _stored_tsv(self) -> bool:
+        """Make sure the table is ready; False if searches must fall back to agno's query-time tsvector."""
+        self.ensure_table()
+        return self._full_text
+
+    def get_table_v1(self):
+        table = super().get_table_v1()
+        if TSV_COLUMN not in table.c:
+            table.append_column(Column(TSV_COLUMN, TSVECTOR, Computed(tsv_expression(self.content_language))))
+            Index(tsv_index_name(self), table.c[TSV_COLUMN], postgresql_using="gin")
+        return table
+
+    def create(self) -> None:
+        super().create()
+        self.check_dimensions()
+        ensure_version_trigger(self)
+
+    def check_dimensions(self) -> None:
+        """Raise ``ValueError`` once if the table's embedding column does not match the embedder's dimensions."""
+        if self._dimensions_checked:
+            return
+        try:
+            stored = embedding_column_dimensions(self)
+        except Exception as exc:
+            log.warning("Could not read embedding dimensions of %s: %s", self.table_name, exc)
+            stored = None
+        if stored is not None and self.dimensions is not None and stored != self.dimensions:
+            raise ValueError(
+                f'Table "{self.schema}"."{self.table_name}" stores vector({stored}) embeddings but the embedder '
+                f"produces {self.dimensions} dimensions. Set EMBEDDING_DIMENSIONS to match the embedding model, "
+                f"or drop and re-create the table (and re-ingest) after switching EMBEDDING_PROVIDER."
+            )
+        self._dimensions_checked = True
+
+    def search(self, query: str, limit: int = 5, filters: Filters = None) -> List[Document]:
+        """Search, serving repeated queries from the cache while the table version is unchanged."""
+        cache = get_search_cache()
+        if not SEARCH_CACHE_ENABLED or not cache.is_tracked(self):
+            return super().search(query=query, limit=limit, filters=filters)
+        version = table_version(self)
+        if version is None:
+            return super().search(query=query, limit=limit, filters=filters)
+
+        key = (self.table_name, normalize_query(query), self.search_type.value, limit, filters_key(filters))
+        cached = cache.get(key, version)
+        if cached is not None:
+            return cached
+        documents = super().search(query=query, limit=limit, filters=filters)
+        if not isinstance(documents, Uncached):
+            cache.put(key, version, documents)
+        return documents
+
+    def _filtered(self, stmt, filters: Filters):
+        if filters is None:
+            return stmt
+        if isinstance(filters, dict):
+            return stmt.where(self.table.c.meta_data.contains(filters))
+        conditions = [self._dsl_to_sqlalchemy(f.to_dict() if hasattr(f, "to_dict") else f, self.table) for f in filters]
+        return stmt.where(and_(*conditions))
+
+    def _ts_query(self, query: str):
+        processed_query = self.enable_prefix_matching(query) if self.prefix_match else query
+        return func.websearch_to_tsquery(self.content_language, bindparam("query", value=processed_query))
+
+    def _columns(self) -> list:
+        t = self.table.c
+        return [t.id, t.name, t.meta_data, t.content, t.embedding, t.usage]
+
+    def _documents(self, rows) -> List[Document]:
+        return [
+            Document(
+                id=row.id,
+                name=row.name,
+                meta_data=row.meta_data,
+                content=row.content,
+                embedder=self.embedder,
+                embedding=row.embedding,
+                usage=row.usage,
+            )
+            for row in rows
+        ]
+
+    def keyword_search(self, query: str, limit: int = 5, filters: Filters = None) -> List[Document]:
+        """Rank rows whose ``content_tsv`` matches the query (GIN index scan)."""
+        try:
+            if not self._stored_tsv():
+                return Uncached(super().keyword_search(query=query, limit=limit, filters=filters))
+        except Exception as e:
+            log.error("Keyword search on %s failed: %s", self.table.fullname, e)
+            return Uncached()
+        tsv = self.table.c[TSV_COLUMN]
+        ts_query = self._ts_query(query)
+        stmt = select(*self._columns()).where(tsv.op("@@")(ts_query))
+        stmt = self._filtered(stmt, filters).order_by(func.ts_rank_cd(tsv, ts_query).desc()).limit(limit)
+        try:
+            with self.Session() as sess, sess.begin():
+                rows = sess.execute(stmt).fetchall()
+        except Exception as e:
+            log.error("Keyword search on %s failed: %s", self.table.fullname, e)
+            return Uncached()
+        return self._documents(rows)
+
+    def _distance(self, query_embedding: List[float]):
+        """Full-precision distance (ascending = closer) and the similarity score agno's hybrid formula uses."""
+        embedding = self.table.c.embedding
+        if self.distance == Distance.l2:
+            distance = embedding.l2_distance(query_embedding)
+            return distance, 1 / (1 + distance)
+        if self.distance == Distance.max_inner_product:
+            # <#> is the negated inner product, so ascending order is best-first
+            distance = embedding.max_inner_product(query_embedding)
+            return distance, (-distance + 1) / 2
+        distance = embedding.cosine_distance(query_embedding)
+        return distance, 1 / (1 + distance)
+
+    def _ann_distance(self, query_embedding: List[float]):
+        """Distance on the expression the ANN index is built on (see ``ann_column``)."""
+        embedding = self.table.c.embedding
+        if self.vector_storage == "halfvec":
+            column = cast(embedding, HALFVEC(self.dimensions))
+            if self.distance == Distance.l2:
+                return column.l2_distance(query_embedding)
+            if self.distance == Distance.max_inner_product:
+                return column.max_inner_product(query_embedding)
+            return column.cosine_distance(query_embedding)
+        if self.vector_storage == "binary":
+            bits = BIT(self.dimensions)
+            query_vector = bindparam("query_embedding", value=query_embedding, type_=VECTOR(self.dimensions))
+            return cast(func.binary_quantize(embedding), bits).op("<~>")(cast(func.binary_quantize(query_vector), bits))
+        return self._distance(query_embedding)[0]
+
+    def _ann_candidates(self, query_embedding: List[float], filters: Filters, candidates: int):
+        return (
+            self._filtered(select(self.table.c.id), filters)
+            .order_by(self._ann_distance(query_embedding))
+            .limit(candidates)
+            .subquery()
+        )
+
+    def _set_search_params(self, sess, candidates: int) -> None:
+        # HNSW returns at most ef_search rows, so widen it to the candidate count
+        if isinstance(self.vector_index, HNSW):
+            sess.execute(text(f"SET LOCAL hnsw.ef_search = {max(self.vector_index.ef_search, candidates)}"))
+        elif isinstance(self.vector_index, Ivfflat):
+            sess.execute(text(f"SET LOCAL ivfflat.probes = {self.vector_index.probes}"))
+
+    def vector_search(self, query: str, limit: int = 5, filters: Filters = None) -> List[Document]:
+        """Order by distance on the ANN index; with quantized storage, rescore its candidates at float32."""
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding:
+            log.error("Could not embed vector search query: %s", query)
+            return Uncached()
+
+        if self.vector_storage == "full":
+            candidates = limit
+            stmt = self._filtered(select(*self._columns()), filters)
+        else:
+            candidates = max(limit * 4, VECTOR_RESCORE_CANDIDATES)
+            ann = self._ann_candidates(query_embedding, filters, candidates)
+            stmt = select(*self._columns()).where(self.table.c.id.in_(select(ann.c.id)))
+        stmt = stmt.order_by(self._distance(query_embedding)[0]).limit(limit)
+        try:
+            with self.Session() as sess, sess.begin():
+                self._set_search_params(sess, candidates)
+                rows = sess.execute(stmt).fetchall()
+        except Exception as e:
+            log.error("Vector search on %s failed: %s", self.table.fullname, e)
+            return Uncached()
+
+        documents = self._documents(rows)
+        if self.reranker:
+            documents = self.reranker.rerank(query=query, documents=documents)
+        return documents
+
+    def hybrid_search(self, query: str, limit: int = 5, filters: Filters = None) -> List[Document]:
+        """Score the union of the ANN and full-text top candidates with agno's hybrid formula."""
+        try:
+            if not self._stored_tsv():
+                return Uncached(super().hybrid_search(query=query, limit=limit, filters=filters))
+        except Exception as e:
+            log.error("Hybrid search on %s failed: %s", self.table.fullname, e)
+            return Uncached()
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding:
+            log.error("Could not embed hybrid search query: %s", query)
+            return Uncached()
+        if not 0 <= self.vector_score_weight <= 1:
+            raise ValueError("vector_score_weight must be between 0 and 1")
+
+        tsv = self.table.c[TSV_COLUMN]
+        ts_query = self._ts_query(query)
+        text_rank = func.ts_rank_cd(tsv, ts_query)
+        # Always scored at full precision, which also rescores quantized ANN candidates
+        _, vector_score = self._distance(query_embedding)
+        hybrid_score = self.vector_score_weight * vector_score + (1 - self.vector_score_weight) * text_rank
+
+        candidates = max(limit * 4, TEXT_SEARCH_HYBRID_CANDIDATES)
+        if self.vector_storage != "full":
+            candidates = max(candidates, VECTOR_RESCORE_CANDIDATES)
+        by_vector = self._ann_candidates(query_embedding, filters, candidates)
+        by_text = (
+            self._filtered(select(self.table.c.id).where(tsv.op("@@")(ts_query)), filters)
+            .order_by(text_rank.desc())
+            .limit(candidates)
+            .subquery()
+        )
+        candidate_ids = union(select(by_vector.c.id), select(by_text.c.id)).subquery()
+        stmt = (
+            select(*self._columns(), hybrid_score.label("hybrid_score"))
+            .where(self.table.c.id.in_(select(candidate_ids.c.id)))
+            .order_by(desc("hybrid_score"))
+            .limit(limit)
+        )
+        try:
+            with self.Session() as sess, sess.begin():
+                self._set_search_params(sess, candidates)
+                rows = sess.execute(stmt).fetchall()
+        except Exception as e:
+            log.error("Hybrid search on %s failed: %s", self.table.fullname, e)
+            return Uncached()
+
+        documents = self._documents(rows)
+        if self.reranker:
+            documents = self.reranker.rerank(query=query, documents=documents)
+        return documents
+
+
+def tsv_column_expression(vector_db: Any) -> str | None:
+    """Return the stored ``content_tsv`` expression as Postgres prints it, or None if the column is missing."""
+    with vector_db.db_engine.connect() as conn:
+        return conn.execute(
+            text(
+                "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attribute a "
+                "JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum "
+                "WHERE a.attrelid = to_regclass(:table) AND a.attname = :column AND NOT a.attisdropped"
+            ),
+            {"table": f'"{vector_db.schema}"."{vector_db.table_name}"', "column": TSV_COLUMN},
+        ).scalar()
+
+
+def embedding_column_dimensions(vector_db: Any) -> int | None:
+    """Return the declared size of the table's ``embedding`` column, or None if the table or size is missing."""
+    with vector_db.db_engine.connect() as conn:
+        typmod = conn.execute(
+            text(
+                "SELECT atttypmod FROM pg_attribute "
+                "WHERE attrelid = to_regclass(:table) AND attname = 'embedding' AND NOT attisdropped"
+            ),
+            {"table": f'"{vector_db.schema}"."{vector_db.table_name}"'},
+        ).scalar()
+    # pgvector stores the dimensions as the type modifier; -1 means undeclared
+    return typmod if typmod is not None and typmod > 0 else None
+
+
+def full_text_statements(vector_db: Any, expression: str | None, index_valid: bool | None) -> tuple[str, list[str]]:
+    """Plan the statements that bring ``content_tsv`` and its GIN index in line with ``TEXT_SEARCH_CONFIG``.
+
+    Args:
+        vector_db: The PgVector table.
+        expression: Current column expression (``tsv_column_expression``), or None if missing.
+        index_valid: Whether the GIN index is valid, or None if it does not exist.
+
+    Returns:
+        The action (``created``, ``rebuilt`` or ``exists``) and the SQL to run, in order.
+    """
+    table = f'"{vector_db.schema}"."{vector_db.table_name}"'
+    index = tsv_index_name(vector_db)
+    column = f"{TSV_COLUMN} tsvector GENERATED ALWAYS AS ({tsv_expression(vector_db.content_language)}) STORED"
+    create_index = f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index}" ON {table} USING gin ({TSV_COLUMN})'
+
+    if expression is None:
+        return "created", [f"ALTER TABLE {table} ADD COLUMN {column}", create_index]
+    if f"'{vector_db.content_language}'::regconfig" not in expression:
+        # Dropping the column drops its index too
+        return "rebuilt", [f"ALTER TABLE {table} DROP COLUMN {TSV_COLUMN}, ADD COLUMN {column}", create_index]
+    if index_valid is None:
+        return "created", [create_index]
+    if not index_valid:
+        return "rebuilt", [f'DROP INDEX CONCURRENTLY IF EXISTS "{vector_db.schema}"."{index}"', create_index]
+    return "exists", []
+
+
+def migrate_full_text(vector_db: Any) -> IndexBuildResult:
+    """Add (or re-create) the stored tsvector column and its GIN index on an existing table.
+
+    Adding the column rewrites the table under an exclusive lock; the index
+    is then built with ``CREATE INDEX CONCURRENTLY``. ALTER TABLE fires no
+    row triggers, so the table version is bumped to drop cached searches.
+    """
+    table = f"{vector_db.schema}.{vector_db.table_name}"
+    name = tsv_index_name(vector_db)
+    if not isinstance(vector_db, FullTextPgVector) or not vector_db.table_exists():
+        return IndexBuildResult(table=table, name="", action="skipped")
+
+    status = index_status(vector_db, name)
+    action, statements = full_text_statements(
+        vector_db, tsv_column_expression(vector_db), None if status is None else status.valid
+    )
+    if not statements:
+        return IndexBuildResult(table=table, name=name, action=action)
+
+    started = time.monotonic()
+    with vector_db.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in statements:
+            log.info("%s: %s", table, statement)
+            conn.execute(text(statement))
+    bump_table_version(vector_db)
+    return IndexBuildResult(table=table, name=name, action=action, seconds=time.monotonic() - started)
@@ -0,0 +1,218 @@
+"""
+Local Embedder
+--------------
+
+In-process CPU embeddings and reranking with ONNX models via ``fastembed``.
+
+With ``EMBEDDING_PROVIDER=local``, ``create_knowledge`` embeds with
+``LocalEmbedder`` instead of calling LiteLLM. Query embeddings then take a few
+milliseconds in process, with no network hop. Ingestion throughput is bounded
+by local CPUs rather than by a remote rate limit.
+
+- Texts are embedded in batches of ``EMBEDDING_LOCAL_BATCH_SIZE``. Async
+  callers (the ingestion pipeline, agno's async search) fan the batches out
+  over a pool of ``EMBEDDING_LOCAL_THREADS`` threads. The ONNX runtime
+  releases the GIL, so batches run in parallel and the event loop is never
+  blocked.
+- The model is loaded on first use and downloaded to
+  ``EMBEDDING_LOCAL_CACHE_DIR`` if needed. Its output size must equal
+  ``EMBEDDING_DIMENSIONS``. That is checked against fastembed's model list
+  when the embedder is created, and again on the first embedding. Existing
+  vector tables are checked by ``FullTextPgVector``.
+
+``LocalReranker`` (``RERANKER=local``) reorders search results with a
+cross-encoder, independently of the embedding provider.
+
+``fastembed`` is optional: it is the ``local`` extra (``uv sync --extra local``,
+or the ``INSTALL_LOCAL_EMBEDDINGS=true`` image build arg) needed by either class.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.reranker.base import Reranker
+
+log = logging.getLogger(__name__)
+
+EMBEDDING_LOCAL_MODEL = getenv("EMBEDDING_LOCAL_MODEL", "BAAI/bge-small-en-v1.5")
+EMBEDDING_LOCAL_BATCH_SIZE = int(getenv("EMBEDDING_LOCAL_BATCH_SIZE", "64"))
+EMBEDDING_LOCAL_THREADS = int(getenv("EMBEDDING_LOCAL_THREADS", str(min(4, os.cpu_count() or 1))))
+EMBEDDING_LOCAL_CACHE_DIR = getenv("EMBEDDING_LOCAL_CACHE_DIR") or None
+RERANKER = getenv("RERANKER", "none").lower()  # none | local
+RERANKER_MODEL = getenv("RERANKER_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+
+_INSTALL_HINT = (
+    "fastembed is not installed; install the `local` extra (`uv sync --extra local`, or build the image with "
+    "INSTALL_LOCAL_EMBEDDINGS=true) to use local models"
+)
+
+
+def _fastembed() -> Any:
+    try:
+        import fastembed  # type: ignore[import-not-found]
+    except ImportError as exc:
+        raise ImportError(_INSTALL_HINT) from exc
+    return fastembed
+
+
+def model_dimensions(model: str) -> Optional[int]:
+    """Output size of a fastembed text embedding model, or None if fastembed does not list it."""
+    for description in _fastembed().TextEmbedding.list_supported_models():
+        if description.get("model") == model:
+            return description.get("dim")
+    return None
+
+
+def check_dimensions(model: str, expected: Optional[int], actual: Optional[int]) -> None:
+    """Raise ``ValueError`` when a model's output size differs from the configured ``EMBEDDING_DIMENSIONS``."""
+    if expected is not None and actual is not None and expected != actual:
+        raise ValueError(
+            f"Embedding model {model} produces {actual}-dimension vectors but EMBEDDING_DIMENSIONS is {expected}. "
+            f"Set EMBEDDING_DIMENSIONS={actual}, and re-create the knowledge tables, which store "
+            f"vector({expected}) columns."
+        )
+
+
+def _onnx_threads(workers: int) -> int:
+    """ONNX intra-op threads per session, so ``workers`` concurrent batches do not oversubscribe the CPUs."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+@dataclass
+class LocalEmbedder(Embedder):
+    """fastembed (ONNX, CPU) embedder that batches internally and runs async calls on a thread pool."""
+
+    id: str = EMBEDDING_LOCAL_MODEL
+    dimensions: Optional[int] = None
+    enable_batch: bool = True
+    batch_size: int = EMBEDDING_LOCAL_BATCH_SIZE
+    threads: int = EMBEDDING_LOCAL_THREADS
+    cache_dir: Optional[str] = EMBEDDING_LOCAL_CACHE_DIR
+    # Injected in tests; otherwise loaded on first use
+    model: Any = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _executor: Optional[ThreadPoolExecutor] = field(default=None, init=False, repr=False)
+    _checked: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.model is None:
+            listed = model_dimensions(self.id)
+            check_dimensions(self.id, self.dimensions, listed)
+            if self.dimensions is None:
+                self.dimensions = listed
+
+    def _model(self) -> Any:
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    log.info("Loading local embedding model %s", self.id)
+                    self.model = _fastembed().TextEmbedding(
+                        model_name=self.id, cache_dir=self.cache_dir, threads=_onnx_threads(self.threads)
+                    )
+        return self.model
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max(1, self.threads), thread_name_prefix="local-embedder"
+                    )
+        return self._executor
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = [vector.tolist() for vector in self._model().embed(texts, batch_size=max(1, self.batch_size))]
+        if vectors and not self._checked:
+            check_dimensions(self.id, self.dimensions, len(vectors[0]))
+            self.dimensions = len(vectors[0])
+            self._checked = True
+        return vectors
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        size = max(1, self.batch_size)
+        return [texts[i : i + size] for i in range(0, len(texts), size)]
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    def get_embeddings_batch_and_usage(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        embeddings = [vector for batch in self._batches(texts) for vector in self._embed_batch(batch)]
+        return embeddings, [None] * len(texts)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embeddings_batch_and_usage([text]))[0][0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return await self.async_get_embedding(text), None
+
+    async def async_get_embeddings_batch_and_usage(
+        self, texts: List[str]
+    ) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        """Embed ``texts`` with one pool task per batch, in parallel."""
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, self._embed_batch, batch) for batch in self._batches(texts))
+        )
+        return [vector for batch in results for vector in batch], [None] * len(texts)
+
+
+class LocalReranker(Reranker):
+    """Cross-encoder reranker (fastembed ``TextCrossEncoder``); returns the input order if scoring fails."""
+
+    model: str = RERANKER_MODEL
+    batch_size: int = EMBEDDING_LOCAL_BATCH_SIZE
+    threads: int = EMBEDDING_LOCAL_THREADS
+    cache_dir: Optional[str] = EMBEDDING_LOCAL_CACHE_DIR
+    encoder: Any = None
+
+    def _encoder(self) -> Any:
+        if self.encoder is None:
+            _fastembed()
+            from fastembed.rerank.cross_encoder import TextCrossEncoder  # type: ignore[import-not-found]
+
+            log.info("Loading local reranker %s", self.model)
+            self.encoder = TextCrossEncoder(
+                model_name=self.model, cache_dir=self.cache_dir, threads=_onnx_threads(self.threads)
+            )
+        return self.encoder
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if len(documents) < 2:
+            return documents
+        try:
+            scores = list(
+                self._encoder().rerank(query, [doc.content for doc in documents], batch_size=max(1, self.batch_size))
+            )
+        except Exception as exc:
+            log.error("Reranking failed, keeping search order: %s", exc)
+            return documents
+        for doc, score in zip(documents, scores):
+            doc.reranking_score = float(score)
+        return sorted(documents, key=lambda doc: doc.reranking_score or 0.0, reverse=True)
+
+
+_reranker: Optional[LocalReranker] = None
+
+
+def get_reranker() -> Optional[Reranker]:
+    """The reranker selected by ``RERANKER`` (one shared model for every knowledge base), or None."""
+    global _reranker
+    if RERANKER == "local":
+        if _reranker is None:
+            _reranker = LocalReranker()
+        return _reranker
+    if RERANKER not in ("", "none"):
+        raise ValueError(f"Unknown RERANKER: {RERANKER!r} (expected 'none' or 'local')")
+    return None
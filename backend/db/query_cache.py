@@ -0,0 +1,325 @@
+"""
+Query Cache
+-----------
+
+Result cache for the data agent's SQL tools, invalidated by per-table versions.
+
+The data tables (the F1 sample data, CSV tables) change only when a loader
+runs, but the agent re-runs the same analytical SQL for repeated questions.
+``summarize_table`` scans the table once per column. Results are kept per
+process, keyed by the SQL (formatting, comments and keyword case dropped,
+literals kept) and stamped with the (oid, version) of every table the query
+references. An entry is only returned while every stamp still matches.
+
+Versions come from ``backend/db/table_versions.py``: a statement-level
+trigger on each referenced table advances its sequence on any insert, update,
+delete or truncate. The trigger is installed the first time a query reads the
+table. Loaders that replace tables call ``bump_table_versions``, which
+re-installs the trigger. A table that is dropped and re-created gets a new
+oid, which also misses.
+
+Reading the versions is one catalog query for the whole schema. It is reused
+for ``QUERY_CACHE_VERSION_TTL`` seconds, so repeated questions within that
+window never touch the database. A write is seen by the cache at most that
+many seconds late.
+
+A query is only cached when it is a read (``SELECT``, ``WITH``, ``TABLE`` or
+``VALUES``), references at least one table of the schema,
+and has no volatile functions (``now()``, ``random()``, ...). It also must
+not read views, other schemas or the system catalogs, whose changes are not
+versioned. ``EXPLAIN`` is not cached either: plans change with statistics,
+indexes and settings, none of which bump a table version. Everything else
+runs uncached. Results over
+``QUERY_CACHE_MAX_RESULT_BYTES`` are not kept. The least recently used
+entries are evicted past ``QUERY_CACHE_SIZE`` entries or
+``QUERY_CACHE_MAX_BYTES`` in total.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from os import getenv
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.db.table_versions import TRIGGER_NAME, VERSION_SQL, track_tables
+from backend.db.validated_queries import sql_tokens
+
+log = logging.getLogger(__name__)
+
+QUERY_CACHE_ENABLED = getenv("QUERY_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+QUERY_CACHE_SIZE = int(getenv("QUERY_CACHE_SIZE", "1000"))
+QUERY_CACHE_MAX_BYTES = int(getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_MAX_RESULT_BYTES = int(getenv("QUERY_CACHE_MAX_RESULT_BYTES", str(1024 * 1024)))
+QUERY_CACHE_VERSION_TTL = float(getenv("QUERY_CACHE_VERSION_TTL", "2"))
+
+# Re-try untracked tables (no trigger permission) and a failed version read at most this often
+_UNTRACKED_RECHECK_SECONDS = 60.0
+
+_STATE_SQL = f"""
+SELECT c.relname, c.oid, c.relkind IN ('r', 'p') AS is_table,
+       EXISTS (SELECT 1 FROM pg_trigger t WHERE t.tgrelid = c.oid AND t.tgname = :trigger) AS tracked,
+       {VERSION_SQL} AS version
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = :schema AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+"""
+
+# First word of the statements that are cached
+_READS = {"select", "with", "table", "values"}
+# Words that make a statement write, or its result depend on more than the tables it reads
+_UNCACHEABLE = {
+    "alter", "analyze", "call", "clock_timestamp", "copy", "create", "current_date", "current_setting",
+    "current_time", "current_timestamp", "current_user", "currval", "delete", "do", "drop", "gen_random_uuid",
+    "grant", "information_schema", "insert", "into", "localtime", "localtimestamp", "lock", "merge", "nextval",
+    "notify", "now", "random", "refresh", "reset", "revoke", "session_user", "set", "setval",
+    "statement_timestamp", "timeofday", "transaction_timestamp", "truncate", "update", "vacuum",
+}  # fmt: skip
+
+Stamp = Tuple[Tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True)
+class TableState:
+    oid: int
+    # Base or partitioned table (not a view, materialized view or foreign table)
+    is_table: bool
+    tracked: bool
+    version: int
+
+
+@dataclass
+class SchemaState:
+    tables: Dict[str, TableState]
+    schemas: FrozenSet[str]
+    loaded_at: float
+
+
+def load_schema_state(conn: Connection, schema: str, now: float) -> SchemaState:
+    """Oid, kind, trigger and version of every relation in ``schema``, and the names of all schemas."""
+    rows = conn.execute(text(_STATE_SQL), {"schema": schema, "trigger": TRIGGER_NAME})
+    tables = {
+        name: TableState(int(oid), bool(is_table), bool(tracked), int(version))
+        for name, oid, is_table, tracked, version in rows
+    }
+    schemas = frozenset(conn.execute(text("SELECT nspname FROM pg_namespace")).scalars())
+    return SchemaState(tables, schemas, now)
+
+
+def cache_key(sql: str) -> str:
+    """``sql`` without formatting, comments or trailing semicolons; keywords and unquoted names case-folded."""
+    tokens = [token for _, token in sql_tokens(sql)]
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def referenced_tables(sql: str, state: SchemaState, schema: str) -> Optional[List[str]]:
+    """Tables of ``schema`` named in ``sql``, or None if its result cannot be cached by their versions.
+
+    Any name that matches a relation counts, so a column sharing a table's name only adds a dependency.
+    """
+    tokens = sql_tokens(sql)
+    if not tokens or tokens[0][1] not in _READS:
+        return None
+    names = set()
+    for index, (kind, token) in enumerate(tokens):
+        if kind == "quoted":
+            name = token[1:-1].replace('""', '"')
+        elif kind == "word":
+            if token in _UNCACHEABLE or token.startswith("pg_"):
+                return None
+            name = token
+        else:
+            continue
+        qualifies = index + 1 < len(tokens) and tokens[index + 1][1] == "."
+        if qualifies and name != schema and name in state.schemas:
+            return None
+        relation = state.tables.get(name)
+        if relation is not None:
+            if not relation.is_table:
+                return None
+            names.add(name)
+    return sorted(names) or None
+
+
+class QueryCache:
+    """LRU of query results for one schema, each stamped with the versions of the tables it read."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        schema: str = "public",
+        size: int = QUERY_CACHE_SIZE,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        max_result_bytes: int = QUERY_CACHE_MAX_RESULT_BYTES,
+        version_ttl: float = QUERY_CACHE_VERSION_TTL,
+        loader: Callable[..., SchemaState] = load_schema_state,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engine = engine
+        self.schema = schema
+        self.size = size
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        self.version_ttl = version_ttl
+        self._loader = loader
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, Tuple[Stamp, str, int]] = OrderedDict()
+        self._bytes = 0
+        self._state: Optional[SchemaState] = None
+        self._state_failed_at: Optional[float] = None
+        self._untracked: Dict[str, float] = {}  # table -> time of the last failed trigger install
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def state(self, refresh: bool = False) -> Optional[SchemaState]:
+        """Versions of the schema's tables, re-read after ``version_ttl`` seconds; None if unavailable."""
+        with self._state_lock:
+            now = self._clock()
+            state = self._state
+            if not refresh and state is not None and now - state.loaded_at < self.version_ttl:
+                return state
+            if self._state_failed_at is not None and now - self._state_failed_at < _UNTRACKED_RECHECK_SECONDS:
+                return None
+            try:
+                with self.engine.connect() as conn:
+                    state = self._loader(conn, self.schema, now)
+            except Exception as exc:
+                log.warning("Query cache disabled for %ss: %s", _UNTRACKED_RECHECK_SECONDS, exc)
+                self._state, self._state_failed_at = None, now
+                return None
+            self._state, self._state_failed_at = state, None
+            return state
+
+    def _track(self, tables: List[str]) -> bool:
+        now = self._clock()
+        failed = [self._untracked[table] for table in tables if table in self._untracked]
+        if failed and now - max(failed) < _UNTRACKED_RECHECK_SECONDS:
+            return False
+        try:
+            with self.engine.connect() as conn:
+                tracked = track_tables(conn, self.schema, tables)
+                conn.commit()
+        except Exception as exc:
+            log.warning("Could not install version triggers: %s", exc)
+            tracked = False
+        if tracked:
+            log.info("Query cache tracks %s", ", ".join(f"{self.schema}.{table}" for table in tables))
+            for table in tables:
+                self._untracked.pop(table, None)
+        else:
+            self._untracked.update((table, now) for table in tables)
+        return tracked
+
+    def stamp(self, tables: Sequence[str]) -> Optional[Stamp]:
+        """(table, oid, version) of each table, installing missing triggers; None if any is untracked."""
+        state = self.state()
+        if state is None:
+            return None
+        relations = [state.tables.get(table) for table in tables]
+        if any(relation is None or not relation.is_table for relation in relations):
+            return None
+        untracked = [table for table, relation in zip(tables, relations) if relation and not relation.tracked]
+        if untracked:
+            if not self._track(untracked):
+                return None
+            state = self.state(refresh=True)
+            if state is None:
+                return None
+            relations = [state.tables.get(table) for table in tables]
+            if any(relation is None or not relation.tracked for relation in relations):
+                return None
+        return tuple((table, relation.oid, relation.version) for table, relation in zip(tables, relations) if relation)
+
+    def schema_stamp(self) -> Optional[Stamp]:
+        """``stamp`` of every table in the schema, for results that may have read any of them."""
+        state = self.state()
+        if state is None:
+            return None
+        return self.stamp(sorted(name for name, relation in state.tables.items() if relation.is_table))
+
+    def fetch(
+        self, key: Hashable, tables: Sequence[str], run: Callable[[], str], keep: Callable[[str], bool] = bool
+    ) -> str:
+        """The cached result of ``run`` while ``tables`` are unchanged, else run it (and cache it if ``keep``)."""
+        stamp = self.stamp(sorted(tables)) if tables else None
+        if stamp is None:
+            self.bypassed += 1
+            return run()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        result = run()
+        if keep(result):
+            self.put(key, stamp, result)
+        return result
+
+    def fetch_sql(self, sql: str, run: Callable[[], str], keep: Callable[[str], bool] = bool) -> str:
+        """``fetch`` for a SQL statement, keyed by its normalized text; runs uncached if it is not cacheable."""
+        state = self.state()
+        tables = referenced_tables(sql, state, self.schema) if state is not None else None
+        if tables is None:
+            self.bypassed += 1
+            return run()
+        return self.fetch(("sql", cache_key(sql)), tables, run, keep)
+
+    def put(self, key: Hashable, stamp: Stamp, result: str) -> None:
+        size = len(result.encode("utf-8"))
+        if size > self.max_result_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (stamp, result, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.size or self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "schema": self.schema,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+            }
+
+
+_query_caches: Dict[Tuple[str, str], QueryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_query_cache(engine: Engine, schema: str = "public") -> QueryCache:
+    """Return the process-wide query cache for a database schema (created on first use)."""
+    key = (engine.url.render_as_string(hide_password=False), schema)
+    with _caches_lock:
+        cache = _query_caches.get(key)
+        if cache is None:
+            cache = _query_caches[key] = QueryCache(engine, schema)
+        return cache
+
+
+def query_cache_stats() -> List[Dict[str, Any]]:
+    with _caches_lock:
+        caches = list(_query_caches.values())
+    return [cache.stats() for cache in caches]
@@ -0,0 +1,31 @@
+"""
+Database Routes
+---------------
+Mounted on base_app.
+
+GET /db/pools        -- usage of the shared connection pools (see ``backend/db/engine.py``)
+GET /db/query-cache  -- entries and hit rate of the data agent's query cache (see ``backend/db/query_cache.py``)
+
+Access is enforced by EntraJWTMiddleware via the ``metrics:read`` scope.
+"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from backend.db.engine import pool_stats
+from backend.db.query_cache import query_cache_stats
+
+db_router = APIRouter(prefix="/db", tags=["db"])
+
+
+@db_router.get("/pools")
+async def get_pools() -> dict:
+    """Checked-out, idle and overflow connections of each pool in this worker."""
+    return pool_stats()
+
+
+@db_router.get("/query-cache")
+async def get_query_cache() -> dict:
+    """Entries, bytes, hits, misses and uncached runs of each query cache in this worker."""
+    return {"caches": query_cache_stats()}
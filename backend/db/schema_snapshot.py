@@ -0,0 +1,324 @@
+"""
+Schema Snapshot
+---------------
+
+Cached catalog snapshot behind the data agent's ``introspect_schema`` tool.
+
+SQLAlchemy's inspector costs several catalog queries per table and per call,
+and the listing used to run ``SELECT COUNT(*)`` on every table, which scans
+each one in full. Instead, one snapshot of the tables in the current schema
+is loaded with three catalog queries and kept per process. It holds columns,
+primary keys, indexes and the planner's row estimate (``pg_class.reltuples``).
+Schema tool calls are then answered from memory.
+
+A snapshot is reloaded when:
+
+- ``SCHEMA_CACHE_TTL`` seconds have passed. This also refreshes the row
+  estimates, which autovacuum keeps current.
+- the schema version changed. Event triggers on ``ddl_command_end`` and
+  ``sql_drop`` advance the ``ai.schema_version_seq`` sequence on DDL, except
+  DDL that only touches temporary objects or the ``ai`` schema (knowledge
+  tables, sessions). A sequence takes no row lock, so concurrent DDL does
+  not queue behind the trigger. Checking the version reads the sequence.
+  Creating event triggers needs superuser rights, so the triggers are
+  installed best-effort on first use. Without them, the TTL is the only
+  invalidation.
+
+Exact counts (``count(*)``) are opt-in per call. Tables that were never
+analyzed have no estimate; they are counted exactly when smaller than
+``SCHEMA_EXACT_COUNT_MAX_BYTES``. Sample rows of large tables come from
+``TABLESAMPLE SYSTEM``, which reads a few random pages instead of the start
+of the heap.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+log = logging.getLogger(__name__)
+
+SCHEMA_CACHE_TTL = float(getenv("SCHEMA_CACHE_TTL", "300"))
+SCHEMA_EXACT_COUNT_MAX_BYTES = int(getenv("SCHEMA_EXACT_COUNT_MAX_BYTES", str(8 * 1024 * 1024)))
+# Tables with fewer estimated rows are sampled with a plain LIMIT
+SCHEMA_SAMPLE_MIN_ROWS = int(getenv("SCHEMA_SAMPLE_MIN_ROWS", "10000"))
+
+# Re-try installing the event trigger at most this often
+_TRIGGER_RECHECK_SECONDS = 600.0
+
+SCHEMA_VERSION_SEQUENCE = "ai.schema_version_seq"
+SCHEMA_EVENT_TRIGGERS = ("ai_schema_version", "ai_schema_version_drop")
+
+SCHEMA_VERSION_DDL = [
+    f"CREATE SEQUENCE IF NOT EXISTS {SCHEMA_VERSION_SEQUENCE}",
+    # Replaced by the sequence; its single row serialized concurrent DDL
+    "DROP TABLE IF EXISTS ai.schema_version",
+    # Temporary objects live in pg_temp_N (and pg_toast_temp_N). Never lets a failure here
+    # (e.g. a role without USAGE on the sequence) abort someone else's DDL.
+    f"""
+CREATE OR REPLACE FUNCTION ai.bump_schema_version() RETURNS event_trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_EVENT = 'sql_drop' THEN
+        IF EXISTS (
+            SELECT 1 FROM pg_event_trigger_dropped_objects()
+            WHERE NOT is_temporary AND schema_name IS DISTINCT FROM 'ai'
+        ) THEN
+            PERFORM nextval('{SCHEMA_VERSION_SEQUENCE}');
+        END IF;
+    ELSIF EXISTS (
+        SELECT 1 FROM pg_event_trigger_ddl_commands()
+        WHERE schema_name IS DISTINCT FROM 'ai' AND coalesce(schema_name, '') NOT LIKE 'pg\\_%temp%'
+    ) THEN
+        PERFORM nextval('{SCHEMA_VERSION_SEQUENCE}');
+    END IF;
+EXCEPTION WHEN others THEN
+    NULL;
+END $$
+""",
+    """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_event_trigger WHERE evtname = 'ai_schema_version') THEN
+        CREATE EVENT TRIGGER ai_schema_version ON ddl_command_end EXECUTE FUNCTION ai.bump_schema_version();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_event_trigger WHERE evtname = 'ai_schema_version_drop') THEN
+        CREATE EVENT TRIGGER ai_schema_version_drop ON sql_drop EXECUTE FUNCTION ai.bump_schema_version();
+    END IF;
+END $$
+""",
+]
+
+_TABLES_SQL = """
+SELECT c.oid, c.relname, c.reltuples::bigint AS reltuples, pg_relation_size(c.oid) AS size_bytes
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+"""
+
+_COLUMNS_SQL = """
+SELECT a.attrelid, a.attname, format_type(a.atttypid, a.atttypmod) AS type, NOT a.attnotnull AS nullable
+FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attrelid, a.attnum
+"""
+
+_INDEXES_SQL = """
+SELECT i.indrelid, ic.relname AS name, i.indisprimary, i.indisunique, pg_get_indexdef(i.indexrelid) AS definition,
+       ARRAY(
+           SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+           JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+           ORDER BY k.ord
+       ) AS columns
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_class c ON c.oid = i.indrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema()
+ORDER BY i.indrelid, NOT i.indisprimary, ic.relname
+"""
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    name: str
+    type: str
+    nullable: bool
+
+
+@dataclass(frozen=True)
+class IndexInfo:
+    name: str
+    definition: str
+    unique: bool
+    primary: bool
+
+
+@dataclass
+class TableInfo:
+    name: str
+    # Planner estimate; None until the table is first analyzed
+    estimated_rows: Optional[int]
+    size_bytes: int
+    columns: List[ColumnInfo] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    indexes: List[IndexInfo] = field(default_factory=list)
+
+
+@dataclass
+class SchemaSnapshot:
+    tables: Dict[str, TableInfo]
+    # ai.schema_version_seq at load time; None when DDL is not tracked
+    version: Optional[int]
+    loaded_at: float
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def load_snapshot(conn: Connection, version: Optional[int] = None, now: Optional[float] = None) -> SchemaSnapshot:
+    """Read every table of the current schema with its columns, primary key and indexes (three queries)."""
+    by_oid: Dict[int, TableInfo] = {}
+    for oid, name, reltuples, size_bytes in conn.execute(text(_TABLES_SQL)):
+        # -1 (PG 14+) means never vacuumed or analyzed
+        by_oid[oid] = TableInfo(name, int(reltuples) if reltuples >= 0 else None, int(size_bytes))
+    for oid, name, type_, nullable in conn.execute(text(_COLUMNS_SQL)):
+        if oid in by_oid:
+            by_oid[oid].columns.append(ColumnInfo(name, type_, bool(nullable)))
+    for oid, name, primary, unique, definition, columns in conn.execute(text(_INDEXES_SQL)):
+        table = by_oid.get(oid)
+        if table is None:
+            continue
+        table.indexes.append(IndexInfo(name, definition, bool(unique), bool(primary)))
+        if primary:
+            table.primary_key = list(columns)
+    tables = {table.name: table for table in by_oid.values()}
+    return SchemaSnapshot(tables, version, time.monotonic() if now is None else now)
+
+
+def install_schema_trigger(conn: Connection) -> bool:
+    """Install the DDL event triggers and version sequence if missing. Returns whether DDL is tracked."""
+    installed = conn.execute(
+        text(
+            "SELECT count(*) = :triggers AND to_regclass(:sequence) IS NOT NULL "
+            "FROM pg_event_trigger WHERE evtname = ANY(:names)"
+        ),
+        {
+            "triggers": len(SCHEMA_EVENT_TRIGGERS),
+            "sequence": SCHEMA_VERSION_SEQUENCE,
+            "names": list(SCHEMA_EVENT_TRIGGERS),
+        },
+    ).scalar()
+    if installed:
+        return True
+    try:
+        with conn.begin_nested():
+            for statement in SCHEMA_VERSION_DDL:
+                conn.execute(text(statement))
+    except Exception as exc:
+        log.info("Schema cache falls back to a %ss TTL (no DDL event trigger: %s)", SCHEMA_CACHE_TTL, exc)
+        return False
+    log.info("Installed DDL event triggers %s", ", ".join(SCHEMA_EVENT_TRIGGERS))
+    return True
+
+
+def schema_version(conn: Connection) -> Optional[int]:
+    """Current value of ``ai.schema_version_seq`` (0 before any DDL), or None if it cannot be read."""
+    try:
+        with conn.begin_nested():
+            # last_value is the start value until the first nextval, so is_called tells them apart
+            version = conn.execute(
+                text(f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {SCHEMA_VERSION_SEQUENCE}")
+            ).scalar()
+    except Exception:
+        return None
+    return None if version is None else int(version)
+
+
+def exact_row_counts(conn: Connection, tables: Sequence[str]) -> Dict[str, int]:
+    """``count(*)`` of each table, in one statement (each table is scanned in full)."""
+    if not tables:
+        return {}
+    union = " UNION ALL ".join(
+        f"SELECT {index} AS i, count(*) AS n FROM {quote_ident(name)}" for index, name in enumerate(tables)
+    )
+    return {tables[index]: int(count) for index, count in conn.execute(text(union))}
+
+
+def sample_sql(table: TableInfo, limit: int, sampled: bool = True) -> str:
+    """Query for ``limit`` sample rows; large tables read a few random pages with ``TABLESAMPLE SYSTEM``."""
+    name = quote_ident(table.name)
+    rows = table.estimated_rows
+    if not sampled or rows is None or rows < SCHEMA_SAMPLE_MIN_ROWS:
+        return f"SELECT * FROM {name} LIMIT {limit}"
+    # Aim for ~20x the rows needed, since SYSTEM sampling picks whole pages and may skip sparse ones
+    percent = min(100.0, max(0.0001, 100.0 * limit * 20 / rows))
+    return f"SELECT * FROM {name} TABLESAMPLE SYSTEM ({percent:.4f}) LIMIT {limit}"
+
+
+def sample_rows(conn: Connection, table: TableInfo, limit: int) -> Tuple[List[str], List[Any]]:
+    """Column names and up to ``limit`` sample rows, re-read with a plain LIMIT if the sampled pages held too few."""
+    sql = sample_sql(table, limit)
+    result = conn.execute(text(sql))
+    rows = list(result.fetchall())
+    if len(rows) < limit and sql != sample_sql(table, limit, sampled=False):
+        result = conn.execute(text(sample_sql(table, limit, sampled=False)))
+        rows = list(result.fetchall())
+    return list(result.keys()), rows
+
+
+class SchemaCache:
+    """Per-process schema snapshot, reloaded after ``ttl`` seconds or when ``ai.schema_version_seq`` changes."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        ttl: float = SCHEMA_CACHE_TTL,
+        loader: Callable[..., SchemaSnapshot] = load_snapshot,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engine = engine
+        self.ttl = ttl
+        self._loader = loader
+        self._clock = clock
+        self._snapshot: Optional[SchemaSnapshot] = None
+        # None until checked; then whether DDL is tracked, re-checked every _TRIGGER_RECHECK_SECONDS if not
+        self._tracked: Optional[bool] = None
+        self._tracked_checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _trigger_check_due(self) -> bool:
+        if self._tracked is None:
+            return True
+        return not self._tracked and self._clock() - self._tracked_checked_at > _TRIGGER_RECHECK_SECONDS
+
+    def _is_tracked(self, conn: Connection) -> bool:
+        if self._trigger_check_due():
+            try:
+                self._tracked = install_schema_trigger(conn)
+                conn.commit()
+            except Exception as exc:
+                log.warning("Could not check the schema event trigger: %s", exc)
+                conn.rollback()
+                self._tracked = False
+            self._tracked_checked_at = self._clock()
+        return bool(self._tracked)
+
+    def get(self) -> SchemaSnapshot:
+        """The current snapshot: one version lookup (none without the trigger) while fresh, else a reload."""
+        with self._lock:
+            snapshot = self._snapshot
+            fresh = snapshot is not None and self._clock() - snapshot.loaded_at < self.ttl
+            if snapshot is not None and fresh and self._tracked is False and not self._trigger_check_due():
+                return snapshot
+            with self.engine.connect() as conn:
+                version = schema_version(conn) if self._is_tracked(conn) else None
+                if snapshot is not None and fresh and (version is None or version == snapshot.version):
+                    return snapshot
+                snapshot = self._loader(conn, version=version, now=self._clock())
+                conn.commit()
+            self._snapshot = snapshot
+            self.loads += 1
+            return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+
+_schema_caches: Dict[str, SchemaCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_schema_cache(engine: Engine) -> SchemaCache:
+    """Return the process-wide schema cache for an engine's database (created on first use)."""
+    key = engine.url.render_as_string(hide_password=False)
+    with _caches_lock:
+        cache = _schema_caches.get(key)
+        if cache is None:
+            cache = _schema_caches[key] = SchemaCache(engine)
+        return cache
@@ -0,0 +1,166 @@
+"""
+Search Cache
+------------
+
+Result cache for knowledge searches, invalidated by per-table versions.
+
+Entries are keyed by (vector table, normalized query, search type, limit,
+filters), so a hit skips both the query embedding and the database search.
+Every knowledge table carries a version (``backend/db/table_versions.py``),
+advanced by a statement-level trigger on any insert, update, delete or
+truncate. That covers ``Knowledge.insert``, the ingestion pipeline, URL
+refreshes and learnings alike, from any process. A cached result is only
+returned while the table's version is the one it was computed at; checking
+it is one catalog lookup.
+
+The trigger is installed on first search of each table (or by
+``FullTextPgVector.create``); tables without it are never cached.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from os import getenv
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from sqlalchemy import text
+
+from backend.db.schema_snapshot import quote_ident
+from backend.db.table_versions import TRIGGER_NAME, Version, bump_table_versions, table_versions, track_tables
+
+log = logging.getLogger(__name__)
+
+SEARCH_CACHE_ENABLED = getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+SEARCH_CACHE_SIZE = int(getenv("SEARCH_CACHE_SIZE", "2000"))
+
+# Re-check untracked tables (not created yet, or no trigger permission) at most this often
+_UNTRACKED_RECHECK_SECONDS = 60.0
+
+CacheKey = Tuple[str, str, str, int, str]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(query.casefold().split())
+
+
+def filters_key(filters: Any) -> str:
+    """Stable string for dict or FilterExpr filters."""
+    if filters is None:
+        return ""
+    if isinstance(filters, dict):
+        return json.dumps(filters, sort_keys=True, default=str)
+    return json.dumps([f.to_dict() if hasattr(f, "to_dict") else f for f in filters], sort_keys=True, default=str)
+
+
+def qualified_table(vector_db: Any) -> str:
+    return f"{vector_db.schema}.{vector_db.table_name}"
+
+
+def _table(vector_db: Any) -> str:
+    return f"{quote_ident(vector_db.schema)}.{quote_ident(vector_db.table_name)}"
+
+
+def ensure_version_trigger(vector_db: Any) -> bool:
+    """Install the version trigger on the table if missing. Returns whether the table is tracked."""
+    try:
+        with vector_db.db_engine.begin() as conn:
+            installed = conn.execute(
+                text("SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(:table) AND tgname = :name"),
+                {"table": qualified_table(vector_db), "name": TRIGGER_NAME},
+            ).first()
+            if installed:
+                return True
+            if not vector_db.table_exists():
+                return False
+            # Earlier trigger, which bumped a shared row in ai.knowledge_versions
+            conn.execute(
+                text(f"DROP TRIGGER IF EXISTS {quote_ident(vector_db.table_name + '_version')} ON {_table(vector_db)}")
+            )
+            if not track_tables(conn, vector_db.schema, [vector_db.table_name]):
+                return False
+            log.info("Installed version trigger on %s", qualified_table(vector_db))
+            return True
+    except Exception as exc:
+        log.warning("Search cache disabled for %s: %s", qualified_table(vector_db), exc)
+        return False
+
+
+def table_version(vector_db: Any) -> Optional[Version]:
+    """Current (oid, version) of the table, or None if it is not tracked or cannot be read."""
+    try:
+        with vector_db.db_engine.connect() as conn:
+            return table_versions(conn, vector_db.schema, [vector_db.table_name])[vector_db.table_name]
+    except Exception as exc:
+        log.warning("Could not read version of %s: %s", qualified_table(vector_db), exc)
+        return None
+
+
+def bump_table_version(vector_db: Any) -> None:
+    """Invalidate cached searches of the table after a change its trigger does not see (e.g. ALTER TABLE)."""
+    try:
+        with vector_db.db_engine.begin() as conn:
+            bump_table_versions(conn, vector_db.schema, [vector_db.table_name])
+    except Exception as exc:
+        log.warning("Could not bump version of %s: %s", qualified_table(vector_db), exc)
+
+
+class SearchCache:
+    """LRU of search results, each tagged with the table version it was computed at."""
+
+    def __init__(self, size: int = 2000):
+        self._size = size
+        self._entries: OrderedDict[CacheKey, Tuple[Version, List[Document]]] = OrderedDict()
+        self._tracked: Dict[str, float] = {}  # table -> 0 when tracked, else time of the last failed check
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_tracked(self, vector_db: Any) -> bool:
+        """Whether the table has a version trigger (installing it if needed; failures re-checked after a minute)."""
+        table = qualified_table(vector_db)
+        checked = self._tracked.get(table)
+        if checked == 0:
+            return True
+        if checked is not None and time.monotonic() - checked < _UNTRACKED_RECHECK_SECONDS:
+            return False
+        tracked = ensure_version_trigger(vector_db)
+        self._tracked[table] = 0 if tracked else time.monotonic()
+        return tracked
+
+    def get(self, key: CacheKey, version: Version) -> Optional[List[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Copies, so callers (rerankers, reference builders) cannot mutate the cached documents
+        return [replace(doc) for doc in entry[1]]
+
+    def put(self, key: CacheKey, version: Version, documents: List[Document]) -> None:
+        with self._lock:
+            self._entries[key] = (version, [replace(doc) for doc in documents])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_search_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache (created on first use)."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(size=SEARCH_CACHE_SIZE)
+    return _search_cache
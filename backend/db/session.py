@@ -5,25 +5,38 @@ Database Session
 PostgreSQL database connection for Apollos AI.
 """
 
+from dataclasses import dataclass
 from os import getenv
 
 from agno.db.postgres import PostgresDb
 from agno.knowledge import Knowledge
+from agno.knowledge.embedder.base import Embedder
 from agno.knowledge.embedder.openai import OpenAIEmbedder
-from agno.vectordb.pgvector import PgVector, SearchType
+from agno.vectordb.pgvector import SearchType
 
+from backend.db.embedding_cache import EMBEDDING_CACHE_ENABLED, CachedEmbedder
+from backend.db.engine import get_engine
+from backend.db.full_text import TEXT_SEARCH_CONFIG, FullTextPgVector
+from backend.db.local_embedder import EMBEDDING_LOCAL_MODEL, LocalEmbedder, get_reranker
 from backend.db.url import db_url
+from backend.db.vector_index import VECTOR_STORAGE, VectorIndex, vector_index_config
 
 LITELLM_BASE_URL = getenv("LITELLM_BASE_URL", "http://localhost:4000/v1")
 LITELLM_API_KEY = getenv("LITELLM_API_KEY", "")
+EMBEDDING_PROVIDER = getenv("EMBEDDING_PROVIDER", "litellm").lower()  # litellm | local
 EMBEDDING_MODEL_ID = getenv("EMBEDDING_MODEL_ID", "text-embedding-3-small")
-EMBEDDING_DIMENSIONS = int(getenv("EMBEDDING_DIMENSIONS", "1536"))
+# bge-small-en-v1.5, the default local model, produces 384-dimension vectors
+EMBEDDING_DIMENSIONS = int(getenv("EMBEDDING_DIMENSIONS", "384" if EMBEDDING_PROVIDER == "local" else "1536"))
 
 DB_ID = "apollos-db"
 
+# Every knowledge base created in this process, by vector table name
+_knowledge_bases: dict[str, Knowledge] = {}
+_embedder: Embedder | None = None
+
 
 def get_postgres_db(contents_table: str | None = None) -> PostgresDb:
-    """Create a PostgresDb instance.
+    """Create a PostgresDb instance on the shared engine (see ``backend/db/engine.py``).
 
     Args:
         contents_table: Optional table name for storing knowledge contents.
@@ -32,8 +45,8 @@ def get_postgres_db(contents_table: str | None = None) -> PostgresDb:
         Configured PostgresDb instance.
     """
     if contents_table is not None:
-        return PostgresDb(id=DB_ID, db_url=db_url, knowledge_table=contents_table)
-    return PostgresDb(id=DB_ID, db_url=db_url)
+        return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_engine(), knowledge_table=contents_table)
+    return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_engine())
 
 
 def get_eval_db() -> PostgresDb:
@@ -42,31 +55,105 @@ def get_eval_db() -> PostgresDb:
     Returns:
         Configured PostgresDb instance with eval_table="eval_runs".
     """
-    return PostgresDb(id=DB_ID, db_url=db_url, eval_table="eval_runs")
+    return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_engine(), eval_table="eval_runs")
+
+
+def get_embedder() -> Embedder:
+    """Return the embedder shared by all knowledge bases, creating it on first call.
+
+    ``EMBEDDING_PROVIDER=local`` embeds in process on CPU with ``LocalEmbedder``
+    (see ``backend/db/local_embedder.py``), so one instance means one model in
+    memory; the default calls the LiteLLM proxy. Wrapped in ``CachedEmbedder``
+    unless ``EMBEDDING_CACHE_ENABLED=false``.
 
+    Returns:
+        Configured Embedder instance.
+    """
+    global _embedder
+    if _embedder is None:
+        _embedder = _create_embedder()
+    return _embedder
+
+
+def _create_embedder() -> Embedder:
+    embedder: Embedder
+    if EMBEDDING_PROVIDER == "local":
+        embedder = LocalEmbedder(id=EMBEDDING_LOCAL_MODEL, dimensions=EMBEDDING_DIMENSIONS)
+    elif EMBEDDING_PROVIDER == "litellm":
+        embedder = OpenAIEmbedder(
+            id=EMBEDDING_MODEL_ID,
+            dimensions=EMBEDDING_DIMENSIONS,
+            base_url=LITELLM_BASE_URL,
+            api_key=LITELLM_API_KEY,
+        )
+    else:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {EMBEDDING_PROVIDER!r} (expected 'litellm' or 'local')")
+    if not EMBEDDING_CACHE_ENABLED:
+        return embedder
+    return CachedEmbedder(inner=embedder)
+
+
+@dataclass
+class LazyKnowledge(Knowledge):
+    """Knowledge that leaves creating its vector table to the first query (see ``FullTextPgVector.ensure_table``).
+
+    Agno's ``Knowledge`` checks for and creates the table on construction, so
+    every agent module imported would cost database round trips (and fail
+    without a database).
+    """
 
-def create_knowledge(name: str, table_name: str) -> Knowledge:
-    """Create a Knowledge instance with PgVector hybrid search.
+    def __post_init__(self) -> None:
+        self.construct_readers()
+
+
+def create_knowledge(
+    name: str, table_name: str, vector_index: VectorIndex | None = None, vector_storage: str | None = None
+) -> Knowledge:
+    """Return the Knowledge instance for a vector table, creating it with PgVector hybrid search on first call.
+
+    One instance is shared per table: agents, the registry and scripts that
+    ask for the same table get the same object (the other arguments only
+    apply to the first call). Nothing is read from or written to the database
+    until the first query, which creates the table if needed.
+
+    Keyword and hybrid search use a stored tsvector column with a GIN index
+    (see ``backend/db/full_text.py``). Vector and hybrid results are reordered
+    by the ``RERANKER`` when one is configured.
 
     Args:
         name: Display name for the knowledge base.
         table_name: PostgreSQL table name for vector storage.
+        vector_index: ANN index spec for this table (defaults to ``VECTOR_INDEX_*`` settings).
+        vector_storage: What the ANN index holds: ``full``, ``halfvec`` or ``binary``
+            (defaults to ``VECTOR_STORAGE``). Reduced modes rescore candidates at full precision.
 
     Returns:
         Configured Knowledge instance.
     """
-    return Knowledge(
+    existing = _knowledge_bases.get(table_name)
+    if existing is not None:
+        return existing
+    knowledge = LazyKnowledge(
         name=name,
-        vector_db=PgVector(
+        vector_db=FullTextPgVector(
+            # db_url keeps the vector db id stable; queries go through the shared engine
             db_url=db_url,
+            db_engine=get_engine(),
             table_name=table_name,
             search_type=SearchType.hybrid,
-            embedder=OpenAIEmbedder(
-                id=EMBEDDING_MODEL_ID,
-                dimensions=EMBEDDING_DIMENSIONS,
-                base_url=LITELLM_BASE_URL,
-                api_key=LITELLM_API_KEY,
-            ),
+            embedder=get_embedder(),
+            content_language=TEXT_SEARCH_CONFIG,
+            vector_storage=vector_storage or VECTOR_STORAGE,
+            # A fresh spec per table (agno's default HNSW() is shared); None when VECTOR_INDEX_TYPE=none
+            vector_index=vector_index or vector_index_config(),  # type: ignore[arg-type]
+            reranker=get_reranker(),
         ),
         contents_db=get_postgres_db(contents_table=f"{table_name}_contents"),
     )
+    _knowledge_bases[table_name] = knowledge
+    return knowledge
+
+
+def get_knowledge_bases() -> dict[str, Knowledge]:
+    """Return the knowledge bases created so far in this process, keyed by vector table name."""
+    return dict(_knowledge_bases)
@@ -0,0 +1,120 @@
+"""
+Table Versions
+--------------
+
+Change counters for tables whose contents are cached in process: knowledge
+tables (``backend/db/search_cache.py``, the answer cache) and the data
+agent's SQL tables (``backend/db/query_cache.py``).
+
+A tracked table has a statement-level trigger (``ai_table_version``) that
+advances the table's own sequence in ``ai`` on any insert, update, delete or
+truncate. A sequence takes no row lock, so concurrent writers never queue
+behind the trigger. ``ai.bump_table_version()`` runs as its owner with a
+pinned ``search_path``, so writers need no rights on ``ai``, and it turns its
+own errors into a warning, so it can never fail someone else's write.
+
+``nextval`` is visible to other sessions at once, before the write commits,
+and a cache filled in between would keep the old rows under the new version.
+A version therefore also adds the table's insert, update and delete counts
+from the cumulative statistics, which only move once the write has committed
+and its statistics are flushed (about a second later). Rolled-back writes
+bump both, which only costs a cache miss. The counters start over when a table
+is dropped and re-created, so a version is only meaningful with the table's
+oid next to it.
+"""
+
+import hashlib
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.db.schema_snapshot import quote_ident
+
+log = logging.getLogger(__name__)
+
+TRIGGER_NAME = "ai_table_version"
+
+VERSIONS_DDL = [
+    # Replaced by per-table sequences; its rows serialized concurrent writers of a table
+    "DROP TABLE IF EXISTS ai.table_versions",
+    """
+CREATE OR REPLACE FUNCTION ai.bump_table_version() RETURNS trigger
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = pg_catalog, pg_temp AS $$
+BEGIN
+    PERFORM nextval(('ai.tv_' || md5(TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME))::regclass);
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RAISE WARNING 'ai.bump_table_version() on %.%: %', TG_TABLE_SCHEMA, TG_TABLE_NAME, SQLERRM;
+    RETURN NULL;
+END $$
+""",
+]
+
+# Version of relation ``c`` in namespace ``n`` (0 before its first tracked write)
+VERSION_SQL = """(
+    coalesce((SELECT s.last_value FROM pg_sequences s
+              WHERE s.schemaname = 'ai' AND s.sequencename = 'tv_' || md5(n.nspname || '.' || c.relname)), 0)
+    + pg_stat_get_tuples_inserted(c.oid) + pg_stat_get_tuples_updated(c.oid) + pg_stat_get_tuples_deleted(c.oid)
+)"""
+
+# (oid, version) of a table
+Version = Tuple[int, int]
+
+_VERSIONS_SQL = f"""
+SELECT c.relname, c.oid, {VERSION_SQL} AS version,
+       EXISTS (SELECT 1 FROM pg_trigger t WHERE t.tgrelid = c.oid AND t.tgname = :trigger) AS tracked
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = :schema AND c.relname = ANY(:tables)
+"""
+
+
+def sequence_name(schema: str, table: str) -> str:
+    """Qualified name of the table's version sequence (hashed, so any table name fits in 63 bytes)."""
+    return "ai.tv_" + hashlib.md5(f"{schema}.{table}".encode("utf-8")).hexdigest()
+
+
+def trigger_ddl(schema: str, table: str) -> str:
+    return (
+        f"CREATE OR REPLACE TRIGGER {TRIGGER_NAME} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+        f"ON {quote_ident(schema)}.{quote_ident(table)} FOR EACH STATEMENT EXECUTE FUNCTION ai.bump_table_version()"
+    )
+
+
+def track_tables(conn: Connection, schema: str, tables: Sequence[str]) -> bool:
+    """Install each table's sequence and trigger (in a savepoint). Returns whether all are tracked."""
+    try:
+        with conn.begin_nested():
+            for statement in VERSIONS_DDL:
+                conn.execute(text(statement))
+            for table in tables:
+                conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {sequence_name(schema, table)}"))
+                conn.execute(text(trigger_ddl(schema, table)))
+    except Exception as exc:
+        log.warning("Cannot track versions of %s in %s: %s", ", ".join(tables), schema, exc)
+        return False
+    return True
+
+
+def bump_table_versions(conn: Connection, schema: str, tables: Sequence[str]) -> bool:
+    """Record a change the triggers do not see (a replaced table, ALTER TABLE) and track later writes. Never raises."""
+    if not track_tables(conn, schema, tables):
+        return False
+    try:
+        with conn.begin_nested():
+            for table in tables:
+                conn.execute(
+                    text("SELECT nextval(CAST(:sequence AS regclass))"), {"sequence": sequence_name(schema, table)}
+                )
+    except Exception as exc:
+        log.warning("Could not bump table versions in %s: %s", schema, exc)
+        return False
+    return True
+
+
+def table_versions(conn: Connection, schema: str, tables: Sequence[str]) -> Dict[str, Optional[Version]]:
+    """(oid, version) of each tracked table; None for tables that are missing or have no trigger."""
+    rows = conn.execute(text(_VERSIONS_SQL), {"schema": schema, "tables": list(tables), "trigger": TRIGGER_NAME})
+    found = {name: (int(oid), int(version)) for name, oid, version, tracked in rows if tracked}
+    return {table: found.get(table) for table in tables}
@@ -0,0 +1,227 @@
+"""
+Validated Queries
+-----------------
+
+SQL fingerprints and the exact-match index of validated queries.
+
+``save_validated_query`` stores each query in ``data_knowledge`` for vector
+search. It also records a row in ``ai.validated_queries``, keyed by
+(knowledge table, SQL fingerprint). The fingerprint is the sha256 of the
+query's normalized token stream. Comments and formatting are dropped, keywords
+and unquoted identifiers are case-folded, and literals (strings, numbers,
+``$n`` parameters, and lists of them) become ``?``. As in ``pg_stat_statements``,
+queries that differ only in constants share a fingerprint, so the same SQL
+saved under different names maps to one row. Saving it again updates that row and replaces its knowledge
+content instead of adding a copy.
+
+``lookup_validated_query`` reads the same table by fingerprint or normalized
+question. Both are index lookups, so the agent can reuse a validated query
+before any vector search.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, delete, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from backend.db.search_cache import normalize_query
+
+# Knowledge content metadata key holding the fingerprint
+FINGERPRINT_KEY = "sql_fingerprint"
+
+_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<dollar>\$(?P<tag>[^\W\d]\w*)?\$.*?\$(?P=tag)?\$)
+  | (?P<string>(?:[EeBbXxNn]|[Uu]&)?'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<word>[^\W\d][\w$]*)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<param>\$\d+)
+  | (?P<operator>::|<=|>=|<>|!=|\|\||[^\s\w])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_LITERALS = {"dollar", "string", "number", "param"}
+# A "-" after these is a sign, not a subtraction
+_SIGN_CONTEXT = {"(", ",", "=", "<", ">", "<=", ">=", "<>", "!=", "+", "-", "*", "/", "then", "else", "when"}
+
+_metadata = MetaData(schema="ai")
+
+validated_queries_table = Table(
+    "validated_queries",
+    _metadata,
+    Column("knowledge_table", String(255), primary_key=True),
+    Column("fingerprint", String(64), primary_key=True),
+    Column("name", Text, nullable=False),
+    Column("question", Text, nullable=False),
+    Column("question_key", Text, nullable=False),
+    Column("query", Text, nullable=False),
+    Column("normalized_query", Text, nullable=False),
+    Column("payload", JSONB, nullable=False),
+    Column("content_id", String(255)),
+    Column("saves", Integer, nullable=False, default=1),
+    Column("created_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)),
+    Column("updated_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)),
+    Index("validated_queries_question_idx", "knowledge_table", "question_key"),
+)
+
+
+def sql_tokens(sql: str) -> List[Tuple[str, str]]:
+    """(kind, text) of each token of ``sql``, without whitespace and comments; words are case-folded."""
+    tokens: List[Tuple[str, str]] = []
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup or ""
+        if kind in ("space", "comment"):
+            continue
+        tokens.append((kind, match.group().casefold() if kind == "word" else match.group()))
+    return tokens
+
+
+def normalize_sql(sql: str) -> str:
+    """Token stream of ``sql`` with formatting, comments and literal values removed."""
+    tokens: List[str] = []
+    for kind, token in sql_tokens(sql):
+        if kind in _LITERALS:
+            # Fold a sign into the literal, and a list of literals into one
+            if tokens[-1:] == ["-"] and (len(tokens) == 1 or tokens[-2] in _SIGN_CONTEXT):
+                tokens.pop()
+            if tokens[-2:] == ["?", ","]:
+                tokens.pop()
+                continue
+            tokens.append("?")
+        else:
+            tokens.append(token)
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def sql_fingerprint(sql: str) -> str:
+    """sha256 of the normalized SQL: equal for queries that differ only in formatting and literals."""
+    return hashlib.sha256(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+def question_key(question: str) -> str:
+    return normalize_query(question).rstrip("?!. ")
+
+
+@dataclass
+class ValidatedQuery:
+    fingerprint: str
+    name: str
+    question: str
+    query: str
+    payload: Dict[str, Any]
+    content_id: Optional[str] = None
+    saves: int = 1
+
+
+class ValidatedQueryStore:
+    """Exact-match index of the validated queries saved to one knowledge base."""
+
+    def __init__(self, knowledge: Any):
+        self._knowledge = knowledge
+        self._ready = False
+
+    @property
+    def _vector_db(self) -> Any:
+        return self._knowledge.vector_db
+
+    @property
+    def knowledge_table(self) -> str:
+        return self._vector_db.table_name
+
+    def _engine(self) -> Any:
+        engine = self._vector_db.db_engine
+        if not self._ready:
+            _metadata.create_all(engine, tables=[validated_queries_table], checkfirst=True)
+            self._ready = True
+        return engine
+
+    def _query(self, row: Any) -> ValidatedQuery:
+        return ValidatedQuery(
+            fingerprint=row.fingerprint,
+            name=row.name,
+            question=row.question,
+            query=row.query,
+            payload=row.payload,
+            content_id=row.content_id,
+            saves=row.saves,
+        )
+
+    def get(self, fingerprint: str) -> Optional[ValidatedQuery]:
+        t = validated_queries_table
+        with self._engine().connect() as conn:
+            row = conn.execute(
+                select(t).where(t.c.knowledge_table == self.knowledge_table, t.c.fingerprint == fingerprint)
+            ).first()
+        return self._query(row) if row is not None else None
+
+    def find(self, question: Optional[str] = None, sql: Optional[str] = None) -> Optional[ValidatedQuery]:
+        """Validated query with the same SQL fingerprint, else the latest one saved for the same question."""
+        if sql:
+            found = self.get(sql_fingerprint(sql))
+            if found is not None or not question:
+                return found
+        if not question:
+            return None
+        t = validated_queries_table
+        with self._engine().connect() as conn:
+            row = conn.execute(
+                select(t)
+                .where(t.c.knowledge_table == self.knowledge_table, t.c.question_key == question_key(question))
+                .order_by(t.c.updated_at.desc())
+                .limit(1)
+            ).first()
+        return self._query(row) if row is not None else None
+
+    def content_id_of(self, fingerprint: str, exclude: Optional[str] = None) -> Optional[str]:
+        """Knowledge content id of the rows inserted with this fingerprint in their metadata, other than ``exclude``."""
+        table = self._vector_db.table
+        stmt = select(table.c.content_id).where(table.c.meta_data[FINGERPRINT_KEY].astext == fingerprint)
+        if exclude is not None:
+            stmt = stmt.where(table.c.content_id != exclude)
+        with self._engine().connect() as conn:
+            return conn.execute(stmt.limit(1)).scalar()
+
+    def save(self, sql: str, payload: Dict[str, Any], content_id: Optional[str]) -> None:
+        """Upsert on the fingerprint; rows whose content was overwritten (same name, other SQL) are dropped."""
+        t = validated_queries_table
+        fingerprint = sql_fingerprint(sql)
+        values = {
+            "knowledge_table": self.knowledge_table,
+            "fingerprint": fingerprint,
+            "name": payload["name"],
+            "question": payload["question"],
+            "question_key": question_key(payload["question"]),
+            "query": payload["query"],
+            "normalized_query": normalize_sql(sql),
+            "payload": payload,
+            "content_id": content_id,
+        }
+        stmt = insert(t).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.knowledge_table, t.c.fingerprint],
+            set_={
+                **{key: stmt.excluded[key] for key in ("name", "question", "question_key", "query", "payload")},
+                "content_id": stmt.excluded.content_id,
+                "saves": t.c.saves + 1,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        )
+        with self._engine().begin() as conn:
+            conn.execute(stmt)
+            if content_id is not None:
+                conn.execute(
+                    delete(t).where(
+                        t.c.knowledge_table == self.knowledge_table,
+                        t.c.content_id == content_id,
+                        t.c.fingerprint != fingerprint,
+                    )
+                )
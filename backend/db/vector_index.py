@@ -0,0 +1,275 @@
+"""
+Vector Indexes
+--------------
+
+ANN index configuration and management for PgVector knowledge tables.
+
+``create_knowledge`` attaches an index spec (agno's ``HNSW`` or ``Ivfflat``)
+to every PgVector table; agno applies its query-time setting (``ef_search`` or
+``probes``) with ``SET LOCAL`` on each search. Agno never builds the index
+itself, so ``build_index`` does, with ``CREATE INDEX CONCURRENTLY`` so that
+ingestion and search keep working during the build. Rebuilds create a new
+index alongside the old one and swap names, and invalid leftovers from an
+interrupted concurrent build are dropped and rebuilt.
+
+``VECTOR_STORAGE`` picks what the index holds: the float32 ``embedding``
+column (``full``), an expression index on ``embedding::halfvec`` (half the
+index size), or on ``binary_quantize(embedding)::bit`` (1/32 of it). In the
+reduced modes searches take the top candidates from the index and rescore
+them against the float32 column, which is kept for that purpose.
+
+Usage:
+    python -m backend.scripts.build_indexes
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from math import sqrt
+from os import getenv
+from typing import Any
+
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+VECTOR_INDEX_TYPE = getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+VECTOR_INDEX_HNSW_M = int(getenv("VECTOR_INDEX_HNSW_M", "16"))
+VECTOR_INDEX_HNSW_EF_CONSTRUCTION = int(getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", "64"))
+VECTOR_INDEX_HNSW_EF_SEARCH = int(getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "40"))
+VECTOR_INDEX_IVFFLAT_LISTS = int(getenv("VECTOR_INDEX_IVFFLAT_LISTS", "0"))  # 0 = sized from row count
+VECTOR_INDEX_IVFFLAT_PROBES = int(getenv("VECTOR_INDEX_IVFFLAT_PROBES", "10"))
+VECTOR_INDEX_MAINTENANCE_WORK_MEM = getenv("VECTOR_INDEX_MAINTENANCE_WORK_MEM", "512MB")
+VECTOR_STORAGE = getenv("VECTOR_STORAGE", "full").lower()
+VECTOR_RESCORE_CANDIDATES = int(getenv("VECTOR_RESCORE_CANDIDATES", "40"))
+
+VECTOR_STORAGES = ("full", "halfvec", "binary")
+
+VectorIndex = HNSW | Ivfflat
+
+_OPERATOR_CLASSES = {
+    Distance.cosine: "vector_cosine_ops",
+    Distance.l2: "vector_l2_ops",
+    Distance.max_inner_product: "vector_ip_ops",
+}
+
+_HALFVEC_OPERATOR_CLASSES = {
+    Distance.cosine: "halfvec_cosine_ops",
+    Distance.l2: "halfvec_l2_ops",
+    Distance.max_inner_product: "halfvec_ip_ops",
+}
+
+
+def vector_index_config(
+    kind: str | None = None,
+    *,
+    m: int | None = None,
+    ef_construction: int | None = None,
+    ef_search: int | None = None,
+    lists: int | None = None,
+    probes: int | None = None,
+) -> VectorIndex | None:
+    """Build an index spec, filling unset parameters from the environment.
+
+    Args:
+        kind: ``hnsw``, ``ivfflat`` or ``none`` (defaults to ``VECTOR_INDEX_TYPE``).
+        m: HNSW max connections per layer.
+        ef_construction: HNSW candidate list size while building.
+        ef_search: HNSW candidate list size at query time.
+        lists: IVFFlat list count; 0 sizes it from the row count at build time.
+        probes: IVFFlat lists scanned at query time.
+
+    Returns:
+        An ``HNSW`` or ``Ivfflat`` spec, or None for no index.
+    """
+    kind = (kind or VECTOR_INDEX_TYPE).lower()
+    if kind == "none":
+        return None
+    if kind == "hnsw":
+        return HNSW(
+            m=m or VECTOR_INDEX_HNSW_M,
+            ef_construction=ef_construction or VECTOR_INDEX_HNSW_EF_CONSTRUCTION,
+            ef_search=ef_search or VECTOR_INDEX_HNSW_EF_SEARCH,
+            configuration={"maintenance_work_mem": VECTOR_INDEX_MAINTENANCE_WORK_MEM},
+        )
+    if kind == "ivfflat":
+        list_count = VECTOR_INDEX_IVFFLAT_LISTS if lists is None else lists
+        return Ivfflat(
+            lists=list_count or 100,
+            dynamic_lists=list_count == 0,
+            probes=probes or VECTOR_INDEX_IVFFLAT_PROBES,
+            configuration={"maintenance_work_mem": VECTOR_INDEX_MAINTENANCE_WORK_MEM},
+        )
+    raise ValueError(f"Unknown vector index type: {kind!r} (expected hnsw, ivfflat or none)")
+
+
+def vector_storage(mode: str | None = None) -> str:
+    """Validate a storage mode (defaults to ``VECTOR_STORAGE``)."""
+    mode = (mode or VECTOR_STORAGE).lower()
+    if mode not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown vector storage: {mode!r} (expected {', '.join(VECTOR_STORAGES)})")
+    return mode
+
+
+def ann_column(vector_db: Any) -> tuple[str, str]:
+    """Indexed expression and operator class for the table's storage mode."""
+    storage = getattr(vector_db, "vector_storage", "full")
+    if storage == "halfvec":
+        ops = _HALFVEC_OPERATOR_CLASSES.get(vector_db.distance, "halfvec_cosine_ops")
+        return f"(embedding::halfvec({vector_db.dimensions}))", ops
+    if storage == "binary":
+        # Hamming distance on sign bits ranks candidates; rescoring restores the configured distance
+        return f"(binary_quantize(embedding)::bit({vector_db.dimensions}))", "bit_hamming_ops"
+    return "embedding", _OPERATOR_CLASSES.get(vector_db.distance, "vector_cosine_ops")
+
+
+def set_search_params(knowledge: Any, *, ef_search: int | None = None, probes: int | None = None) -> None:
+    """Tune query-time recall/latency for one knowledge base (or vector DB).
+
+    Args:
+        knowledge: A Knowledge instance or its PgVector.
+        ef_search: HNSW candidate list size (higher = better recall, slower).
+        probes: IVFFlat lists scanned (higher = better recall, slower).
+    """
+    vector_db = getattr(knowledge, "vector_db", knowledge)
+    index = getattr(vector_db, "vector_index", None)
+    if ef_search is not None:
+        if not isinstance(index, HNSW):
+            raise ValueError(f"ef_search applies to HNSW indexes, not {type(index).__name__}")
+        index.ef_search = ef_search
+    if probes is not None:
+        if not isinstance(index, Ivfflat):
+            raise ValueError(f"probes applies to IVFFlat indexes, not {type(index).__name__}")
+        index.probes = probes
+
+
+def index_name(vector_db: Any) -> str:
+    """Index name for a PgVector table (same default naming as agno's ``optimize``)."""
+    index = vector_db.vector_index
+    if index.name:
+        return index.name
+    kind = "ivfflat" if isinstance(index, Ivfflat) else "hnsw"
+    return f"{vector_db.table_name}_{kind}_index"
+
+
+def ivfflat_lists(index: Ivfflat, rows: int) -> int:
+    """List count for an IVFFlat build: rows/1000 up to 1M rows, sqrt(rows) above."""
+    if not index.dynamic_lists:
+        return index.lists
+    return max(rows // 1000 if rows < 1_000_000 else int(sqrt(rows)), 1)
+
+
+def index_ddl(vector_db: Any, name: str, rows: int = 0) -> str:
+    """``CREATE INDEX CONCURRENTLY`` statement for the table's index spec."""
+    index = vector_db.vector_index
+    column, ops = ann_column(vector_db)
+    prefix = f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{vector_db.schema}"."{vector_db.table_name}"'
+    if isinstance(index, Ivfflat):
+        return f"{prefix} USING ivfflat ({column} {ops}) WITH (lists = {ivfflat_lists(index, rows)})"
+    return f"{prefix} USING hnsw ({column} {ops}) WITH (m = {index.m}, ef_construction = {index.ef_construction})"
+
+
+@dataclass
+class IndexStatus:
+    name: str
+    method: str
+    valid: bool
+    size_bytes: int
+    definition: str = ""
+
+
+@dataclass
+class IndexBuildResult:
+    table: str
+    name: str
+    action: str  # created, rebuilt, exists, skipped
+    seconds: float = 0.0
+
+
+def index_status(vector_db: Any, name: str | None = None) -> IndexStatus | None:
+    """Return the state of the table's vector index, or None if it does not exist."""
+    name = name or index_name(vector_db)
+    with vector_db.db_engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT am.amname, i.indisvalid, pg_relation_size(c.oid), pg_get_indexdef(c.oid) FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "JOIN pg_index i ON i.indexrelid = c.oid "
+                "JOIN pg_am am ON am.oid = c.relam "
+                "WHERE n.nspname = :schema AND c.relname = :name"
+            ),
+            {"schema": vector_db.schema, "name": name},
+        ).first()
+    if row is None:
+        return None
+    return IndexStatus(name=name, method=row[0], valid=bool(row[1]), size_bytes=int(row[2]), definition=row[3])
+
+
+def build_statements(
+    vector_db: Any, status: IndexStatus | None, *, force: bool = False, rows: int = 0
+) -> tuple[str, list[str]]:
+    """Plan the statements that bring the table's index in line with its spec.
+
+    Returns:
+        The action (``created``, ``rebuilt`` or ``exists``) and the SQL to run, in order.
+    """
+    name = index_name(vector_db)
+    qualified = f'"{vector_db.schema}"."{name}"'
+    wanted = "ivfflat" if isinstance(vector_db.vector_index, Ivfflat) else "hnsw"
+    _, ops = ann_column(vector_db)
+
+    if status is None:
+        return "created", [index_ddl(vector_db, name, rows)]
+    if not status.valid:
+        # Left behind by an interrupted concurrent build: unusable, so replace it
+        return "rebuilt", [f"DROP INDEX CONCURRENTLY IF EXISTS {qualified}", index_ddl(vector_db, name, rows)]
+    # A different operator class means the storage mode or distance changed
+    if not force and status.method == wanted and (not status.definition or ops in status.definition):
+        return "exists", []
+    # Build the replacement alongside the live index, then swap, so searches never lose it
+    staging = f"{name[:59]}_new"
+    return "rebuilt", [
+        f'DROP INDEX CONCURRENTLY IF EXISTS "{vector_db.schema}"."{staging}"',
+        index_ddl(vector_db, staging, rows),
+        f"DROP INDEX CONCURRENTLY IF EXISTS {qualified}",
+        f'ALTER INDEX "{vector_db.schema}"."{staging}" RENAME TO "{name}"',
+    ]
+
+
+def build_index(vector_db: Any, *, force: bool = False) -> IndexBuildResult:
+    """Create (or with ``force``, rebuild) the table's ANN index without blocking writes.
+
+    Args:
+        vector_db: PgVector instance with a ``vector_index`` spec.
+        force: Rebuild even if a valid index already exists (e.g. after changing ``m``).
+
+    Returns:
+        What was done and how long it took.
+    """
+    table = f"{vector_db.schema}.{vector_db.table_name}"
+    if vector_db.vector_index is None or not vector_db.table_exists():
+        return IndexBuildResult(table=table, name="", action="skipped")
+
+    name = index_name(vector_db)
+    rows = vector_db.get_count() if isinstance(vector_db.vector_index, Ivfflat) else 0
+    action, statements = build_statements(vector_db, index_status(vector_db, name), force=force, rows=rows)
+    if not statements:
+        return IndexBuildResult(table=table, name=name, action=action)
+
+    started = time.monotonic()
+    # CONCURRENTLY cannot run inside a transaction block
+    settings = vector_db.vector_index.configuration
+    with vector_db.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            for key, value in settings.items():
+                conn.execute(text(f"SET {key} = '{value}'"))
+            for statement in statements:
+                log.info("%s: %s", table, statement)
+                conn.execute(text(statement))
+        finally:
+            # The connection goes back to the pool; don't hand the build settings to its next user
+            for key in settings:
+                conn.execute(text(f"RESET {key}"))
+    return IndexBuildResult(table=table, name=name, action=action, seconds=time.monotonic() - started)
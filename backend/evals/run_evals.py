@@ -30,7 +30,7 @@ from rich.panel import Panel
 from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn
 from rich.table import Table
 from rich.text import Text
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 from backend.evals.grader import GradeResult, check_source_citation, grade_response
 from backend.evals.test_cases import ALL_CASES, CATEGORIES, TestCase
@@ -95,10 +95,9 @@ def run_agent_direct(agent_id: str, question: str) -> str:
 
 def execute_golden_sql(sql: str) -> list[dict]:
     """Execute a golden SQL query and return results."""
-    from backend.db import db_url as _db_url
+    from backend.db.engine import get_engine
 
-    engine = create_engine(_db_url)
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         result = conn.execute(text(sql))
         columns = list(result.keys())
         return [dict(zip(columns, row)) for row in result.fetchall()]
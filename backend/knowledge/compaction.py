@@ -0,0 +1,423 @@
+"""
+Learnings Compaction
+--------------------
+
+Deterministic near-duplicate compaction of the ``*_learnings`` knowledge tables.
+
+``save_learning`` inserts a new row for every call, so the same insight gets
+saved again and again in slightly different words. Each pass:
+
+1. Loads the learnings added since the table's watermark (``ai.learnings_compaction``).
+2. Finds each one's nearest learnings by embedding, within the same namespace
+   and user, and keeps the pairs above ``LEARNINGS_COMPACTION_COSINE``.
+3. Confirms them with a MinHash estimate of the word-shingle Jaccard similarity
+   of title, learning and context (``LEARNINGS_COMPACTION_JACCARD``). Identical
+   texts always match.
+4. Clusters the confirmed pairs and keeps the oldest learning of each cluster.
+   The others are deleted (vector rows and contents row). Their id, title,
+   creation time, similarity and, unless identical, their text are appended to
+   the survivor's ``meta_data["compaction"]["merged"]``, and their tags are
+   merged into its tags.
+
+Rows older than the watermark were compared when they were new, so a pass only
+costs one nearest-neighbour query per new learning.
+
+Usage:
+    python -m backend.scripts.compact_learnings
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from os import getenv
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, func, select, text, update
+from sqlalchemy.dialects import postgresql
+
+logger = logging.getLogger(__name__)
+
+LEARNINGS_COMPACTION_COSINE = float(getenv("LEARNINGS_COMPACTION_COSINE", "0.92"))
+LEARNINGS_COMPACTION_JACCARD = float(getenv("LEARNINGS_COMPACTION_JACCARD", "0.5"))
+LEARNINGS_COMPACTION_CANDIDATES = int(getenv("LEARNINGS_COMPACTION_CANDIDATES", "10"))
+
+PROVENANCE_KEY = "compaction"
+# Learnings are only merged with learnings sharing these metadata values
+PARTITION_KEYS = ("namespace", "user_id")
+
+MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 3
+# Rows committed late can carry a created_at slightly before the watermark
+_WATERMARK_OVERLAP = timedelta(hours=1)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(41)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(MINHASH_PERMUTATIONS)
+]
+
+STATE_DDL = """
+CREATE TABLE IF NOT EXISTS ai.learnings_compaction (
+    table_name text PRIMARY KEY,
+    watermark timestamptz,
+    removed bigint NOT NULL DEFAULT 0,
+    last_run_at timestamptz NOT NULL DEFAULT now()
+)
+"""
+
+
+def learning_text(content: str) -> str:
+    """Title, learning and context of a saved learning (its raw content if it is not learning JSON)."""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return content or ""
+    if not isinstance(data, dict):
+        return content
+    return "\n".join(str(data[key]) for key in ("title", "learning", "context") if data.get(key))
+
+
+def _tokens(text_: str) -> List[str]:
+    return re.findall(r"\w+", text_.casefold())
+
+
+def same_text(a: str, b: str) -> bool:
+    """Whether two texts have the same words, ignoring case, punctuation and whitespace."""
+    return _tokens(a) == _tokens(b)
+
+
+def shingles(text_: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """Word ``size``-grams of the case-folded text (the whole text if it is shorter)."""
+    tokens = _tokens(text_)
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(text_: str) -> Tuple[int, ...]:
+    """MinHash signature of the text's shingles (seeded, so stable across processes)."""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles(text_)]
+    if not hashes:
+        return (_MERSENNE_PRIME,) * MINHASH_PERMUTATIONS
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def estimated_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+@dataclass
+class Learning:
+    key: str  # content_id (row id for rows inserted without one)
+    name: str
+    content: str
+    meta_data: Dict[str, Any]
+    created_at: datetime
+    embedding: Any = None
+
+    @property
+    def text(self) -> str:
+        return learning_text(self.content)
+
+    @property
+    def order(self) -> Tuple[datetime, str]:
+        return (self.created_at, self.key)
+
+
+@dataclass
+class Duplicate:
+    learning: Learning
+    cosine: float
+    jaccard: float
+
+
+@dataclass
+class Merge:
+    keeper: Learning
+    duplicates: List[Duplicate]
+
+
+@dataclass
+class CompactionResult:
+    table: str
+    scanned: int = 0
+    merges: List[Merge] = field(default_factory=list)
+    dry_run: bool = False
+    skipped: bool = False
+
+    @property
+    def removed(self) -> int:
+        return sum(len(merge.duplicates) for merge in self.merges)
+
+    def summary(self) -> str:
+        if self.skipped:
+            return f"{self.table}: skipped (another pass is running)"
+        verb = "would remove" if self.dry_run else "removed"
+        return f"{self.table}: {self.scanned} new, {verb} {self.removed} duplicates in {len(self.merges)} clusters"
+
+
+def plan_merges(
+    new: Sequence[Learning],
+    neighbours: Callable[[Learning], List[Tuple[Learning, float]]],
+    cosine: float = LEARNINGS_COMPACTION_COSINE,
+    jaccard: float = LEARNINGS_COMPACTION_JACCARD,
+) -> List[Merge]:
+    """Cluster new learnings with their confirmed near-duplicates; the oldest of each cluster is kept.
+
+    ``neighbours`` returns the nearest learnings of the same partition with their cosine similarity.
+    """
+    learnings: Dict[str, Learning] = {}
+    parent: Dict[str, str] = {}
+    scores: Dict[Tuple[str, str], Tuple[float, float]] = {}
+    signatures: Dict[str, Tuple[int, ...]] = {}
+
+    def find(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    def signature(learning: Learning) -> Tuple[int, ...]:
+        if learning.key not in signatures:
+            signatures[learning.key] = minhash(learning.text)
+        return signatures[learning.key]
+
+    for learning in sorted(new, key=lambda item: item.order):
+        learnings.setdefault(learning.key, learning)
+        parent.setdefault(learning.key, learning.key)
+        for other, similarity in neighbours(learning):
+            if similarity < cosine:
+                continue
+            overlap = (
+                1.0
+                if same_text(learning.text, other.text)
+                else estimated_jaccard(signature(learning), signature(other))
+            )
+            if overlap < jaccard:
+                continue
+            learnings.setdefault(other.key, other)
+            parent.setdefault(other.key, other.key)
+            scores[(learning.key, other.key)] = scores[(other.key, learning.key)] = (similarity, overlap)
+            parent[find(learning.key)] = find(other.key)
+
+    clusters: Dict[str, List[Learning]] = {}
+    for key in parent:
+        clusters.setdefault(find(key), []).append(learnings[key])
+
+    merges = []
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        keeper, *rest = sorted(members, key=lambda item: item.order)
+        duplicates = []
+        for member in rest:
+            # Score against the keeper when they were compared, else the member's best confirmed match
+            pair = scores.get((member.key, keeper.key)) or max(
+                score for (a, _), score in scores.items() if a == member.key
+            )
+            duplicates.append(Duplicate(learning=member, cosine=pair[0], jaccard=pair[1]))
+        merges.append(Merge(keeper=keeper, duplicates=duplicates))
+    return sorted(merges, key=lambda merge: merge.keeper.order)
+
+
+def merged_metadata(merge: Merge, now: datetime) -> Dict[str, Any]:
+    """The keeper's metadata with the duplicates' provenance and tags folded in."""
+    meta = dict(merge.keeper.meta_data or {})
+    history = list((meta.get(PROVENANCE_KEY) or {}).get("merged", []))
+    tags = list(meta.get("tags") or [])
+    for duplicate in merge.duplicates:
+        learning = duplicate.learning
+        entry: Dict[str, Any] = {
+            "id": learning.key,
+            "title": learning.name,
+            "created_at": learning.created_at.isoformat(),
+            "cosine": round(duplicate.cosine, 4),
+            "jaccard": round(duplicate.jaccard, 4),
+        }
+        if not same_text(learning.text, merge.keeper.text):
+            entry["learning"] = learning.text
+        history.append(entry)
+        # A duplicate that had absorbed others earlier hands its history over
+        history.extend(((learning.meta_data or {}).get(PROVENANCE_KEY) or {}).get("merged", []))
+        tags.extend(tag for tag in (learning.meta_data or {}).get("tags") or [] if tag not in tags)
+    meta[PROVENANCE_KEY] = {"merged": history, "compacted_at": now.isoformat()}
+    if tags:
+        meta["tags"] = tags
+    return meta
+
+
+def _key_column(table: Any) -> Any:
+    return func.coalesce(table.c.content_id, table.c.id)
+
+
+def _learning(row: Any) -> Learning:
+    return Learning(
+        key=row.key,
+        name=row.name or "",
+        content=row.content or "",
+        meta_data=row.meta_data or {},
+        created_at=row.created_at,
+        embedding=getattr(row, "embedding", None),
+    )
+
+
+def new_learnings_query(table: Any, since: Optional[datetime]) -> Any:
+    """First chunk of every learning created after ``since`` (all learnings when None)."""
+    key = _key_column(table)
+    stmt = (
+        select(
+            key.label("key"), table.c.name, table.c.content, table.c.meta_data, table.c.created_at, table.c.embedding
+        )
+        .distinct(key)
+        .order_by(key, table.c.created_at, table.c.id)
+    )
+    if since is not None:
+        stmt = stmt.where(table.c.created_at > since)
+    return stmt
+
+
+def neighbours_query(table: Any, learning: Learning, limit: int) -> Any:
+    """Nearest learnings by cosine similarity, restricted to the learning's partition."""
+    key = _key_column(table)
+    distance = table.c.embedding.cosine_distance(learning.embedding)
+    stmt = (
+        select(
+            key.label("key"),
+            table.c.name,
+            table.c.content,
+            table.c.meta_data,
+            table.c.created_at,
+            (1 - distance).label("similarity"),
+        )
+        .where(key != learning.key, table.c.embedding.is_not(None))
+        .order_by(distance)
+        .limit(limit)
+    )
+    for partition_key in PARTITION_KEYS:
+        stmt = stmt.where(
+            table.c.meta_data[partition_key].astext.is_not_distinct_from(learning.meta_data.get(partition_key))
+        )
+    return stmt
+
+
+def _read_watermark(conn: Any, table_name: str) -> Optional[datetime]:
+    conn.execute(text(STATE_DDL))
+    return conn.execute(
+        text("SELECT watermark FROM ai.learnings_compaction WHERE table_name = :table"), {"table": table_name}
+    ).scalar()
+
+
+def _write_state(conn: Any, table_name: str, watermark: Optional[datetime], removed: int) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO ai.learnings_compaction AS s (table_name, watermark, removed) "
+            "VALUES (:table, :watermark, :removed) "
+            "ON CONFLICT (table_name) DO UPDATE SET watermark = coalesce(excluded.watermark, s.watermark), "
+            "removed = s.removed + excluded.removed, last_run_at = now()"
+        ),
+        {"table": table_name, "watermark": watermark, "removed": removed},
+    )
+
+
+def _apply(knowledge: Any, merge: Merge, now: datetime) -> None:
+    vector_db = knowledge.vector_db
+    table = vector_db.table
+    key = _key_column(table)
+    duplicate_keys = [duplicate.learning.key for duplicate in merge.duplicates]
+    with vector_db.db_engine.begin() as conn:
+        conn.execute(
+            update(table).where(key == merge.keeper.key).values(meta_data=bindparam("md", type_=postgresql.JSONB)),
+            {"md": merged_metadata(merge, now)},
+        )
+        conn.execute(delete(table).where(key.in_(duplicate_keys)))
+    if knowledge.contents_db is not None:
+        for duplicate_key in duplicate_keys:
+            knowledge.contents_db.delete_knowledge_content(duplicate_key)
+
+
+def compact_learnings(knowledge: Any, *, full: bool = False, dry_run: bool = False) -> CompactionResult:
+    """Run one compaction pass over a learnings knowledge base.
+
+    Args:
+        knowledge: Knowledge instance whose vector_db is a PgVector table.
+        full: Compare every learning, not only those added since the last pass.
+        dry_run: Plan the merges without changing anything.
+
+    Returns:
+        The merges applied (or planned, for a dry run).
+    """
+    vector_db = knowledge.vector_db
+    table_name = vector_db.table_name
+    result = CompactionResult(table=table_name, dry_run=dry_run)
+    if not vector_db.table_exists():
+        return result
+
+    with vector_db.db_engine.connect() as lock_conn:
+        # One pass per table at a time, across processes (session-level lock, released below)
+        lock_name = f"learnings_compaction:{vector_db.schema}.{table_name}"
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": lock_name}).scalar():
+            result.skipped = True
+            return result
+        try:
+            with vector_db.db_engine.begin() as conn:
+                watermark = None if full else _read_watermark(conn, table_name)
+                since = watermark - _WATERMARK_OVERLAP if watermark is not None else None
+                new = [_learning(row) for row in conn.execute(new_learnings_query(vector_db.table, since)).fetchall()]
+
+                def neighbours(learning: Learning) -> List[Tuple[Learning, float]]:
+                    if learning.embedding is None:
+                        return []
+                    rows = conn.execute(
+                        neighbours_query(vector_db.table, learning, LEARNINGS_COMPACTION_CANDIDATES)
+                    ).fetchall()
+                    return [(_learning(row), float(row.similarity)) for row in rows]
+
+                result.scanned = len(new)
+                result.merges = plan_merges(new, neighbours)
+
+            if dry_run:
+                return result
+
+            now = datetime.now(timezone.utc)
+            for merge in result.merges:
+                _apply(knowledge, merge, now)
+                logger.info(
+                    "Merged %d duplicates into learning %r (%s) in %s",
+                    len(merge.duplicates),
+                    merge.keeper.name,
+                    merge.keeper.key,
+                    table_name,
+                )
+            latest = max((learning.created_at for learning in new), default=None)
+            with vector_db.db_engine.begin() as conn:
+                conn.execute(text(STATE_DDL))
+                _write_state(conn, table_name, latest, result.removed)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": lock_name})
+            lock_conn.commit()
+    return result
+
+
+def learnings_knowledge_bases(knowledge_bases: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``*_learnings`` tables among ``knowledge_bases`` (keyed by vector table name)."""
+    return {
+        table: knowledge
+        for table, knowledge in sorted(knowledge_bases.items())
+        if table.endswith("_learnings") and knowledge.vector_db is not None
+    }
+
+
+def compact_all_learnings(*, full: bool = False, dry_run: bool = False) -> List[CompactionResult]:
+    """Compact every learnings knowledge base created in this process."""
+    from backend.db import get_knowledge_bases
+
+    results = []
+    for knowledge in learnings_knowledge_bases(get_knowledge_bases()).values():
+        result = compact_learnings(knowledge, full=full, dry_run=dry_run)
+        logger.info("Compaction %s", result.summary())
+        results.append(result)
+    return results
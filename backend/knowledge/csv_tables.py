@@ -0,0 +1,496 @@
+"""
+CSV Tables
+----------
+
+Table-aware CSV ingestion: CSV files become typed Postgres tables, not vectors.
+
+Through ``CSVReader`` every CSV row turned into an embedded chunk. That made
+large files slow to load, and the rows could only be found by similarity,
+never aggregated. With ``CSV_INGEST_MODE=table`` (opt-in), each CSV in
+``data/docs/`` is:
+
+1. Profiled in one streaming pass: delimiter, encoding, column names
+   (sanitized to identifiers) and the narrowest type that fits every value
+   (boolean, bigint, double precision, date, timestamp[tz], else text).
+2. Bulk-loaded with ``COPY ... FROM STDIN`` into a staging table, which then
+   replaces the previous table in the same transaction, so readers never see
+   a partial load. Tables go to ``CSV_TABLE_SCHEMA`` and are recorded in
+   ``ai.csv_tables``. A table that was not created from the same CSV file is
+   never replaced.
+3. Described by a single summary chunk with the table name, its columns and
+   ``CSV_SAMPLE_ROWS`` sample rows. The chunk is embedded into the knowledge
+   base the file was loaded for, and into ``data_knowledge`` so the data agent
+   finds the table next to the curated table metadata and queries it with SQL.
+
+Sync is incremental through its own ingestion manifest namespace, as for
+documents: unchanged files are skipped, and changed files are reloaded. Removed
+files have their table dropped and their summaries deleted.
+
+``CSV_INGEST_MODE=embed`` (the default) keeps the chunk-per-row behaviour, since
+table mode creates and replaces tables in the database the data agent queries.
+"""
+
+import asyncio
+import csv
+import logging
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from os import getenv
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, String, Table, Text, delete, select, text
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.engine import Engine
+
+from backend.db.table_versions import bump_table_versions
+from backend.knowledge.manifest import (
+    IngestionManifest,
+    SyncPlan,
+    delete_sources,
+    plan_sync,
+    scan_sources,
+)
+from backend.knowledge.pipeline import Chunk, _embed_texts, _record, bulk_upsert, file_sha256, source_name
+
+logger = logging.getLogger(__name__)
+
+CSV_INGEST_MODE = getenv("CSV_INGEST_MODE", "embed").lower()  # embed | table
+CSV_TABLE_SCHEMA = getenv("CSV_TABLE_SCHEMA", "public")
+CSV_SAMPLE_ROWS = int(getenv("CSV_SAMPLE_ROWS", "5"))
+
+# Column types from narrowest to widest; text always fits
+TYPES = ("boolean", "bigint", "double precision", "date", "timestamp")
+_BOOLEANS = {"true", "false", "t", "f", "yes", "no"}
+# No leading zeros: codes like "007" or ZIP codes stay text
+_INTEGER = re.compile(r"[+-]?(?:0|[1-9]\d*)")
+_FLOAT = re.compile(r"[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?(Z|[+-]\d{2}(?::?\d{2})?)?")
+_IDENTIFIER = re.compile(r"[^a-z0-9]+")
+# Room for the staging suffix within Postgres' 63-byte identifier limit
+_MAX_NAME = 50
+_STAGING_SUFFIX = "__loading"
+_DELIMITERS = ",;\t|"
+_SNIFF_BYTES = 64 * 1024
+_COPY_BLOCK = 1 << 20
+
+_metadata = MetaData(schema="ai")
+
+csv_tables_table = Table(
+    "csv_tables",
+    _metadata,
+    Column("table_schema", String(63), primary_key=True),
+    Column("table_name", String(63), primary_key=True),
+    Column("source", Text, nullable=False),
+    Column("content_hash", String(64), nullable=False),
+    Column("columns", JSONB, nullable=False),
+    Column("row_count", BigInteger, nullable=False),
+    Column("loaded_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass
+class CsvColumn:
+    name: str  # Postgres column name
+    header: str  # Header as written in the CSV
+    type: str = "text"
+
+
+@dataclass
+class CsvProfile:
+    """Everything ``COPY`` and the summary need to know about a CSV file."""
+
+    columns: list[CsvColumn]
+    row_count: int
+    sample_rows: list[list[str]]
+    delimiter: str = ","
+    encoding: str = "utf-8"
+
+
+@dataclass
+class CsvTable:
+    schema: str
+    name: str
+    source: str
+    content_hash: str
+    profile: CsvProfile
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+
+@dataclass
+class _TypeTracker:
+    """Narrowest column type consistent with every value seen so far."""
+
+    candidates: list[str] = field(default_factory=lambda: list(TYPES))
+    has_timezone: bool = False
+    seen: bool = False
+
+    def add(self, value: str) -> None:
+        if value == "" or not self.candidates:
+            return  # NULL, or already text
+        stripped = value.strip()
+        if not stripped:
+            # Whitespace is not NULL for COPY and fits no other type
+            self.candidates.clear()
+            return
+        self.seen = True
+        self.candidates = [kind for kind in self.candidates if self._fits(kind, stripped)]
+
+    def _fits(self, kind: str, value: str) -> bool:
+        if kind == "boolean":
+            return value.lower() in _BOOLEANS
+        if kind == "bigint":
+            return bool(_INTEGER.fullmatch(value)) and -(2**63) <= int(value) < 2**63
+        if kind == "double precision":
+            return bool(_FLOAT.fullmatch(value))
+        if kind == "date":
+            return bool(_DATE.fullmatch(value)) and _valid(date.fromisoformat, value)
+        match = _TIMESTAMP.fullmatch(value)
+        if match is None or not _valid(datetime.fromisoformat, value.replace(" ", "T", 1)):
+            return False
+        self.has_timezone = self.has_timezone or match.group(1) is not None
+        return True
+
+    @property
+    def type(self) -> str:
+        if not self.seen or not self.candidates:
+            return "text"
+        kind = self.candidates[0]
+        if kind == "timestamp" and self.has_timezone:
+            return "timestamptz"
+        return kind
+
+
+def _valid(parse: Callable[[str], Any], value: str) -> bool:
+    try:
+        parse(value)
+    except ValueError:
+        return False
+    return True
+
+
+def identifier(value: str, fallback: str) -> str:
+    """Lower-case Postgres identifier made of ``[a-z0-9_]``, never starting with a digit."""
+    name = _IDENTIFIER.sub("_", value.casefold()).strip("_")[:_MAX_NAME].rstrip("_")
+    if not name:
+        return fallback
+    return f"{fallback[0]}_{name}"[:_MAX_NAME] if name[0].isdigit() else name
+
+
+def table_name_for(source: str) -> str:
+    """Table name for a CSV source path: the path without its suffix, as an identifier."""
+    return identifier(str(Path(source).with_suffix("")), fallback="table")
+
+
+def column_names(headers: Iterable[str]) -> list[str]:
+    """Identifiers for a header row, made unique with ``_2``, ``_3``... suffixes."""
+    names: list[str] = []
+    for position, header in enumerate(headers, 1):
+        base = identifier(header, fallback=f"column_{position}")
+        name, n = base, 1
+        while name in names:
+            n += 1
+            name = f"{base}_{n}"
+        names.append(name)
+    return names
+
+
+def _sniff_delimiter(sample: str) -> str:
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def profile_csv(path: Path, sample_rows: int = CSV_SAMPLE_ROWS) -> CsvProfile:
+    """Read ``path`` once and infer its delimiter, encoding, columns, types and row count."""
+    try:
+        return _profile(path, "utf-8-sig", sample_rows)
+    except UnicodeDecodeError:
+        # Latin-1 decodes any byte sequence
+        return _profile(path, "latin-1", sample_rows)
+
+
+def _profile(path: Path, encoding: str, sample_rows: int) -> CsvProfile:
+    with path.open(encoding=encoding, newline="") as f:
+        delimiter = _sniff_delimiter(f.read(_SNIFF_BYTES))
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        headers = next(reader, None)
+        if not headers:
+            raise ValueError(f"{path.name} has no header row")
+        trackers = [_TypeTracker() for _ in headers]
+        samples: list[list[str]] = []
+        rows = 0
+        for row in reader:
+            if len(row) != len(headers):
+                raise ValueError(
+                    f"{path.name} line {reader.line_num}: {len(row)} fields, expected {len(headers)} as in the header"
+                )
+            rows += 1
+            if len(samples) < sample_rows:
+                samples.append(row)
+            for tracker, value in zip(trackers, row):
+                tracker.add(value)
+    columns = [
+        CsvColumn(name, header.strip(), tracker.type)
+        for name, header, tracker in zip(column_names(headers), headers, trackers)
+    ]
+    return CsvProfile(
+        columns=columns,
+        row_count=rows,
+        sample_rows=samples,
+        delimiter=delimiter,
+        encoding="latin-1" if encoding == "latin-1" else "utf-8",
+    )
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _qualified(schema: str, name: str) -> str:
+    return f"{_quote(schema)}.{_quote(name)}"
+
+
+def create_table_sql(schema: str, name: str, columns: list[CsvColumn]) -> str:
+    definitions = ", ".join(f"{_quote(column.name)} {column.type}" for column in columns)
+    return f"CREATE TABLE {_qualified(schema, name)} ({definitions})"
+
+
+def copy_sql(schema: str, name: str, profile: CsvProfile) -> str:
+    """``COPY FROM STDIN`` for the raw file bytes: empty fields are NULL, quoted ones too in typed columns."""
+    column_list = ", ".join(_quote(column.name) for column in profile.columns)
+    delimiter = "E'\\t'" if profile.delimiter == "\t" else "'" + profile.delimiter.replace("'", "''") + "'"
+    options = [
+        "FORMAT csv",
+        "HEADER true",
+        f"DELIMITER {delimiter}",
+        "NULL ''",
+        f"ENCODING '{'LATIN1' if profile.encoding == 'latin-1' else 'UTF8'}'",
+    ]
+    typed = [_quote(column.name) for column in profile.columns if column.type != "text"]
+    if typed:
+        options.append(f"FORCE_NULL ({', '.join(typed)})")
+    return f"COPY {_qualified(schema, name)} ({column_list}) FROM STDIN WITH ({', '.join(options)})"
+
+
+def _ensure_registry(engine: Engine) -> None:
+    _metadata.create_all(engine, tables=[csv_tables_table], checkfirst=True)
+
+
+def load_csv_table(
+    engine: Engine, path: Path, source: str, content_hash: str, schema: str = CSV_TABLE_SCHEMA
+) -> CsvTable:
+    """Profile ``path`` and (re)load it into its table with ``COPY``, replacing the previous load atomically.
+
+    Raises:
+        ValueError: The file is malformed, or the table exists and was not loaded from ``source``.
+    """
+    profile = profile_csv(path)
+    table = CsvTable(schema, table_name_for(source), source, content_hash, profile)
+    staging = table.name + _STAGING_SUFFIX
+    t = csv_tables_table
+    _ensure_registry(engine)
+    with engine.begin() as conn:
+        owner = conn.execute(
+            select(t.c.source).where(t.c.table_schema == schema, t.c.table_name == table.name)
+        ).scalar()
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": _qualified(schema, table.name)}).scalar()
+        if owner is not None and owner != source:
+            raise ValueError(f"Table {table.qualified_name} is already loaded from {owner}")
+        if owner is None and exists is not None:
+            raise ValueError(f"Table {table.qualified_name} already exists and was not loaded from a CSV file")
+
+        conn.execute(text(f"DROP TABLE IF EXISTS {_qualified(schema, staging)}"))
+        conn.execute(text(create_table_sql(schema, staging, profile.columns)))
+        with conn.connection.driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+            with cursor.copy(copy_sql(schema, staging, profile)) as copy, path.open("rb") as f:
+                for block in iter(lambda: f.read(_COPY_BLOCK), b""):
+                    copy.write(block)
+        conn.execute(text(f"DROP TABLE IF EXISTS {_qualified(schema, table.name)}"))
+        conn.execute(text(f"ALTER TABLE {_qualified(schema, staging)} RENAME TO {_quote(table.name)}"))
+        # Drops the data agent's cached results for the previous load
+        bump_table_versions(conn, schema, [table.name])
+
+        stmt = insert(t).values(
+            table_schema=schema,
+            table_name=table.name,
+            source=source,
+            content_hash=content_hash,
+            columns=[{"name": c.name, "header": c.header, "type": c.type} for c in profile.columns],
+            row_count=profile.row_count,
+            loaded_at=datetime.now(timezone.utc),
+        )
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[t.c.table_schema, t.c.table_name],
+                set_={
+                    key: stmt.excluded[key] for key in ("source", "content_hash", "columns", "row_count", "loaded_at")
+                },
+            )
+        )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ANALYZE {_qualified(schema, table.name)}"))
+    logger.info("Loaded %s into %s (%d rows)", source, table.qualified_name, profile.row_count)
+    return table
+
+
+def drop_csv_table(engine: Engine, source: str) -> None:
+    """Drop the tables loaded from ``source`` and forget them."""
+    t = csv_tables_table
+    _ensure_registry(engine)
+    with engine.begin() as conn:
+        rows = conn.execute(select(t.c.table_schema, t.c.table_name).where(t.c.source == source)).all()
+        for schema, name in rows:
+            conn.execute(text(f"DROP TABLE IF EXISTS {_qualified(schema, name)}"))
+            logger.info("Dropped %s.%s (%s was removed)", schema, name, source)
+        conn.execute(delete(t).where(t.c.source == source))
+
+
+def _cell(value: str, width: int = 60) -> str:
+    value = " ".join(value.split()).replace("|", "\\|")
+    return value if len(value) <= width else value[: width - 1] + "…"
+
+
+def table_summary(table: CsvTable) -> str:
+    """The text embedded for a CSV table: where it lives, its columns and a few sample rows."""
+    profile = table.profile
+    lines = [
+        f"# CSV table {table.qualified_name}",
+        "",
+        f"The CSV file `{table.source}` is loaded into the Postgres table `{table.qualified_name}` "
+        f"({profile.row_count:,} rows, {len(profile.columns)} columns). "
+        "Query it with SQL through the data agent instead of searching its rows.",
+        "",
+        "| Column | Type | CSV header |",
+        "|--------|------|------------|",
+        *(f"| {c.name} | {c.type} | {_cell(c.header)} |" for c in profile.columns),
+    ]
+    if profile.sample_rows:
+        lines += [
+            "",
+            "Sample rows:",
+            "",
+            "| " + " | ".join(c.name for c in profile.columns) + " |",
+            "|" + "|".join("---" for _ in profile.columns) + "|",
+            *("| " + " | ".join(_cell(value) for value in row) + " |" for row in profile.sample_rows),
+        ]
+    return "\n".join(lines)
+
+
+def _summary_chunk(table: CsvTable) -> Chunk:
+    return Chunk(
+        source=table.source,
+        content_hash=table.content_hash,
+        content=table_summary(table),
+        meta_data={
+            "source": table.source,
+            "type": "csv_table",
+            "table": table.qualified_name,
+            "row_count": table.profile.row_count,
+        },
+    )
+
+
+async def ingest_csv_tables(
+    vector_db: Any,
+    paths: Iterable[Path],
+    *,
+    root: Path | None = None,
+    data_vector_db: Any = None,
+    engine: Engine | None = None,
+    load: Callable[..., CsvTable] = load_csv_table,
+    upsert: Callable[[Any, list[dict[str, Any]]], int] = bulk_upsert,
+) -> tuple[list[CsvTable], list[str]]:
+    """Load each CSV into its table and embed its summary into ``vector_db`` (and ``data_vector_db``).
+
+    Returns:
+        The loaded tables and the sources that failed.
+    """
+    engine = engine if engine is not None else vector_db.db_engine
+    targets = [db for db in (vector_db, data_vector_db) if db is not None]
+    tables: list[CsvTable] = []
+    failed: list[str] = []
+    for path in paths:
+        source = source_name(path, root)
+        try:
+            content_hash = await asyncio.to_thread(file_sha256, path)
+            table = await asyncio.to_thread(load, engine, path, source, content_hash)
+            chunk = _summary_chunk(table)
+            for db in targets:
+                embeddings, usages = await _embed_texts(db.embedder, [chunk.content])
+                await asyncio.to_thread(upsert, db, [_record(chunk, chunk.content, embeddings[0], usages[0])])
+        except Exception:
+            logger.exception("Failed to load %s into a table", source)
+            failed.append(source)
+            continue
+        tables.append(table)
+    return tables, failed
+
+
+async def sync_csv_tables(
+    vector_db: Any,
+    root: Path,
+    files: Iterable[Path],
+    *,
+    data_vector_db: Any = None,
+    engine: Engine | None = None,
+    manifest: IngestionManifest | None = None,
+    dry_run: bool = False,
+    load: Callable[..., CsvTable] = load_csv_table,
+    drop: Callable[[Engine, str], None] = drop_csv_table,
+    delete: Callable[[Any, list[tuple[str, str]]], None] = delete_sources,
+    upsert: Callable[[Any, list[dict[str, Any]]], int] = bulk_upsert,
+) -> tuple[SyncPlan, list[CsvTable]]:
+    """Bring the CSV tables and their summaries in line with ``files``, reloading only what changed.
+
+    Args:
+        vector_db: Knowledge vector table the summaries are embedded into.
+        root: Directory sources are named relative to.
+        files: CSV files currently on disk.
+        data_vector_db: The data agent's knowledge table, which gets the summaries too.
+        engine: Database the tables are loaded into (defaults to ``vector_db``'s).
+        manifest: Manifest to use (defaults to a ``<vector table>:csv_tables`` namespace).
+        dry_run: Compute and return the plan without changing anything.
+        load, drop, delete, upsert: Table loader, table dropper and vector writers, overridable for tests.
+
+    Returns:
+        The sync plan and the tables loaded.
+    """
+    engine = engine if engine is not None else vector_db.db_engine
+    if manifest is None:
+        manifest = IngestionManifest(f"{vector_db.table_name}:csv_tables", engine)  # type: ignore[arg-type]
+
+    previous = manifest.load()
+    file_list = list(files)
+    current = scan_sources(file_list, root, previous)
+    plan = plan_sync(previous, current)
+    logger.info("CSV table sync plan for %s: %s", manifest.namespace, plan.summary())
+    if dry_run or plan.is_noop:
+        return plan, []
+
+    to_ingest = set(plan.to_ingest)
+    paths = [path for path in file_list if source_name(path, root) in to_ingest]
+    tables, failed = await ingest_csv_tables(
+        vector_db, paths, root=root, data_vector_db=data_vector_db, engine=engine, load=load, upsert=upsert
+    )
+
+    # Old summaries go only once their replacement is in. A failed file keeps its old summary and
+    # manifest entry so the next sync retries it; a summary it half-wrote under the new hash is dropped.
+    stale = [(name, previous[name].content_hash) for name in plan.changed + plan.removed if name not in failed]
+    stale += [(name, current[name].content_hash) for name in failed]
+    for db in (vector_db, data_vector_db):
+        if db is not None:
+            delete(db, stale)
+    for name in plan.removed:
+        drop(engine, name)
+    manifest.remove(plan.removed)
+    manifest.save({name: current[name] for name in plan.to_ingest + plan.touched if name not in failed})
+    return plan, tables
@@ -0,0 +1,316 @@
+"""
+File Index
+----------
+
+Persistent inverted index over the knowledge agent's ``DOCUMENTS_DIR``.
+
+A SQLite file (``DOCUMENTS_INDEX_PATH``) holds one row per text file (path,
+mtime, size, token count, byte offsets of every ``LINE_CHECKPOINT``-th line)
+and one posting per (term, file) with the term frequency and the first line
+numbers it occurs on. Searches rank files with BM25 from the postings of the
+query terms only, so their cost does not depend on the number of files.
+
+The index is refreshed incrementally: a refresh stats every file (no reads)
+and re-tokenizes only those whose mtime or size changed, dropping files that
+disappeared. Searches refresh at most every ``DOCUMENTS_INDEX_REFRESH_SECONDS``.
+Binary files (a NUL byte in the first 8 KB, e.g. PDFs) and files above
+``DOCUMENTS_INDEX_MAX_BYTES`` are recorded without postings, so they are not
+read again until they change.
+
+Usage:
+    python -m backend.knowledge.file_index            # Refresh the index
+    python -m backend.knowledge.file_index "query"    # Refresh and search
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+from dataclasses import dataclass, field
+from os import getenv
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTS_INDEX_REFRESH_SECONDS = float(getenv("DOCUMENTS_INDEX_REFRESH_SECONDS", "30"))
+DOCUMENTS_INDEX_MAX_BYTES = int(getenv("DOCUMENTS_INDEX_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Line numbers kept per posting (the term frequency is always exact)
+MAX_POSTING_LINES = 50
+# A byte offset is stored for every LINE_CHECKPOINT-th line, so chunk reads skip to it
+LINE_CHECKPOINT = 1024
+# SQLite page cache per connection (KiB), allocated as used; large builds insert faster with more
+CACHE_KB = 65536
+# Files re-indexed per transaction
+COMMIT_EVERY = 1000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TERM = re.compile(r"\w{2,64}")
+
+SCHEMA = [
+    """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    checkpoints TEXT NOT NULL
+)
+""",
+    """
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    tf INTEGER NOT NULL,
+    lines TEXT NOT NULL,
+    PRIMARY KEY (term, file_id)
+) WITHOUT ROWID
+""",
+    "CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id)",
+]
+
+
+def terms(text: str) -> List[str]:
+    """Case-folded word tokens of 2 to 64 characters."""
+    return _TERM.findall(text.casefold())
+
+
+@dataclass
+class FileMatch:
+    path: str
+    score: float
+    lines: List[int] = field(default_factory=list)
+
+
+@dataclass
+class RefreshStats:
+    indexed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+
+    def summary(self) -> str:
+        return f"{self.indexed} indexed, {self.unchanged} unchanged, {self.removed} removed, {self.skipped} skipped"
+
+
+def _read_bytes(path: Path, size: int) -> Optional[bytes]:
+    """Contents of a text file, or None for binary and oversized files."""
+    if size > DOCUMENTS_INDEX_MAX_BYTES:
+        return None
+    try:
+        with open(path, "rb") as handle:
+            head = handle.read(8192)
+            if b"\0" in head:
+                return None
+            return head + handle.read()
+    except OSError:
+        return None
+
+
+def _analyze(data: bytes) -> Tuple[Dict[str, Tuple[int, List[int]]], int, List[int]]:
+    """Postings ``term -> (tf, first line numbers)``, token count, and line checkpoints of a file."""
+    postings: Dict[str, List] = defaultdict(lambda: [0, []])
+    length = 0
+    checkpoints = [0]
+    offset = 0
+    for number, raw in enumerate(data.split(b"\n")):
+        if number and number % LINE_CHECKPOINT == 0:
+            checkpoints.append(offset)
+        offset += len(raw) + 1
+        for term in terms(raw.decode("utf-8", errors="replace")):
+            posting = postings[term]
+            posting[0] += 1
+            if len(posting[1]) < MAX_POSTING_LINES and (not posting[1] or posting[1][-1] != number):
+                posting[1].append(number)
+            length += 1
+    return {term: (tf, lines) for term, (tf, lines) in postings.items()}, length, checkpoints
+
+
+class FileIndex:
+    """Inverted index of the text files under ``base_dir``, stored in ``index_path``."""
+
+    def __init__(self, base_dir: Path, index_path: Path, refresh_seconds: float = DOCUMENTS_INDEX_REFRESH_SECONDS):
+        self.base_dir = Path(base_dir).resolve()
+        self.index_path = Path(index_path)
+        self.refresh_seconds = refresh_seconds
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> "closing[sqlite3.Connection]":
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_KB}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        return closing(conn)
+
+    def _walk(self) -> Iterator[Tuple[str, os.stat_result]]:
+        """``(relative path, stat)`` of every regular file, skipping hidden files and directories."""
+        stack = [self.base_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield Path(entry.path).relative_to(self.base_dir).as_posix(), entry.stat(follow_symlinks=False)
+
+    def refresh(self) -> RefreshStats:
+        """Re-index new and changed files and drop removed ones."""
+        stats = RefreshStats()
+        with self._lock, self._connect() as conn:
+            known = {
+                path: (file_id, mtime, size)
+                for file_id, path, mtime, size in conn.execute("SELECT id, path, mtime_ns, size FROM files")
+            }
+            seen = set()
+            pending = 0
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for path, stat in self._walk():
+                    seen.add(path)
+                    current = known.get(path)
+                    if current is not None and current[1:] == (stat.st_mtime_ns, stat.st_size):
+                        stats.unchanged += 1
+                        continue
+                    if current is not None:
+                        conn.execute("DELETE FROM files WHERE id = ?", (current[0],))
+                    if self._index_file(conn, path, stat):
+                        stats.indexed += 1
+                    else:
+                        stats.skipped += 1
+                    pending += 1
+                    if pending % COMMIT_EVERY == 0:
+                        conn.execute("COMMIT")
+                        conn.execute("BEGIN IMMEDIATE")
+                removed = [(file_id,) for path, (file_id, _, _) in known.items() if path not in seen]
+                conn.executemany("DELETE FROM files WHERE id = ?", removed)
+                stats.removed = len(removed)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._refreshed_at = time.monotonic()
+        if stats.indexed or stats.removed:
+            logger.info("Document index %s: %s", self.index_path, stats.summary())
+        return stats
+
+    def _index_file(self, conn: sqlite3.Connection, path: str, stat: os.stat_result) -> bool:
+        """Index one file; binary and oversized files are recorded without postings (length -1)."""
+        data = _read_bytes(self.base_dir / path, stat.st_size)
+        postings, length, checkpoints = _analyze(data) if data is not None else ({}, -1, [0])
+        file_id = conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, length, checkpoints) VALUES (?, ?, ?, ?, ?)",
+            (path, stat.st_mtime_ns, stat.st_size, length, json.dumps(checkpoints)),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO postings (term, file_id, tf, lines) VALUES (?, ?, ?, ?)",
+            [(term, file_id, tf, ",".join(map(str, lines))) for term, (tf, lines) in postings.items()],
+        )
+        return data is not None
+
+    def _refresh_if_stale(self) -> None:
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+
+    def search(self, query: str, limit: int = 10) -> List[FileMatch]:
+        """Files ranked by BM25 for the query terms, with the lines the terms occur on."""
+        query_terms = list(dict.fromkeys(terms(query)))
+        if not query_terms:
+            return []
+        self._refresh_if_stale()
+        with self._connect() as conn:
+            count, average = conn.execute("SELECT count(*), avg(length) FROM files WHERE length >= 0").fetchone()
+            if not count:
+                return []
+            placeholders = ",".join("?" * len(query_terms))
+            rows = conn.execute(
+                f"SELECT p.term, f.path, f.length, p.tf, p.lines FROM postings p JOIN files f ON f.id = p.file_id "
+                f"WHERE p.term IN ({placeholders})",
+                query_terms,
+            ).fetchall()
+        frequencies: Dict[str, int] = defaultdict(int)
+        for term, *_ in rows:
+            frequencies[term] += 1
+        matches: Dict[str, FileMatch] = {}
+        for term, path, length, tf, lines in rows:
+            df = frequencies[term]
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (average or 1))
+            match = matches.setdefault(path, FileMatch(path=path, score=0.0))
+            match.score += idf * tf * (BM25_K1 + 1) / norm
+            match.lines.extend(int(number) for number in lines.split(",") if number)
+        ranked = sorted(matches.values(), key=lambda match: (-match.score, match.path))[:limit]
+        for match in ranked:
+            match.lines = sorted(set(match.lines))
+        return ranked
+
+    def checkpoint(self, path: str, line: int, mtime_ns: int, size: int) -> Tuple[int, int]:
+        """``(line, byte offset)`` of the last checkpoint at or before ``line``; ``(0, 0)`` if the file changed."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT mtime_ns, size, checkpoints FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None or (row[0], row[1]) != (mtime_ns, size):
+            return 0, 0
+        checkpoints = json.loads(row[2])
+        index = min(line // LINE_CHECKPOINT, len(checkpoints) - 1)
+        return index * LINE_CHECKPOINT, checkpoints[index]
+
+
+def read_lines(
+    path: Path, start_line: int, end_line: int, encoding: str = "utf-8", start: Tuple[int, int] = (0, 0)
+) -> str:
+    """Lines ``start_line..end_line`` (0-based, inclusive) of a file, read through a memory map.
+
+    ``start`` is a known ``(line, byte offset)`` at or before ``start_line``. Only the
+    bytes up to the end of ``end_line`` are touched.
+    """
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size == 0:
+            return ""
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            line, offset = start
+            while line < start_line:
+                newline = mapped.find(b"\n", offset)
+                if newline < 0:
+                    return ""
+                line, offset = line + 1, newline + 1
+            end = offset
+            while line <= end_line:
+                newline = mapped.find(b"\n", end)
+                if newline < 0:
+                    end = size + 1
+                    break
+                line, end = line + 1, newline + 1
+            return mapped[offset : end - 1].decode(encoding)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from backend.agents.knowledge_agent import DOCUMENTS_DIR, DOCUMENTS_INDEX_PATH
+
+    index = FileIndex(DOCUMENTS_DIR, DOCUMENTS_INDEX_PATH)
+    print(index.refresh().summary())
+    if len(sys.argv) > 1:
+        for match in index.search(" ".join(sys.argv[1:])):
+            print(f"  {match.score:6.2f}  {match.path}  lines {match.lines[:10]}")
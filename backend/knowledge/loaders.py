@@ -4,75 +4,133 @@ Knowledge Loaders
 
 Multi-source document loading for the knowledge base.
 Supports URL, PDF, and CSV sources with extensible reader support.
+
+PDF and CSV files go through the staged ingestion pipeline
+(``backend.knowledge.pipeline``): parsing in a process pool, batched
+embedding, and bulk upserts into the PgVector table. ``sync_documents``
+uses the ingestion manifest (``backend.knowledge.manifest``) to embed only
+new or changed files and to delete vectors of removed files.
+
+With ``CSV_INGEST_MODE=table`` (opt-in), CSV files skip the pipeline:
+they are bulk-loaded into Postgres tables and only a schema summary with
+sample rows is embedded (``backend.knowledge.csv_tables``).
 """
 
+import asyncio
 import logging
 from pathlib import Path
 
-from agno.knowledge.reader.csv_reader import CSVReader
-from agno.knowledge.reader.pdf_reader import PDFReader
+from backend.knowledge.csv_tables import CSV_INGEST_MODE, ingest_csv_tables, sync_csv_tables
+from backend.knowledge.manifest import SyncPlan, sync_directory
+from backend.knowledge.pipeline import SUPPORTED_SUFFIXES, ingest_files
 
 logger = logging.getLogger(__name__)
 
-# ---------------------------------------------------------------------------
-# Reader Instances
-# ---------------------------------------------------------------------------
-pdf_reader = PDFReader()
-csv_reader = CSVReader()
-
 # ---------------------------------------------------------------------------
 # Data Directory
 # ---------------------------------------------------------------------------
 DATA_DIR = Path(__file__).parent.parent.parent / "data" / "docs"
 
 
-def load_pdf_documents(knowledge: object) -> int:
-    """Load all PDF files from data/docs/ into the knowledge base.
+def _list_files(suffixes: tuple[str, ...]) -> list[Path]:
+    return sorted(p for p in DATA_DIR.iterdir() if p.is_file() and p.suffix.lower() in suffixes)
+
+
+def _split_csv(paths: list[Path]) -> tuple[list[Path], list[Path]]:
+    """(files for the embedding pipeline, CSV files to load as tables)."""
+    if CSV_INGEST_MODE != "table":
+        return paths, []
+    return [p for p in paths if p.suffix.lower() != ".csv"], [p for p in paths if p.suffix.lower() == ".csv"]
+
+
+def _data_vector_db() -> object:
+    """The data agent's knowledge table, where CSV table summaries are registered."""
+    from backend.agents.data_agent import data_knowledge
+
+    return data_knowledge.vector_db
+
+
+def _ingest(knowledge: object, paths: list[Path]) -> int:
+    vector_db = getattr(knowledge, "vector_db", None)
+    if vector_db is None:
+        logger.warning("Knowledge base has no vector_db, skipping %d files", len(paths))
+        return 0
+    documents, csv_files = _split_csv(paths)
+    loaded = 0
+    if documents:
+        loaded += asyncio.run(ingest_files(vector_db, documents)).files_parsed
+    if csv_files:
+        tables, _ = asyncio.run(ingest_csv_tables(vector_db, csv_files, data_vector_db=_data_vector_db()))
+        loaded += len(tables)
+    return loaded
+
+
+def load_documents(knowledge: object, suffixes: tuple[str, ...] = SUPPORTED_SUFFIXES) -> int:
+    """Load all supported files from data/docs/ into the knowledge base in one pipeline run.
 
     Args:
-        knowledge: Knowledge instance with an insert method.
+        knowledge: Knowledge instance with a PgVector ``vector_db``.
+        suffixes: File extensions to include.
 
     Returns:
-        Number of documents loaded.
+        Number of files loaded.
     """
     if not DATA_DIR.exists():
-        logger.info("Data directory %s does not exist, skipping PDF loading", DATA_DIR)
+        logger.info("Data directory %s does not exist, skipping document loading", DATA_DIR)
+        return 0
+
+    paths = _list_files(suffixes)
+    if not paths:
         return 0
+    return _ingest(knowledge, paths)
+
+
+def load_pdf_documents(knowledge: object) -> int:
+    """Load all PDF files from data/docs/ into the knowledge base.
 
-    count = 0
-    for pdf_path in sorted(DATA_DIR.glob("*.pdf")):
-        try:
-            documents = pdf_reader.read(pdf_path)
-            for doc in documents:
-                knowledge.load_documents(documents=[doc])  # type: ignore[attr-defined]
-            count += 1
-            logger.info("Loaded PDF: %s", pdf_path.name)
-        except Exception:
-            logger.exception("Failed to load PDF: %s", pdf_path.name)
-    return count
+    Args:
+        knowledge: Knowledge instance with a PgVector ``vector_db``.
+
+    Returns:
+        Number of documents loaded.
+    """
+    return load_documents(knowledge, suffixes=(".pdf",))
 
 
 def load_csv_documents(knowledge: object) -> int:
     """Load all CSV files from data/docs/ into the knowledge base.
 
+    In ``table`` mode each file becomes a Postgres table and only its summary is embedded.
+
     Args:
-        knowledge: Knowledge instance with an insert method.
+        knowledge: Knowledge instance with a PgVector ``vector_db``.
 
     Returns:
         Number of documents loaded.
     """
-    if not DATA_DIR.exists():
-        logger.info("Data directory %s does not exist, skipping CSV loading", DATA_DIR)
-        return 0
+    return load_documents(knowledge, suffixes=(".csv",))
+
+
+def sync_documents(knowledge: object, dry_run: bool = False) -> SyncPlan | None:
+    """Incrementally sync data/docs/ into the knowledge base using the ingestion manifest.
 
-    count = 0
-    for csv_path in sorted(DATA_DIR.glob("*.csv")):
-        try:
-            documents = csv_reader.read(csv_path)
-            for doc in documents:
-                knowledge.load_documents(documents=[doc])  # type: ignore[attr-defined]
-            count += 1
-            logger.info("Loaded CSV: %s", csv_path.name)
-        except Exception:
-            logger.exception("Failed to load CSV: %s", csv_path.name)
-    return count
+    Args:
+        knowledge: Knowledge instance with a PgVector ``vector_db``.
+        dry_run: Report the plan without embedding or deleting anything.
+
+    Returns:
+        The sync plan, or None when there is nothing to sync against.
+    """
+    vector_db = getattr(knowledge, "vector_db", None)
+    if vector_db is None or not DATA_DIR.exists():
+        logger.info("Nothing to sync from %s", DATA_DIR)
+        return None
+    documents, csv_files = _split_csv(_list_files(SUPPORTED_SUFFIXES))
+    plan, _ = asyncio.run(sync_directory(vector_db, DATA_DIR, documents, dry_run=dry_run))
+    logger.info("Synced %s: %s", DATA_DIR, plan.summary())
+    # Also runs with no files in embed mode, so tables loaded earlier are dropped
+    csv_plan, _ = asyncio.run(
+        sync_csv_tables(vector_db, DATA_DIR, csv_files, data_vector_db=_data_vector_db(), dry_run=dry_run)
+    )
+    logger.info("Synced CSV tables from %s: %s", DATA_DIR, csv_plan.summary())
+    return plan
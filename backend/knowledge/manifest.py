@@ -0,0 +1,250 @@
+"""
+Ingestion Manifest
+------------------
+
+Incremental sync of source files into a PgVector knowledge table.
+
+``ai.knowledge_manifest`` records path, size, mtime and sha256 for every file
+ingested into a vector table. A sync compares the directory against it:
+
+- unchanged size + mtime: skipped without hashing
+- same hash, new mtime (touched): manifest updated, nothing re-embedded
+- new or changed content: embedded through the ingestion pipeline
+- removed or replaced content: old vectors deleted in place by (name, hash)
+
+A nightly refresh therefore costs time proportional to the change set.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    MetaData,
+    String,
+    Table,
+    and_,
+    delete,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+
+from backend.knowledge.pipeline import IngestProgress, file_sha256, ingest_files, source_name
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData(schema="ai")
+
+manifest_table = Table(
+    "knowledge_manifest",
+    _metadata,
+    Column("namespace", String(255), primary_key=True),  # Vector table name
+    Column("path", String, primary_key=True),  # Row name used in the vector table
+    Column("size", BigInteger, nullable=False),
+    Column("mtime", Float, nullable=False),
+    Column("content_hash", String(64), nullable=False),
+    Column("synced_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class SourceState:
+    """Size, mtime and content hash of one source file."""
+
+    size: int
+    mtime: float
+    content_hash: str
+
+
+@dataclass
+class SyncPlan:
+    """Difference between the manifest and the files on disk."""
+
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    touched: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    previous: dict[str, SourceState] = field(default_factory=dict)
+    current: dict[str, SourceState] = field(default_factory=dict)
+
+    @property
+    def to_ingest(self) -> list[str]:
+        return self.added + self.changed
+
+    @property
+    def is_noop(self) -> bool:
+        return not (self.added or self.changed or self.touched or self.removed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed, "
+            f"{len(self.touched)} touched, {len(self.unchanged)} unchanged"
+        )
+
+
+class IngestionManifest:
+    """Manifest rows for one vector table, stored in ``ai.knowledge_manifest``."""
+
+    def __init__(self, namespace: str, engine: Engine):
+        self.namespace = namespace
+        self._engine = engine
+        self._created = False
+
+    def _ensure_table(self) -> None:
+        if not self._created:
+            _metadata.create_all(self._engine, tables=[manifest_table], checkfirst=True)
+            self._created = True
+
+    def load(self) -> dict[str, SourceState]:
+        self._ensure_table()
+        t = manifest_table
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                select(t.c.path, t.c.size, t.c.mtime, t.c.content_hash).where(t.c.namespace == self.namespace)
+            )
+            return {path: SourceState(size, mtime, digest) for path, size, mtime, digest in rows}
+
+    def save(self, states: dict[str, SourceState]) -> None:
+        if not states:
+            return
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "namespace": self.namespace,
+                "path": path,
+                "size": state.size,
+                "mtime": state.mtime,
+                "content_hash": state.content_hash,
+                "synced_at": now,
+            }
+            for path, state in states.items()
+        ]
+        stmt = insert(manifest_table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["namespace", "path"],
+            set_={col: stmt.excluded[col] for col in ("size", "mtime", "content_hash", "synced_at")},
+        )
+        with self._engine.begin() as conn:
+            conn.execute(stmt)
+
+    def remove(self, paths: Iterable[str] | None = None) -> None:
+        """Forget ``paths``, or every entry in this namespace when ``paths`` is None."""
+        self._ensure_table()
+        t = manifest_table
+        stmt = delete(t).where(t.c.namespace == self.namespace)
+        if paths is not None:
+            path_list = list(paths)
+            if not path_list:
+                return
+            stmt = stmt.where(t.c.path.in_(path_list))
+        with self._engine.begin() as conn:
+            conn.execute(stmt)
+
+
+def scan_sources(files: Iterable[Path], root: Path, previous: dict[str, SourceState]) -> dict[str, SourceState]:
+    """Stat every file and hash only those whose size or mtime differs from the manifest."""
+    current: dict[str, SourceState] = {}
+    for path in files:
+        stat = path.stat()
+        name = source_name(path, root)
+        known = previous.get(name)
+        if known is not None and known.size == stat.st_size and known.mtime == stat.st_mtime:
+            current[name] = known
+        else:
+            current[name] = SourceState(stat.st_size, stat.st_mtime, file_sha256(path))
+    return current
+
+
+def plan_sync(previous: dict[str, SourceState], current: dict[str, SourceState]) -> SyncPlan:
+    """Classify each path as added, changed, touched, removed or unchanged."""
+    plan = SyncPlan(previous=previous, current=current)
+    for name, state in sorted(current.items()):
+        known = previous.get(name)
+        if known is None:
+            plan.added.append(name)
+        elif known.content_hash != state.content_hash:
+            plan.changed.append(name)
+        elif known != state:
+            plan.touched.append(name)
+        else:
+            plan.unchanged.append(name)
+    plan.removed = sorted(set(previous) - set(current))
+    return plan
+
+
+def delete_sources(vector_db: Any, sources: list[tuple[str, str]]) -> None:
+    """Delete vector rows matching any ``(name, content_hash)`` pair."""
+    if not sources:
+        return
+    table = vector_db.table
+    condition = or_(*(and_(table.c.name == name, table.c.content_hash == digest) for name, digest in sources))
+    with vector_db.Session() as sess:
+        sess.execute(delete(table).where(condition))
+        sess.commit()
+
+
+async def sync_directory(
+    vector_db: Any,
+    root: Path,
+    files: Iterable[Path],
+    *,
+    manifest: IngestionManifest | None = None,
+    dry_run: bool = False,
+    delete: Callable[[Any, list[tuple[str, str]]], None] = delete_sources,
+    **ingest_kwargs: Any,
+) -> tuple[SyncPlan, IngestProgress | None]:
+    """Bring ``vector_db`` in line with ``files`` under ``root``, touching only what changed.
+
+    Args:
+        vector_db: PgVector instance to sync.
+        root: Directory rows are named relative to.
+        files: Files currently on disk.
+        manifest: Manifest to use (defaults to one keyed by the vector table name).
+        dry_run: Compute and return the plan without changing anything.
+        delete: Vector row deleter, overridable for tests.
+        **ingest_kwargs: Passed through to ``ingest_files``.
+
+    Returns:
+        The sync plan and the ingest progress (None when nothing was ingested).
+    """
+    if manifest is None:
+        manifest = IngestionManifest(vector_db.table_name, vector_db.db_engine)
+
+    previous = manifest.load()
+    file_list = list(files)
+    current = scan_sources(file_list, root, previous)
+    plan = plan_sync(previous, current)
+    logger.info("Sync plan for %s: %s", manifest.namespace, plan.summary())
+    if dry_run or plan.is_noop:
+        return plan, None
+
+    progress = None
+    to_ingest = set(plan.to_ingest)
+    if to_ingest:
+        paths = [path for path in file_list if source_name(path, root) in to_ingest]
+        progress = await ingest_files(vector_db, paths, root=root, **ingest_kwargs)
+
+    # Old vectors go only once their replacement is in. A failed file keeps its old rows and
+    # manifest entry, so search still finds it and the next sync retries it; whatever it
+    # managed to write under the new hash is dropped.
+    failed = set(progress.failed_sources) if progress else set()
+    replaced = [name for name in plan.changed + plan.removed if name not in failed]
+    delete(
+        vector_db,
+        [(name, previous[name].content_hash) for name in replaced]
+        + [(name, current[name].content_hash) for name in sorted(failed)],
+    )
+    manifest.remove(plan.removed)
+    manifest.save({name: current[name] for name in plan.to_ingest + plan.touched if name not in failed})
+    return plan, progress
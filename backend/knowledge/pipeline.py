@@ -0,0 +1,601 @@
+"""
+Ingestion Pipeline
+------------------
+
+Staged, batched document ingestion into a PgVector table:
+
+    parse (process pool) -> embed (large batches, bounded concurrency) -> bulk upsert
+
+Stages are connected by bounded queues, so a slow embedder or database applies
+backpressure to parsing instead of buffering the whole corpus in memory.
+PDFs are read page by page and split into page-window tasks, so peak memory
+is bounded by the window size rather than the size of the largest document.
+Vector rows use the same deterministic ids as agno's PgVector upsert, so
+re-running the pipeline over the same files updates rows in place.
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from hashlib import md5
+from os import getenv
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from agno.knowledge.reader.base import Reader
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql
+
+logger = logging.getLogger(__name__)
+
+INGEST_PARSE_WORKERS = int(getenv("INGEST_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INGEST_EMBED_BATCH_SIZE = int(getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+INGEST_EMBED_CONCURRENCY = int(getenv("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_INSERT_BATCH_SIZE = int(getenv("INGEST_INSERT_BATCH_SIZE", "500"))
+INGEST_PDF_PAGES_PER_TASK = int(getenv("INGEST_PDF_PAGES_PER_TASK", "32"))
+
+SUPPORTED_SUFFIXES = (".pdf", ".csv")
+
+
+@dataclass
+class Chunk:
+    """A parsed chunk of a source file, ready to embed."""
+
+    source: str  # File name (or path relative to the ingest root); stored as the vector row name
+    content_hash: str  # sha256 of the source file bytes
+    content: str
+    meta_data: dict[str, Any] = field(default_factory=dict)
+    doc_id: str | None = None
+
+
+@dataclass
+class IngestProgress:
+    """Running counters reported to the progress callback."""
+
+    files_total: int = 0
+    files_parsed: int = 0
+    files_failed: int = 0
+    chunks_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_inserted: int = 0
+    chunks_failed: int = 0
+    failed_sources: list[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        return (
+            f"files {self.files_parsed + self.files_failed}/{self.files_total} "
+            f"({self.files_failed} failed), chunks parsed={self.chunks_parsed} "
+            f"embedded={self.chunks_embedded} inserted={self.chunks_inserted} "
+            f"failed={self.chunks_failed}, {elapsed:.1f}s"
+        )
+
+
+ProgressCallback = Callable[[IngestProgress], None]
+
+
+def _log_progress(progress: IngestProgress) -> None:
+    logger.info("Ingest progress: %s", progress.summary())
+
+
+# ---------------------------------------------------------------------------
+# Stage 1: parsing (runs in worker processes)
+# ---------------------------------------------------------------------------
+_readers: dict[str, Reader] = {}
+
+
+def _reader_for(suffix: str) -> Reader:
+    """Pick a reader by extension, mirroring ``Knowledge._select_reader_by_extension``."""
+    reader = _readers.get(suffix)
+    if reader is None:
+        if suffix == ".pdf":
+            from agno.knowledge.reader.pdf_reader import PDFReader
+
+            reader = PDFReader()
+        elif suffix == ".csv":
+            from agno.knowledge.reader.csv_reader import CSVReader
+
+            reader = CSVReader()
+        elif suffix == ".json":
+            from agno.knowledge.reader.json_reader import JSONReader
+
+            reader = JSONReader()
+        elif suffix == ".markdown":
+            from agno.knowledge.reader.markdown_reader import MarkdownReader
+
+            reader = MarkdownReader()
+        else:
+            from agno.knowledge.reader.text_reader import TextReader
+
+            reader = TextReader()
+        _readers[suffix] = reader
+    return reader
+
+
+def file_sha256(path: Path) -> str:
+    """Return the sha256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_INHERITABLE_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+class _OpenPdf:
+    """An open PDF whose pages are resolved one at a time.
+
+    ``PdfReader.pages`` materialises every page dictionary up front. Here the
+    page tree is walked once to record only a reference per page (plus the
+    attributes it inherits), and each page is resolved on demand. The reader
+    is given a file handle rather than a path, so pypdf reads objects as
+    needed instead of loading the whole file into memory.
+    """
+
+    def __init__(self, path: Path):
+        from pypdf import PdfReader
+
+        self.handle: BinaryIO = path.open("rb")
+        self.lock = threading.Lock()
+        self.refs: list[tuple[Any, dict[str, Any]]] = []
+        try:
+            self.reader = PdfReader(self.handle)
+            if self.reader.is_encrypted:
+                self.reader.decrypt("")
+            self._collect(self.reader.root_object["/Pages"], {}, depth=0)
+            self.reader.resolved_objects.clear()  # Keep the references, not the page dictionaries
+        except Exception:
+            self.handle.close()
+            raise
+
+    def _collect(self, node_ref: Any, inherit: dict[str, Any], depth: int) -> None:
+        if depth > 64:
+            raise ValueError("PDF page tree is too deep")
+        node = node_ref.get_object()
+        if node.get("/Type") == "/Pages" or ("/Kids" in node and node.get("/Type") != "/Page"):
+            inherited = {**inherit, **{attr: node[attr] for attr in _INHERITABLE_PAGE_ATTRIBUTES if attr in node}}
+            for kid in node["/Kids"]:
+                self._collect(kid, inherited, depth + 1)
+        else:
+            self.refs.append((node_ref, inherit))
+            if len(self.refs) % 64 == 0:
+                self.reader.resolved_objects.clear()  # Walked pages need not stay resolved
+
+    def page(self, index: int) -> Any:
+        from pypdf import PageObject
+        from pypdf.generic import IndirectObject
+
+        ref, inherit = self.refs[index]
+        page = PageObject(self.reader, ref if isinstance(ref, IndirectObject) else None)
+        page.update(ref.get_object())
+        for attr, value in inherit.items():
+            page.setdefault(attr, value)
+        return page
+
+    def close(self) -> None:
+        self.handle.close()
+
+
+# Open PDFs reused across page-window tasks of the same file (per process, LRU)
+_PDF_CACHE_SIZE = 2
+_open_pdfs: OrderedDict[Path, _OpenPdf] = OrderedDict()
+_open_pdfs_guard = threading.Lock()
+
+
+@contextmanager
+def _open_pdf(path: Path) -> Iterator[_OpenPdf]:
+    """Yield a cached ``_OpenPdf`` for ``path``, serialising access to it.
+
+    Opening walks the page tree, so it is done once per file per process
+    rather than once per page-window task.
+    """
+    with _open_pdfs_guard:
+        pdf = _open_pdfs.get(path)
+        if pdf is None:
+            pdf = _OpenPdf(path)
+            _open_pdfs[path] = pdf
+            for stale_path in list(_open_pdfs)[:-_PDF_CACHE_SIZE]:
+                stale = _open_pdfs[stale_path]
+                if stale.lock.acquire(blocking=False):
+                    del _open_pdfs[stale_path]
+                    stale.close()
+                    stale.lock.release()
+        _open_pdfs.move_to_end(path)
+    with pdf.lock:
+        if pdf.handle.closed:  # Evicted meanwhile; use a private copy
+            private = _OpenPdf(path)
+            try:
+                yield private
+            finally:
+                private.close()
+        else:
+            yield pdf
+
+
+def release_pdf(path: Path) -> None:
+    """Close the cached ``path`` PDF in this process, if open."""
+    with _open_pdfs_guard:
+        pdf = _open_pdfs.pop(path, None)
+    if pdf is not None:
+        with pdf.lock:
+            pdf.close()
+
+
+def pdf_page_count(path: Path) -> int:
+    """Number of pages in a PDF (walks the page tree, not page contents)."""
+    with _open_pdf(path) as pdf:
+        return len(pdf.refs)
+
+
+def iter_pdf_pages(path: Path, start: int = 0, stop: int | None = None) -> Iterator[tuple[int, str]]:
+    """Lazily yield ``(page_number, text)`` for pages ``[start, stop)`` of a PDF.
+
+    Only one page is resolved at a time, unlike ``PDFReader.read`` which
+    extracts every page before returning. Resolved objects are dropped after
+    each page, so memory does not grow with the page count.
+    """
+    with _open_pdf(path) as pdf:
+        end = len(pdf.refs) if stop is None else min(stop, len(pdf.refs))
+        try:
+            for index in range(start, end):
+                text = pdf.page(index).extract_text() or ""
+                pdf.reader.resolved_objects.clear()
+                yield index + 1, text
+        finally:
+            pdf.reader.resolved_objects.clear()
+
+
+def iter_pdf_chunks(
+    path: Path, source: str, content_hash: str, start: int = 0, stop: int | None = None
+) -> Iterator[Chunk]:
+    """Lazily yield chunks for pages ``[start, stop)`` of a PDF, chunked like ``PDFReader``."""
+    from agno.knowledge.document.base import Document
+
+    reader = _reader_for(".pdf")
+    doc_name = Path(source).stem.replace(" ", "_")
+    for page_number, text in iter_pdf_pages(path, start, stop):
+        if not text:
+            continue
+        # Page-based ids (PDFReader uses random ones) keep re-ingestion idempotent
+        page = Document(name=doc_name, id=f"{doc_name}_{page_number}", meta_data={"page": page_number}, content=text)
+        for doc in reader.chunk_document(page) if reader.chunk else [page]:
+            if not doc.content:
+                continue
+            yield Chunk(
+                source=source,
+                content_hash=content_hash,
+                content=doc.content,
+                meta_data={**(doc.meta_data or {}), "source": source},
+                doc_id=doc.id,
+            )
+
+
+def parse_file(path: str, source: str | None = None) -> list[Chunk]:
+    """Read and chunk one file. Module-level so it can run in a process pool."""
+    file_path = Path(path)
+    source = source or file_path.name
+    suffix = file_path.suffix.lower()
+    content_hash = file_sha256(file_path)
+    if suffix == ".pdf":
+        try:
+            return list(iter_pdf_chunks(file_path, source, content_hash))
+        finally:
+            release_pdf(file_path)
+    reader = _reader_for(suffix)
+    chunks = []
+    for doc in reader.read(file_path):
+        if not doc.content:
+            continue
+        chunks.append(
+            Chunk(
+                source=source,
+                content_hash=content_hash,
+                content=doc.content,
+                meta_data={**(doc.meta_data or {}), "source": source},
+                doc_id=doc.id,
+            )
+        )
+    return chunks
+
+
+@dataclass(frozen=True)
+class ParseTask:
+    """A whole file, or a page window of a PDF, to parse in one worker call."""
+
+    path: Path
+    source: str
+    start: int | None = None  # Page window; None parses the whole file
+    stop: int | None = None
+    content_hash: str | None = None
+
+
+def parse_task(task: ParseTask) -> list[Chunk]:
+    """Parse one task. Module-level so it can run in a process pool."""
+    if task.start is None or task.content_hash is None:
+        return parse_file(str(task.path), task.source)
+    return list(iter_pdf_chunks(task.path, task.source, task.content_hash, task.start, task.stop))
+
+
+def _plan_pdf(path: Path) -> tuple[int, str]:
+    return pdf_page_count(path), file_sha256(path)
+
+
+# ---------------------------------------------------------------------------
+# Stage 2: embedding
+# ---------------------------------------------------------------------------
+async def _embed_texts(embedder: Any, texts: list[str]) -> tuple[list[list[float]], list[dict | None]]:
+    batch = getattr(embedder, "async_get_embeddings_batch_and_usage", None)
+    if batch is not None:
+        return await batch(texts)
+    results = await asyncio.gather(*(embedder.async_get_embedding_and_usage(text) for text in texts))
+    return [embedding for embedding, _ in results], [usage for _, usage in results]
+
+
+def _record(chunk: Chunk, content: str, embedding: list[float], usage: dict | None) -> dict[str, Any]:
+    # Same id scheme as PgVector.upsert so pipeline rows and agno rows never collide
+    base_id = chunk.doc_id or md5(content.encode()).hexdigest()
+    return {
+        "id": md5(f"{base_id}_{chunk.content_hash}".encode()).hexdigest(),
+        "name": chunk.source,
+        "meta_data": chunk.meta_data,
+        "filters": None,
+        "content": content,
+        "embedding": embedding,
+        "usage": usage,
+        "content_hash": chunk.content_hash,
+        "content_id": None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Stage 3: bulk upsert
+# ---------------------------------------------------------------------------
+_UPSERT_COLUMNS = ("name", "meta_data", "content", "embedding", "usage", "content_hash")
+
+
+def _upsert_statement(vector_db: Any, records: list[dict[str, Any]], columns: Iterable[str] = _UPSERT_COLUMNS) -> Any:
+    stmt = postgresql.insert(vector_db.table).values(records)
+    return stmt.on_conflict_do_update(index_elements=["id"], set_={column: stmt.excluded[column] for column in columns})
+
+
+def bulk_upsert(vector_db: Any, records: list[dict[str, Any]]) -> int:
+    """Upsert vector rows with one multi-row INSERT ... ON CONFLICT statement."""
+    unique = list({record["id"]: record for record in records}.values())
+    if not unique:
+        return 0
+    with vector_db.Session() as sess:
+        sess.execute(_upsert_statement(vector_db, unique))
+        sess.commit()
+    return len(unique)
+
+
+def replace_content_rows(vector_db: Any, content_id: str, records: list[dict[str, Any]]) -> int:
+    """Make ``records`` the only vector rows of ``content_id``, in one transaction.
+
+    The new rows are written first and only then are the content's other rows deleted, so a
+    failure leaves the previous rows in place.
+    """
+    unique = list({record["id"]: {**record, "content_id": content_id} for record in records}.values())
+    if not unique:
+        raise ValueError(f"No rows to replace content {content_id} with")
+    table = vector_db.table
+    with vector_db.Session() as sess:
+        sess.execute(_upsert_statement(vector_db, unique, (*_UPSERT_COLUMNS, "filters", "content_id")))
+        sess.execute(
+            delete(table).where(table.c.content_id == content_id, table.c.id.notin_([r["id"] for r in unique]))
+        )
+        sess.commit()
+    return len(unique)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+async def ingest_files(
+    vector_db: Any,
+    paths: Iterable[Path],
+    *,
+    root: Path | None = None,
+    parse_workers: int = INGEST_PARSE_WORKERS,
+    embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+    embed_concurrency: int = INGEST_EMBED_CONCURRENCY,
+    insert_batch_size: int = INGEST_INSERT_BATCH_SIZE,
+    pdf_pages_per_task: int = INGEST_PDF_PAGES_PER_TASK,
+    on_progress: ProgressCallback | None = _log_progress,
+    upsert: Callable[[Any, list[dict[str, Any]]], int] = bulk_upsert,
+) -> IngestProgress:
+    """Parse, embed and upsert ``paths`` into ``vector_db``.
+
+    Args:
+        vector_db: PgVector instance (its embedder, table and Session are used).
+        paths: Files to ingest (reader chosen by extension).
+        root: When set, rows are named by path relative to ``root`` instead of file name.
+        parse_workers: Process pool size; 0 parses in a thread instead.
+        embed_batch_size: Chunks per embedding request.
+        embed_concurrency: Embedding requests in flight at once.
+        insert_batch_size: Rows per bulk upsert statement.
+        pdf_pages_per_task: Pages per PDF parse task; 0 parses each PDF as one task.
+        on_progress: Called after each parse task and each upsert.
+        upsert: Bulk writer, overridable for tests.
+
+    Returns:
+        Final progress counters.
+    """
+    path_list = list(paths)
+    progress = IngestProgress(files_total=len(path_list))
+    if not path_list:
+        return progress
+
+    def report() -> None:
+        if on_progress is not None:
+            on_progress(progress)
+
+    if hasattr(vector_db, "create"):
+        await asyncio.to_thread(vector_db.create)
+
+    embedder = vector_db.embedder
+    embed_concurrency = max(1, embed_concurrency)
+    chunk_queue: asyncio.Queue[list[Chunk] | None] = asyncio.Queue(maxsize=embed_concurrency * 2)
+    record_queue: asyncio.Queue[list[dict[str, Any]] | None] = asyncio.Queue(maxsize=embed_concurrency * 2)
+
+    # Parse tasks outstanding per source; a source counts as parsed once all are done
+    tasks_left: dict[str, int] = {}
+    failed_sources: set[str] = set()
+
+    async def plan_tasks() -> AsyncIterator[ParseTask]:
+        for path in path_list:
+            source = source_name(path, root)
+            if path.suffix.lower() != ".pdf" or pdf_pages_per_task <= 0:
+                tasks_left[source] = 1
+                yield ParseTask(path, source)
+                continue
+            try:
+                pages, content_hash = await asyncio.to_thread(_plan_pdf, path)
+            except Exception:
+                logger.exception("Failed to open %s", path.name)
+                progress.files_failed += 1
+                _mark_failed(progress, [source])
+                report()
+                continue
+            starts = range(0, pages, pdf_pages_per_task)
+            tasks_left[source] = len(starts)
+            if not starts:
+                progress.files_parsed += 1
+                report()
+            for start in starts:
+                yield ParseTask(path, source, start, min(start + pdf_pages_per_task, pages), content_hash)
+
+    def finish_task(task: ParseTask, chunks: list[Chunk] | None) -> None:
+        if chunks is None:
+            failed_sources.add(task.source)
+            _mark_failed(progress, [task.source])
+        else:
+            progress.chunks_parsed += len(chunks)
+        tasks_left[task.source] -= 1
+        if tasks_left[task.source] == 0:
+            if task.start is not None:
+                release_pdf(task.path)
+            if task.source in failed_sources:
+                progress.files_failed += 1
+            else:
+                progress.files_parsed += 1
+        report()
+
+    async def parse_stage() -> None:
+        loop = asyncio.get_running_loop()
+        pool: Executor | None = None
+        if parse_workers > 0:
+            # spawn, not fork: the event loop process has live threads (DB pools, to_thread workers)
+            pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        max_in_flight = max(1, parse_workers) * 2
+        tasks = plan_tasks()
+        buffer: list[Chunk] = []
+
+        async def parse_one(task: ParseTask) -> tuple[ParseTask, list[Chunk] | None]:
+            try:
+                if pool is None:
+                    return task, await asyncio.to_thread(parse_task, task)
+                return task, await loop.run_in_executor(pool, parse_task, task)
+            except Exception:
+                logger.exception("Failed to parse %s", task.source)
+                return task, None
+
+        async def submit(n: int) -> set[asyncio.Future]:
+            futures: set[asyncio.Future] = set()
+            async for task in tasks:
+                futures.add(asyncio.ensure_future(parse_one(task)))
+                if len(futures) >= n:
+                    break
+            return futures
+
+        try:
+            in_flight = await submit(max_in_flight)
+            while in_flight:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task, chunks = future.result()
+                    finish_task(task, chunks)
+                    buffer.extend(chunks or [])
+                    # Blocks when the embedders fall behind — that is the backpressure
+                    while len(buffer) >= embed_batch_size:
+                        await chunk_queue.put(buffer[:embed_batch_size])
+                        buffer = buffer[embed_batch_size:]
+                    in_flight |= await submit(1)
+            if buffer:
+                await chunk_queue.put(buffer)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        for _ in range(embed_concurrency):
+            await chunk_queue.put(None)
+
+    async def embed_worker() -> None:
+        while (batch := await chunk_queue.get()) is not None:
+            texts = [chunk.content.replace("\x00", "\ufffd") for chunk in batch]
+            try:
+                embeddings, usages = await _embed_texts(embedder, texts)
+            except Exception:
+                logger.exception("Embedding batch of %d chunks failed", len(batch))
+                progress.chunks_failed += len(batch)
+                _mark_failed(progress, (chunk.source for chunk in batch))
+                continue
+            records = []
+            for chunk, text, embedding, usage in zip(batch, texts, embeddings, usages):
+                if not embedding:
+                    progress.chunks_failed += 1
+                    _mark_failed(progress, [chunk.source])
+                    continue
+                records.append(_record(chunk, text, embedding, usage))
+            progress.chunks_embedded += len(records)
+            await record_queue.put(records)
+
+    async def embed_stage() -> None:
+        await asyncio.gather(*(embed_worker() for _ in range(embed_concurrency)))
+        await record_queue.put(None)
+
+    async def insert_stage() -> None:
+        pending: list[dict[str, Any]] = []
+
+        async def flush() -> None:
+            nonlocal pending
+            batch, pending = pending, []
+            progress.chunks_inserted += await asyncio.to_thread(upsert, vector_db, batch)
+            report()
+
+        while (records := await record_queue.get()) is not None:
+            pending.extend(records)
+            if len(pending) >= insert_batch_size:
+                await flush()
+        if pending:
+            await flush()
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(parse_stage())
+        group.create_task(embed_stage())
+        group.create_task(insert_stage())
+
+    logger.info("Ingest complete: %s", progress.summary())
+    return progress
+
+
+def _mark_failed(progress: IngestProgress, sources: Iterable[str]) -> None:
+    for source in sources:
+        if source not in progress.failed_sources:
+            progress.failed_sources.append(source)
+
+
+def source_name(path: Path, root: Path | None = None) -> str:
+    """Row name for a file: its path relative to ``root``, or just the file name."""
+    return path.relative_to(root).as_posix() if root is not None else path.name
@@ -0,0 +1,71 @@
+"""
+Knowledge Routes
+----------------
+Mounted on base_app alongside the AgentOS ``/knowledge`` routes.
+
+POST /knowledge/refresh-urls       -- conditional re-fetch of URL sources (rate limited: 5/minute)
+POST /knowledge/compact-learnings  -- merge near-duplicate learnings (rate limited: 5/minute)
+
+Called daily by the ``daily-knowledge-refresh`` and ``nightly-learning-compaction``
+schedules. Access is enforced by EntraJWTMiddleware via the ``knowledge:write`` scope.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from fastapi import APIRouter, Request
+
+from backend.auth.routes import limiter
+
+log = logging.getLogger(__name__)
+
+knowledge_router = APIRouter(prefix="/knowledge", tags=["knowledge"])
+
+
+@knowledge_router.post("/refresh-urls")
+@limiter.limit("5/minute")
+async def refresh_urls(request: Request) -> dict:
+    """Re-check every URL knowledge source and re-embed only those that changed."""
+    from backend.agents.knowledge_agent import knowledge
+    from backend.knowledge.url_refresh import refresh_url_sources
+
+    report = await refresh_url_sources(knowledge)
+    return {
+        "summary": report.summary(),
+        "counts": report.counts,
+        "results": [
+            {"name": r.name, "url": r.url, "status": r.status, "http_status": r.http_status, "detail": r.detail}
+            for r in report.results
+        ],
+    }
+
+
+@knowledge_router.post("/compact-learnings")
+@limiter.limit("5/minute")
+async def compact_learnings(request: Request, full: bool = False, dry_run: bool = False) -> dict:
+    """Merge near-duplicate learnings added since the last pass, in every learnings table."""
+    from backend.knowledge.compaction import compact_all_learnings
+
+    results = await asyncio.to_thread(compact_all_learnings, full=full, dry_run=dry_run)
+    return {
+        "summary": "; ".join(result.summary() for result in results),
+        "results": [
+            {
+                "table": result.table,
+                "scanned": result.scanned,
+                "removed": result.removed,
+                "skipped": result.skipped,
+                "merges": [
+                    {
+                        "kept": merge.keeper.key,
+                        "title": merge.keeper.name,
+                        "removed": [duplicate.learning.key for duplicate in merge.duplicates],
+                    }
+                    for merge in result.merges
+                ],
+            }
+            for result in results
+        ],
+    }
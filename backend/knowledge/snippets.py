@@ -0,0 +1,223 @@
+"""
+Snippets
+--------
+
+Query-focused snippet extraction for keyword search results.
+
+``search_content`` used to return the first 500 characters of every hit, so
+the match was often cut off and the model had to search again or read the
+whole source. Instead, each hit is reduced to the windows of text where the
+query terms are densest:
+
+1. The query is split into terms (stopwords dropped, light suffix stripping
+   so "agents" also finds "agent"); each term matches as a word prefix, close
+   to what the ``english`` tsvector config matched in Postgres.
+2. Windows of ``SEARCH_SNIPPET_WINDOW`` characters are scored by the number
+   of distinct terms they contain, then by total matches. The best windows
+   are taken greedily without overlap, widened to fill the budget when there
+   are fewer of them than fit, snapped to word boundaries and shown in
+   document order, with matches in ``**bold**``.
+3. ``SEARCH_SNIPPET_BUDGET`` characters are shared across the results. A hit
+   shorter than its share is returned whole and leaves the rest to the next
+   ones; a hit without any literal match falls back to its leading text.
+
+``SEARCH_SNIPPET_MODE=head`` restores the leading-text snippets (within the
+same budget), e.g. to compare the two with ``benchmark_search_snippets``.
+"""
+
+import re
+from dataclasses import dataclass
+from os import getenv
+from typing import List, Optional, Sequence, Tuple
+
+# Total characters of snippet text across all results of one search
+SEARCH_SNIPPET_BUDGET = int(getenv("SEARCH_SNIPPET_BUDGET", "2500"))
+# Characters per window
+SEARCH_SNIPPET_WINDOW = int(getenv("SEARCH_SNIPPET_WINDOW", "300"))
+# focused | head
+SEARCH_SNIPPET_MODE = getenv("SEARCH_SNIPPET_MODE", "focused").lower()
+
+ELLIPSIS = "…"
+
+_WORD = re.compile(r"\w+")
+_SPACE = re.compile(r"\s+")
+# How far a window edge may move to land on whitespace
+_SNAP = 24
+_SUFFIXES = ("ing", "ed", "es", "s")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its me my of on or our that the this to was we what "
+    "when where which who why will with you your".split()
+)
+
+
+@dataclass(frozen=True)
+class _Match:
+    start: int
+    end: int
+    term: int
+
+
+def _stem(term: str) -> str:
+    for suffix in _SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[: -len(suffix)]
+    return term
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct, stemmed search terms of ``query``; stopwords are kept only if nothing else is left."""
+    words = _WORD.findall(query.casefold())
+    content_words = [word for word in words if word not in _STOPWORDS and len(word) > 1]
+    terms: List[str] = []
+    for word in content_words or words:
+        term = _stem(word)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _term_pattern(terms: Sequence[str]) -> Optional["re.Pattern[str]"]:
+    if not terms:
+        return None
+    # Longest first, so a term never shadows a longer one it is a prefix of
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})\w*", re.IGNORECASE)
+
+
+def find_matches(content: str, terms: Sequence[str]) -> List[_Match]:
+    pattern = _term_pattern(terms)
+    if pattern is None:
+        return []
+    ordered = sorted(range(len(terms)), key=lambda i: len(terms[i]), reverse=True)
+    matches = []
+    for match in pattern.finditer(content):
+        word = match.group().casefold()
+        term = next(i for i in ordered if word.startswith(terms[i]))
+        matches.append(_Match(match.start(), match.end(), term))
+    return matches
+
+
+def _best_window(matches: Sequence[_Match], window: int) -> Optional[Tuple[int, int]]:
+    """Index range [i, j) of the matches forming the densest window, or None."""
+    best: Optional[Tuple[int, int]] = None
+    best_score = (0, 0)
+    j = 0
+    for i, first in enumerate(matches):
+        j = max(j, i)
+        while j < len(matches) and matches[j].end - first.start <= window:
+            j += 1
+        if j == i:
+            # A single match longer than the window still counts
+            j = i + 1
+        score = (len({m.term for m in matches[i:j]}), j - i)
+        if score > best_score:
+            best, best_score = (i, j), score
+    return best
+
+
+def _snap(content: str, start: int, end: int) -> Tuple[int, int]:
+    """Move window edges onto whitespace so no word is cut, if one is near."""
+    if start > 0 and not content[start - 1].isspace():
+        found = _SPACE.search(content, start, min(start + _SNAP, end))
+        if found is not None:
+            start = found.end()
+    if end < len(content) and not content[end].isspace():
+        space = max((k for k in range(max(start, end - _SNAP), end) if content[k].isspace()), default=-1)
+        if space > start:
+            end = space
+    return start, end
+
+
+def _center(first: int, last: int, width: int, length: int) -> Tuple[int, int]:
+    """Window of ``width`` characters (or the whole match span, if longer) centered on [first, last)."""
+    width = max(width, last - first)
+    start = max(0, first - (width - (last - first)) // 2)
+    end = min(length, start + width)
+    return max(0, end - width), end
+
+
+def _windows(content: str, matches: List[_Match], budget: int, count: int) -> List[Tuple[int, int]]:
+    """Up to ``count`` non-overlapping windows around the densest matches, widened to fill ``budget``."""
+    window = budget // count
+    groups: List[Tuple[int, int]] = []
+    remaining = list(matches)
+    while remaining and len(groups) < count:
+        found = _best_window(remaining, window)
+        if found is None:
+            break
+        i, j = found
+        first, last = remaining[i].start, remaining[j - 1].end
+        groups.append((first, last))
+        start, end = _center(first, last, window, len(content))
+        remaining = [m for m in remaining if m.end <= start or m.start >= end]
+
+    # Fewer dense spots than windows: give each one more context
+    width = budget // max(1, len(groups))
+    spans: List[Tuple[int, int]] = []
+    for first, last in sorted(groups):
+        start, end = _snap(content, *_center(first, last, width, len(content)))
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(end, spans[-1][1]))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def _highlight(text: str, pattern: Optional["re.Pattern[str]"]) -> str:
+    if pattern is not None:
+        text = pattern.sub(lambda m: f"**{m.group()}**", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def leading_snippet(content: str, budget: int) -> str:
+    """The first ``budget`` characters of ``content``, as ``search_content`` returned before."""
+    return content[:budget] + "..." if len(content) > budget else content
+
+
+def extract_snippet(content: str, terms: Sequence[str], budget: int, window: int = SEARCH_SNIPPET_WINDOW) -> str:
+    """The densest windows of ``content`` for ``terms``, at most ``budget`` characters before highlighting."""
+    pattern = _term_pattern(terms)
+    if len(content) <= budget:
+        return _highlight(content, pattern)
+    matches = find_matches(content, terms)
+    if not matches:
+        return _highlight(content[:budget], pattern) + "..."
+
+    # Split the budget evenly between as many windows as fit about ``window`` characters
+    count = max(1, round(budget / max(1, window)))
+    spans = _windows(content, matches, budget, count)
+    parts = []
+    previous_end = 0
+    for start, end in spans:
+        if start > previous_end:
+            parts.append(ELLIPSIS)
+        parts.append(_highlight(content[start:end], pattern))
+        previous_end = end
+    if previous_end < len(content):
+        parts.append(ELLIPSIS)
+    return " ".join(parts)
+
+
+def extract_snippets(
+    contents: Sequence[str],
+    query: str,
+    budget: Optional[int] = None,
+    window: Optional[int] = None,
+    mode: Optional[str] = None,
+) -> List[str]:
+    """One snippet per result, sharing ``budget`` characters; short results leave their unused share to later ones."""
+    budget = SEARCH_SNIPPET_BUDGET if budget is None else budget
+    window = SEARCH_SNIPPET_WINDOW if window is None else window
+    mode = SEARCH_SNIPPET_MODE if mode is None else mode
+    terms = query_terms(query)
+    snippets: List[str] = []
+    remaining = budget
+    for index, content in enumerate(contents):
+        share = max(1, remaining // (len(contents) - index))
+        if mode == "head":
+            snippet = leading_snippet(content, share)
+        else:
+            snippet = extract_snippet(content, terms, share, window)
+        remaining -= min(len(snippet), share)
+        snippets.append(snippet)
+    return snippets
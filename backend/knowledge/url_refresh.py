@@ -0,0 +1,258 @@
+"""
+URL Refresh
+-----------
+
+Deterministic refresh of URL-backed knowledge sources.
+
+Every URL content row is re-checked with a conditional GET (``If-None-Match`` /
+``If-Modified-Since``), concurrently. Only sources whose body actually changed
+are re-chunked and re-embedded, from the body already fetched; everything else
+costs one HTTP 304 (or one body hash comparison for servers without
+validators). New vector rows are written before the old ones are deleted, in
+one transaction, so a failed refresh keeps the previous rows (and their
+validators, so the next run tries again). Fetch metadata — ETag,
+Last-Modified, body hash, status, time — is recorded on the contents row under
+``metadata["fetch"]``.
+
+Usage:
+    python -m backend.knowledge.url_refresh
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Literal
+from urllib.parse import urlparse
+
+import httpx
+from agno.knowledge.document import Document
+
+from backend.knowledge.pipeline import Chunk, _embed_texts, _reader_for, _record, replace_content_rows
+
+logger = logging.getLogger(__name__)
+
+# Content metadata keys
+URL_SOURCE_KEY = "source_url"
+FETCH_KEY = "fetch"
+
+# URL sources loaded by load_default_documents(); also used to resolve rows
+# inserted before the source URL was recorded in content metadata.
+DEFAULT_URL_SOURCES: list[tuple[str, str]] = [
+    ("Agno Introduction", "https://docs.agno.com/introduction.md"),
+    ("Agno First Agent", "https://docs.agno.com/first-agent.md"),
+]
+
+RefreshStatus = Literal["not_modified", "unchanged", "updated", "failed"]
+
+
+@dataclass
+class UrlRefreshResult:
+    name: str
+    url: str
+    status: RefreshStatus
+    http_status: int | None = None
+    detail: str = ""
+
+
+@dataclass
+class RefreshReport:
+    results: list[UrlRefreshResult] = field(default_factory=list)
+
+    @property
+    def counts(self) -> dict[str, int]:
+        return dict(Counter(result.status for result in self.results))
+
+    def summary(self) -> str:
+        counts = self.counts
+        return ", ".join(
+            f"{counts.get(status, 0)} {status.replace('_', ' ')}"
+            for status in ("updated", "not_modified", "unchanged", "failed")
+        )
+
+
+def insert_url_source(knowledge: Any, name: str, url: str) -> None:
+    """Insert a URL source, recording the URL in content metadata so it can be refreshed."""
+    knowledge.insert(name=name, url=url, metadata={URL_SOURCE_KEY: url}, skip_if_exists=True)
+
+
+def url_sources(knowledge: Any) -> list[tuple[Any, str]]:
+    """Return ``(content, url)`` for every URL content row of ``knowledge``."""
+    defaults = dict(DEFAULT_URL_SOURCES)
+    contents, _ = knowledge.get_content()
+    sources = []
+    for content in contents:
+        if content.file_type != "url":
+            continue
+        url = (content.metadata or {}).get(URL_SOURCE_KEY) or defaults.get(content.name)
+        if url:
+            sources.append((content, url))
+        else:
+            logger.debug("URL content %s has no recorded source URL, skipping", content.name)
+    return sources
+
+
+def _record_fetch(knowledge: Any, content: Any, url: str, fetch: dict[str, Any]) -> None:
+    """Write fetch metadata to the contents row only (vector rows are untouched)."""
+    row = knowledge.contents_db.get_knowledge_content(content.id)
+    if row is None:
+        return
+    row.metadata = {**(row.metadata or {}), URL_SOURCE_KEY: url, FETCH_KEY: fetch}
+    row.updated_at = int(time.time())
+    knowledge.contents_db.upsert_knowledge_content(knowledge_row=row)
+
+
+def url_content_hash(name: str | None, description: str | None, url: str) -> str:
+    """The content hash agno's ``Knowledge`` gives a URL source, so re-ingested rows keep it."""
+    parts = [part for part in (name, description) if part]
+    return hashlib.sha256(":".join([*parts, url]).encode()).hexdigest()
+
+
+def parse_body(content: Any, url: str, body: bytes) -> list[Document]:
+    """Chunk an already-fetched body with the reader for the URL's file extension."""
+    suffix = Path(urlparse(url).path).suffix.lower()
+    return _reader_for(suffix).read(BytesIO(body), name=content.name)
+
+
+async def _reingest(knowledge: Any, content: Any, url: str, body: bytes, fetch: dict[str, Any]) -> None:
+    """Replace a URL source's vectors with the fetched body, chunked and embedded.
+
+    The new rows are written before the old ones are deleted, in one transaction. URLs
+    without a file extension are web pages read by agno's website reader, which fetches
+    the page itself; those still go through ``Knowledge.insert``.
+    """
+    metadata = {**(content.metadata or {}), URL_SOURCE_KEY: url, FETCH_KEY: fetch}
+    if not Path(urlparse(url).path).suffix:
+        await asyncio.to_thread(
+            knowledge.insert,
+            name=content.name,
+            description=content.description or None,  # Keeps the content hash (and id) stable
+            url=url,
+            metadata=metadata,
+            upsert=True,
+            skip_if_exists=False,
+        )
+        return
+
+    documents = await asyncio.to_thread(parse_body, content, url, body)
+    if not documents:
+        raise ValueError(f"No content read from {url}")
+    content_hash = url_content_hash(content.name, content.description, url)
+    embeddings, usages = await _embed_texts(knowledge.vector_db.embedder, [doc.content for doc in documents])
+    # Agno embedders report a failed call as an empty embedding
+    if not all(embeddings):
+        raise ValueError(f"Could not embed {url}")
+    records = []
+    for doc, embedding, usage in zip(documents, embeddings, usages):
+        meta_data = dict(doc.meta_data or {})
+        if getattr(knowledge, "isolate_vector_search", False):
+            meta_data["linked_to"] = knowledge.name or ""
+        chunk = Chunk(source=content.name, content_hash=content_hash, content=doc.content, meta_data=meta_data)
+        records.append({**_record(chunk, doc.content, embedding, usage), "filters": metadata})
+    await asyncio.to_thread(replace_content_rows, knowledge.vector_db, content.id, records)
+    await asyncio.to_thread(_record_fetch, knowledge, content, url, fetch)
+
+
+async def refresh_url_sources(
+    knowledge: Any,
+    *,
+    client: httpx.AsyncClient | None = None,
+    concurrency: int = 8,
+    timeout: float = 20.0,
+) -> RefreshReport:
+    """Conditionally re-fetch every URL source and re-embed only the ones that changed.
+
+    Args:
+        knowledge: Knowledge instance with a contents DB and vector DB.
+        client: HTTP client to use (one is created when omitted).
+        concurrency: Maximum concurrent fetches.
+        timeout: Per-request timeout in seconds when creating the client.
+
+    Returns:
+        Per-source results.
+    """
+    sources = await asyncio.to_thread(url_sources, knowledge)
+    report = RefreshReport()
+    if not sources:
+        return report
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Knowledge.insert is synchronous and not meant to run concurrently on one instance
+    ingest_lock = asyncio.Lock()
+    own_client = client is None
+    http = client or httpx.AsyncClient(timeout=timeout, follow_redirects=True)
+
+    async def check(content: Any, url: str) -> UrlRefreshResult:
+        previous = dict((content.metadata or {}).get(FETCH_KEY) or {})
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+        fetch = {**previous, "fetched_at": datetime.now(timezone.utc).isoformat()}
+        try:
+            async with semaphore:
+                response = await http.get(url, headers=headers)
+        except httpx.HTTPError as exc:
+            fetch.update(status=None, error=str(exc))
+            await asyncio.to_thread(_record_fetch, knowledge, content, url, fetch)
+            return UrlRefreshResult(content.name, url, "failed", detail=str(exc))
+
+        fetch["status"] = response.status_code
+        fetch.pop("error", None)
+        if response.status_code == 304:
+            await asyncio.to_thread(_record_fetch, knowledge, content, url, fetch)
+            return UrlRefreshResult(content.name, url, "not_modified", 304)
+        if response.status_code >= 400:
+            fetch["error"] = f"HTTP {response.status_code}"
+            await asyncio.to_thread(_record_fetch, knowledge, content, url, fetch)
+            return UrlRefreshResult(content.name, url, "failed", response.status_code, fetch["error"])
+
+        fetch["etag"] = response.headers.get("etag")
+        fetch["last_modified"] = response.headers.get("last-modified")
+        body_sha256 = hashlib.sha256(response.content).hexdigest()
+        if body_sha256 == previous.get("body_sha256"):
+            await asyncio.to_thread(_record_fetch, knowledge, content, url, fetch)
+            return UrlRefreshResult(content.name, url, "unchanged", response.status_code)
+
+        fetch["body_sha256"] = body_sha256
+        try:
+            async with ingest_lock:
+                await _reingest(knowledge, content, url, response.content, fetch)
+        except Exception as exc:
+            logger.exception("Failed to re-ingest %s from %s", content.name, url)
+            # The stored rows still match the previous fetch; its validators make the next run re-ingest
+            for key in ("etag", "last_modified", "body_sha256"):
+                if key in previous:
+                    fetch[key] = previous[key]
+                else:
+                    fetch.pop(key, None)
+            fetch["error"] = str(exc)
+            await asyncio.to_thread(_record_fetch, knowledge, content, url, fetch)
+            return UrlRefreshResult(content.name, url, "failed", response.status_code, str(exc))
+        return UrlRefreshResult(content.name, url, "updated", response.status_code)
+
+    try:
+        report.results = list(await asyncio.gather(*(check(content, url) for content, url in sources)))
+    finally:
+        if own_client:
+            await http.aclose()
+
+    logger.info("URL refresh: %s", report.summary())
+    return report
+
+
+if __name__ == "__main__":
+    from backend.agents.knowledge_agent import knowledge
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(refresh_url_sources(knowledge))
+    for item in result.results:
+        print(f"  {item.status:<13} {item.name} ({item.url}) {item.detail}")
+    print(result.summary())
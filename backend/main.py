@@ -20,18 +20,20 @@ from fastapi import FastAPI
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
-from backend.a2a.server import create_a2a_apps
 from backend.agents.data_agent import data_agent
 from backend.agents.knowledge_agent import knowledge_agent
 from backend.agents.mcp_agent import mcp_agent
 from backend.agents.reasoning_agent import reasoning_agent
 from backend.agents.web_search_agent import web_search_agent
+from backend.answer_cache import ANSWER_CACHE_AGENTS, AnswerCacheMiddleware, answer_cache_router
 from backend.auth import EntraJWTMiddleware, auth_lifespan, auth_router
 from backend.auth.config import auth_config
 from backend.auth.jwks_cache import jwks_cache
 from backend.auth.routes import limiter
 from backend.auth.security_headers import SecurityHeadersMiddleware
 from backend.db import get_postgres_db
+from backend.db.routes import db_router
+from backend.knowledge.routes import knowledge_router
 from backend.mcp.config import MCP_GATEWAY_ENABLED
 from backend.registry import create_registry
 from backend.teams.coordinator_team import coordinator_team
@@ -58,6 +60,18 @@ configure_telemetry()
 # ---------------------------------------------------------------------------
 registry = create_registry()
 
+# ---------------------------------------------------------------------------
+# Agent list (M365 agent opt-in via M365_ENABLED)
+# ---------------------------------------------------------------------------
+log = logging.getLogger(__name__)
+_agents: list[Agent | RemoteAgent] = [knowledge_agent, mcp_agent, web_search_agent, data_agent, reasoning_agent]
+
+if getenv("M365_ENABLED", "").lower() in ("true", "1", "yes"):
+    from backend.agents.m365_agent import m365_agent
+
+    _agents.append(m365_agent)
+    log.info("M365 agent registered")
+
 # ---------------------------------------------------------------------------
 # Base FastAPI app with Entra ID JWT middleware
 # ---------------------------------------------------------------------------
@@ -71,8 +85,16 @@ base_app.state.limiter = limiter
 base_app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)  # type: ignore[arg-type]
 # Middleware order (LIFO): SecurityHeaders first → runs after JWT on response
 base_app.add_middleware(SecurityHeadersMiddleware)
+# Answer cache (opt-in via ANSWER_CACHE_AGENTS) runs inside JWT, so request.state has user and scopes
+if ANSWER_CACHE_AGENTS:
+    base_app.add_middleware(AnswerCacheMiddleware, agents=_agents)
+    log.info("Answer cache enabled for %s", ", ".join(ANSWER_CACHE_AGENTS))
 base_app.add_middleware(EntraJWTMiddleware, config=auth_config, jwks_cache=jwks_cache)
 base_app.include_router(auth_router)  # /auth/health, /auth/me, /auth/sync, etc.
+base_app.include_router(knowledge_router)  # /knowledge/refresh-urls, /knowledge/compact-learnings
+base_app.include_router(db_router)  # /db/pools
+if ANSWER_CACHE_AGENTS:
+    base_app.include_router(answer_cache_router)  # /answer-cache/{agent_id}/runs/{run_id}/approve
 
 # M365 routes (opt-in via M365_ENABLED) — no middleware needed, token resolved
 # directly in MCPTools header_provider via run_context.user_id + OBOTokenService
@@ -81,18 +103,6 @@ if getenv("M365_ENABLED", "").lower() in ("true", "1", "yes"):
 
     base_app.include_router(m365_router)
 
-# ---------------------------------------------------------------------------
-# Agent list (M365 agent opt-in via M365_ENABLED)
-# ---------------------------------------------------------------------------
-log = logging.getLogger(__name__)
-_agents: list[Agent | RemoteAgent] = [knowledge_agent, mcp_agent, web_search_agent, data_agent, reasoning_agent]
-
-if getenv("M365_ENABLED", "").lower() in ("true", "1", "yes"):
-    from backend.agents.m365_agent import m365_agent
-
-    _agents.append(m365_agent)
-    log.info("M365 agent registered")
-
 if MCP_GATEWAY_ENABLED:
     from backend.mcp.routes import mcp_router
 
@@ -126,6 +136,8 @@ app = agent_os.get_app()
 # A2A Protocol Endpoints (opt-in via A2A_ENABLED env var)
 # ---------------------------------------------------------------------------
 if getenv("A2A_ENABLED", "").lower() in ("true", "1", "yes"):
+    from backend.a2a.server import create_a2a_apps
+
     a2a_base_url = getenv("A2A_BASE_URL", "http://localhost:8000")
     a2a_mounts = create_a2a_apps(
         agents=[knowledge_agent, mcp_agent, web_search_agent, data_agent, reasoning_agent],
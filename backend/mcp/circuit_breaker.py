@@ -0,0 +1,244 @@
+"""Circuit breaker and adaptive timeouts for ContextForge gateway traffic.
+
+Wraps the ``httpx`` transport used by ``GatewayClient`` so every call — CRUD,
+list, import/export — shares one breaker. Only ``GatewayClient`` traffic (the
+``/mcp/*`` routes) is counted: agents' ``MCPTools`` connect to the gateway with
+their own HTTP client, so agent-run failures never open the circuit.
+
+States:
+
+- closed:    requests flow; consecutive failures (transport errors, 5xx) are counted
+- open:      after ``failure_threshold`` failures, requests fail fast with
+             ``GatewayUnavailableError`` instead of waiting for a timeout
+- half-open: once ``reset_timeout`` elapses, the next request first runs a probe
+             through ``GatewayClient.health()``; success closes the breaker,
+             failure re-opens it for another cooldown
+
+Per-operation timeouts start from a ceiling (``GATEWAY_OPERATION_TIMEOUTS``) and
+tighten to a multiple of the observed p99 latency once enough samples exist, so
+a degraded gateway is detected in seconds rather than after the full ceiling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Literal
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+# Request extension marking health probes — they bypass the open-circuit gate
+PROBE_EXTENSION = "apollos_circuit_probe"
+
+# Timeout ceilings (seconds) per operation key ("METHOD /first-path-segment").
+# Operations not listed use the client default (30s).
+GATEWAY_OPERATION_TIMEOUTS: dict[str, float] = {
+    "GET /health": 5.0,
+    "GET /version": 5.0,
+    "GET /export": 120.0,
+    "POST /import": 120.0,
+}
+
+
+class GatewayUnavailableError(httpx.ConnectError):
+    """Raised without contacting the gateway while the circuit is open.
+
+    Subclasses ``httpx.ConnectError`` so existing handlers that map connection
+    failures keep working.
+    """
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self._reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker allows a half-open probe (0 when not open)."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            log.info("MCP Gateway circuit closed")
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        # A failure while open/half-open (e.g. a failed probe) restarts the cooldown
+        if self._opened_at is not None or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                log.warning("MCP Gateway circuit opened after %d consecutive failures", self._failures)
+            self._opened_at = self._clock()
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_after_seconds": round(self.retry_after(), 1),
+        }
+
+
+class AdaptiveTimeouts:
+    """Per-operation timeouts derived from observed latency percentiles.
+
+    The effective timeout is ``multiplier * p(percentile)`` of the last ``window``
+    successful calls, clamped to ``[floor, ceiling]``. Until ``min_samples``
+    observations exist, the ceiling is used.
+    """
+
+    def __init__(
+        self,
+        *,
+        ceilings: dict[str, float],
+        default: float = 30.0,
+        floor: float = 2.0,
+        multiplier: float = 3.0,
+        percentile: float = 0.99,
+        min_samples: int = 20,
+        window: int = 200,
+    ) -> None:
+        self._ceilings = ceilings
+        self._default = default
+        self._floor = floor
+        self._multiplier = multiplier
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, operation: str, seconds: float) -> None:
+        samples = self._samples.get(operation)
+        if samples is None:
+            samples = self._samples[operation] = deque(maxlen=self._window)
+        samples.append(seconds)
+
+    def ceiling_for(self, operation: str) -> float:
+        return self._ceilings.get(operation, self._default)
+
+    def timeout_for(self, operation: str) -> float:
+        ceiling = self.ceiling_for(operation)
+        samples = self._samples.get(operation)
+        if not samples or len(samples) < self._min_samples:
+            return ceiling
+        adaptive = self._multiplier * _percentile(sorted(samples), self._percentile)
+        return min(ceiling, max(self._floor, adaptive))
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        result: dict[str, dict[str, float]] = {}
+        for operation, samples in sorted(self._samples.items()):
+            ordered = sorted(samples)
+            result[operation] = {
+                "samples": len(ordered),
+                "p50": round(_percentile(ordered, 0.5), 3),
+                "p99": round(_percentile(ordered, 0.99), 3),
+                "timeout": round(self.timeout_for(operation), 3),
+            }
+        return result
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """httpx transport that applies the breaker and adaptive timeouts to every request."""
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        *,
+        breaker: CircuitBreaker,
+        timeouts: AdaptiveTimeouts,
+        base_path: str = "",
+        probe: Callable[[], Awaitable[object]] | None = None,
+    ) -> None:
+        self._inner = inner
+        self._breaker = breaker
+        self._timeouts = timeouts
+        self._base_path = base_path.rstrip("/")
+        self._probe = probe
+        self._probe_lock = asyncio.Lock()
+
+    def operation_key(self, request: httpx.Request) -> str:
+        path = request.url.path
+        if self._base_path and path.startswith(self._base_path):
+            path = path[len(self._base_path) :]
+        first_segment = path.strip("/").split("/", 1)[0]
+        return f"{request.method} /{first_segment}"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.extensions.get(PROBE_EXTENSION):
+            await self._gate(request)
+
+        operation = self.operation_key(request)
+        request.extensions["timeout"] = httpx.Timeout(self._timeouts.timeout_for(operation)).as_dict()
+        start = time.monotonic()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except httpx.TransportError:
+            self._breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+            self._timeouts.observe(operation, time.monotonic() - start)
+        return response
+
+    async def _gate(self, request: httpx.Request) -> None:
+        """Let the request through, probe the gateway, or fail fast."""
+        state = self._breaker.state
+        if state == "closed":
+            return
+        if state == "half_open":
+            if self._probe is None:
+                return  # No probe wired — this request is the trial
+            if not self._probe_lock.locked():
+                async with self._probe_lock:
+                    try:
+                        await self._probe()
+                    except httpx.HTTPError as exc:
+                        log.warning("MCP Gateway half-open probe failed: %s", exc)
+                if self._breaker.state == "closed":
+                    return
+        raise GatewayUnavailableError(
+            f"MCP Gateway circuit open; retry in {self._breaker.retry_after():.0f}s",
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
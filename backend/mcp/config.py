@@ -3,8 +3,9 @@
 Provides ``get_gateway_client()`` and ``get_gateway_tools_factory()`` for
 agents that route MCP traffic through the ContextForge gateway.
 
-Reads ``MCP_GATEWAY_ENABLED``, ``MCP_GATEWAY_URL``, and
-``MCP_GATEWAY_JWT_SECRET`` from the environment.
+Reads ``MCP_GATEWAY_ENABLED``, ``MCP_GATEWAY_URL``,
+``MCP_GATEWAY_JWT_SECRET``, ``MCP_GATEWAY_BREAKER_FAILURES`` and
+``MCP_GATEWAY_BREAKER_RESET_SECONDS`` from the environment.
 """
 
 from __future__ import annotations
@@ -40,7 +41,12 @@ def get_gateway_client() -> GatewayClient | None:
     if _gateway_client is None:
         url = getenv("MCP_GATEWAY_URL", "http://apollos-mcp-gateway:4444")
         secret = getenv("MCP_GATEWAY_JWT_SECRET", "dev-gateway-secret")
-        _gateway_client = GatewayClient(base_url=url, jwt_secret=secret)
+        _gateway_client = GatewayClient(
+            base_url=url,
+            jwt_secret=secret,
+            failure_threshold=int(getenv("MCP_GATEWAY_BREAKER_FAILURES", "5")),
+            reset_timeout=float(getenv("MCP_GATEWAY_BREAKER_RESET_SECONDS", "30")),
+        )
         log.info("MCP Gateway client initialized: %s", url)
     return _gateway_client
 
@@ -66,6 +72,14 @@ async def _resolve_server_id(name: str) -> str | None:
     return server_id
 
 
+def invalidate_catalog_cache() -> None:
+    """Drop cached gateway catalog lookups (server name -> ID).
+
+    Called once after bulk mutations so the next lookup re-reads the registry.
+    """
+    _server_ids.clear()
+
+
 def get_gateway_tools_factory(
     server_name: str,
     *,
@@ -95,6 +109,9 @@ def get_gateway_tools_factory(
     gateway_url = getenv("MCP_GATEWAY_URL", "http://apollos-mcp-gateway:4444").rstrip("/")
 
     def factory() -> list[MCPTools]:
+        if client.circuit_open:
+            log.warning("MCP Gateway circuit open — skipping '%s' tools for this run", server_name)
+            return []
         return [
             MCPTools(
                 url=f"{gateway_url}/servers/{server_name}/mcp",
@@ -3,6 +3,9 @@
 Handles JWT token generation (with jti + exp per RC1 requirements) and
 full CRUD for gateways, tools, virtual servers, resources, prompts,
 tags, import/export, and health.
+
+All traffic passes through a circuit breaker with adaptive per-operation
+timeouts (see ``backend.mcp.circuit_breaker``).
 """
 
 from __future__ import annotations
@@ -14,6 +17,14 @@ from typing import TYPE_CHECKING
 import httpx
 import jwt
 
+from backend.mcp.circuit_breaker import (
+    GATEWAY_OPERATION_TIMEOUTS,
+    PROBE_EXTENSION,
+    AdaptiveTimeouts,
+    CircuitBreaker,
+    CircuitBreakerTransport,
+)
+
 if TYPE_CHECKING:
     from backend.mcp.schemas import MCPVisibility
 
@@ -21,10 +32,36 @@ if TYPE_CHECKING:
 class GatewayClient:
     """Manages communication with the ContextForge MCP Gateway."""
 
-    def __init__(self, base_url: str, jwt_secret: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        jwt_secret: str,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
         self._base_url = base_url.rstrip("/")
         self._jwt_secret = jwt_secret
-        self._http = httpx.AsyncClient(base_url=self._base_url, timeout=30)
+        self._breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self._timeouts = AdaptiveTimeouts(ceilings=GATEWAY_OPERATION_TIMEOUTS, default=30.0)
+        breaker_transport = CircuitBreakerTransport(
+            transport or httpx.AsyncHTTPTransport(),
+            breaker=self._breaker,
+            timeouts=self._timeouts,
+            base_path=httpx.URL(self._base_url).path,
+            probe=self.health,  # Half-open probes go through the health endpoint
+        )
+        self._http = httpx.AsyncClient(base_url=self._base_url, timeout=30, transport=breaker_transport)
+
+    @property
+    def circuit_open(self) -> bool:
+        """True while the breaker is failing fast (cooldown not yet elapsed)."""
+        return self._breaker.state == "open"
+
+    def circuit_state(self) -> dict[str, object]:
+        """Breaker state plus observed latency and effective timeout per operation."""
+        return {**self._breaker.snapshot(), "timeouts": self._timeouts.snapshot()}
 
     def create_service_token(self, user_id: str | None = None) -> str:
         """Create a service JWT for gateway authentication.
@@ -444,6 +481,42 @@ class GatewayClient:
         include_dependencies: bool = True,
     ) -> dict:
         """Export gateway configuration with optional filters."""
+        params = self._export_params(
+            types=types, tags=tags, include_inactive=include_inactive, include_dependencies=include_dependencies
+        )
+        resp = await self._http.get("/export", headers=self._auth_headers(), params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def stream_export_config(
+        self,
+        *,
+        types: str | None = None,
+        tags: str | None = None,
+        include_inactive: bool = False,
+        include_dependencies: bool = True,
+    ) -> httpx.Response:
+        """Open a streaming export response without reading the body.
+
+        The caller iterates ``aiter_bytes()`` and MUST ``aclose()`` the response.
+        Error responses are read and closed here, then raised as HTTPStatusError,
+        so callers can map them before any bytes are sent downstream.
+        """
+        params = self._export_params(
+            types=types, tags=tags, include_inactive=include_inactive, include_dependencies=include_dependencies
+        )
+        request = self._http.build_request("GET", "/export", headers=self._auth_headers(), params=params)
+        resp = await self._http.send(request, stream=True)
+        if resp.is_error:
+            await resp.aread()
+            await resp.aclose()
+            resp.raise_for_status()
+        return resp
+
+    @staticmethod
+    def _export_params(
+        *, types: str | None, tags: str | None, include_inactive: bool, include_dependencies: bool
+    ) -> dict[str, str]:
         params: dict[str, str] = {}
         if types:
             params["types"] = types
@@ -453,9 +526,7 @@ class GatewayClient:
             params["include_inactive"] = "true"
         if not include_dependencies:
             params["include_dependencies"] = "false"
-        resp = await self._http.get("/export", headers=self._auth_headers(), params=params)
-        resp.raise_for_status()
-        return resp.json()
+        return params
 
     async def import_config(self, data: dict, *, conflict_strategy: str = "update", dry_run: bool = False) -> dict:
         """Import gateway configuration.
@@ -482,7 +553,11 @@ class GatewayClient:
     # ── Health (no auth required) ─────────────────────────────────────
 
     async def health(self) -> dict:
-        resp = await self._http.get("/health")
+        """Gateway health. Always reaches the gateway, even with the circuit open.
+
+        Doubles as the half-open probe: a successful call closes the breaker.
+        """
+        resp = await self._http.get("/health", extensions={PROBE_EXTENSION: True})
         resp.raise_for_status()
         return resp.json()
 
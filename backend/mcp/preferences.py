@@ -1,70 +1,123 @@
-"""Per-user MCP workspace preferences (PostgreSQL-backed)."""
+"""Per-user MCP workspace preferences (PostgreSQL-backed).
+
+Reads go through a small in-process cache keyed by Entra OID and are resolved
+with a single query on a miss (joined to ``auth_users`` unless the shared
+``user_id_cache`` already knows the internal ID). Writes are one ``INSERT ...
+ON CONFLICT`` statement and refresh the cached entry. The TTL bounds
+staleness across worker processes, which do not share the cache.
+"""
 
 from __future__ import annotations
 
 import logging
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.auth.models import MCPPreference
+from backend.auth.user_id_cache import user_id_cache
 from backend.mcp.schemas import MCPUserPreferences
 
 log = logging.getLogger(__name__)
 
 _DEFAULT_PREFS = MCPUserPreferences()
 
+_CACHE_TTL_SECONDS = 300.0
+_CACHE_MAX_ENTRIES = 1024
+
+# oid -> (loaded_at, preferences); insertion order doubles as LRU order
+_cache: OrderedDict[str, tuple[float, MCPUserPreferences]] = OrderedDict()
+
+
+def _cache_get(user_id: str) -> MCPUserPreferences | None:
+    entry = _cache.get(user_id)
+    if entry is None:
+        return None
+    loaded_at, prefs = entry
+    if time.monotonic() - loaded_at > _CACHE_TTL_SECONDS:
+        del _cache[user_id]
+        return None
+    _cache.move_to_end(user_id)
+    return prefs
+
+
+def _cache_put(user_id: str, prefs: MCPUserPreferences) -> None:
+    _cache[user_id] = (time.monotonic(), prefs)
+    _cache.move_to_end(user_id)
+    while len(_cache) > _CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def invalidate_preferences(user_id: str | None = None) -> None:
+    """Drop one user's cached preferences, or all of them when ``user_id`` is None."""
+    if user_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(user_id, None)
+
 
 async def get_preferences(session: AsyncSession, user_id: str) -> MCPUserPreferences:
     """Load preferences for a user, returning defaults if none exist."""
     from backend.auth.models import AuthUser
 
-    # Resolve Entra OID string to internal UUID
-    user_result = await session.execute(select(AuthUser.id).where(AuthUser.oid == user_id))
-    auth_user_id = user_result.scalar_one_or_none()
-    if not auth_user_id:
-        return _DEFAULT_PREFS
+    cached = _cache_get(user_id)
+    if cached is not None:
+        return cached
+
+    hit, auth_user_id = user_id_cache.lookup(user_id)
+    row: MCPPreference | None = None
+    if hit and auth_user_id:
+        result = await session.execute(select(MCPPreference).where(MCPPreference.user_id == auth_user_id))
+        row = result.scalar_one_or_none()
+    elif not hit:
+        # Resolve Entra OID and load the preference row in one round trip
+        result = await session.execute(
+            select(AuthUser.id, MCPPreference)
+            .outerjoin(MCPPreference, MCPPreference.user_id == AuthUser.id)
+            .where(AuthUser.oid == user_id)
+        )
+        first = result.first()
+        user_id_cache.prime(user_id, first[0] if first else None)
+        row = first[1] if first else None
 
-    pref_result = await session.execute(select(MCPPreference).where(MCPPreference.user_id == auth_user_id))
-    row = pref_result.scalar_one_or_none()
     if not row:
-        return _DEFAULT_PREFS
-
-    return MCPUserPreferences(
-        hidden_tools=row.hidden_tools,
-        hidden_servers=row.hidden_servers,
-        default_tab=row.default_tab,
-        compact_view=row.compact_view,
-    )
+        prefs = _DEFAULT_PREFS
+    else:
+        prefs = MCPUserPreferences(
+            hidden_tools=row.hidden_tools,
+            hidden_servers=row.hidden_servers,
+            default_tab=row.default_tab,
+            compact_view=row.compact_view,
+        )
+    _cache_put(user_id, prefs)
+    return prefs
 
 
 async def save_preferences(session: AsyncSession, user_id: str, prefs: MCPUserPreferences) -> None:
     """Save preferences for a user (upsert)."""
-    from backend.auth.models import AuthUser
-
-    user_result = await session.execute(select(AuthUser.id).where(AuthUser.oid == user_id))
-    auth_user_id = user_result.scalar_one_or_none()
+    auth_user_id = await user_id_cache.resolve(session, user_id)
     if not auth_user_id:
         raise ValueError(f"User {user_id} not found in auth_users")
 
-    pref_result = await session.execute(select(MCPPreference).where(MCPPreference.user_id == auth_user_id))
-    row = pref_result.scalar_one_or_none()
-
-    if row:
-        row.hidden_tools = prefs.hidden_tools
-        row.hidden_servers = prefs.hidden_servers
-        row.default_tab = prefs.default_tab
-        row.compact_view = prefs.compact_view
-        row.updated_at = datetime.now(timezone.utc)
-    else:
-        row = MCPPreference(
-            user_id=auth_user_id,
-            hidden_tools=prefs.hidden_tools,
-            hidden_servers=prefs.hidden_servers,
-            default_tab=prefs.default_tab,
-            compact_view=prefs.compact_view,
-        )
-        session.add(row)
+    values = {
+        "hidden_tools": prefs.hidden_tools,
+        "hidden_servers": prefs.hidden_servers,
+        "default_tab": prefs.default_tab,
+        "compact_view": prefs.compact_view,
+        "updated_at": datetime.now(timezone.utc),
+    }
+    stmt = (
+        insert(MCPPreference)
+        .values(id=uuid.uuid4(), user_id=auth_user_id, **values)
+        .on_conflict_do_update(index_elements=["user_id"], set_=values)
+    )
 
+    invalidate_preferences(user_id)
+    await session.execute(stmt)
     await session.commit()
+    _cache_put(user_id, prefs)
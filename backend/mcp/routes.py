@@ -14,6 +14,8 @@ Gateways (registered upstream MCP servers):
 
 Tools:
   GET    /mcp/tools                 List tools
+  POST   /mcp/tools/bulk/state      Enable/disable many tools
+  POST   /mcp/tools/bulk/delete     Delete many tools
   GET    /mcp/tools/{id}            Get a tool
   POST   /mcp/tools                 Create a tool
   PUT    /mcp/tools/{id}            Update a tool
@@ -34,6 +36,8 @@ Virtual Servers:
 Resources:
   GET    /mcp/resources                  List resources
   GET    /mcp/resources/templates        List resource templates
+  POST   /mcp/resources/bulk/state       Enable/disable many resources
+  POST   /mcp/resources/bulk/delete      Delete many resources
   GET    /mcp/resources/{id}             Get a resource
   GET    /mcp/resources/{id}/info        Get resource metadata
   POST   /mcp/resources                  Create a resource
@@ -43,6 +47,8 @@ Resources:
 
 Prompts:
   GET    /mcp/prompts                    List prompts
+  POST   /mcp/prompts/bulk/state         Enable/disable many prompts
+  POST   /mcp/prompts/bulk/delete        Delete many prompts
   GET    /mcp/prompts/{id}               Get a prompt
   POST   /mcp/prompts                    Create a prompt
   PUT    /mcp/prompts/{id}               Update a prompt
@@ -55,6 +61,7 @@ Tags:
 
 Import/Export:
   GET    /mcp/export                     Export configuration
+  GET    /mcp/export/stream              Stream configuration export (optional gzip)
   POST   /mcp/import                     Import configuration
   GET    /mcp/import/status/{id}         Check import status
 
@@ -68,15 +75,26 @@ Preferences:
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import zlib
+from collections.abc import AsyncIterator, Awaitable, Callable
 from typing import NoReturn
 
 import httpx
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 from backend.auth.routes import limiter
-from backend.mcp.config import get_gateway_client
+from backend.mcp.circuit_breaker import GatewayUnavailableError
+from backend.mcp.config import get_gateway_client, invalidate_catalog_cache
 from backend.mcp.schemas import (
+    MCPBulkDeleteRequest,
+    MCPBulkItemResult,
+    MCPBulkResponse,
+    MCPBulkStateRequest,
+    MCPCircuitInfo,
     MCPHealthResponse,
     MCPImportRequest,
     MCPImportResponse,
@@ -132,16 +150,14 @@ def _handle_gateway_error(
     exc: httpx.HTTPStatusError | httpx.ConnectError | httpx.TimeoutException,
 ) -> NoReturn:
     """Convert ContextForge HTTP errors to meaningful proxy responses."""
+    if isinstance(exc, GatewayUnavailableError):
+        raise HTTPException(status_code=503, detail="MCP Gateway temporarily unavailable (circuit open)") from exc
     if isinstance(exc, (httpx.ConnectError, httpx.TimeoutException)):
         log.error("Gateway connection error: %s", exc)
         raise HTTPException(status_code=502, detail="MCP Gateway unreachable") from exc
 
     status = exc.response.status_code
-    try:
-        body = exc.response.json()
-        detail = body.get("detail", str(exc)) if isinstance(body, dict) else str(body)
-    except (ValueError, UnicodeDecodeError):
-        detail = exc.response.text or str(exc)
+    detail = _gateway_error_detail(exc)
 
     log.error("Gateway error: status=%d detail=%s", status, detail)
 
@@ -158,6 +174,51 @@ def _handle_gateway_error(
     raise HTTPException(status_code=502, detail=f"Gateway error ({status}): {detail}") from exc
 
 
+def _gateway_error_detail(exc: httpx.HTTPStatusError) -> str:
+    """Extract the ContextForge error detail from an error response."""
+    try:
+        body = exc.response.json()
+        return body.get("detail", str(exc)) if isinstance(body, dict) else str(body)
+    except (ValueError, UnicodeDecodeError):
+        return exc.response.text or str(exc)
+
+
+# Max in-flight gateway calls per bulk request
+_BULK_CONCURRENCY = 8
+
+
+async def _run_bulk(ids: list[str], op: Callable[[str], Awaitable[object]]) -> MCPBulkResponse:
+    """Fan ``op`` out over ``ids`` with bounded concurrency, collecting per-item results.
+
+    Duplicate ids are applied once. ``op`` returning False means "not found"
+    (the ``delete_*`` contract). The catalog cache is invalidated once at the end.
+    """
+    semaphore = asyncio.Semaphore(_BULK_CONCURRENCY)
+
+    async def run_one(entity_id: str) -> MCPBulkItemResult:
+        async with semaphore:
+            try:
+                result = await op(entity_id)
+            except httpx.HTTPStatusError as exc:
+                return MCPBulkItemResult(
+                    id=entity_id, ok=False, status_code=exc.response.status_code, detail=_gateway_error_detail(exc)
+                )
+            except GatewayUnavailableError:
+                return MCPBulkItemResult(
+                    id=entity_id, ok=False, status_code=503, detail="MCP Gateway temporarily unavailable (circuit open)"
+                )
+            except (httpx.ConnectError, httpx.TimeoutException):
+                return MCPBulkItemResult(id=entity_id, ok=False, status_code=502, detail="MCP Gateway unreachable")
+        if result is False:
+            return MCPBulkItemResult(id=entity_id, ok=False, status_code=404, detail="Not found")
+        return MCPBulkItemResult(id=entity_id, ok=True, status_code=200)
+
+    results = await asyncio.gather(*(run_one(entity_id) for entity_id in dict.fromkeys(ids)))
+    invalidate_catalog_cache()
+    succeeded = sum(1 for r in results if r.ok)
+    return MCPBulkResponse(results=list(results), succeeded=succeeded, failed=len(results) - succeeded)
+
+
 # ── Gateways (registered upstream MCP servers) ──────────────────────────
 
 
@@ -286,6 +347,24 @@ async def list_tools(
     return [MCPToolInfo.model_validate(t) for t in tools]
 
 
+@mcp_router.post("/tools/bulk/state", response_model=MCPBulkResponse)
+@limiter.limit("10/minute")
+async def bulk_toggle_tools(request: Request, body: MCPBulkStateRequest) -> MCPBulkResponse:
+    """Enable or disable many tools in one call. Counts as one rate-limit unit."""
+    _require_auth(request)
+    client = _require_gateway()
+    return await _run_bulk(body.ids, lambda tool_id: client.toggle_tool(tool_id, activate=body.activate))
+
+
+@mcp_router.post("/tools/bulk/delete", response_model=MCPBulkResponse)
+@limiter.limit("10/minute")
+async def bulk_delete_tools(request: Request, body: MCPBulkDeleteRequest) -> MCPBulkResponse:
+    """Delete many tools in one call. Counts as one rate-limit unit."""
+    _require_auth(request)
+    client = _require_gateway()
+    return await _run_bulk(body.ids, client.delete_tool)
+
+
 @mcp_router.get("/tools/{tool_id}", response_model=MCPToolInfo)
 @limiter.limit("30/minute")
 async def get_tool(request: Request, tool_id: str) -> MCPToolInfo:
@@ -489,6 +568,24 @@ async def list_resource_templates(request: Request) -> list[dict]:
     return await client.list_resource_templates()
 
 
+@mcp_router.post("/resources/bulk/state", response_model=MCPBulkResponse)
+@limiter.limit("10/minute")
+async def bulk_toggle_resources(request: Request, body: MCPBulkStateRequest) -> MCPBulkResponse:
+    """Enable or disable many resources in one call. Counts as one rate-limit unit."""
+    _require_auth(request)
+    client = _require_gateway()
+    return await _run_bulk(body.ids, lambda resource_id: client.toggle_resource(resource_id, activate=body.activate))
+
+
+@mcp_router.post("/resources/bulk/delete", response_model=MCPBulkResponse)
+@limiter.limit("10/minute")
+async def bulk_delete_resources(request: Request, body: MCPBulkDeleteRequest) -> MCPBulkResponse:
+    """Delete many resources in one call. Counts as one rate-limit unit."""
+    _require_auth(request)
+    client = _require_gateway()
+    return await _run_bulk(body.ids, client.delete_resource)
+
+
 @mcp_router.get("/resources/{resource_id}", response_model=MCPResourceInfo)
 @limiter.limit("30/minute")
 async def get_resource(request: Request, resource_id: str) -> MCPResourceInfo:
@@ -583,6 +680,24 @@ async def list_prompts(
     return [MCPPromptInfo.model_validate(p) for p in prompts]
 
 
+@mcp_router.post("/prompts/bulk/state", response_model=MCPBulkResponse)
+@limiter.limit("10/minute")
+async def bulk_toggle_prompts(request: Request, body: MCPBulkStateRequest) -> MCPBulkResponse:
+    """Enable or disable many prompts in one call. Counts as one rate-limit unit."""
+    _require_auth(request)
+    client = _require_gateway()
+    return await _run_bulk(body.ids, lambda prompt_id: client.toggle_prompt(prompt_id, activate=body.activate))
+
+
+@mcp_router.post("/prompts/bulk/delete", response_model=MCPBulkResponse)
+@limiter.limit("10/minute")
+async def bulk_delete_prompts(request: Request, body: MCPBulkDeleteRequest) -> MCPBulkResponse:
+    """Delete many prompts in one call. Counts as one rate-limit unit."""
+    _require_auth(request)
+    client = _require_gateway()
+    return await _run_bulk(body.ids, client.delete_prompt)
+
+
 @mcp_router.get("/prompts/{prompt_id}", response_model=MCPPromptInfo)
 @limiter.limit("30/minute")
 async def get_prompt(request: Request, prompt_id: str) -> MCPPromptInfo:
@@ -694,6 +809,56 @@ async def export_config(
     )
 
 
+@mcp_router.get("/export/stream")
+@limiter.limit("10/minute")
+async def stream_export_config(
+    request: Request,
+    types: str | None = None,
+    tags: str | None = None,
+    include_inactive: bool = False,
+    include_dependencies: bool = True,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream gateway configuration export straight from the gateway.
+
+    The upstream body is relayed chunk by chunk (optionally gzip-compressed),
+    so peak memory stays constant regardless of export size.
+    """
+    _require_auth(request)
+    client = _require_gateway()
+    try:
+        upstream = await client.stream_export_config(
+            types=types,
+            tags=tags,
+            include_inactive=include_inactive,
+            include_dependencies=include_dependencies,
+        )
+    except (httpx.HTTPStatusError, httpx.ConnectError, httpx.TimeoutException) as exc:
+        _handle_gateway_error(exc)
+
+    headers = {"Content-Disposition": 'attachment; filename="mcp-export.json"'}
+    body = upstream.aiter_bytes()
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        body = _gzip_stream(body)
+    return StreamingResponse(
+        body,
+        media_type="application/json",
+        headers=headers,
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+async def _gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip-compress a byte stream incrementally (wbits=31 selects the gzip container)."""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
 @mcp_router.post("/import", response_model=MCPImportResponse)
 @limiter.limit("10/minute")
 async def import_config(request: Request, body: MCPImportRequest) -> MCPImportResponse:
@@ -743,17 +908,25 @@ async def get_import_status(request: Request, import_id: str) -> dict:
 
 @mcp_router.get("/health", response_model=MCPHealthResponse)
 @limiter.limit("30/minute")
-async def gateway_health(request: Request) -> MCPHealthResponse:
-    """Gateway health check. No authentication required."""
+async def gateway_health(request: Request) -> MCPHealthResponse | JSONResponse:
+    """Gateway health check. No authentication required.
+
+    Always contacts the gateway (also serving as the circuit breaker's probe) and
+    reports breaker state. Unreachable gateways return 502 with the same body shape.
+    """
     client = _require_gateway()
     try:
         health = await client.health()
         version_info = await client.version()
-    except (httpx.HTTPStatusError, httpx.ConnectError, httpx.TimeoutException) as exc:
-        raise HTTPException(status_code=502, detail="Gateway unreachable") from exc
+    except (httpx.HTTPStatusError, httpx.ConnectError, httpx.TimeoutException):
+        unreachable = MCPHealthResponse(
+            status="unreachable", circuit=MCPCircuitInfo.model_validate(client.circuit_state())
+        )
+        return JSONResponse(status_code=502, content=unreachable.model_dump())
     return MCPHealthResponse(
         status=health.get("status", "unknown"),
         version=version_info.get("version"),
+        circuit=MCPCircuitInfo.model_validate(client.circuit_state()),
     )
 
 
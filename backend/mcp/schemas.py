@@ -55,6 +55,42 @@ class MCPStateToggle(BaseModel):
     activate: bool
 
 
+# ── Bulk Operations ───────────────────────────────────────────────────
+
+# Upper bound on ids per batch request; keeps one request from monopolizing the gateway.
+MCP_BULK_MAX_IDS = 500
+
+
+class MCPBulkStateRequest(BaseModel):
+    """Request body for enabling/disabling many entities in one call."""
+
+    ids: list[str] = Field(..., min_length=1, max_length=MCP_BULK_MAX_IDS)
+    activate: bool
+
+
+class MCPBulkDeleteRequest(BaseModel):
+    """Request body for deleting many entities in one call."""
+
+    ids: list[str] = Field(..., min_length=1, max_length=MCP_BULK_MAX_IDS)
+
+
+class MCPBulkItemResult(BaseModel):
+    """Outcome for a single id in a bulk operation."""
+
+    id: str
+    ok: bool
+    status_code: int
+    detail: str | None = None
+
+
+class MCPBulkResponse(BaseModel):
+    """Per-item results of a bulk operation."""
+
+    results: list[MCPBulkItemResult]
+    succeeded: int
+    failed: int
+
+
 # ── Tools ─────────────────────────────────────────────────────────────
 
 
@@ -257,11 +293,21 @@ class MCPImportResponse(BaseModel):
 # ── Health ────────────────────────────────────────────────────────────
 
 
+class MCPCircuitInfo(BaseModel):
+    """Circuit breaker state for gateway traffic."""
+
+    state: Literal["closed", "open", "half_open"]
+    consecutive_failures: int = 0
+    retry_after_seconds: float = 0.0
+    timeouts: dict[str, dict[str, float]] = {}
+
+
 class MCPHealthResponse(BaseModel):
     """Gateway health check response."""
 
     status: str
     version: str | None = None
+    circuit: MCPCircuitInfo | None = None
 
 
 # ── Preferences ───────────────────────────────────────────────────────
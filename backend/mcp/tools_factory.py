@@ -10,6 +10,9 @@ Key design decisions:
 - Service JWT includes ``jti`` + ``exp`` per RC1 requirements
 - ``refresh_connection=True``: forces per-run MCP connection with fresh headers
 - ``cache_callables=False`` must be set on the **Agent** (not here) for per-user isolation
+- Open circuit: factories return no tools so the run proceeds instead of waiting on timeouts.
+  The breaker only sees ``GatewayClient`` (admin/proxy) traffic; the MCPTools connections
+  made here bypass it, so their failures do not open it
 """
 
 from __future__ import annotations
@@ -75,6 +78,9 @@ def create_gateway_tools_factory(
     provider = create_gateway_header_provider(gateway_client, needs_user_token=needs_user_token)
 
     def factory() -> list[MCPTools]:
+        if gateway_client.circuit_open:
+            log.warning("MCP Gateway circuit open — skipping '%s' tools for this run", server_name)
+            return []
         return [
             MCPTools(
                 url=mcp_url,
@@ -14,18 +14,15 @@ from os import getenv
 
 from agno.registry import Registry
 from agno.tools.mcp import MCPTools
-from agno.tools.postgres import PostgresTools
 from agno.tools.reasoning import ReasoningTools
 from agno.tools.websearch import WebSearchTools
 
+from backend.agents.data_agent import introspect_schema, lookup_validated_query, save_validated_query
 from backend.db import get_postgres_db
-from backend.db.session import create_knowledge
-from backend.db.url import db_url
 from backend.models import get_model
 from backend.tools.approved_ops import add_knowledge_source
+from backend.tools.cached_postgres import CachedPostgresTools
 from backend.tools.awareness import list_knowledge_sources
-from backend.tools.introspect import create_introspect_schema_tool
-from backend.tools.save_query import create_save_validated_query_tool
 from backend.tools.search import search_content
 
 
@@ -35,12 +32,10 @@ def create_registry() -> Registry:
     All non-serializable components (tools, models, databases, custom
     functions) must be registered here so that agents, teams, and
     workflows can be restored from saved configurations.
-    """
-    # Instantiate factory-created tools (need state at creation time)
-    data_knowledge = create_knowledge("Data Knowledge", "data_knowledge")
-    save_validated_query = create_save_validated_query_tool(data_knowledge)
-    introspect_schema = create_introspect_schema_tool(db_url)
 
+    Factory-created tools are the data agent's own instances (bound to its
+    knowledge base and the shared engine), not second copies.
+    """
     return Registry(
         name="apollos-registry",
         description="Apollos AI component registry",
@@ -48,7 +43,7 @@ def create_registry() -> Registry:
             # Knowledge agent tools
             WebSearchTools(enable_search=True, enable_news=True),
             # Data agent tools
-            PostgresTools(
+            CachedPostgresTools(
                 host=getenv("DB_HOST", "apollos-db"),
                 port=int(getenv("DB_PORT", "5432")),
                 user=getenv("DB_USER", "ai"),
@@ -68,6 +63,7 @@ def create_registry() -> Registry:
             add_knowledge_source,  # type: ignore[list-item]
             # Data agent custom tools
             save_validated_query,
+            lookup_validated_query,
             introspect_schema,
         ],
         models=[get_model()],
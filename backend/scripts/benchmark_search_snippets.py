@@ -0,0 +1,130 @@
+"""
+Benchmark Search Snippets
+-------------------------
+
+Runs the knowledge agent's eval cases once per snippet mode and compares the
+tool calls and tokens each mode costs. ``head`` is the old leading-text
+snippet, ``focused`` the query-focused windows of ``backend/knowledge/snippets.py``.
+Fewer follow-up ``search_content``/``read_file`` calls and fewer input tokens
+at the same pass rate mean the snippets answered more on their own.
+
+Each run gets a fresh session so history does not carry over between modes.
+The model is not deterministic: use ``--repeat`` to average over several runs.
+
+Usage:
+    python -m backend.scripts.benchmark_search_snippets
+    python -m backend.scripts.benchmark_search_snippets --modes head,focused --repeat 3
+    python -m backend.scripts.benchmark_search_snippets --budget 1500 --window 200 -c basic
+"""
+
+import argparse
+import statistics
+import uuid
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+# Tools that fetch more text after a search; their count is what focused snippets should reduce
+FOLLOW_UP_TOOLS = ("search_content", "search_knowledge_base", "read_file", "read_file_chunk", "search_documents")
+
+
+@dataclass
+class RunStats:
+    question: str
+    passed: bool
+    tool_calls: Counter = field(default_factory=Counter)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    snippet_chars: int = 0
+
+    @property
+    def total_tool_calls(self) -> int:
+        return sum(self.tool_calls.values())
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+def run_stats(question: str, passed: bool, result) -> RunStats:
+    """Tool calls, token usage and ``search_content`` output size of one agent run."""
+    stats = RunStats(question=question, passed=passed)
+    for execution in result.tools or []:
+        stats.tool_calls[execution.tool_name] += 1
+        if execution.tool_name == "search_content":
+            stats.snippet_chars += len(str(execution.result or ""))
+    if result.metrics is not None:
+        stats.input_tokens = result.metrics.input_tokens or 0
+        stats.output_tokens = result.metrics.output_tokens or 0
+    return stats
+
+
+def summarize(runs: Sequence[RunStats]) -> dict[str, float]:
+    """Per-run means of the benchmark metrics."""
+    if not runs:
+        return {}
+    return {
+        "pass_rate": statistics.mean(1.0 if run.passed else 0.0 for run in runs),
+        "tool_calls": statistics.mean(run.total_tool_calls for run in runs),
+        **{name: statistics.mean(run.tool_calls[name] for run in runs) for name in FOLLOW_UP_TOOLS},
+        "snippet_chars": statistics.mean(run.snippet_chars for run in runs),
+        "input_tokens": statistics.mean(run.input_tokens for run in runs),
+        "output_tokens": statistics.mean(run.output_tokens for run in runs),
+        "total_tokens": statistics.mean(run.total_tokens for run in runs),
+    }
+
+
+def format_summary(summaries: dict[str, dict[str, float]]) -> str:
+    modes = list(summaries)
+    metrics = list(next(iter(summaries.values()), {}))
+    lines = [f"{'metric':<22}" + "".join(f"{mode:>14}" for mode in modes)]
+    for metric in metrics:
+        lines.append(f"{metric:<22}" + "".join(f"{summaries[mode][metric]:>14,.2f}" for mode in modes))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare search_content snippet modes on the knowledge evals")
+    parser.add_argument("--modes", default="head,focused", help="Comma-separated snippet modes")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case and mode")
+    parser.add_argument("--budget", type=int, help="SEARCH_SNIPPET_BUDGET override")
+    parser.add_argument("--window", type=int, help="SEARCH_SNIPPET_WINDOW override")
+    parser.add_argument("-c", "--category", help="Only run cases of this category")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every run")
+    args = parser.parse_args()
+
+    import backend.knowledge.snippets as snippets
+    from backend.agents.knowledge_agent import knowledge_agent
+    from backend.evals.run_evals import check_strings
+    from backend.evals.test_cases import KNOWLEDGE_AGENT_CASES
+
+    if args.budget is not None:
+        snippets.SEARCH_SNIPPET_BUDGET = args.budget
+    if args.window is not None:
+        snippets.SEARCH_SNIPPET_WINDOW = args.window
+    cases = [case for case in KNOWLEDGE_AGENT_CASES if not args.category or case.category == args.category]
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+
+    runs: dict[str, list[RunStats]] = {mode: [] for mode in modes}
+    for _ in range(args.repeat):
+        for case in cases:
+            # Alternate modes per case so drift in the model or data affects both alike
+            for mode in modes:
+                snippets.SEARCH_SNIPPET_MODE = mode
+                result = knowledge_agent.run(
+                    case.question, user_id="snippet-benchmark", session_id=f"snippet-benchmark-{uuid.uuid4()}"
+                )
+                passed = not check_strings(result.content or "", case.expected_strings)
+                stats = run_stats(case.question, passed, result)
+                runs[mode].append(stats)
+                if args.verbose:
+                    print(
+                        f"{mode:<8} {'PASS' if passed else 'FAIL'} tools={stats.total_tool_calls:<2} "
+                        f"tokens={stats.total_tokens:<7,} {dict(stats.tool_calls)}  {case.question}"
+                    )
+
+    print(
+        f"{len(cases)} cases x {args.repeat} runs, budget={snippets.SEARCH_SNIPPET_BUDGET} "
+        f"window={snippets.SEARCH_SNIPPET_WINDOW}"
+    )
+    print(format_summary({mode: summarize(mode_runs) for mode, mode_runs in runs.items()}))
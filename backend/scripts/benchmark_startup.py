@@ -0,0 +1,155 @@
+"""
+Benchmark Startup
+-----------------
+
+Measures how long ``import backend.main`` takes in a fresh interpreter: the
+wall clock of the import (agents, teams, workflows, registry and the app),
+and Python's ``-X importtime`` breakdown. The import is what every cold start
+and every ``--reload`` cycle in dev pays before serving.
+
+Each run is a new process, so nothing is cached in memory between runs
+(bytecode caches on disk are, as in a real restart). Importing must not need
+a database: knowledge tables are created on first query, not on import.
+
+Save a run with ``--output`` and compare a later one against it with
+``--baseline``, e.g. before and after a change on the same machine.
+
+Usage:
+    python -m backend.scripts.benchmark_startup
+    python -m backend.scripts.benchmark_startup --runs 10 --top 30
+    python -m backend.scripts.benchmark_startup --output startup.json
+    python -m backend.scripts.benchmark_startup --baseline startup.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+TARGET = "backend.main"
+
+# Prints the wall clock of the import alone, excluding interpreter start-up
+_PROBE = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+@dataclass(frozen=True)
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupRun:
+    wall_s: float
+    imports: list[ImportTime] = field(default_factory=list)
+
+    @property
+    def import_s(self) -> float:
+        """Cumulative ``-X importtime`` of the top-level module, in seconds."""
+        top = [record for record in self.imports if record.depth == 0]
+        return top[-1].cumulative_us / 1e6 if top else 0.0
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Records of ``-X importtime`` output, in the order Python printed them."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        # Python indents each nested import by two spaces after the separator's one
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append(ImportTime(stripped, int(parts[0]), int(parts[1]), depth))
+    return records
+
+
+def top_imports(records: Sequence[ImportTime], n: int = 20, prefix: str = "") -> list[ImportTime]:
+    """The ``n`` modules with the most self time, optionally only those under ``prefix``."""
+    selected = [record for record in records if record.module.startswith(prefix)]
+    return sorted(selected, key=lambda record: record.self_us, reverse=True)[:n]
+
+
+def run_once(module: str = TARGET) -> StartupRun:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    wall = float(completed.stdout.strip().splitlines()[-1])
+    return StartupRun(wall_s=wall, imports=parse_importtime(completed.stderr))
+
+
+def summarize(runs: Sequence[StartupRun]) -> dict[str, float]:
+    """Median and spread of the wall-clock and ``-X importtime`` totals."""
+    if not runs:
+        return {}
+    walls = [run.wall_s for run in runs]
+    return {
+        "runs": len(runs),
+        "wall_median_s": statistics.median(walls),
+        "wall_min_s": min(walls),
+        "wall_max_s": max(walls),
+        "importtime_median_s": statistics.median(run.import_s for run in runs),
+    }
+
+
+def compare(current: dict[str, float], baseline: dict[str, float]) -> list[str]:
+    """One line per shared metric: baseline, current and relative change."""
+    lines = []
+    for metric in ("wall_median_s", "wall_min_s", "importtime_median_s"):
+        if metric in current and baseline.get(metric):
+            before, after = baseline[metric], current[metric]
+            lines.append(f"{metric:<22}{before:>9.3f}{after:>9.3f}  {100 * (after - before) / before:+.1f}%")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time of the backend")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to list (by self time)")
+    parser.add_argument("--module", default=TARGET, help="Module to import")
+    parser.add_argument("--output", type=Path, help="Write the summary and slowest modules as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare against a summary saved with --output")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    summary = summarize(runs)
+    # The median run's breakdown is the representative one
+    median_run = sorted(runs, key=lambda run: run.wall_s)[len(runs) // 2]
+
+    print(f"import {args.module}: {args.runs} runs")
+    print(
+        f"  wall   median {summary['wall_median_s']:.3f}s  "
+        f"min {summary['wall_min_s']:.3f}s  max {summary['wall_max_s']:.3f}s"
+    )
+    print(f"  -X importtime total {summary['importtime_median_s']:.3f}s")
+    for title, prefix in (("Slowest modules", ""), ("Slowest backend modules", "backend.")):
+        print(f"\n{title} (self time; module-level code such as building agents counts here):")
+        for record in top_imports(median_run.imports, args.top, prefix):
+            print(f"  {record.self_us / 1000:9.1f}ms  {record.cumulative_us / 1000:9.1f}ms cum  {record.module}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["summary"]
+        print(f"\n{'metric':<22}{'baseline':>9}{'current':>9}  change")
+        print("\n".join(compare(summary, baseline)))
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {"summary": summary, "slowest": [asdict(record) for record in top_imports(median_run.imports, 50)]},
+                indent=2,
+            )
+        )
+        print(f"\nWrote {args.output}")
@@ -0,0 +1,192 @@
+"""
+Benchmark Vector Index
+----------------------
+
+Measures recall@k against exact search, query latency and index size for
+HNSW and IVFFlat indexes at several table sizes, for each vector storage mode
+(full float32, halfvec, binary quantization). Reduced modes rescore their
+candidates with the float32 column, as the knowledge tables do. Random vectors are generated inside
+Postgres in a scratch table (ai.ann_benchmark), which is dropped afterwards.
+
+Random uniform vectors are a pessimistic case for ANN indexes; real embeddings
+cluster and usually reach higher recall at the same settings.
+
+Usage:
+    python -m backend.scripts.benchmark_vector_index
+    python -m backend.scripts.benchmark_vector_index --sizes 10000,100000 --dims 256 --ef-search 40,100
+    python -m backend.scripts.benchmark_vector_index --index hnsw --storage full,halfvec,binary --rescore 40,200
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections.abc import Sequence
+
+TABLE = "ai.ann_benchmark"
+
+
+def recall_at_k(truth: Sequence[int], found: Sequence[int]) -> float:
+    """Fraction of the exact top-k that the approximate search returned."""
+    if not truth:
+        return 1.0
+    return len(set(truth) & set(found)) / len(truth)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def random_vector(dims: int, rng: random.Random) -> str:
+    return "[" + ",".join(f"{rng.random() - 0.5:.6f}" for _ in range(dims)) + "]"
+
+
+def format_row(size: int, index: str, setting: str, recall: float, latencies_ms: Sequence[float]) -> str:
+    return (
+        f"{size:>9,}  {index:<16} {setting:<22} recall={recall:.3f}  "
+        f"p50={percentile(latencies_ms, 50):7.2f}ms  p95={percentile(latencies_ms, 95):7.2f}ms"
+    )
+
+
+def storage_sql(storage: str, dims: int) -> tuple[str, str]:
+    """Indexed column (with operator class) and ORDER BY expression for a storage mode."""
+    if storage == "halfvec":
+        column = f"(embedding::halfvec({dims}))"
+        return f"{column} halfvec_cosine_ops", f"{column} <=> CAST(:q AS halfvec({dims}))"
+    if storage == "binary":
+        column = f"(binary_quantize(embedding)::bit({dims}))"
+        return f"{column} bit_hamming_ops", f"{column} <~> binary_quantize(CAST(:q AS vector))::bit({dims})"
+    return "embedding vector_cosine_ops", "embedding <=> CAST(:q AS vector)"
+
+
+def search_sql(storage: str, dims: int, rescore: int) -> str:
+    """Top-k query; reduced modes take ``rescore`` ANN candidates and re-rank them at full precision."""
+    _, order_by = storage_sql(storage, dims)
+    if storage == "full":
+        return f"SELECT id FROM {TABLE} ORDER BY {order_by} LIMIT :k"
+    return (
+        f"SELECT id FROM (SELECT id, embedding FROM {TABLE} ORDER BY {order_by} LIMIT {rescore}) c "
+        "ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    )
+
+
+def _search(conn, sql: str, query: str, k: int, settings: dict[str, object]) -> tuple[list[int], float]:
+    from sqlalchemy import text
+
+    with conn.begin():
+        for key, value in settings.items():
+            conn.execute(text(f"SET LOCAL {key} = {value}"))
+        started = time.perf_counter()
+        rows = conn.execute(text(sql), {"q": query, "k": k}).all()
+        elapsed = (time.perf_counter() - started) * 1000
+    return [row[0] for row in rows], elapsed
+
+
+def _fill(conn, size: int, dims: int) -> None:
+    from sqlalchemy import text
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"CREATE TABLE {TABLE} (id bigint PRIMARY KEY, embedding vector({dims}))"))
+    for start in range(0, size, 100_000):
+        stop = min(start + 100_000, size)
+        # The correlated WHERE makes Postgres draw a fresh vector per row
+        conn.execute(
+            text(
+                f"INSERT INTO {TABLE} SELECT g, (SELECT array_agg(random() - 0.5) FROM generate_series(1, :dims) "
+                "WHERE g > 0)::vector FROM generate_series(:start, :stop) g"
+            ),
+            {"dims": dims, "start": start + 1, "stop": stop},
+        )
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ANN recall and latency on pgvector")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated table sizes")
+    parser.add_argument("--dims", type=int, default=1536, help="Vector dimensions (default: 1536)")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per setting")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query (recall@k)")
+    parser.add_argument("--index", default="hnsw,ivfflat", help="Index types to test")
+    parser.add_argument("--m", type=int, default=16, help="HNSW m")
+    parser.add_argument("--ef-construction", type=int, default=64, help="HNSW ef_construction")
+    parser.add_argument("--ef-search", default="40,100,200", help="HNSW ef_search values")
+    parser.add_argument("--probes", default="1,10,32", help="IVFFlat probes values")
+    parser.add_argument("--storage", default="full,halfvec,binary", help="Vector storage modes to test")
+    parser.add_argument("--rescore", default="40", help="Candidates rescored in halfvec/binary modes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table")
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine, text
+
+    from backend.db.url import db_url
+    from backend.db.vector_index import VECTOR_INDEX_MAINTENANCE_WORK_MEM
+
+    engine = create_engine(db_url)
+    rng = random.Random(args.seed)
+    indexes = [kind.strip() for kind in args.index.split(",") if kind.strip()]
+
+    print(f"{'rows':>9}  {'index':<16} {'setting':<22} results (k={args.k}, {args.queries} queries, {args.dims} dims)")
+    storages = [mode.strip() for mode in args.storage.split(",") if mode.strip()]
+    rescores = [int(v) for v in args.rescore.split(",")]
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+                started = time.perf_counter()
+                _fill(conn, size, args.dims)
+                print(f"{size:>9,}  loaded in {time.perf_counter() - started:.1f}s")
+
+            queries = [random_vector(args.dims, rng) for _ in range(args.queries)]
+            exact_sql = search_sql("full", args.dims, 0)
+            with engine.connect() as conn:
+                exact = [_search(conn, exact_sql, q, args.k, {"enable_indexscan": "off"}) for q in queries]
+            truth = [ids for ids, _ in exact]
+            print(format_row(size, "exact", "seqscan", 1.0, [ms for _, ms in exact]))
+
+            for kind in indexes:
+                for storage in storages:
+                    column, _ = storage_sql(storage, args.dims)
+                    if kind == "hnsw":
+                        ddl = f"USING hnsw ({column}) WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+                        settings = [("hnsw.ef_search", int(v)) for v in args.ef_search.split(",")]
+                    else:
+                        lists = max(size // 1000 if size < 1_000_000 else int(size**0.5), 1)
+                        ddl = f"USING ivfflat ({column}) WITH (lists = {lists})"
+                        settings = [("ivfflat.probes", int(v)) for v in args.probes.split(",")]
+                    label = f"{kind}/{storage}"
+
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        conn.execute(text(f"SET maintenance_work_mem = '{VECTOR_INDEX_MAINTENANCE_WORK_MEM}'"))
+                        started = time.perf_counter()
+                        conn.execute(text(f"CREATE INDEX ann_benchmark_idx ON {TABLE} {ddl}"))
+                        built = time.perf_counter() - started
+                        index_bytes = (
+                            conn.execute(text("SELECT pg_relation_size('ai.ann_benchmark_idx')")).scalar() or 0
+                        )
+                        print(f"{size:>9,}  {label:<16} built in {built:.1f}s, index {index_bytes / 1e6:.1f} MB")
+
+                    with engine.connect() as conn:
+                        for rescore in rescores if storage != "full" else [0]:
+                            sql = search_sql(storage, args.dims, rescore)
+                            for key, value in settings:
+                                # HNSW returns at most ef_search rows, so it must cover the rescore window
+                                effective = max(value, rescore) if key == "hnsw.ef_search" else value
+                                results = [_search(conn, sql, q, args.k, {key: effective}) for q in queries]
+                                recall = statistics.mean(recall_at_k(t, ids) for t, (ids, _) in zip(truth, results))
+                                setting = f"{key.split('.')[1]}={effective}" + (
+                                    f" rescore={rescore}" if rescore else ""
+                                )
+                                print(format_row(size, label, setting, recall, [ms for _, ms in results]))
+
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        conn.execute(text("DROP INDEX IF EXISTS ai.ann_benchmark_idx"))
+    finally:
+        if not args.keep:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
@@ -0,0 +1,89 @@
+"""
+Build Indexes
+-------------
+
+Builds the ANN index of every PgVector knowledge table with
+CREATE INDEX CONCURRENTLY, so agents keep searching and writing meanwhile.
+Index type and parameters come from the VECTOR_INDEX_* settings (or the
+spec passed to create_knowledge for a table). Tables created before the
+stored tsvector column existed get it added, with its GIN index.
+
+Usage:
+    python -m backend.scripts.build_indexes                       # Build missing indexes
+    python -m backend.scripts.build_indexes --status              # Show index state only
+    python -m backend.scripts.build_indexes --force               # Rebuild (e.g. after changing m/lists)
+    python -m backend.scripts.build_indexes --table data_learnings --jobs 2
+"""
+
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+
+AGENT_MODULES = [
+    "backend.agents.knowledge_agent",
+    "backend.agents.data_agent",
+    "backend.agents.web_search_agent",
+    "backend.agents.mcp_agent",
+    "backend.agents.reasoning_agent",
+]
+
+
+def load_knowledge_bases() -> dict:
+    """Import the agent modules and return every knowledge base they create, keyed by vector table."""
+    from backend.db import get_knowledge_bases
+
+    modules = AGENT_MODULES + (
+        ["backend.agents.m365_agent"] if getenv("M365_ENABLED", "").lower() in ("true", "1", "yes") else []
+    )
+    for module in modules:
+        importlib.import_module(module)
+    return get_knowledge_bases()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build ANN indexes on knowledge vector tables")
+    parser.add_argument("--table", action="append", help="Only this vector table (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Rebuild valid indexes too (swapped in when done)")
+    parser.add_argument("--status", action="store_true", help="Print index state without building")
+    parser.add_argument("--jobs", type=int, default=1, help="Tables to build in parallel (default: 1)")
+    args = parser.parse_args()
+
+    from backend.db.full_text import migrate_full_text, tsv_index_name
+    from backend.db.vector_index import build_index, index_name, index_status
+
+    vector_dbs = {
+        table: knowledge.vector_db
+        for table, knowledge in sorted(load_knowledge_bases().items())
+        if knowledge.vector_db is not None and (not args.table or table in args.table)
+    }
+    if not vector_dbs:
+        raise SystemExit("No matching knowledge tables")
+
+    if args.status:
+        for table, vector_db in vector_dbs.items():
+            spec = vector_db.vector_index  # type: ignore[attr-defined]
+            if spec is None:
+                print(f"  {table}: no index configured")
+                continue
+            status = index_status(vector_db, index_name(vector_db))
+            if status is None:
+                print(f"  {table}: missing ({type(spec).__name__})")
+            else:
+                state = "valid" if status.valid else "INVALID"
+                print(f"  {table}: {status.name} {status.method} {state} {status.size_bytes / 1e6:.1f} MB")
+            tsv = index_status(vector_db, tsv_index_name(vector_db))
+            print(
+                f"  {table}: {tsv_index_name(vector_db)} {'missing' if tsv is None else 'valid' if tsv.valid else 'INVALID'}"
+            )
+        raise SystemExit(0)
+
+    print(f"Building indexes on {len(vector_dbs)} tables (jobs={args.jobs})...\n")
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = pool.map(lambda db: (build_index(db, force=args.force), migrate_full_text(db)), vector_dbs.values())
+        for pair in results:
+            for result in pair:
+                took = f" in {result.seconds:.1f}s" if result.seconds else ""
+                print(f"  {result.table}: {result.action} {result.name}{took}")
+
+    print("\nDone!")
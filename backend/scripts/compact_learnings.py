@@ -0,0 +1,48 @@
+"""
+Compact Learnings
+-----------------
+
+Merges near-duplicate learnings in every ``*_learnings`` knowledge table
+(see ``backend/knowledge/compaction.py``). Only learnings added since the
+previous pass are compared, unless --full is given.
+
+Usage:
+    python -m backend.scripts.compact_learnings                   # Incremental pass over all tables
+    python -m backend.scripts.compact_learnings --dry-run         # Show what would be merged
+    python -m backend.scripts.compact_learnings --full --table data_learnings
+"""
+
+import argparse
+import logging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge near-duplicate learnings")
+    parser.add_argument("--table", action="append", help="Only this learnings table (repeatable)")
+    parser.add_argument("--full", action="store_true", help="Compare all learnings, not only new ones")
+    parser.add_argument("--dry-run", action="store_true", help="Print the merges without applying them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from backend.knowledge.compaction import compact_learnings, learnings_knowledge_bases
+    from backend.scripts.build_indexes import load_knowledge_bases
+
+    knowledge_bases = {
+        table: knowledge
+        for table, knowledge in learnings_knowledge_bases(load_knowledge_bases()).items()
+        if not args.table or table in args.table
+    }
+    if not knowledge_bases:
+        raise SystemExit("No matching learnings tables")
+
+    for knowledge in knowledge_bases.values():
+        result = compact_learnings(knowledge, full=args.full, dry_run=args.dry_run)
+        print(f"  {result.summary()}")
+        for merge in result.merges:
+            print(f"    keep {merge.keeper.name!r} ({merge.keeper.key})")
+            for duplicate in merge.duplicates:
+                learning = duplicate.learning
+                print(
+                    f"      - {learning.name!r} ({learning.key}) cosine={duplicate.cosine:.3f} jaccard={duplicate.jaccard:.3f}"
+                )
+
+    print("\nDone!")
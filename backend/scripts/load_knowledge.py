@@ -5,12 +5,18 @@ Load Knowledge
 Loads table metadata, validated queries, and business rules into
 the data agent's knowledge base (vector DB).
 
+Sync is incremental: an ingestion manifest (ai.knowledge_manifest) tracks
+size, mtime and content hash per file, so only new or changed files are
+embedded and vectors of removed files are deleted in place.
+
 Usage:
-    python -m backend.scripts.load_knowledge             # Upsert
-    python -m backend.scripts.load_knowledge --recreate   # Drop and reload
+    python -m backend.scripts.load_knowledge             # Incremental sync
+    python -m backend.scripts.load_knowledge --dry-run   # Show what would change
+    python -m backend.scripts.load_knowledge --recreate  # Drop and reload
 """
 
 import argparse
+import asyncio
 from pathlib import Path
 
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
@@ -18,6 +24,8 @@ TABLES_DIR = DATA_DIR / "tables"
 QUERIES_DIR = DATA_DIR / "queries"
 BUSINESS_DIR = DATA_DIR / "business"
 
+SUBDIRS = [("tables", TABLES_DIR), ("queries", QUERIES_DIR), ("business", BUSINESS_DIR)]
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Load knowledge into vector database")
     parser.add_argument(
@@ -25,27 +33,57 @@ if __name__ == "__main__":
         action="store_true",
         help="Drop existing knowledge and reload from scratch",
     )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the sync plan without embedding or deleting anything",
+    )
     args = parser.parse_args()
 
     from backend.agents.data_agent import data_knowledge
+    from backend.knowledge.manifest import IngestionManifest, sync_directory
 
-    if args.recreate:
+    vector_db = data_knowledge.vector_db
+    if vector_db is None:
+        raise SystemExit("Data knowledge has no vector database configured")
+    manifest = IngestionManifest(vector_db.table_name, vector_db.db_engine)  # type: ignore[attr-defined]
+
+    if args.recreate and not args.dry_run:
         print("Recreating knowledge base (dropping existing data)...\n")
-        if data_knowledge.vector_db:
-            data_knowledge.vector_db.drop()
-            data_knowledge.vector_db.create()
+        vector_db.drop()
+        vector_db.create()
+        manifest.remove()
+    elif not args.dry_run and not manifest.load():
+        # First manifest sync: drop rows written by the old whole-directory insert
+        for subdir_name, _ in SUBDIRS:
+            vector_db.delete_by_name(f"knowledge-{subdir_name}")
 
-    print(f"Loading knowledge from: {DATA_DIR}\n")
+    print(f"Syncing knowledge from: {DATA_DIR}\n")
 
-    for subdir_name, subdir_path in [("tables", TABLES_DIR), ("queries", QUERIES_DIR), ("business", BUSINESS_DIR)]:
+    files: list[Path] = []
+    for subdir_name, subdir_path in SUBDIRS:
         if not subdir_path.exists():
             print(f"  {subdir_name}/: (not found)")
             continue
 
-        files = [f for f in subdir_path.iterdir() if f.is_file() and not f.name.startswith(".")]
-        print(f"  {subdir_name}/: {len(files)} files")
+        subdir_files = sorted(f for f in subdir_path.iterdir() if f.is_file() and not f.name.startswith("."))
+        print(f"  {subdir_name}/: {len(subdir_files)} files")
+        files.extend(subdir_files)
+
+    plan, progress = asyncio.run(sync_directory(vector_db, DATA_DIR, files, manifest=manifest, dry_run=args.dry_run))
+
+    print(f"\n{'Plan' if args.dry_run else 'Synced'}: {plan.summary()}")
+    for label, names in [("added", plan.added), ("changed", plan.changed), ("removed", plan.removed)]:
+        for name in names:
+            print(f"  {label}: {name}")
+    if progress is not None:
+        print(f"  {progress.summary()}")
+
+    if not args.dry_run:
+        from backend.db.full_text import migrate_full_text
+        from backend.db.vector_index import build_index
 
-        if files:
-            data_knowledge.insert(name=f"knowledge-{subdir_name}", path=str(subdir_path))
+        for result in (build_index(vector_db), migrate_full_text(vector_db)):
+            print(f"  index: {result.action} {result.name}")
 
     print("\nDone!")
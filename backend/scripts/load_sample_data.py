@@ -5,6 +5,9 @@ Load Sample Data
 Downloads F1 data (1950-2020) and loads into PostgreSQL.
 Used for development, demos, and evaluations.
 
+Each table is replaced, then its version (``backend/db/table_versions.py``)
+is bumped so the data agent's query cache drops results computed from the old data.
+
 Usage: python -m backend.scripts.load_sample_data
 """
 
@@ -15,6 +18,7 @@ import pandas as pd
 from sqlalchemy import create_engine
 
 from backend.db import db_url
+from backend.db.table_versions import bump_table_versions
 
 S3_URI = "https://agno-public.s3.amazonaws.com/f1"
 
@@ -39,4 +43,7 @@ if __name__ == "__main__":
         print(f"{len(df):,} rows")
         total += len(df)
 
+    with engine.begin() as conn:
+        bump_table_versions(conn, "public", list(TABLES))
+
     print(f"\nDone! {total:,} total rows")
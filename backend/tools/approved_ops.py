@@ -49,7 +49,9 @@ def add_knowledge_source(url: str, name: str) -> str:
 
     logger.info("Approved: adding knowledge source '%s' from %s", name, url)
     try:
-        _knowledge.insert(name=name, url=url, skip_if_exists=True)
+        from backend.knowledge.url_refresh import insert_url_source
+
+        insert_url_source(_knowledge, name, url)
         return f"Knowledge source '{name}' from {url} added successfully."
     except Exception:
         logger.exception("Failed to add knowledge source '%s' from %s", name, url)
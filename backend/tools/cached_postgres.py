@@ -0,0 +1,88 @@
+"""
+Cached Postgres Tools
+---------------------
+
+``PostgresTools`` for the data agent, with results served from the query cache.
+
+SQL run through ``run_query``, and ``summarize_table`` (one full scan per
+column), are cached per process and invalidated by the versions of the tables
+they read (see ``backend/db/query_cache.py``). Query plans (``inspect_query``),
+catalog lookups (``show_tables``, ``describe_table``) and errors are never
+cached.
+
+``PostgresTools`` connects read-only, so Postgres rejects any write the model
+sends through ``run_query``. It never ends its transaction, though, so the
+locks of one tool call would be held until the next; every call here ends it.
+"""
+
+from contextlib import suppress
+from typing import Any, Optional
+
+import psycopg
+from agno.tools.postgres import PostgresTools
+
+from backend.db.engine import get_engine
+from backend.db.query_cache import QUERY_CACHE_ENABLED, QueryCache, get_query_cache
+from backend.db.url import db_url as default_db_url
+
+# How PostgresTools reports a failure instead of a result
+_ERROR_PREFIXES = ("Error", "An unexpected error occurred")
+
+
+def is_result(output: str) -> bool:
+    return not output.startswith(_ERROR_PREFIXES)
+
+
+class CachedPostgresTools(PostgresTools):
+    """PostgresTools whose query results come from the process-wide query cache.
+
+    ``db_url`` must point at the same database as the connection settings; it is
+    used to read table versions through the shared engine.
+    """
+
+    def __init__(self, *args: Any, db_url: str = default_db_url, cache: bool = QUERY_CACHE_ENABLED, **kwargs: Any):
+        self._db_url = db_url
+        self._cache_enabled = cache
+        self._query_cache: Optional[QueryCache] = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def query_cache(self) -> Optional[QueryCache]:
+        if not self._cache_enabled:
+            return None
+        if self._query_cache is None:
+            self._query_cache = get_query_cache(get_engine(self._db_url), self.table_schema)
+        return self._query_cache
+
+    def _execute_query(self, query: str, params: Optional[tuple] = None) -> str:
+        try:
+            cache = self.query_cache
+            # Parameterized statements are PostgresTools' own catalog lookups
+            if cache is None or params is not None:
+                return super()._execute_query(query, params)
+            return cache.fetch_sql(
+                query, lambda: super(CachedPostgresTools, self)._execute_query(query), keep=is_result
+            )
+        finally:
+            self._end_transaction()
+
+    def _end_transaction(self) -> None:
+        # An open transaction would keep its locks, making loaders that replace a table wait
+        connection = self._connection
+        if connection is not None and not connection.closed:
+            with suppress(psycopg.Error):
+                connection.rollback()
+
+    def summarize_table(self, table: str) -> str:
+        cache = self.query_cache
+        if cache is None:
+            return super().summarize_table(table)
+        return cache.fetch(
+            ("summarize_table", table),
+            [table],
+            lambda: super(CachedPostgresTools, self).summarize_table(table),
+            keep=is_result,
+        )
+
+    # The agent reads the tool description from the docstring
+    summarize_table.__doc__ = PostgresTools.summarize_table.__doc__
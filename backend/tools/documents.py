@@ -0,0 +1,97 @@
+"""
+Document Tools
+--------------
+
+FileTools for the knowledge agent's documents directory, backed by the
+inverted index in ``backend/knowledge/file_index.py``.
+
+- search_documents: ranked full-text search returning paths and line numbers.
+- read_file_chunk: memory-mapped, starting from the nearest indexed line
+  checkpoint, so only the requested lines are read from large files.
+
+The other FileTools functions are unchanged.
+"""
+
+import codecs
+import json
+from pathlib import Path
+
+from agno.tools.file import FileTools
+from agno.utils.log import log_debug, log_error
+
+from backend.knowledge.file_index import FileIndex, read_lines
+
+# Encodings in which every b"\n" byte is a line break
+_BYTE_LINE_ENCODINGS = {"utf-8", "ascii", "iso8859-1", "cp1252"}
+# Line numbers returned per file by search_documents
+_MAX_LINES_PER_FILE = 20
+
+
+class DocumentTools(FileTools):
+    def __init__(self, base_dir: Path, index_path: Path, enable_search_documents: bool = True, **kwargs):
+        super().__init__(base_dir=base_dir, **kwargs)
+        self.index = FileIndex(self.base_dir, index_path)
+        if enable_search_documents:
+            self.register(self.search_documents)
+
+    def search_documents(self, query: str, max_results: int = 10) -> str:
+        """Searches the contents of all files in the base directory, best matches first.
+
+        Use this to find which files mention a term before reading them. Each match
+        lists the line numbers where query words occur; read around them with
+        read_file_chunk(file_name, start_line, end_line).
+
+        :param query: Words to search for (case-insensitive; files matching more and rarer words rank higher).
+        :param max_results: Maximum number of files to return (default 10).
+        :return: JSON with the matching files, their scores and line numbers, or an error message.
+        """
+        if not query or not query.strip():
+            return "Error: Query cannot be empty"
+        try:
+            log_debug(f"Searching document index for {query!r}")
+            matches = self.index.search(query, limit=max(1, min(max_results, 50)))
+            return json.dumps(
+                {
+                    "query": query,
+                    "matches_found": len(matches),
+                    "files": [
+                        {"file": match.path, "score": round(match.score, 3), "lines": match.lines[:_MAX_LINES_PER_FILE]}
+                        for match in matches
+                    ],
+                },
+                indent=2,
+            )
+        except Exception as e:
+            log_error(f"Error searching documents for '{query}': {e}")
+            return f"Error searching documents: {e}"
+
+    def read_file_chunk(self, file_name: str, start_line: int, end_line: int, encoding: str = "utf-8") -> str:
+        """Reads the contents of the file `file_name` and returns lines from start_line to end_line.
+
+        :param file_name: The name of the file to read.
+        :param start_line: Number of first line in the returned chunk
+        :param end_line: Number of the last line in the returned chunk
+        :param encoding: Encoding to use, default - utf-8
+
+        :return: The contents of the selected chunk
+        """
+        try:
+            byte_lines = codecs.lookup(encoding).name in _BYTE_LINE_ENCODINGS
+        except LookupError:
+            byte_lines = False
+        if start_line < 0 or end_line < 0 or self.line_separator != "\n" or not byte_lines:
+            return super().read_file_chunk(file_name, start_line, end_line, encoding=encoding)
+        try:
+            log_debug(f"Reading file chunk: {file_name}")
+            safe, file_path = self.check_escape(file_name)
+            if not (safe):
+                log_error(f"Attempted to read file: {file_name}")
+                return "Error reading file"
+            stat = file_path.stat()
+            start = self.index.checkpoint(
+                file_path.relative_to(self.base_dir).as_posix(), start_line, stat.st_mtime_ns, stat.st_size
+            )
+            return read_lines(file_path, start_line, end_line, encoding=encoding, start=start)
+        except Exception as e:
+            log_error(f"Error reading file: {e}")
+            return f"Error reading file: {e}"
@@ -2,25 +2,48 @@
 Runtime Schema Introspection
 ----------------------------
 
-SQLAlchemy-based schema inspection tool for the data agent.
+Schema inspection tool for the data agent.
 Provides live table listings, column metadata, and sample data.
+
+Tables, columns, keys and indexes come from the process-wide schema snapshot
+(see ``backend/db/schema_snapshot.py``), and row counts from the planner's
+estimates, so a call normally costs one version lookup. Exact counts and
+sample rows still query the table.
 """
 
 from agno.tools import tool
 from agno.utils.log import logger
-from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.exc import DatabaseError, OperationalError
 
+from backend.db.engine import get_engine
+from backend.db.schema_snapshot import (
+    SCHEMA_EXACT_COUNT_MAX_BYTES,
+    TableInfo,
+    exact_row_counts,
+    get_schema_cache,
+    sample_rows,
+)
+
+
+def _row_count(table: TableInfo, exact: dict[str, int]) -> str:
+    if table.name in exact:
+        return f"{exact[table.name]:,} rows"
+    if table.estimated_rows is None:
+        return "row count unknown"
+    return f"~{table.estimated_rows:,} rows"
+
 
 def create_introspect_schema_tool(db_url: str):
     """Create introspect_schema tool with database connection."""
-    engine = create_engine(db_url)
+    engine = get_engine(db_url)
+    schema_cache = get_schema_cache(engine)
 
     @tool
     def introspect_schema(
         table_name: str | None = None,
         include_sample_data: bool = False,
         sample_limit: int = 5,
+        exact_counts: bool = False,
     ) -> str:
         """Inspect database schema at runtime.
 
@@ -28,62 +51,81 @@ def create_introspect_schema_tool(db_url: str):
         or see sample data before writing SQL. Call without arguments to list
         all tables with row counts.
 
+        Row counts are estimates (~) from table statistics unless
+        exact_counts is set, which counts every row and is slow on large tables.
+
         Args:
             table_name: Table to inspect. If None, lists all tables.
             include_sample_data: Include sample rows for the table.
             sample_limit: Number of sample rows (default 5).
+            exact_counts: Count rows exactly instead of using estimates.
         """
         sample_limit = max(1, min(sample_limit, 100))
 
         try:
-            insp = inspect(engine)
+            snapshot = schema_cache.get()
+            tables = snapshot.tables
 
             if table_name is None:
-                tables = insp.get_table_names()
                 if not tables:
                     return "No tables found."
 
-                lines = ["## Tables", ""]
-                for t in sorted(tables):
+                # Never-analyzed tables have no estimate; count them when small
+                to_count = sorted(
+                    t.name
+                    for t in tables.values()
+                    if exact_counts or (t.estimated_rows is None and t.size_bytes <= SCHEMA_EXACT_COUNT_MAX_BYTES)
+                )
+                exact: dict[str, int] = {}
+                if to_count:
                     try:
                         with engine.connect() as conn:
-                            count = conn.execute(text(f'SELECT COUNT(*) FROM "{t}"')).scalar()
-                            lines.append(f"- **{t}** ({count:,} rows)")
-                    except (OperationalError, DatabaseError):
-                        lines.append(f"- **{t}**")
+                            exact = exact_row_counts(conn, to_count)
+                    except (OperationalError, DatabaseError) as e:
+                        logger.warning("Row counts failed: %s", e)
+
+                lines = ["## Tables", ""]
+                for name in sorted(tables):
+                    lines.append(f"- **{name}** ({_row_count(tables[name], exact)})")
                 return "\n".join(lines)
 
-            tables = insp.get_table_names()
-            if table_name not in tables:
+            table = tables.get(table_name)
+            if table is None:
                 return f"Table '{table_name}' not found. Available: {', '.join(sorted(tables))}"
 
-            lines = [f"## {table_name}", ""]
+            exact = {}
+            if exact_counts:
+                with engine.connect() as conn:
+                    exact = exact_row_counts(conn, [table.name])
+            lines = [f"## {table_name}", "", f"_{_row_count(table, exact)}_", ""]
 
-            cols = insp.get_columns(table_name)
-            if cols:
+            if table.columns:
                 lines.extend(["### Columns", "", "| Column | Type | Nullable |", "| --- | --- | --- |"])
-                for c in cols:
-                    nullable = "Yes" if c.get("nullable", True) else "No"
-                    lines.append(f"| {c['name']} | {c['type']} | {nullable} |")
+                for c in table.columns:
+                    nullable = "Yes" if c.nullable else "No"
+                    lines.append(f"| {c.name} | {c.type} | {nullable} |")
+                lines.append("")
+
+            if table.primary_key:
+                lines.append(f"**Primary Key:** {', '.join(table.primary_key)}")
                 lines.append("")
 
-            pk = insp.get_pk_constraint(table_name)
-            if pk and pk.get("constrained_columns"):
-                lines.append(f"**Primary Key:** {', '.join(pk['constrained_columns'])}")
+            secondary = [index for index in table.indexes if not index.primary]
+            if secondary:
+                lines.append("### Indexes")
+                lines.extend(f"- `{index.definition}`" for index in secondary)
                 lines.append("")
 
             if include_sample_data:
                 lines.append("### Sample")
                 try:
                     with engine.connect() as conn:
-                        result = conn.execute(text(f'SELECT * FROM "{table_name}" LIMIT {sample_limit}'))
-                        rows = result.fetchall()
-                        col_names = list(result.keys())
+                        col_names, rows = sample_rows(conn, table, sample_limit)
                         if rows:
                             lines.append("| " + " | ".join(col_names) + " |")
                             lines.append("| " + " | ".join(["---"] * len(col_names)) + " |")
                             for row in rows:
-                                vals = [str(v)[:30] if v else "NULL" for v in row]
+                                vals = [str(v)[:30] if v is not None else "NULL" for v in row]
                                 lines.append("| " + " | ".join(vals) + " |")
                         else:
                             lines.append("_No data_")
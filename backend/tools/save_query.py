@@ -4,6 +4,11 @@ Save Validated Query Tool
 
 Saves successful SQL queries to the knowledge base for reuse.
 Includes safety checks to prevent saving dangerous queries.
+
+Saves are upserts on the query's SQL fingerprint (see
+``backend/db/validated_queries.py``): saving the same SQL again, under any
+name, replaces the earlier entry. ``lookup_validated_query`` finds a saved
+query by exact SQL fingerprint or question, without a vector search.
 """
 
 import json
@@ -12,10 +17,14 @@ from agno.knowledge import Knowledge
 from agno.knowledge.reader.text_reader import TextReader
 from agno.tools import tool
 from agno.utils.log import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.db.validated_queries import FINGERPRINT_KEY, ValidatedQueryStore, sql_fingerprint
 
 
 def create_save_validated_query_tool(knowledge: Knowledge):
     """Create save_validated_query tool with knowledge injected."""
+    store = ValidatedQueryStore(knowledge)
 
     @tool
     def save_validated_query(
@@ -66,16 +75,58 @@ def create_save_validated_query_tool(knowledge: Knowledge):
         }
         payload = {k: v for k, v in payload.items() if v is not None}
 
+        fingerprint = sql_fingerprint(query)
         try:
+            previous = store.get(fingerprint)
+            previous_id = previous.content_id if previous is not None else None
+            # Insert first, so a failed insert leaves the previous version searchable
             knowledge.insert(
                 name=name.strip(),
                 text_content=json.dumps(payload, ensure_ascii=False, indent=2),
                 reader=TextReader(),
-                skip_if_exists=True,
+                metadata={FINGERPRINT_KEY: fingerprint},
+                upsert=True,
             )
+            # Same name and payload hash to the same content id, which the insert just upserted
+            content_id = store.content_id_of(fingerprint, exclude=previous_id) or previous_id
+            if previous_id and previous_id != content_id:
+                knowledge.remove_content_by_id(previous_id)
+            store.save(query, payload, content_id=content_id)
+            if previous is not None:
+                return f"Updated validated query '{previous.name}' (same SQL) as '{name}'."
             return f"Saved query '{name}' to knowledge base."
-        except (AttributeError, TypeError, ValueError, OSError) as e:
+        except (AttributeError, TypeError, ValueError, OSError, SQLAlchemyError) as e:
             logger.error("Failed to save query: %s", e)
             return f"Error: {e}"
 
     return save_validated_query
+
+
+def create_lookup_validated_query_tool(knowledge: Knowledge):
+    """Create lookup_validated_query tool with knowledge injected."""
+    store = ValidatedQueryStore(knowledge)
+
+    @tool
+    def lookup_validated_query(question: str | None = None, query: str | None = None) -> str:
+        """Find a validated query by exact question or SQL, without searching the knowledge base.
+
+        Call FIRST with the user's question. If a validated query is returned, reuse it
+        (adjusting literal values such as years or names) instead of writing new SQL.
+        Pass `query` to check whether a SQL statement is already saved.
+
+        Args:
+            question: The user's question.
+            query: A SQL query to look up by fingerprint (formatting and literal values are ignored).
+        """
+        if not (question and question.strip()) and not (query and query.strip()):
+            return "Error: Question or query required."
+        try:
+            found = store.find(question=question, sql=query)
+        except SQLAlchemyError as e:
+            logger.error("Failed to look up validated query: %s", e)
+            return f"Error: {e}"
+        if found is None:
+            return "No validated query found."
+        return json.dumps(found.payload, ensure_ascii=False, indent=2)
+
+    return lookup_validated_query
@@ -4,6 +4,9 @@ Content Search Tools
 
 Keyword search tools for knowledge exploration.
 Complements vector search with exact-match capability.
+
+Each hit is cut down to the passages around the query terms
+(``backend/knowledge/snippets.py``), within a total ``SEARCH_SNIPPET_BUDGET``.
 """
 
 import logging
@@ -11,6 +14,8 @@ from typing import TYPE_CHECKING, Optional
 
 from agno.tools import tool
 
+from backend.knowledge.snippets import extract_snippets
+
 if TYPE_CHECKING:
     from agno.knowledge import Knowledge
 
@@ -38,7 +43,9 @@ def search_content(query: str, max_results: int = 5) -> str:
         max_results: Maximum number of results to return (default 5).
 
     Returns:
-        Matching content snippets with source references.
+        Matching content snippets with source references. Each snippet holds the
+        passages where the query terms occur, with matches in **bold** and
+        omitted text marked with "…".
     """
     if _knowledge is None:
         return "Knowledge base not initialized. Load documents first with `mise run load-docs`."
@@ -53,11 +60,10 @@ def search_content(query: str, max_results: int = 5) -> str:
     if not documents:
         return f"No results found for '{query}'."
 
+    snippets = extract_snippets([str(getattr(doc, "content", "")) for doc in documents], query)
     results: list[str] = []
-    for i, doc in enumerate(documents, 1):
+    for i, (doc, snippet) in enumerate(zip(documents, snippets), 1):
         name: Optional[str] = getattr(doc, "name", None)
-        content: str = str(getattr(doc, "content", ""))
-        snippet = content[:500] + "..." if len(content) > 500 else content
         header = f"**{i}. {name}**" if name else f"**{i}.**"
         results.append(f"{header}\n{snippet}")
 
@@ -98,9 +98,17 @@ export interface MCPTagInfo {
   entities: Record<string, unknown>[]
 }
 
+export interface MCPCircuitInfo {
+  state: 'closed' | 'open' | 'half_open'
+  consecutive_failures: number
+  retry_after_seconds: number
+  timeouts: Record<string, Record<string, number>>
+}
+
 export interface MCPHealthInfo {
   status: string
   version?: string | null
+  circuit?: MCPCircuitInfo | null
 }
 
 export interface MCPUserPreferences {
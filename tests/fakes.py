@@ -0,0 +1,118 @@
+"""Shared fakes for the knowledge and search tests (no database or embedding API)."""
+
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+from agno.knowledge.embedder.base import Embedder
+from sqlalchemy.dialects import postgresql
+
+from backend.knowledge.manifest import IngestionManifest, SourceState
+
+
+@dataclass
+class FakeEmbedder(Embedder):
+    """Embeds each text as ``[len(text), 0.0, 1.0]`` and records the texts of every call.
+
+    ``fail`` raises like an unreachable API; ``empty`` returns empty embeddings,
+    which is how agno embedders report a failed call.
+    """
+
+    id: str = "fake-model"
+    dimensions: int = 3
+    enable_batch: bool = True
+    fail: bool = False
+    empty: bool = False
+    calls: list = field(default_factory=list)
+
+    @property
+    def texts(self) -> list[str]:
+        return [text for call in self.calls for text in call]
+
+    def _embed(self, texts):
+        if self.fail:
+            raise ConnectionError("embedding service down")
+        self.calls.append(list(texts))
+        return [[] if self.empty else [float(len(text)), 0.0, 1.0] for text in texts]
+
+    def get_embedding(self, text):
+        return self._embed([text])[0]
+
+    def get_embedding_and_usage(self, text):
+        return self.get_embedding(text), {"total_tokens": 1}
+
+    async def async_get_embedding(self, text):
+        return self.get_embedding(text)
+
+    async def async_get_embedding_and_usage(self, text):
+        return self.get_embedding_and_usage(text)
+
+    async def async_get_embeddings_batch_and_usage(self, texts):
+        return self._embed(texts), [{"total_tokens": 1}] * len(texts)
+
+
+class RecordingSession:
+    """SQLAlchemy session stand-in that records compiled statements; every query returns ``rows``."""
+
+    def __init__(self, executed: list[str], rows=()):
+        self.executed = executed
+        self.rows = list(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def begin(self):
+        return self
+
+    def begin_nested(self):
+        return self
+
+    def execute(self, stmt, params=None):
+        self.executed.append(str(stmt.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(fetchall=lambda: list(self.rows))
+
+
+class MemoryManifest(IngestionManifest):
+    """Ingestion manifest kept in a dict instead of ``ai.knowledge_manifest``."""
+
+    def __init__(self, namespace: str = "test_table"):
+        self.namespace = namespace
+        self.entries: dict[str, SourceState] = {}
+
+    def load(self):
+        return dict(self.entries)
+
+    def save(self, states):
+        self.entries.update(states)
+
+    def remove(self, paths=None):
+        for path in list(self.entries) if paths is None else paths:
+            self.entries.pop(path, None)
+
+
+class SyncHarness:
+    """Vector tables in dicts, written through the ``upsert`` and ``delete`` hooks of the sync functions.
+
+    Rows are keyed by table (``vector_dbs`` name) and record id.
+    """
+
+    def __init__(self, root, namespace: str = "test_table", tables: tuple[str, ...] = ("docs",)):
+        self.root = root
+        self.manifest = MemoryManifest(namespace)
+        self.embedder = FakeEmbedder()
+        self.vector_dbs = {name: SimpleNamespace(name=name, embedder=self.embedder) for name in tables}
+        self.rows: dict[str, dict[str, dict]] = {name: {} for name in tables}
+        self.deleted: list[tuple[str, str]] = []
+
+    def upsert(self, db, records):
+        for record in records:
+            self.rows[db.name][record["id"]] = record
+        return len(records)
+
+    def delete(self, db, sources):
+        self.deleted.extend(sources)
+        for rid, row in list(self.rows[db.name].items()):
+            if (row["name"], row["content_hash"]) in sources:
+                del self.rows[db.name][rid]
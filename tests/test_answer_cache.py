@@ -0,0 +1,353 @@
+"""Tests for the semantic answer cache middleware (fake run endpoint, in-memory cache, no database)."""
+
+import json
+import math
+from types import SimpleNamespace
+
+import pytest
+from agno.run.agent import RunOutput
+from agno.session.agent import AgentSession
+from agno.tools.postgres import PostgresTools
+from fastapi import FastAPI, Form
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import backend.answer_cache as answer_cache
+from backend.answer_cache import (
+    AnswerCache,
+    AnswerCacheMiddleware,
+    CachedAnswer,
+    answer_cache_router,
+    completed_run,
+    scope_key,
+    sql_table_versions,
+)
+from backend.tools.cached_postgres import CachedPostgresTools
+
+# Paraphrases share a direction; unrelated questions are orthogonal
+_VECTORS = {
+    "who won the most races in 2019?": [1.0, 0.0, 0.0],
+    "which driver won the most races in 2019": [0.99, 0.1, 0.0],
+    "how many laps is monaco?": [0.0, 0.0, 1.0],
+    "and in 2020?": [0.0, 1.0, 0.0],
+}
+
+
+class _Embedder:
+    async def async_get_embedding(self, text):
+        return _VECTORS[text.lower()]
+
+
+class _MemoryCache(AnswerCache):
+    def __init__(self):
+        super().__init__(threshold=0.95)
+        self.rows: list[dict] = []
+
+    def lookup(self, agent_id, key, embedding, versions):
+        best, best_sim = None, -1.0
+        for row in self.rows:
+            if (row["agent_id"], row["key"], row["versions"], row["validated"]) != (agent_id, key, versions, True):
+                continue
+            sim = sum(a * b for a, b in zip(row["embedding"], embedding)) / (
+                math.hypot(*row["embedding"]) * math.hypot(*embedding)
+            )
+            if sim > best_sim:
+                best, best_sim = row, sim
+        if best is None or best_sim < self.threshold:
+            return None
+        return CachedAnswer(
+            id="1", question=best["question"], answer=best["answer"], similarity=best_sim, created_at=best["at"]
+        )
+
+    def store(self, agent_id, key, question, answer, embedding, versions, run_id=None, validated=False):
+        from datetime import datetime, timezone
+
+        self.rows.append(
+            dict(
+                agent_id=agent_id,
+                key=key,
+                question=question,
+                answer=answer,
+                embedding=embedding,
+                versions=versions,
+                run_id=run_id,
+                validated=validated,
+                at=datetime.now(timezone.utc),
+            )
+        )
+
+    def validate(self, agent_id, run_id, key):
+        rows = [row for row in self.rows if (row["agent_id"], row["run_id"], row["key"]) == (agent_id, run_id, key)]
+        for row in rows:
+            row["validated"] = True
+        return bool(rows)
+
+
+class _SessionDb:
+    """Agent session storage: get_session / upsert_session, as the middleware uses them."""
+
+    def __init__(self):
+        self.sessions: dict[str, AgentSession] = {}
+
+    def get_session(self, session_id, session_type, user_id=None):
+        return self.sessions.get(session_id)
+
+    def upsert_session(self, session):
+        self.sessions[session.session_id] = session
+        return session
+
+
+class _FakeJWT:
+    """Sets request.state like EntraJWTMiddleware, from X-User / X-Scopes headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = dict(scope["headers"])
+            scope.setdefault("state", {})
+            scope["state"]["user_id"] = headers.get(b"x-user", b"u1").decode()
+            scope["state"]["scopes"] = headers.get(b"x-scopes", b"agents:read").decode().split(",")
+        await self.app(scope, receive, send)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    versions = {"ai.f1_docs": (10, 3)}
+    monkeypatch.setattr(answer_cache, "get_search_cache", lambda: SimpleNamespace(is_tracked=lambda db: True))
+    monkeypatch.setattr(answer_cache, "table_version", lambda db: versions[f"{db.schema}.{db.table_name}"])
+
+    db = _SessionDb()
+    vector_db = SimpleNamespace(schema="ai", table_name="f1_docs")
+    agent = SimpleNamespace(
+        id="knowledge-agent", name="Knowledge Agent", knowledge=SimpleNamespace(vector_db=vector_db), db=db, tools=[]
+    )
+    other = SimpleNamespace(id="web-search-agent", name="Web", knowledge=None)
+    runs: list[str] = []
+    status = {"value": "COMPLETED"}
+    # Tool calls of the next runs, as agno reports them
+    tools: list[dict] = []
+
+    app = FastAPI()
+
+    @app.post("/agents/{agent_id}/runs")
+    async def run(
+        agent_id: str, message: str = Form(...), stream: bool = Form(True), session_id: str | None = Form(None)
+    ):
+        runs.append(message)
+        run_id = f"r{len(runs)}"
+        answer = f"Answer #{len(runs)}: Lewis Hamilton"
+        if session_id:
+            session = db.sessions.setdefault(session_id, AgentSession(session_id=session_id, agent_id=agent_id))
+            session.upsert_run(RunOutput(run_id=run_id, session_id=session_id, content=answer))
+        if not stream:
+            return {
+                "run_id": run_id,
+                "agent_id": agent_id,
+                "content": answer,
+                "status": status["value"],
+                "tools": tools,
+            }
+
+        async def events():
+            yield f"event: RunStarted\ndata: {json.dumps({'run_id': run_id})}\n\n"
+            for tool in tools:
+                yield f"event: ToolCallCompleted\ndata: {json.dumps({'run_id': run_id, 'tool': tool})}\n\n"
+            yield f"event: RunContent\ndata: {json.dumps({'content': answer})}\n\n"
+            event = "RunCompleted" if status["value"] == "COMPLETED" else "RunError"
+            yield f"event: {event}\ndata: {json.dumps({'run_id': run_id, 'content': answer})}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    cache = _MemoryCache()
+    monkeypatch.setattr(answer_cache, "get_answer_cache", lambda: cache)
+    app.include_router(answer_cache_router)
+    app.add_middleware(
+        AnswerCacheMiddleware, agents=[agent, other], agent_ids=["knowledge-agent"], cache=cache, embedder=_Embedder()
+    )
+    app.add_middleware(_FakeJWT)
+    return SimpleNamespace(
+        client=TestClient(app),
+        agent=agent,
+        db=db,
+        runs=runs,
+        versions=versions,
+        cache=cache,
+        status=status,
+        tools=tools,
+    )
+
+
+def _ask(env, message, stream=False, user="u1", scopes="agents:read", agent="knowledge-agent", session_id=None):
+    data = {"message": message, "stream": str(stream).lower()}
+    if session_id:
+        data["session_id"] = session_id
+    return env.client.post(f"/agents/{agent}/runs", data=data, headers={"X-User": user, "X-Scopes": scopes})
+
+
+def _approve(env, run_id, user="u1", scopes="agents:read", agent="knowledge-agent"):
+    return env.client.post(f"/answer-cache/{agent}/runs/{run_id}/approve", headers={"X-User": user, "X-Scopes": scopes})
+
+
+def test_paraphrase_served_from_cache_once_approved(env):
+    first = _ask(env, "Who won the most races in 2019?")
+    assert first.headers["x-answer-cache"] == "miss"
+    assert _approve(env, first.json()["run_id"]).json()["validated"] is True
+    second = _ask(env, "Which driver won the most races in 2019")
+
+    assert env.runs == ["Who won the most races in 2019?"]
+    assert second.headers["x-answer-cache"] == "hit"
+    body = second.json()
+    assert body["content"] == first.json()["content"]
+    assert body["status"] == "COMPLETED"
+    assert body["metadata"]["answer_cache"]["hit"] is True
+    assert body["metadata"]["answer_cache"]["cached_question"] == "Who won the most races in 2019?"
+
+
+def test_unvalidated_answers_are_not_served(env):
+    _ask(env, "Who won the most races in 2019?")
+    _ask(env, "Which driver won the most races in 2019")
+    assert len(env.runs) == 2
+    assert [row["validated"] for row in env.cache.rows] == [False, False]
+
+
+def test_saved_validated_query_validates_the_answer(env):
+    env.tools.append({"tool_name": "save_validated_query", "result": "Saved query 'wins_2019' to knowledge base."})
+    _ask(env, "Who won the most races in 2019?", stream=True)
+    assert _ask(env, "Which driver won the most races in 2019").headers["x-answer-cache"] == "hit"
+    assert len(env.runs) == 1
+
+
+def test_failed_save_does_not_validate(env):
+    env.tools.append({"tool_name": "save_validated_query", "result": "Error: Only SELECT queries can be saved."})
+    _ask(env, "Who won the most races in 2019?")
+    _ask(env, "Who won the most races in 2019?")
+    assert len(env.runs) == 2
+
+
+def test_approval_is_limited_to_the_answers_scope(env):
+    run_id = _ask(env, "Who won the most races in 2019?", user="u1").json()["run_id"]
+    assert _approve(env, run_id, user="u2").status_code == 404
+    assert _approve(env, "unknown").status_code == 404
+    _ask(env, "Who won the most races in 2019?", user="u1")
+    assert len(env.runs) == 2
+
+
+def test_unrelated_question_runs_agent(env):
+    _approve(env, _ask(env, "Who won the most races in 2019?").json()["run_id"])
+    _ask(env, "How many laps is Monaco?")
+    assert len(env.runs) == 2
+
+
+def test_streamed_hit_is_sse(env):
+    _approve(env, _ask(env, "Who won the most races in 2019?").json()["run_id"])
+    hit = _ask(env, "Which driver won the most races in 2019", stream=True)
+    assert hit.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in hit.text.strip().split("\n\n")]
+    assert events == ["event: RunStarted", "event: RunContent", "event: RunCompleted"]
+    completed = json.loads(hit.text.strip().split("\n\n")[-1].split("data: ", 1)[1])
+    assert completed["content"] == "Answer #1: Lewis Hamilton"
+    assert completed["metadata"]["answer_cache"]["hit"] is True
+    assert len(env.runs) == 1
+
+
+def test_hit_is_saved_as_a_run_of_the_session(env):
+    _approve(env, _ask(env, "Who won the most races in 2019?").json()["run_id"])
+    hit = _ask(env, "Which driver won the most races in 2019", session_id="s1").json()
+
+    session = env.db.sessions["s1"]
+    assert [run.run_id for run in session.runs] == [hit["run_id"]]
+    assert session.runs[0].content == "Answer #1: Lewis Hamilton"
+    assert [m.role for m in session.runs[0].messages] == ["user", "assistant"]
+    assert session.user_id == "u1" and session.agent_id == "knowledge-agent"
+
+    # The follow-up has history now, so it goes to the agent
+    _ask(env, "And in 2020?", session_id="s1")
+    assert env.runs == ["Who won the most races in 2019?", "And in 2020?"]
+
+
+def test_follow_ups_bypass_cache(env):
+    _approve(env, _ask(env, "Who won the most races in 2019?").json()["run_id"])
+    _ask(env, "How many laps is Monaco?", session_id="s2")
+    response = _ask(env, "Which driver won the most races in 2019", session_id="s2")
+    assert "x-answer-cache" not in response.headers
+    assert len(env.runs) == 3 and len(env.cache.rows) == 2  # only the first turn of s2 was stored
+
+
+def test_scope_isolation(env):
+    env.tools.append({"tool_name": "save_validated_query", "result": "Saved"})
+    _ask(env, "Who won the most races in 2019?", user="u1")
+    _ask(env, "Who won the most races in 2019?", user="u2")
+    _ask(env, "Who won the most races in 2019?", user="u1", scopes="agents:read,admin")
+    assert len(env.runs) == 3
+
+
+def test_role_scope_mode_shares_between_users():
+    assert scope_key("a", "u1", ["x", "y"], "role") == scope_key("a", "u2", ["y", "x"], "role")
+    assert scope_key("a", "u1", ["x"], "role") != scope_key("a", "u1", ["x", "y"], "role")
+    assert scope_key("a", "u1", ["x"]) != scope_key("a", "u2", ["x"])
+
+
+def test_knowledge_version_change_invalidates(env):
+    _approve(env, _ask(env, "Who won the most races in 2019?").json()["run_id"])
+    env.versions["ai.f1_docs"] = (10, 4)
+    _ask(env, "Who won the most races in 2019?")
+    assert len(env.runs) == 2
+
+
+def test_sql_table_version_change_invalidates(env):
+    stamp = [(("race_wins", 1, 0),)]
+    tools = CachedPostgresTools(db_name="ai", include_tools=["run_query"])
+    tools._query_cache = SimpleNamespace(schema="public", schema_stamp=lambda: stamp[0])  # type: ignore[assignment]
+    env.agent.tools = [tools]
+
+    _approve(env, _ask(env, "Who won the most races in 2019?").json()["run_id"])
+    assert env.cache.rows[0]["versions"]["public.race_wins"] == (1, 0)
+    _ask(env, "Who won the most races in 2019?")
+    assert len(env.runs) == 1
+    stamp[0] = (("race_wins", 1, 1),)
+    _ask(env, "Who won the most races in 2019?")
+    assert len(env.runs) == 2
+
+    # Tables that cannot be versioned turn the cache off
+    stamp[0] = None
+    assert sql_table_versions(env.agent) is None
+    assert "x-answer-cache" not in _ask(env, "Who won the most races in 2019?").headers
+
+
+def test_sql_tools_without_query_cache_bypass(env):
+    env.agent.tools = [PostgresTools(db_name="ai", include_tools=["run_query"])]
+    response = _ask(env, "Who won the most races in 2019?")
+    assert "x-answer-cache" not in response.headers
+    assert env.cache.rows == []
+
+
+def test_failed_runs_are_not_cached(env):
+    env.status["value"] = "ERROR"
+    _ask(env, "Who won the most races in 2019?")
+    _ask(env, "Who won the most races in 2019?", stream=True)
+    assert env.cache.rows == []
+
+
+def test_other_agents_bypass_cache(env):
+    response = _ask(env, "Who won the most races in 2019?", agent="web-search-agent")
+    assert "x-answer-cache" not in response.headers
+    assert env.cache.rows == []
+
+
+def test_completed_run_parsing():
+    run = completed_run(b'{"status":"COMPLETED","content":"hi","run_id":"r"}', streamed=False)
+    assert run is not None and (run.run_id, run.answer, run.validated) == ("r", "hi", False)
+    assert completed_run(b'{"status":"PAUSED","content":"hi"}', streamed=False) is None
+    sse = b'event: RunContent\ndata: {"content":"h"}\n\nevent: RunCompleted\ndata: {"content":"hi","run_id":"r"}\n\n'
+    run = completed_run(sse, streamed=True)
+    assert run is not None and (run.run_id, run.answer, run.validated) == ("r", "hi", False)
+    saved = b'event: ToolCallCompleted\ndata: {"tool":{"tool_name":"save_validated_query","result":"Saved"}}\n\n'
+    run = completed_run(saved + sse, streamed=True)
+    assert run is not None and run.validated
+    failed = b'event: ToolCallCompleted\ndata: {"tool":{"tool_name":"save_validated_query","tool_call_error":true}}\n\n'
+    run = completed_run(failed + sse, streamed=True)
+    assert run is not None and not run.validated
+    assert completed_run(b"event: RunPaused\ndata: {}\n\n" + sse, streamed=True) is None
+    assert completed_run(b"not json", streamed=False) is None
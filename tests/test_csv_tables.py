@@ -0,0 +1,205 @@
+"""Tests for table-aware CSV ingestion (profiling, COPY SQL, and sync with fakes, no database)."""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+from fakes import SyncHarness
+
+from backend.knowledge.csv_tables import (
+    CsvTable,
+    column_names,
+    copy_sql,
+    create_table_sql,
+    profile_csv,
+    sync_csv_tables,
+    table_name_for,
+    table_summary,
+)
+
+
+def _write(path, text, encoding="utf-8"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(text.encode(encoding))
+    return path
+
+
+def test_profile_infers_narrowest_types(tmp_path):
+    path = _write(
+        tmp_path / "orders.csv",
+        "Order ID,Price,Active,Day,Created At,ZIP,Note,Empty\n"
+        "1,9.5,true,2024-01-31,2024-01-31T10:00:00Z,00501,a,\n"
+        "2,10,no,2024-02-01,2024-02-01 11:30:00+01:00,10001,2,\n"
+        '-3,,F,,2024-02-02,94105,"x, y",\n',
+    )
+    profile = profile_csv(path, sample_rows=2)
+    types = {column.name: column.type for column in profile.columns}
+    assert types == {
+        "order_id": "bigint",
+        "price": "double precision",
+        "active": "boolean",
+        "day": "date",
+        "created_at": "timestamptz",
+        # Leading zeros would be lost as a number
+        "zip": "text",
+        "note": "text",
+        "empty": "text",
+    }
+    assert profile.row_count == 3
+    assert profile.sample_rows == [
+        ["1", "9.5", "true", "2024-01-31", "2024-01-31T10:00:00Z", "00501", "a", ""],
+        ["2", "10", "no", "2024-02-01", "2024-02-01 11:30:00+01:00", "10001", "2", ""],
+    ]
+    assert profile.columns[0].header == "Order ID"
+
+
+def test_profile_whitespace_and_invalid_values_fall_back_to_text(tmp_path):
+    path = _write(tmp_path / "t.csv", "a,b,c\n1, ,2024-02-30\n2,3,2024-01-01\n")
+    assert [column.type for column in profile_csv(path).columns] == ["bigint", "text", "text"]
+
+
+def test_profile_sniffs_delimiter_and_falls_back_to_latin1(tmp_path):
+    path = _write(tmp_path / "eu.csv", "ville;habitants\nMontréal;1762949\nQuébec;549459\n", encoding="latin-1")
+    profile = profile_csv(path)
+    assert (profile.delimiter, profile.encoding) == (";", "latin-1")
+    assert [(c.name, c.type) for c in profile.columns] == [("ville", "text"), ("habitants", "bigint")]
+    assert profile.sample_rows[0][0] == "Montréal"
+
+
+def test_profile_rejects_ragged_rows(tmp_path):
+    path = _write(tmp_path / "bad.csv", "a,b\n1,2\n3\n")
+    with pytest.raises(ValueError, match="line 3: 1 fields, expected 2"):
+        profile_csv(path)
+
+
+def test_identifiers_for_tables_and_columns():
+    assert table_name_for("Sales Report (2024).csv") == "sales_report_2024"
+    assert table_name_for("exports/2024/q1.csv") == "exports_2024_q1"
+    assert table_name_for("2024-q1.csv") == "t_2024_q1"
+    assert table_name_for("---.csv") == "table"
+    assert column_names(["Name", "name", "", "2020", "Name"]) == ["name", "name_2", "column_3", "c_2020", "name_3"]
+    assert len(table_name_for("x" * 200 + ".csv")) == 50
+
+
+def test_copy_sql_streams_raw_csv_with_null_handling(tmp_path):
+    path = _write(tmp_path / "t.csv", "id\tlabel\n1\ta\n")
+    profile = profile_csv(path)
+    assert profile.delimiter == "\t"
+    assert create_table_sql("public", "t__loading", profile.columns) == (
+        'CREATE TABLE "public"."t__loading" ("id" bigint, "label" text)'
+    )
+    assert copy_sql("public", "t__loading", profile) == (
+        'COPY "public"."t__loading" ("id", "label") FROM STDIN WITH (FORMAT csv, HEADER true, '
+        "DELIMITER E'\\t', NULL '', ENCODING 'UTF8', FORCE_NULL (\"id\"))"
+    )
+
+
+def test_summary_names_table_columns_and_samples(tmp_path):
+    path = _write(tmp_path / "laps.csv", "driver,lap time\nHamilton,1:21.046\nVer|stappen,1:21.5\n")
+    table = CsvTable("public", "laps", "laps.csv", "abc", profile_csv(path))
+    summary = table_summary(table)
+    assert summary.startswith("# CSV table public.laps")
+    assert "`laps.csv` is loaded into the Postgres table `public.laps` (2 rows, 2 columns)" in summary
+    assert "| lap_time | text | lap time |" in summary
+    assert "| Ver\\|stappen | 1:21.5 |" in summary
+
+
+class _Harness(SyncHarness):
+    def __init__(self, root):
+        super().__init__(root, namespace="docs:csv_tables", tables=("docs", "data"))
+        self.loaded: list[str] = []
+        self.dropped: list[str] = []
+
+    def load(self, engine, path, source, content_hash):
+        if "broken" in source:
+            raise ValueError("bad file")
+        self.loaded.append(source)
+        return CsvTable("public", table_name_for(source), source, content_hash, profile_csv(path))
+
+    def drop(self, engine, source):
+        self.dropped.append(source)
+
+    def sync(self):
+        files = sorted(self.root.glob("*.csv"))
+        return asyncio.run(
+            sync_csv_tables(
+                self.vector_dbs["docs"],
+                self.root,
+                files,
+                data_vector_db=self.vector_dbs["data"],
+                engine=SimpleNamespace(),  # type: ignore[arg-type]
+                manifest=self.manifest,
+                load=self.load,
+                drop=self.drop,
+                delete=self.delete,
+                upsert=self.upsert,
+            )
+        )
+
+
+def test_sync_loads_changed_files_and_drops_removed_ones(tmp_path):
+    harness = _Harness(tmp_path)
+    sales = _write(tmp_path / "sales.csv", "region,total\neu,10\n")
+    _write(tmp_path / "stock.csv", "sku,qty\na,1\n")
+
+    plan, tables = harness.sync()
+    assert plan.added == ["sales.csv", "stock.csv"]
+    assert [table.name for table in tables] == ["sales", "stock"]
+    # One summary per file in each knowledge base, not one chunk per row
+    for name in ("docs", "data"):
+        rows = list(harness.rows[name].values())
+        assert sorted(row["name"] for row in rows) == ["sales.csv", "stock.csv"]
+        assert all(row["meta_data"]["type"] == "csv_table" for row in rows)
+    assert {row["meta_data"]["table"] for row in harness.rows["data"].values()} == {"public.sales", "public.stock"}
+
+    plan, tables = harness.sync()
+    assert plan.is_noop and tables == []
+    assert harness.loaded == ["sales.csv", "stock.csv"]
+
+    _write(sales, "region,total\neu,10\nus,20\n")
+    os.utime(sales, (1, 1))
+    (tmp_path / "stock.csv").unlink()
+    plan, tables = harness.sync()
+    assert (plan.changed, plan.removed) == (["sales.csv"], ["stock.csv"])
+    assert harness.loaded[-1] == "sales.csv" and harness.dropped == ["stock.csv"]
+    for name in ("docs", "data"):
+        (row,) = harness.rows[name].values()
+        assert "(2 rows, 2 columns)" in row["content"]
+    assert set(harness.manifest.entries) == {"sales.csv"}
+
+
+def test_failed_load_is_retried_next_sync(tmp_path):
+    harness = _Harness(tmp_path)
+    _write(tmp_path / "broken.csv", "a\n1\n")
+    _write(tmp_path / "ok.csv", "a\n1\n")
+
+    _, tables = harness.sync()
+    assert [table.source for table in tables] == ["ok.csv"]
+    assert set(harness.manifest.entries) == {"ok.csv"}
+    plan, _ = harness.sync()
+    assert plan.added == ["broken.csv"]
+
+
+def test_failed_update_keeps_old_summary(tmp_path):
+    harness = _Harness(tmp_path)
+    sales = _write(tmp_path / "sales.csv", "region,total\neu,10\n")
+    harness.sync()
+    old_entry = harness.manifest.entries["sales.csv"]
+
+    _write(sales, "region,total\neu,10\nus,20\n")
+    os.utime(sales, (1, 1))
+    harness.embedder.fail = True
+    _, tables = harness.sync()
+    assert tables == []
+    for name in ("docs", "data"):
+        (row,) = harness.rows[name].values()
+        assert "(1 rows, 2 columns)" in row["content"]
+    assert harness.manifest.entries["sales.csv"] == old_entry
+
+    harness.embedder.fail = False
+    plan, _ = harness.sync()
+    assert plan.changed == ["sales.csv"]
+    for name in ("docs", "data"):
+        (row,) = harness.rows[name].values()
+        assert "(2 rows, 2 columns)" in row["content"]
@@ -0,0 +1,65 @@
+"""Tests for the content-addressed embedding cache (LRU layer; Postgres layer disabled)."""
+
+import asyncio
+
+from fakes import FakeEmbedder
+
+from backend.db.embedding_cache import CachedEmbedder, EmbeddingCache, content_hash
+
+
+def _embedder(**cache_kwargs):
+    inner = FakeEmbedder()
+    return inner, CachedEmbedder(inner=inner, cache=EmbeddingCache(persist=False, **cache_kwargs))
+
+
+def test_wrapper_mirrors_inner_settings():
+    inner, embedder = _embedder()
+    assert embedder.id == "fake-model"
+    assert embedder.dimensions == 3
+    assert embedder.enable_batch is True
+
+
+def test_sync_embedding_cached_by_content():
+    inner, embedder = _embedder()
+    first = embedder.get_embedding("hello")
+    second = embedder.get_embedding("hello")
+    assert first == second
+    assert inner.calls == [["hello"]]
+
+
+def test_batch_only_embeds_misses_once():
+    inner, embedder = _embedder()
+    embedder.get_embedding("a")
+    inner.calls.clear()
+
+    embeddings, usages = asyncio.run(embedder.async_get_embeddings_batch_and_usage(["a", "bb", "bb", "ccc"]))
+    assert inner.calls == [["bb", "ccc"]]
+    assert [e[0] for e in embeddings] == [1.0, 2.0, 2.0, 3.0]
+    assert usages[0] is None  # served from cache
+
+    # Re-ingesting the same corpus makes zero embedding calls
+    inner.calls.clear()
+    asyncio.run(embedder.async_get_embeddings_batch_and_usage(["a", "bb", "ccc"]))
+    assert inner.calls == []
+
+
+def test_failed_embeddings_not_cached():
+    inner, embedder = _embedder()
+    inner.empty = True
+    assert embedder.get_embedding("x") == []
+    inner.empty = False
+    assert embedder.get_embedding("x") == [1.0, 0.0, 1.0]
+
+
+def test_key_includes_model_and_dimensions():
+    cache = EmbeddingCache(persist=False)
+    cache.put_many({("m1", 3, content_hash("t")): [1.0, 2.0, 3.0]})
+    assert cache.get_many([("m2", 3, content_hash("t"))]) == {}
+    assert cache.get_many([("m1", 4, content_hash("t"))]) == {}
+    assert cache.get_many([("m1", 3, content_hash("t"))]) == {("m1", 3, content_hash("t")): [1.0, 2.0, 3.0]}
+
+
+def test_lru_bounded():
+    cache = EmbeddingCache(persist=False, lru_size=2)
+    cache.put_many({("m", 1, "a"): [1.0], ("m", 1, "b"): [2.0], ("m", 1, "c"): [3.0]})
+    assert cache.get_many([("m", 1, "a")]) == {}
@@ -0,0 +1,90 @@
+"""Tests for the documents directory inverted index and memory-mapped chunk reads."""
+
+import json
+import os
+
+import pytest
+from agno.tools.file import FileTools
+
+import backend.knowledge.file_index as file_index
+from backend.knowledge.file_index import FileIndex, read_lines
+from backend.tools.documents import DocumentTools
+
+
+@pytest.fixture
+def docs(tmp_path):
+    base = tmp_path / "docs"
+    (base / "guides").mkdir(parents=True)
+    (base / "guides" / "pooling.md").write_text(
+        "# Connection pooling\n\nSet pool_size for the reporting database.\nPool timeouts default to 30s.\n"
+    )
+    (base / "vacuum.txt").write_text("Run VACUUM ANALYZE after bulk loads.\nThe database needs it.\n")
+    (base / "manual.pdf").write_bytes(b"%PDF-1.7\x00\x01binary pool")
+    (base / ".hidden.md").write_text("pool pool pool")
+    return base, FileIndex(base, tmp_path / "index.sqlite", refresh_seconds=0)
+
+
+def test_search_ranks_files_and_returns_line_numbers(docs):
+    _, index = docs
+
+    matches = index.search("pool database")
+
+    assert [match.path for match in matches] == ["guides/pooling.md", "vacuum.txt"]
+    assert matches[0].lines == [2, 3]
+    assert matches[1].lines == [1]
+    assert matches[0].score > matches[1].score
+    assert index.search("   ") == []
+    assert index.search("kubernetes") == []
+
+
+def test_refresh_is_incremental(docs, monkeypatch):
+    base, index = docs
+    assert index.refresh().indexed == 2  # The PDF is recorded without postings, the hidden file ignored
+
+    read = []
+    original = file_index._read_bytes
+    monkeypatch.setattr(file_index, "_read_bytes", lambda path, size: read.append(path.name) or original(path, size))
+
+    (base / "vacuum.txt").write_text("Autovacuum tuning notes.\n")
+    os.utime(base / "vacuum.txt", ns=(1, 1))
+    (base / "guides" / "pooling.md").unlink()
+    (base / "guides" / "replicas.md").write_text("Read replicas lag behind the primary.\n")
+
+    stats = index.refresh()
+
+    assert (stats.indexed, stats.removed, stats.unchanged) == (2, 1, 1)
+    assert sorted(read) == ["replicas.md", "vacuum.txt"]
+    assert sorted(match.path for match in index.search("autovacuum replicas")) == ["guides/replicas.md", "vacuum.txt"]
+    assert index.search("pooling") == []
+
+
+@pytest.mark.parametrize("start,end", [(0, 0), (0, 2), (3, 7), (6, 9), (9, 12), (11, 20), (12, 12), (0, 50)])
+def test_read_lines_matches_split_semantics(tmp_path, monkeypatch, start, end):
+    monkeypatch.setattr(file_index, "LINE_CHECKPOINT", 4)
+    path = tmp_path / "lines.txt"
+    text = "\n".join(f"line {i} é" for i in range(12)) + "\n"
+    path.write_text(text)
+    index = FileIndex(tmp_path, tmp_path / "index.sqlite")
+    index.refresh()
+    stat = path.stat()
+
+    checkpoint = index.checkpoint("lines.txt", start, stat.st_mtime_ns, stat.st_size)
+
+    assert checkpoint[0] == min(start // 4, 3) * 4
+    expected = "\n".join(text.split("\n")[start : end + 1])
+    assert read_lines(path, start, end, start=checkpoint) == expected
+    assert read_lines(path, start, end) == expected
+
+
+def test_document_tools_search_and_chunk_reads(docs):
+    base, index = docs
+    tools = DocumentTools(base_dir=base, index_path=index.index_path, enable_save_file=False)
+
+    assert "search_documents" in tools.functions
+    result = json.loads(tools.search_documents("vacuum"))
+    assert result["files"] == [{"file": "vacuum.txt", "score": result["files"][0]["score"], "lines": [0]}]
+
+    plain = FileTools(base_dir=base)
+    assert tools.read_file_chunk("guides/pooling.md", 1, 3) == plain.read_file_chunk("guides/pooling.md", 1, 3)
+    assert tools.read_file_chunk("../outside.txt", 0, 1) == "Error reading file"
+    assert tools.search_documents("") == "Error: Query cannot be empty"
@@ -0,0 +1,149 @@
+"""Tests for indexed full-text search on knowledge tables (statements compiled, no database)."""
+
+from types import SimpleNamespace
+
+import pytest
+from fakes import FakeEmbedder, RecordingSession
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+import backend.db.full_text as full_text
+from backend.db.full_text import FullTextPgVector, full_text_statements, tsv_expression
+from backend.db.vector_index import vector_index_config
+
+
+def _vector_db(config="english", storage="full"):
+    vector_db = FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai",
+        table_name="docs",
+        embedder=FakeEmbedder(),
+        vector_index=vector_index_config("hnsw", ef_search=40),
+        content_language=config,
+        vector_storage=storage,
+    )
+    vector_db._table_ready = True  # the table exists with its content_tsv column
+    executed: list[str] = []
+    vector_db.Session = lambda: RecordingSession(executed)  # type: ignore[assignment]
+    return vector_db, executed
+
+
+def test_table_has_generated_tsvector_and_gin_index():
+    vector_db, _ = _vector_db("simple")
+    dialect = postgresql.dialect()
+    ddl = str(CreateTable(vector_db.table).compile(dialect=dialect))
+    assert "content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple'::regconfig" in ddl
+    assert "STORED" in ddl
+    indexes = [str(CreateIndex(index).compile(dialect=dialect)) for index in vector_db.table.indexes]
+    assert "CREATE INDEX docs_content_tsv_index ON ai.docs USING gin (content_tsv)" in indexes
+
+
+def test_invalid_text_search_config_rejected():
+    with pytest.raises(ValueError, match="Invalid text search config"):
+        tsv_expression("english'; DROP TABLE x; --")
+
+
+def test_keyword_search_matches_through_stored_column():
+    vector_db, executed = _vector_db()
+    assert vector_db.keyword_search("connection pool", limit=3) == []
+    (sql,) = executed
+    assert "content_tsv @@ websearch_to_tsquery" in sql
+    assert "ts_rank_cd(ai.docs.content_tsv" in sql
+    assert "to_tsvector" not in sql
+
+
+def test_hybrid_search_scores_only_index_candidates():
+    vector_db, executed = _vector_db()
+    assert vector_db.hybrid_search("connection pool", limit=5, filters={"type": "pdf"}) == []
+    set_ef, sql = executed
+    # ef_search is widened so HNSW can return every vector candidate
+    assert set_ef == "SET LOCAL hnsw.ef_search = 40"
+    assert "UNION" in sql
+    assert "ORDER BY ai.docs.embedding <=>" in sql
+    assert "content_tsv @@ websearch_to_tsquery" in sql
+    assert sql.count("meta_data @>") == 2
+    assert "to_tsvector" not in sql
+
+
+def test_hybrid_search_widens_ef_search_for_large_limits():
+    vector_db, executed = _vector_db()
+    vector_db.hybrid_search("pool", limit=50)
+    assert executed[0] == "SET LOCAL hnsw.ef_search = 200"
+
+
+def _existing_table_without_tsv(monkeypatch, migrate):
+    vector_db, executed = _vector_db()
+    vector_db._table_ready = False
+    monkeypatch.setattr(vector_db, "exists", lambda: True)
+    monkeypatch.setattr(vector_db, "check_dimensions", lambda: None)
+    monkeypatch.setattr(full_text, "tsv_column_expression", lambda db: None)
+    monkeypatch.setattr(full_text, "migrate_full_text", migrate)
+    return vector_db, executed
+
+
+def test_existing_table_without_tsv_column_is_migrated_on_first_use(monkeypatch):
+    migrated: list[str] = []
+    vector_db, executed = _existing_table_without_tsv(monkeypatch, lambda db: migrated.append(db.table_name))
+    vector_db.keyword_search("pool")
+    vector_db.keyword_search("pool")
+    assert migrated == ["docs"]
+    assert all("content_tsv @@" in sql for sql in executed)
+
+
+def test_search_falls_back_to_query_time_tsvector_when_migration_fails(monkeypatch):
+    def migrate(db):
+        raise PermissionError("must be owner of table docs")
+
+    vector_db, executed = _existing_table_without_tsv(monkeypatch, migrate)
+    vector_db.keyword_search("pool")
+    vector_db.hybrid_search("pool")
+    selects = [sql for sql in executed if sql.startswith("SELECT")]
+    assert len(selects) == 2
+    assert all("to_tsvector" in sql and "content_tsv" not in sql for sql in selects)
+
+
+def test_full_text_migration_plans():
+    vector_db = SimpleNamespace(schema="ai", table_name="docs", content_language="english")
+    current = "to_tsvector('english'::regconfig, COALESCE(content, ''::text))"
+
+    action, statements = full_text_statements(vector_db, None, None)
+    assert action == "created"
+    assert statements[0].startswith('ALTER TABLE "ai"."docs" ADD COLUMN content_tsv tsvector GENERATED ALWAYS')
+    assert statements[1] == (
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS "docs_content_tsv_index" ON "ai"."docs" USING gin (content_tsv)'
+    )
+
+    assert full_text_statements(vector_db, current, True) == ("exists", [])
+    assert full_text_statements(vector_db, current, None)[1] == statements[1:]
+
+    action, statements = full_text_statements(vector_db, current, False)
+    assert action == "rebuilt" and statements[0].startswith("DROP INDEX CONCURRENTLY")
+
+    # Config changed: column is re-created (its index goes with it)
+    vector_db.content_language = "simple"
+    action, statements = full_text_statements(vector_db, current, True)
+    assert action == "rebuilt"
+    assert "DROP COLUMN content_tsv, ADD COLUMN content_tsv" in statements[0]
+    assert "'simple'::regconfig" in statements[0]
+
+
+def test_quantized_vector_search_rescores_at_full_precision():
+    vector_db, executed = _vector_db(storage="halfvec")
+    vector_db.vector_search("pool", limit=5)
+    set_ef, sql = executed
+    assert set_ef == "SET LOCAL hnsw.ef_search = 40"
+    # Candidates come from the halfvec expression index, then re-rank on the float32 column
+    assert "ORDER BY CAST(ai.docs.embedding AS HALFVEC(3)) <=>" in sql
+    assert "ORDER BY ai.docs.embedding <=> %(embedding_1)s" in sql
+
+
+def test_binary_hybrid_search_uses_hamming_candidates():
+    vector_db, executed = _vector_db(storage="binary")
+    vector_db.hybrid_search("pool", limit=5)
+    sql = executed[1]
+    assert "CAST(binary_quantize(ai.docs.embedding) AS BIT(3)) <~> CAST(binary_quantize(" in sql
+    assert "(ai.docs.embedding <=> %(embedding_1)s)" in sql
+
+
+def test_unknown_vector_storage_rejected():
+    with pytest.raises(ValueError, match="Unknown vector storage"):
+        _vector_db(storage="int4")
@@ -5,6 +5,7 @@ from __future__ import annotations
 import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import jwt as pyjwt
 import pytest
 
@@ -13,7 +14,7 @@ from backend.mcp.gateway_client import GatewayClient
 
 def _run(coro):
     """Helper to run async code in sync tests."""
-    return asyncio.get_event_loop().run_until_complete(coro)
+    return asyncio.run(coro)
 
 
 @pytest.fixture
@@ -310,6 +311,31 @@ class TestImportExport:
             assert kwargs["params"]["tags"] == "ml"
             assert kwargs["params"]["include_inactive"] == "true"
 
+    def test_stream_export_config_returns_unread_response(self, client):
+        """Streaming export sends with stream=True and leaves the body for the caller."""
+        upstream = MagicMock(is_error=False)
+        with patch.object(client._http, "send", new_callable=AsyncMock) as mock_send:
+            mock_send.return_value = upstream
+            result = _run(client.stream_export_config(types="tools", include_inactive=True))
+            assert result is upstream
+            request = mock_send.call_args.args[0]
+            assert request.url.params["types"] == "tools"
+            assert request.url.params["include_inactive"] == "true"
+            assert mock_send.call_args.kwargs["stream"] is True
+            upstream.aclose.assert_not_called()
+
+    def test_stream_export_config_closes_and_raises_on_error(self, client):
+        upstream = MagicMock(is_error=True, aread=AsyncMock(), aclose=AsyncMock())
+        upstream.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "boom", request=MagicMock(), response=MagicMock(status_code=500)
+        )
+        with patch.object(client._http, "send", new_callable=AsyncMock) as mock_send:
+            mock_send.return_value = upstream
+            with pytest.raises(httpx.HTTPStatusError):
+                _run(client.stream_export_config())
+            upstream.aread.assert_awaited_once()
+            upstream.aclose.assert_awaited_once()
+
 
 # ── Health ────────────────────────────────────────────────────────────
 
@@ -327,3 +353,128 @@ class TestHealth:
             assert result["status"] == "ok"
             _, kwargs = mock_get.call_args
             assert "headers" not in kwargs
+
+
+# ── Circuit Breaker ───────────────────────────────────────────────────
+
+
+class TestCircuitBreaker:
+    @staticmethod
+    def _client(handler, **kwargs):
+        return GatewayClient(
+            base_url="http://localhost:4444",
+            jwt_secret="test-secret",
+            transport=httpx.MockTransport(handler),
+            **kwargs,
+        )
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        calls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            raise httpx.ConnectError("refused", request=request)
+
+        client = self._client(handler, failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                _run(client.list_tools())
+        assert client.circuit_open
+        assert len(calls) == 3
+
+        from backend.mcp.circuit_breaker import GatewayUnavailableError
+
+        with pytest.raises(GatewayUnavailableError):
+            _run(client.list_tools())
+        assert len(calls) == 3  # failed fast, gateway not contacted
+
+    def test_5xx_counts_as_failure_4xx_does_not(self):
+        status = {"code": 404}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(status["code"], json={"detail": "x"})
+
+        client = self._client(handler, failure_threshold=2)
+        for _ in range(3):
+            _run(client.get_tool("t-1"))
+        assert client.circuit_state()["state"] == "closed"
+
+        status["code"] = 503
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                _run(client.get_tool("t-1"))
+        assert client.circuit_state()["state"] == "open"
+
+    def test_half_open_probe_uses_health_and_closes(self):
+        from backend.mcp.circuit_breaker import CircuitBreaker
+
+        now = {"t": 0.0}
+        healthy = {"ok": False}
+        paths: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            paths.append(request.url.path)
+            if not healthy["ok"]:
+                raise httpx.ConnectError("refused", request=request)
+            if request.url.path == "/health":
+                return httpx.Response(200, json={"status": "healthy"})
+            return httpx.Response(200, json=[])
+
+        client = self._client(handler, failure_threshold=1, reset_timeout=10)
+        client._breaker = breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now["t"])
+        client._http._transport._breaker = breaker
+
+        with pytest.raises(httpx.ConnectError):
+            _run(client.list_tools())
+        assert breaker.state == "open"
+
+        now["t"] = 11.0  # cooldown elapsed -> half-open
+        healthy["ok"] = True
+        paths.clear()
+        assert _run(client.list_tools()) == []
+        assert paths == ["/health", "/tools"]
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens_circuit(self):
+        from backend.mcp.circuit_breaker import CircuitBreaker, GatewayUnavailableError
+
+        now = {"t": 0.0}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        client = self._client(handler)
+        client._http._transport._breaker = breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now["t"]
+        )
+        with pytest.raises(httpx.ConnectError):
+            _run(client.list_tools())
+        now["t"] = 11.0
+        with pytest.raises(GatewayUnavailableError):
+            _run(client.list_tools())
+        assert breaker.state == "open"
+        assert breaker.retry_after() == 10
+
+    def test_adaptive_timeout_tightens_to_observed_latency(self):
+        from backend.mcp.circuit_breaker import AdaptiveTimeouts
+
+        timeouts = AdaptiveTimeouts(ceilings={"GET /export": 120.0}, default=30.0, floor=2.0, min_samples=5)
+        assert timeouts.timeout_for("GET /tools") == 30.0
+        for _ in range(10):
+            timeouts.observe("GET /tools", 0.5)
+            timeouts.observe("GET /export", 60.0)
+        assert timeouts.timeout_for("GET /tools") == 2.0  # 3 * 0.5 clamped to floor
+        assert timeouts.timeout_for("GET /export") == 120.0  # never exceeds ceiling
+
+    def test_request_timeout_set_per_operation(self):
+        seen: dict[str, float] = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen[request.url.path] = request.extensions["timeout"]["read"]
+            return httpx.Response(200, json={})
+
+        client = self._client(handler)
+        _run(client.export_config())
+        _run(client.health())
+        assert seen["/export"] == 120.0
+        assert seen["/health"] == 5.0
@@ -0,0 +1,188 @@
+"""Tests for the staged knowledge ingestion pipeline (no database or embedding API)."""
+
+import asyncio
+import tracemalloc
+from types import SimpleNamespace
+
+from fakes import FakeEmbedder
+
+from backend.knowledge.pipeline import IngestProgress, ingest_files, iter_pdf_pages, parse_file
+
+
+def _write_csvs(tmp_path, count, rows=3):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"file_{i}.csv"
+        lines = ["name,value"] + [f"row{i}_{r},{r}" for r in range(rows)]
+        path.write_text("\n".join(lines) + "\n")
+        paths.append(path)
+    return paths
+
+
+def _run(paths, **kwargs):
+    embedder = FakeEmbedder()
+    vector_db = SimpleNamespace(embedder=embedder)
+    upserts: list[list[dict]] = []
+
+    def upsert(db, records):
+        upserts.append(records)
+        return len(records)
+
+    progress = asyncio.run(ingest_files(vector_db, paths, upsert=upsert, on_progress=None, **kwargs))
+    return progress, embedder, upserts
+
+
+def test_parse_file_chunks_carry_source_and_hash(tmp_path):
+    (path,) = _write_csvs(tmp_path, 1)
+    chunks = parse_file(str(path))
+    assert chunks
+    assert {c.source for c in chunks} == {"file_0.csv"}
+    assert len({c.content_hash for c in chunks}) == 1
+    assert chunks[0].meta_data["source"] == "file_0.csv"
+
+
+def test_pipeline_batches_embeddings_and_inserts(tmp_path):
+    paths = _write_csvs(tmp_path, 6)
+    progress, embedder, upserts = _run(paths, parse_workers=0, embed_batch_size=4, insert_batch_size=10)
+
+    assert progress.files_parsed == 6
+    assert progress.files_failed == 0
+    assert progress.chunks_embedded == progress.chunks_parsed
+    assert progress.chunks_inserted == progress.chunks_parsed
+    assert all(len(batch) <= 4 for batch in embedder.calls)
+    assert len(embedder.texts) == progress.chunks_parsed
+    # Bulk writes, not one insert per chunk
+    assert len(upserts) < progress.chunks_parsed
+    assert {r["name"] for batch in upserts for r in batch} == {p.name for p in paths}
+
+
+def test_pipeline_uses_process_pool(tmp_path):
+    paths = _write_csvs(tmp_path, 3)
+    progress, _, _ = _run(paths, parse_workers=2)
+    assert progress.files_parsed == 3
+    assert progress.chunks_inserted == progress.chunks_parsed
+
+
+def test_failed_file_does_not_stop_pipeline(tmp_path):
+    paths = _write_csvs(tmp_path, 2)
+    bad = tmp_path / "missing.csv"  # vanished between listing and parsing
+    progress, _, _ = _run([*paths, bad], parse_workers=0)
+    assert progress.files_parsed == 2
+    assert progress.files_failed == 1
+
+
+def test_empty_embeddings_counted_as_failed(tmp_path):
+    paths = _write_csvs(tmp_path, 1)
+
+    vector_db = SimpleNamespace(embedder=FakeEmbedder(empty=True))
+    progress = asyncio.run(
+        ingest_files(vector_db, paths, parse_workers=0, upsert=lambda db, r: len(r), on_progress=None)
+    )
+    assert progress.chunks_inserted == 0
+    assert progress.chunks_failed == progress.chunks_parsed
+
+
+def test_progress_callback_reports(tmp_path):
+    paths = _write_csvs(tmp_path, 2)
+    seen: list[IngestProgress] = []
+    vector_db = SimpleNamespace(embedder=FakeEmbedder())
+    asyncio.run(ingest_files(vector_db, paths, parse_workers=0, upsert=lambda db, r: len(r), on_progress=seen.append))
+    assert seen
+    assert "files 2/2" in seen[-1].summary()
+
+
+def test_no_files_is_noop():
+    progress, embedder, upserts = _run([], parse_workers=0)
+    assert progress.files_total == 0
+    assert upserts == []
+
+
+def _write_pdf(path, pages, lines=1):
+    """Write a minimal text PDF with ``pages`` pages of ``lines`` lines each, without any PDF library."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for n in range(1, pages + 1):
+        text = " T* ".join(
+            f"(Page {n} line {i}: torque settings and maintenance intervals for unit {n}) Tj" for i in range(lines)
+        )
+        stream = f"BT /F1 10 Tf 12 TL 72 750 Td {text} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def test_pdf_streamed_in_page_windows(tmp_path):
+    path = _write_pdf(tmp_path / "manual.pdf", 10)
+    assert [n for n, _ in iter_pdf_pages(path, 3, 5)] == [4, 5]
+
+    progress, _, upserts = _run([path], parse_workers=0, pdf_pages_per_task=4)
+    assert progress.files_parsed == 1
+    assert progress.chunks_inserted == 10
+    records = [r for batch in upserts for r in batch]
+    assert sorted(r["meta_data"]["page"] for r in records) == list(range(1, 11))
+    # Page-based ids: identical across runs, so re-ingestion updates rows in place
+    _, _, again = _run([path], parse_workers=0, pdf_pages_per_task=4)
+    assert {r["id"] for r in records} == {r["id"] for batch in again for r in batch}
+    # Windows of one PDF are spread across worker processes
+    pooled, _, _ = _run([path], parse_workers=2, pdf_pages_per_task=4)
+    assert pooled.chunks_inserted == 10
+
+
+def _peak_ingest(path, pages_per_task):
+    """Ingest ``path`` and return (progress, peak traced bytes, max chunks held at once)."""
+    outstanding: list[int] = []
+
+    def on_progress(p):
+        outstanding.append(p.chunks_parsed - p.chunks_inserted - p.chunks_failed)
+
+    vector_db = SimpleNamespace(embedder=FakeEmbedder())
+    tracemalloc.start()
+    try:
+        progress = asyncio.run(
+            ingest_files(
+                vector_db,
+                [path],
+                parse_workers=0,
+                pdf_pages_per_task=pages_per_task,
+                embed_batch_size=16,
+                embed_concurrency=2,
+                insert_batch_size=16,
+                upsert=lambda db, records: len(records),
+                on_progress=on_progress,
+            )
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return progress, peak, max(outstanding)
+
+
+def test_large_pdf_ingested_with_bounded_memory(tmp_path):
+    small = _write_pdf(tmp_path / "small.pdf", 200)
+    large = _write_pdf(tmp_path / "large.pdf", 2000)
+    _peak_ingest(small, pages_per_task=20)  # Warm-up: imports are not ingestion memory
+
+    _, small_peak, _ = _peak_ingest(small, pages_per_task=20)
+    progress, large_peak, held = _peak_ingest(large, pages_per_task=20)
+    assert progress.files_parsed == 1
+    assert progress.chunks_inserted == 2000
+    # Chunks in memory at once are capped by in-flight windows plus queue capacity, not document size
+    assert held <= 2 * 20 + 16 * (2 * 2 * 2 + 2)
+    # 10x the pages must not mean anywhere near 10x the memory
+    assert large_peak < small_peak * 3
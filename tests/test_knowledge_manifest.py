@@ -0,0 +1,152 @@
+"""Tests for manifest-based incremental knowledge sync (in-memory manifest, no database)."""
+
+import asyncio
+import os
+
+from fakes import SyncHarness
+
+from backend.knowledge.manifest import SourceState, plan_sync, scan_sources, sync_directory
+
+
+class _Harness(SyncHarness):
+    def __init__(self, root):
+        super().__init__(root)
+        self.vector_db = self.vector_dbs["docs"]
+
+    def sync(self, dry_run=False):
+        files = sorted(p for p in self.root.rglob("*") if p.is_file())
+        return asyncio.run(
+            sync_directory(
+                self.vector_db,
+                self.root,
+                files,
+                manifest=self.manifest,
+                dry_run=dry_run,
+                delete=self.delete,
+                upsert=self.upsert,
+                parse_workers=0,
+                on_progress=None,
+            )
+        )
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_plan_classifies_changes():
+    previous = {
+        "same": SourceState(1, 1.0, "a"),
+        "touched": SourceState(1, 1.0, "b"),
+        "edited": SourceState(1, 1.0, "c"),
+        "gone": SourceState(1, 1.0, "d"),
+    }
+    current = {
+        "same": SourceState(1, 1.0, "a"),
+        "touched": SourceState(1, 2.0, "b"),
+        "edited": SourceState(2, 2.0, "x"),
+        "new": SourceState(1, 1.0, "e"),
+    }
+    plan = plan_sync(previous, current)
+    assert plan.added == ["new"]
+    assert plan.changed == ["edited"]
+    assert plan.touched == ["touched"]
+    assert plan.removed == ["gone"]
+    assert plan.unchanged == ["same"]
+
+
+def test_scan_skips_hashing_when_stat_matches(tmp_path):
+    path = _write(tmp_path / "a.sql", "select 1;")
+    stat = path.stat()
+    previous = {"a.sql": SourceState(stat.st_size, stat.st_mtime, "cached-hash")}
+    assert scan_sources([path], tmp_path, previous)["a.sql"].content_hash == "cached-hash"
+
+
+def test_sync_embeds_only_changes_and_deletes_in_place(tmp_path):
+    harness = _Harness(tmp_path)
+    _write(tmp_path / "tables" / "a.sql", "select 1;")
+    _write(tmp_path / "queries" / "b.sql", "select 2;")
+
+    plan, progress = harness.sync()
+    assert plan.added == ["queries/b.sql", "tables/a.sql"]
+    assert progress.files_parsed == 2
+    assert {r["name"] for r in harness.rows["docs"].values()} == {"queries/b.sql", "tables/a.sql"}
+
+    # No changes: nothing embedded
+    harness.embedder.calls.clear()
+    plan, progress = harness.sync()
+    assert plan.is_noop and progress is None
+    assert harness.embedder.texts == []
+
+    # Edit one file, delete the other
+    old_hash = harness.manifest.entries["tables/a.sql"].content_hash
+    edited = _write(tmp_path / "tables" / "a.sql", "select 42;")
+    os.utime(edited, (1, 1))
+    (tmp_path / "queries" / "b.sql").unlink()
+    plan, progress = harness.sync()
+    assert plan.changed == ["tables/a.sql"]
+    assert plan.removed == ["queries/b.sql"]
+    assert ("tables/a.sql", old_hash) in harness.deleted
+    assert harness.embedder.texts == ["select 42;"]
+    assert {r["name"] for r in harness.rows["docs"].values()} == {"tables/a.sql"}
+    assert set(harness.manifest.entries) == {"tables/a.sql"}
+
+
+def test_touched_file_updates_manifest_without_embedding(tmp_path):
+    harness = _Harness(tmp_path)
+    path = _write(tmp_path / "a.sql", "select 1;")
+    harness.sync()
+    harness.embedder.calls.clear()
+
+    os.utime(path, (12345, 12345))
+    plan, progress = harness.sync()
+    assert plan.touched == ["a.sql"]
+    assert progress is None
+    assert harness.embedder.texts == []
+    assert harness.manifest.entries["a.sql"].mtime == 12345
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    harness = _Harness(tmp_path)
+    _write(tmp_path / "a.sql", "select 1;")
+    plan, progress = harness.sync(dry_run=True)
+    assert plan.added == ["a.sql"]
+    assert progress is None
+    assert harness.rows["docs"] == {}
+    assert harness.manifest.entries == {}
+
+
+def test_failed_file_retried_next_sync(tmp_path):
+    harness = _Harness(tmp_path)
+    _write(tmp_path / "a.sql", "select 1;")
+
+    harness.embedder.empty = True
+    harness.sync()
+    assert harness.manifest.entries == {}
+
+    harness.embedder.empty = False
+    plan, _ = harness.sync()
+    assert plan.added == ["a.sql"]
+    assert "a.sql" in harness.manifest.entries
+
+
+def test_failed_update_keeps_old_vectors_until_retry_succeeds(tmp_path):
+    harness = _Harness(tmp_path)
+    path = _write(tmp_path / "a.sql", "select 1;")
+    harness.sync()
+    old_entry = harness.manifest.entries["a.sql"]
+
+    _write(path, "select 42;")
+    os.utime(path, (1, 1))
+    harness.embedder.empty = True
+    plan, progress = harness.sync()
+    assert plan.changed == ["a.sql"] and progress.failed_sources == ["a.sql"]
+    assert [r["content"] for r in harness.rows["docs"].values()] == ["select 1;"]
+    assert harness.manifest.entries["a.sql"] == old_entry
+
+    harness.embedder.empty = False
+    plan, _ = harness.sync()
+    assert plan.changed == ["a.sql"]
+    assert [r["content"] for r in harness.rows["docs"].values()] == ["select 42;"]
@@ -0,0 +1,94 @@
+"""Tests for lazy knowledge construction and the startup benchmark helpers (no database)."""
+
+from fakes import FakeEmbedder
+
+import backend.db.session as session
+from backend.db.full_text import FullTextPgVector
+from backend.scripts.benchmark_startup import StartupRun, compare, parse_importtime, summarize, top_imports
+
+
+def test_create_knowledge_does_not_touch_the_database_and_is_shared(monkeypatch):
+    monkeypatch.setattr(session, "_knowledge_bases", {})
+
+    def exists(self):
+        raise AssertionError("database queried while building the knowledge base")
+
+    monkeypatch.setattr(FullTextPgVector, "exists", exists)
+    knowledge = session.create_knowledge("Lazy", "lazy_docs")
+    assert session.create_knowledge("Other name", "lazy_docs") is knowledge
+    assert session.create_knowledge("Lazy", "lazy_other") is not knowledge
+    assert set(session.get_knowledge_bases()) == {"lazy_docs", "lazy_other"}
+
+
+def test_first_session_creates_the_table_once(monkeypatch):
+    vector_db = FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai", table_name="docs", embedder=FakeEmbedder()
+    )
+    calls: list[str] = []
+    opened: list[str] = []
+    monkeypatch.setattr(vector_db, "_sessions", lambda: opened.append("session") or "session")
+    monkeypatch.setattr(vector_db, "exists", lambda: calls.append("exists") or False)
+
+    def create():
+        calls.append("create")
+        # agno's create() opens a session itself; that must not recurse into another create
+        vector_db.Session()
+
+    monkeypatch.setattr(vector_db, "create", create)
+    monkeypatch.setattr(vector_db, "check_dimensions", lambda: calls.append("check"))
+
+    assert vector_db.Session() == "session"
+    vector_db.Session()
+    assert calls == ["exists", "create", "check"]
+    assert len(opened) == 3
+
+
+def test_failed_create_is_retried(monkeypatch):
+    vector_db = FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai", table_name="docs", embedder=FakeEmbedder()
+    )
+    monkeypatch.setattr(vector_db, "exists", lambda: False)
+    attempts: list[int] = []
+
+    def create():
+        attempts.append(1)
+        raise ConnectionError("database down")
+
+    monkeypatch.setattr(vector_db, "create", create)
+    for _ in range(2):
+        try:
+            vector_db.ensure_table()
+        except ConnectionError:
+            pass
+    assert len(attempts) == 2
+
+
+_IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 |     backend.db.url
+import time:      2000 |       2420 |   backend.db
+import time:      5000 |       7420 | backend.main
+"""
+
+
+def test_parse_importtime_and_top_imports():
+    records = parse_importtime(_IMPORTTIME)
+    assert [(r.module, r.self_us, r.cumulative_us, r.depth) for r in records] == [
+        ("_io", 120, 120, 1),
+        ("backend.db.url", 300, 420, 2),
+        ("backend.db", 2000, 2420, 1),
+        ("backend.main", 5000, 7420, 0),
+    ]
+    assert [r.module for r in top_imports(records, 2)] == ["backend.main", "backend.db"]
+    assert [r.module for r in top_imports(records, 5, "backend.db")] == ["backend.db", "backend.db.url"]
+    assert StartupRun(wall_s=1.0, imports=records).import_s == 0.00742
+
+
+def test_summarize_and_compare():
+    runs = [StartupRun(wall_s=wall) for wall in (2.0, 1.0, 4.0)]
+    summary = summarize(runs)
+    assert (summary["wall_median_s"], summary["wall_min_s"], summary["wall_max_s"]) == (2.0, 1.0, 4.0)
+    (line, *_) = compare(summary, {"wall_median_s": 4.0})
+    assert line.split()[0] == "wall_median_s" and line.endswith("-50.0%")
+    assert summarize([]) == {}
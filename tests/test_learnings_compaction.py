@@ -0,0 +1,172 @@
+"""Tests for learnings near-duplicate compaction (pure planning, compiled SQL, no database)."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fakes import FakeEmbedder
+from sqlalchemy.dialects import postgresql
+
+from backend.db.full_text import FullTextPgVector
+from backend.knowledge.compaction import (
+    PROVENANCE_KEY,
+    Learning,
+    compact_learnings,
+    estimated_jaccard,
+    learning_text,
+    learnings_knowledge_bases,
+    merged_metadata,
+    minhash,
+    neighbours_query,
+    new_learnings_query,
+    plan_merges,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _learning(key, title, learning, minutes=0, **meta):
+    content = json.dumps({"title": title, "learning": learning, "context": "", "tags": meta.get("tags", [])})
+    return Learning(
+        key=key,
+        name=title,
+        content=content,
+        meta_data={"namespace": "global", **meta},
+        created_at=T0 + timedelta(minutes=minutes),
+    )
+
+
+POOL = "Set pool_size to twice the CPU count and max_overflow to 10 for the reporting database"
+POOL_AGAIN = "Set pool_size to twice the CPU count and max_overflow to 10 for the reporting database."
+POOL_REWORDED = "Set pool_size to twice the CPU count and max_overflow to 10 on the reporting database server"
+VACUUM = "Run VACUUM ANALYZE on the orders table after the nightly bulk load finishes"
+
+
+def _neighbours(pairs):
+    """Symmetric neighbour lookup from [(a, b, cosine)]."""
+
+    def lookup(learning):
+        found = []
+        for a, b, cosine in pairs:
+            if a.key == learning.key:
+                found.append((b, cosine))
+            elif b.key == learning.key:
+                found.append((a, cosine))
+        return found
+
+    return lookup
+
+
+def test_learning_text_reads_title_learning_and_context():
+    content = json.dumps({"title": "Pools", "learning": POOL, "context": "reporting", "tags": ["db"]})
+    assert learning_text(content) == f"Pools\n{POOL}\nreporting"
+    assert learning_text("plain text learning") == "plain text learning"
+
+
+def test_minhash_estimates_shingle_overlap():
+    assert estimated_jaccard(minhash(POOL), minhash(POOL)) == 1.0
+    assert estimated_jaccard(minhash(POOL), minhash(POOL_REWORDED)) > 0.5
+    assert estimated_jaccard(minhash(POOL), minhash(VACUUM)) < 0.1
+    # Seeded: identical across calls (and processes)
+    assert minhash(POOL) == minhash(POOL)
+
+
+def test_plan_merges_keeps_oldest_and_requires_both_signals():
+    old = _learning("a", "Pool sizing", POOL, minutes=0)
+    again = _learning("b", "Pool sizing", POOL_AGAIN, minutes=5)
+    reworded = _learning("c", "Pool sizing v2", POOL_REWORDED, minutes=10)
+    # Close in embedding space but different text: not merged
+    vacuum = _learning("d", "Vacuum", VACUUM, minutes=15)
+    # Same text but below the cosine threshold: not merged
+    distant = _learning("e", "Pool sizing", POOL, minutes=20)
+
+    pairs = [(again, old, 0.99), (reworded, again, 0.95), (vacuum, old, 0.96), (distant, old, 0.5)]
+    merges = plan_merges([again, reworded, vacuum, distant], _neighbours(pairs), cosine=0.92, jaccard=0.5)
+
+    assert len(merges) == 1
+    assert merges[0].keeper.key == "a"
+    assert [d.learning.key for d in merges[0].duplicates] == ["b", "c"]
+    by_key = {d.learning.key: d for d in merges[0].duplicates}
+    assert by_key["b"].cosine == 0.99 and by_key["b"].jaccard == 1.0
+    assert by_key["c"].cosine == 0.95
+
+
+def test_plan_merges_is_deterministic():
+    learnings = [_learning(str(i), "Pool sizing", POOL, minutes=i) for i in range(4)]
+    pairs = [(learnings[i], learnings[i + 1], 0.99) for i in range(3)]
+    first = plan_merges(list(reversed(learnings)), _neighbours(pairs))
+    second = plan_merges(learnings, _neighbours(pairs))
+    assert [(m.keeper.key, [d.learning.key for d in m.duplicates]) for m in first] == [("0", ["1", "2", "3"])]
+    assert [(m.keeper.key, [d.learning.key for d in m.duplicates]) for m in second] == [("0", ["1", "2", "3"])]
+
+
+def test_merged_metadata_records_provenance_and_tags():
+    keeper = _learning("a", "Pool sizing", POOL, tags=["db"])
+    keeper.meta_data[PROVENANCE_KEY] = {"merged": [{"id": "z", "title": "earlier"}]}
+    identical = _learning("b", "Pool sizing", POOL_AGAIN, minutes=5, tags=["db", "pool"])
+    reworded = _learning("c", "Pool sizing v2", POOL_REWORDED, minutes=10)
+    reworded.meta_data[PROVENANCE_KEY] = {"merged": [{"id": "y", "title": "absorbed by c"}]}
+    plan = plan_merges([identical, reworded], _neighbours([(identical, keeper, 0.99), (reworded, keeper, 0.95)]))[0]
+
+    meta = merged_metadata(plan, T0)
+
+    merged = meta[PROVENANCE_KEY]["merged"]
+    assert [entry["id"] for entry in merged] == ["z", "b", "c", "y"]
+    assert "learning" not in merged[1]  # identical apart from punctuation
+    assert POOL_REWORDED in merged[2]["learning"]
+    assert merged[2]["created_at"] == (T0 + timedelta(minutes=10)).isoformat()
+    assert meta[PROVENANCE_KEY]["compacted_at"] == T0.isoformat()
+    assert meta["tags"] == ["db", "pool"]
+    assert meta["namespace"] == "global"
+
+
+def _vector_db():
+    return FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai", table_name="data_learnings", embedder=FakeEmbedder()
+    )
+
+
+def test_queries_are_partitioned_and_incremental():
+    table = _vector_db().table
+    learning = _learning("a", "Pool sizing", POOL, user_id="u1")
+    learning.embedding = [0.0, 0.0, 1.0]
+
+    sql = str(neighbours_query(table, learning, 10).compile(dialect=postgresql.dialect()))
+    assert "<=>" in sql and "LIMIT" in sql
+    assert "(ai.data_learnings.meta_data ->> %(meta_data_1)s) IS NOT DISTINCT FROM" in sql
+    assert "(ai.data_learnings.meta_data ->> %(meta_data_2)s) IS NOT DISTINCT FROM" in sql
+
+    sql = str(new_learnings_query(table, T0).compile(dialect=postgresql.dialect()))
+    assert "DISTINCT ON (coalesce(ai.data_learnings.content_id, ai.data_learnings.id))" in sql
+    assert "created_at >" in sql
+    assert "WHERE" not in str(new_learnings_query(table, None).compile(dialect=postgresql.dialect()))
+
+
+def test_compaction_skips_table_locked_by_another_pass(monkeypatch):
+    vector_db = _vector_db()
+    executed = []
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def execute(self, stmt, params=None):
+            executed.append(str(stmt))
+            return SimpleNamespace(scalar=lambda: False)
+
+    monkeypatch.setattr(vector_db, "table_exists", lambda: True)
+    vector_db.db_engine = SimpleNamespace(connect=_Conn)  # type: ignore[assignment]
+
+    result = compact_learnings(SimpleNamespace(vector_db=vector_db, contents_db=None))
+
+    assert result.skipped and result.removed == 0
+    assert executed == ["SELECT pg_try_advisory_lock(hashtext(:name))"]
+
+
+def test_learnings_knowledge_bases_selects_learnings_tables():
+    kb = SimpleNamespace(vector_db=object())
+    found = learnings_knowledge_bases({"knowledge_docs": kb, "data_learnings": kb, "mcp_learnings": kb})
+    assert list(found) == ["data_learnings", "mcp_learnings"]
@@ -0,0 +1,112 @@
+"""Tests for the local CPU embedder, reranker and dimension checks (fake models, no fastembed or database)."""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from agno.knowledge.document import Document
+
+import backend.db.local_embedder as local
+from backend.db.full_text import FullTextPgVector
+from backend.db.local_embedder import LocalEmbedder, LocalReranker, check_dimensions
+
+
+class _FakeModel:
+    def __init__(self, dim: int = 4):
+        self.dim = dim
+        self.calls: list[list[str]] = []
+
+    def embed(self, texts, batch_size):
+        self.calls.append(list(texts))
+        for text in texts:
+            yield np.full(self.dim, float(len(text)), dtype=np.float32)
+
+
+def test_batches_internally_and_returns_plain_lists():
+    model = _FakeModel()
+    embedder = LocalEmbedder(model=model, dimensions=4, batch_size=2)
+    embeddings, usage = embedder.get_embeddings_batch_and_usage(["a", "bb", "ccc", "dddd", "e"])
+    assert model.calls == [["a", "bb"], ["ccc", "dddd"], ["e"]]
+    assert [vector[0] for vector in embeddings] == [1.0, 2.0, 3.0, 4.0, 1.0]
+    assert isinstance(embeddings[0], list) and usage == [None] * 5
+    assert embedder.get_embedding("xyz") == [3.0] * 4
+
+
+def test_async_batches_run_on_the_pool_in_order():
+    model = _FakeModel()
+    embedder = LocalEmbedder(model=model, dimensions=4, batch_size=3, threads=2)
+    texts = [str(i) * (i + 1) for i in range(10)]
+    embeddings, _ = asyncio.run(embedder.async_get_embeddings_batch_and_usage(texts))
+    assert [vector[0] for vector in embeddings] == [float(i + 1) for i in range(10)]
+    assert len(model.calls) == 4
+    assert asyncio.run(embedder.async_get_embedding("ab")) == [2.0] * 4
+
+
+def test_dimension_mismatch_is_reported_on_first_embedding():
+    embedder = LocalEmbedder(model=_FakeModel(dim=4), dimensions=1536)
+    with pytest.raises(ValueError, match="produces 4-dimension vectors but EMBEDDING_DIMENSIONS is 1536"):
+        embedder.get_embedding("a")
+    check_dimensions("m", None, 4)
+    check_dimensions("m", 4, None)
+
+
+def test_missing_fastembed_raises_install_hint(monkeypatch):
+    # A None entry makes ``import fastembed`` fail whether or not the package is installed
+    monkeypatch.setitem(sys.modules, "fastembed", None)
+    with pytest.raises(ImportError, match="uv sync --extra local"):
+        LocalEmbedder(id="BAAI/bge-small-en-v1.5")
+
+
+def test_get_embedder_is_shared(monkeypatch):
+    import backend.db.session as session
+
+    monkeypatch.setattr(session, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(session, "_embedder", None)
+    monkeypatch.setattr(session, "LocalEmbedder", lambda **kwargs: LocalEmbedder(model=_FakeModel(), **kwargs))
+    assert session.get_embedder() is session.get_embedder()
+
+
+def test_reranker_orders_by_score_and_keeps_order_on_failure():
+    documents = [Document(content="pool"), Document(content="connection pool sizing"), Document(content="x")]
+    encoder = SimpleNamespace(rerank=lambda query, texts, batch_size: [len(text) for text in texts])
+    reranked = LocalReranker(encoder=encoder).rerank("pool", documents)
+    assert [doc.content for doc in reranked] == ["connection pool sizing", "pool", "x"]
+    assert reranked[0].reranking_score == 22.0
+
+    def _fail(query, texts, batch_size):
+        raise RuntimeError("onnx error")
+
+    failing = LocalReranker(encoder=SimpleNamespace(rerank=_fail))
+    assert failing.rerank("pool", documents) == documents
+
+
+def test_get_reranker_is_shared_and_validated(monkeypatch):
+    monkeypatch.setattr(local, "RERANKER", "none")
+    assert local.get_reranker() is None
+    monkeypatch.setattr(local, "RERANKER", "local")
+    monkeypatch.setattr(local, "_reranker", None)
+    assert local.get_reranker() is local.get_reranker()
+    monkeypatch.setattr(local, "RERANKER", "cohere")
+    with pytest.raises(ValueError, match="Unknown RERANKER"):
+        local.get_reranker()
+
+
+def test_table_dimension_check_runs_once(monkeypatch):
+    import backend.db.full_text as full_text
+
+    vector_db = FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai",
+        table_name="docs",
+        embedder=LocalEmbedder(model=_FakeModel(), dimensions=384),
+    )
+    reads: list[str] = []
+    monkeypatch.setattr(full_text, "embedding_column_dimensions", lambda db: reads.append(db.table_name) or 1536)
+    with pytest.raises(ValueError, match=r'"ai"."docs" stores vector\(1536\) embeddings .* 384 dimensions'):
+        vector_db.check_dimensions()
+
+    monkeypatch.setattr(full_text, "embedding_column_dimensions", lambda db: reads.append(db.table_name) or 384)
+    vector_db.check_dimensions()
+    vector_db.check_dimensions()
+    assert reads == ["docs", "docs"]
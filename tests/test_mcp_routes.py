@@ -84,6 +84,93 @@ class TestHandleGatewayError:
         assert exc_info.value.status_code == 502
 
 
+class TestGzipStream:
+    def test_gzip_stream_roundtrip(self):
+        import gzip
+
+        from backend.mcp.routes import _gzip_stream
+
+        async def chunks():
+            for part in (b'{"tools": [', b'{"id": "t-1"}', b"]}"):
+                yield part
+
+        async def collect():
+            return b"".join([c async for c in _gzip_stream(chunks())])
+
+        compressed = asyncio.run(collect())
+        assert gzip.decompress(compressed) == b'{"tools": [{"id": "t-1"}]}'
+
+
+class TestBulkOperations:
+    def _status_error(self, status_code: int, detail: str) -> Exception:
+        import httpx
+
+        resp = MagicMock(status_code=status_code)
+        resp.json.return_value = {"detail": detail}
+        return httpx.HTTPStatusError("err", request=MagicMock(), response=resp)
+
+    def test_run_bulk_reports_per_item_results(self):
+        import httpx
+
+        from backend.mcp.routes import _run_bulk
+
+        async def op(entity_id: str):
+            if entity_id == "missing":
+                return False
+            if entity_id == "conflict":
+                raise self._status_error(409, "in use")
+            if entity_id == "down":
+                raise httpx.ConnectError("refused")
+            return {"id": entity_id}
+
+        with patch("backend.mcp.routes.invalidate_catalog_cache") as invalidate:
+            result = asyncio.run(_run_bulk(["ok-1", "missing", "conflict", "down", "ok-1"], op))
+        invalidate.assert_called_once()
+        by_id = {r.id: r for r in result.results}
+        assert len(result.results) == 4  # duplicate ok-1 applied once
+        assert by_id["ok-1"].ok and by_id["ok-1"].status_code == 200
+        assert by_id["missing"].status_code == 404
+        assert by_id["conflict"].status_code == 409 and by_id["conflict"].detail == "in use"
+        assert by_id["down"].status_code == 502
+        assert result.succeeded == 1
+        assert result.failed == 3
+
+    def test_run_bulk_caps_concurrency(self):
+        from backend.mcp import routes
+
+        in_flight = 0
+        peak = 0
+
+        async def op(entity_id: str):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return True
+
+        ids = [f"t-{i}" for i in range(50)]
+        result = asyncio.run(routes._run_bulk(ids, op))
+        assert result.succeeded == 50
+        assert peak <= routes._BULK_CONCURRENCY
+
+    def test_bulk_routes_registered_before_id_routes(self):
+        """/tools/bulk/state must not be captured by /tools/{tool_id}/state."""
+        from backend.mcp.routes import mcp_router
+
+        paths = [route.path for route in mcp_router.routes]
+        for entity, param in (("tools", "tool_id"), ("resources", "resource_id"), ("prompts", "prompt_id")):
+            assert paths.index(f"/mcp/{entity}/bulk/state") < paths.index(f"/mcp/{entity}/{{{param}}}/state")
+
+    def test_bulk_request_rejects_empty_ids(self):
+        from pydantic import ValidationError
+
+        from backend.mcp.schemas import MCPBulkDeleteRequest
+
+        with pytest.raises(ValidationError):
+            MCPBulkDeleteRequest(ids=[])
+
+
 # ── Route Pattern Tests ──────────────────────────────────────────────────
 
 
@@ -162,6 +249,13 @@ class TestScopeMapper:
             # Should NOT fall through to default admin scope
             assert scopes != ["agent_os:admin"], f"Route {method} {path} still falls through to admin default"
 
+    def test_bulk_routes_use_write_and_delete_scopes(self):
+        from backend.auth.scope_mapper import get_required_scopes
+
+        for entity in ("tools", "resources", "prompts"):
+            assert get_required_scopes("POST", f"/mcp/{entity}/bulk/state") == [f"mcp:{entity}:write"]
+            assert get_required_scopes("POST", f"/mcp/{entity}/bulk/delete") == [f"mcp:{entity}:delete"]
+
     def test_tags_scope_is_any_authenticated(self):
         """MEDIUM-5 fix: tags should be [] (any authenticated), not mcp:tools:read."""
         from backend.auth.scope_mapper import get_required_scopes
@@ -169,6 +263,11 @@ class TestScopeMapper:
         assert get_required_scopes("GET", "/mcp/tags") == []
         assert get_required_scopes("GET", "/mcp/tags/some-tag") == []
 
+    def test_export_stream_scope_is_config_read(self):
+        from backend.auth.scope_mapper import get_required_scopes
+
+        assert get_required_scopes("GET", "/mcp/export/stream") == ["mcp:config:read"]
+
     def test_health_scope_is_any_authenticated(self):
         from backend.auth.scope_mapper import get_required_scopes
 
@@ -260,22 +359,20 @@ class TestPreferences:
         assert hasattr(MCPPreference, "compact_view")
 
     def test_save_and_load_roundtrip(self):
-        """save_preferences creates a new row when none exists."""
-        from backend.mcp.preferences import save_preferences
+        """save_preferences upserts in one statement and the saved prefs are served from cache."""
+        from backend.auth.user_id_cache import user_id_cache
+        from backend.mcp.preferences import get_preferences, invalidate_preferences, save_preferences
         from backend.mcp.schemas import MCPUserPreferences
 
+        invalidate_preferences()
+        user_id_cache.invalidate()
         mock_session = AsyncMock()
         test_user_uuid = uuid.uuid4()
 
-        # Mock AuthUser lookup -> returns a UUID
+        # Mock AuthUser lookup -> returns a UUID, then the upsert
         auth_result = MagicMock()
         auth_result.scalar_one_or_none.return_value = test_user_uuid
-
-        # Mock MCPPreference lookup -> returns None (first save)
-        pref_result = MagicMock()
-        pref_result.scalar_one_or_none.return_value = None
-
-        mock_session.execute.side_effect = [auth_result, pref_result]
+        mock_session.execute.side_effect = [auth_result, MagicMock()]
 
         prefs = MCPUserPreferences(
             hidden_tools=["t1"],
@@ -283,6 +380,89 @@ class TestPreferences:
             default_tab="tools",
             compact_view=True,
         )
-        asyncio.get_event_loop().run_until_complete(save_preferences(mock_session, "test-oid", prefs))
-        mock_session.add.assert_called_once()
+        asyncio.run(save_preferences(mock_session, "test-oid", prefs))
+        assert mock_session.execute.await_count == 2
         mock_session.commit.assert_awaited_once()
+        mock_session.add.assert_not_called()
+        assert "ON CONFLICT" in str(mock_session.execute.call_args[0][0])
+
+        loaded = asyncio.run(get_preferences(mock_session, "test-oid"))
+        assert loaded == prefs
+        assert mock_session.execute.await_count == 2  # served from cache
+
+        # OID -> UUID is now cached: a second save skips the AuthUser lookup
+        mock_session.execute.side_effect = None
+        asyncio.run(save_preferences(mock_session, "test-oid", prefs))
+        assert mock_session.execute.await_count == 3
+        invalidate_preferences()
+        user_id_cache.invalidate()
+
+    def test_save_unknown_user_raises(self):
+        """save_preferences raises ValueError when the OID has no auth_users row."""
+        from backend.auth.user_id_cache import user_id_cache
+        from backend.mcp.preferences import invalidate_preferences, save_preferences
+        from backend.mcp.schemas import MCPUserPreferences
+
+        invalidate_preferences()
+        user_id_cache.invalidate()
+        mock_session = AsyncMock()
+        auth_result = MagicMock()
+        auth_result.scalar_one_or_none.return_value = None
+        mock_session.execute.return_value = auth_result
+
+        with pytest.raises(ValueError):
+            asyncio.run(save_preferences(mock_session, "missing-oid", MCPUserPreferences()))
+        mock_session.commit.assert_not_awaited()
+        user_id_cache.invalidate()
+
+    def test_get_preferences_single_query_and_cached(self):
+        """get_preferences joins oid -> row in one query and caches the result."""
+        from backend.auth.user_id_cache import user_id_cache
+        from backend.mcp.preferences import get_preferences, invalidate_preferences
+
+        invalidate_preferences()
+        user_id_cache.invalidate()
+        mock_session = AsyncMock()
+        test_user_uuid = uuid.uuid4()
+        row = MagicMock(hidden_tools=["t1"], hidden_servers=[], default_tab="tools", compact_view=False)
+        result = MagicMock()
+        result.first.return_value = (test_user_uuid, row)
+        result.scalar_one_or_none.return_value = row
+        mock_session.execute.return_value = result
+
+        first = asyncio.run(get_preferences(mock_session, "oid-1"))
+        second = asyncio.run(get_preferences(mock_session, "oid-1"))
+        assert first.hidden_tools == ["t1"]
+        assert second == first
+        assert mock_session.execute.await_count == 1
+        assert "JOIN" in str(mock_session.execute.call_args[0][0])
+        assert user_id_cache.lookup("oid-1") == (True, test_user_uuid)
+
+        # After invalidation the cached internal ID lets us skip the join
+        invalidate_preferences("oid-1")
+        asyncio.run(get_preferences(mock_session, "oid-1"))
+        assert mock_session.execute.await_count == 2
+        assert "JOIN" not in str(mock_session.execute.call_args[0][0])
+        invalidate_preferences()
+        user_id_cache.invalidate()
+
+
+class TestCircuitErrors:
+    def test_open_circuit_maps_to_503(self):
+        from backend.mcp.circuit_breaker import GatewayUnavailableError
+
+        with pytest.raises(HTTPException) as exc_info:
+            _handle_gateway_error(GatewayUnavailableError("circuit open"))
+        assert exc_info.value.status_code == 503
+
+    def test_health_reports_circuit_state(self):
+        from backend.mcp.routes import gateway_health
+
+        client = MagicMock()
+        client.health = AsyncMock(return_value={"status": "healthy"})
+        client.version = AsyncMock(return_value={"version": "1.0.0"})
+        client.circuit_state.return_value = {"state": "closed", "consecutive_failures": 0, "timeouts": {}}
+        request = MagicMock()
+        with patch("backend.mcp.routes.get_gateway_client", return_value=client):
+            result = asyncio.run(gateway_health.__wrapped__(request))
+        assert result.circuit.state == "closed"
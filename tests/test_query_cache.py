@@ -0,0 +1,237 @@
+"""Tests for the data agent's query result cache (fake engine and tools, no database)."""
+
+from types import SimpleNamespace
+
+from agno.tools.postgres import PostgresTools
+
+from backend.auth.scope_mapper import get_required_scopes
+from backend.db.query_cache import QueryCache, SchemaState, TableState, cache_key, referenced_tables
+from backend.tools.cached_postgres import CachedPostgresTools
+
+
+class _Conn:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def begin_nested(self):
+        return self
+
+    def execute(self, stmt, params=None):
+        pass
+
+    def commit(self):
+        pass
+
+
+class _Engine:
+    def __init__(self):
+        self.connections = 0
+
+    def connect(self):
+        self.connections += 1
+        return _Conn()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _state(**versions):
+    tables = {name: TableState(oid, True, True, version) for name, (oid, version) in versions.items()}
+    tables["winners"] = TableState(99, False, False, 0)  # a view
+    return SchemaState(tables, frozenset({"public", "ai", "pg_catalog"}), 0.0)
+
+
+STATE = _state(race_wins=(1, 0), drivers_championship=(2, 0))
+
+
+def test_cache_key_drops_formatting_but_keeps_literals():
+    assert cache_key("SELECT  name\nFROM race_wins -- wins\nWHERE year = 2020;") == (
+        "select name from race_wins where year = 2020"
+    )
+    assert cache_key("select name from race_wins where year = 2020") != cache_key(
+        "select name from race_wins where year = 2019"
+    )
+    assert cache_key("SELECT 'Hamilton'") != cache_key("SELECT 'hamilton'")
+
+
+def test_referenced_tables():
+    sql = 'SELECT w.name FROM public.race_wins w, "drivers_championship" d WHERE d.name = w.name'
+    assert referenced_tables(sql, STATE, "public") == ["drivers_championship", "race_wins"]
+    uncacheable = [
+        "SELECT 1",  # reads no table
+        "SELECT name FROM winners",  # view
+        "SELECT count(*) FROM race_wins WHERE date > now()",  # volatile
+        "SELECT * FROM ai.agno_sessions, race_wins",  # other schema
+        "SELECT relname FROM pg_class, race_wins",  # catalog
+        "DELETE FROM race_wins",
+        "SELECT name INTO copy_of_wins FROM race_wins",
+        "EXPLAIN SELECT name FROM race_wins",  # plans change without a write
+        "EXPLAIN ANALYZE SELECT name FROM race_wins",
+    ]
+    for sql in uncacheable:
+        assert referenced_tables(sql, STATE, "public") is None, sql
+
+
+def _cache(states, **kwargs):
+    clock = _Clock()
+
+    def loader(conn, schema, now):
+        state = states[0]
+        return SchemaState(state.tables, state.schemas, now)
+
+    cache = QueryCache(_Engine(), loader=loader, clock=clock, **kwargs)  # type: ignore[arg-type]
+    return cache, clock
+
+
+class _Runner:
+    def __init__(self, result="name\nHamilton"):
+        self.calls = 0
+        self.result = result
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def test_hits_until_a_referenced_table_changes():
+    states = [STATE]
+    cache, clock = _cache(states, version_ttl=2)
+    run = _Runner()
+    sql = "SELECT name FROM race_wins LIMIT 50"
+    assert cache.fetch_sql(sql, run) == "name\nHamilton"
+    assert cache.fetch_sql("select name\n  from race_wins limit 50;", run) == "name\nHamilton"
+    assert run.calls == 1 and (cache.hits, cache.misses) == (1, 1)
+
+    # Versions are re-read only after version_ttl: no database access in between
+    connections = cache.engine.connections
+    cache.fetch_sql(sql, run)
+    assert cache.engine.connections == connections
+
+    states[0] = _state(race_wins=(1, 0), drivers_championship=(2, 5))  # another table changed
+    clock.now += 3
+    cache.fetch_sql(sql, run)
+    assert run.calls == 1
+    states[0] = _state(race_wins=(1, 1), drivers_championship=(2, 5))  # a write to race_wins
+    clock.now += 3
+    cache.fetch_sql(sql, run)
+    assert run.calls == 2
+    states[0] = _state(race_wins=(7, 1), drivers_championship=(2, 5))  # dropped and re-created
+    clock.now += 3
+    cache.fetch_sql(sql, run)
+    assert run.calls == 3
+
+
+def test_uncacheable_queries_and_errors_always_run():
+    cache, _ = _cache([STATE])
+    run = _Runner()
+    for _ in range(2):
+        cache.fetch_sql("SELECT name FROM winners", run)
+    assert run.calls == 2 and cache.bypassed == 2
+    failing = _Runner("Error executing query: boom")
+    for _ in range(2):
+        cache.fetch_sql("SELECT nme FROM race_wins", failing, keep=lambda r: not r.startswith("Error"))
+    assert failing.calls == 2
+
+
+def test_untracked_tables_are_tracked_before_caching(monkeypatch):
+    import backend.db.query_cache as query_cache
+
+    states = [SchemaState({"race_wins": TableState(1, True, False, 0)}, frozenset({"public"}), 0.0)]
+    cache, clock = _cache(states)
+    installed: list[list[str]] = []
+
+    def track(conn, schema, tables):
+        installed.append(list(tables))
+        states[0] = STATE
+        return True
+
+    monkeypatch.setattr(query_cache, "track_tables", track)
+    run = _Runner()
+    cache.fetch_sql("SELECT name FROM race_wins", run)
+    cache.fetch_sql("SELECT name FROM race_wins", run)
+    assert installed == [["race_wins"]] and run.calls == 1
+
+    # Without permission to install the trigger, the table is not cached and re-tried after a while
+    monkeypatch.setattr(query_cache, "track_tables", lambda conn, schema, tables: installed.append(["x"]) or False)
+    states[0] = SchemaState({"fastest_laps": TableState(3, True, False, 0)}, frozenset({"public"}), 0.0)
+    clock.now += 10
+    for _ in range(2):
+        cache.fetch_sql("SELECT driver FROM fastest_laps", run)
+    assert run.calls == 3 and installed.count(["x"]) == 1
+
+
+def test_schema_stamp_covers_every_table_and_not_views():
+    states = [STATE]
+    cache, clock = _cache(states)
+    assert cache.schema_stamp() == (("drivers_championship", 2, 0), ("race_wins", 1, 0))
+    states[0] = _state(race_wins=(1, 4), drivers_championship=(2, 0))
+    clock.now += 10
+    assert cache.schema_stamp() == (("drivers_championship", 2, 0), ("race_wins", 1, 4))
+
+
+def test_lru_respects_entry_and_byte_caps():
+    cache, _ = _cache([STATE], size=2, max_bytes=10, max_result_bytes=6)
+    stamp = (("race_wins", 1, 0),)
+    cache.put("a", stamp, "aaaa")
+    cache.put("b", stamp, "bbbb")
+    cache.put("big", stamp, "x" * 7)  # over the per-result cap
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] == 8
+    cache.put("c", stamp, "cccc")  # evicts the least recently used
+    assert list(cache._entries) == ["b", "c"]
+    cache.put("d", stamp, "dddddd")  # 4 + 6 fits; 4 + 4 + 6 does not
+    assert list(cache._entries) == ["c", "d"] and cache.stats()["bytes"] == 10
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_cached_tools_wrap_queries_and_summaries(monkeypatch):
+    cache, _ = _cache([STATE])
+    executed: list[str] = []
+
+    def execute(self, query, params=None):
+        executed.append(query)
+        return "name\nHamilton"
+
+    monkeypatch.setattr(PostgresTools, "_execute_query", execute)
+    monkeypatch.setattr(PostgresTools, "summarize_table", lambda self, table: executed.append(table) or "Summary")
+    tools = CachedPostgresTools(
+        db_name="ai", include_tools=["show_tables", "summarize_table", "inspect_query", "run_query"]
+    )
+    tools._query_cache = cache
+
+    for _ in range(2):
+        assert tools.run_query("SELECT name FROM race_wins") == "name\nHamilton"
+        assert tools.summarize_table("race_wins") == "Summary"
+        tools.inspect_query("SELECT name FROM race_wins")
+        tools.show_tables()
+    assert executed.count("SELECT name FROM race_wins") == 1
+    assert executed.count("race_wins") == 1
+    assert executed.count("EXPLAIN SELECT name FROM race_wins") == 2
+    assert len(executed) == 6  # plans and catalog lookups are not cached
+    assert tools.functions["summarize_table"].description == PostgresTools.summarize_table.__doc__
+
+
+def test_run_query_is_read_only_and_ends_its_transaction(monkeypatch):
+    import agno.tools.postgres as agno_postgres
+
+    connection = SimpleNamespace(closed=False, read_only=False, rollbacks=0)
+    connection.rollback = lambda: setattr(connection, "rollbacks", connection.rollbacks + 1)
+    monkeypatch.setattr(agno_postgres.psycopg, "connect", lambda **kwargs: connection)
+    monkeypatch.setattr(PostgresTools, "_execute_query", lambda self, query, params=None: self.connect() and "n\n1")
+    tools = CachedPostgresTools(db_name="ai", cache=False, include_tools=["run_query"])
+
+    assert tools.run_query("SELECT count(*) AS n FROM race_wins") == "n\n1"
+    assert connection.read_only is True
+    assert connection.rollbacks == 1
+
+
+def test_query_cache_route_requires_metrics_scope():
+    assert get_required_scopes("GET", "/db/query-cache") == ["metrics:read"]
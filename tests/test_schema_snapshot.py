@@ -0,0 +1,215 @@
+"""Tests for the cached schema snapshot and introspect_schema (fake connections, no database)."""
+
+from types import SimpleNamespace
+
+import backend.db.schema_snapshot as snapshot_module
+import backend.tools.introspect as introspect
+from backend.db.schema_snapshot import (
+    SCHEMA_VERSION_DDL,
+    ColumnInfo,
+    IndexInfo,
+    SchemaCache,
+    SchemaSnapshot,
+    TableInfo,
+    exact_row_counts,
+    install_schema_trigger,
+    sample_rows,
+    sample_sql,
+    schema_version,
+)
+
+
+class _Result:
+    def __init__(self, rows, keys=()):
+        self.rows = rows
+        self._keys = keys
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def keys(self):
+        return list(self._keys)
+
+
+class _Conn:
+    def __init__(self, results=None):
+        self.executed: list[str] = []
+        self.results = list(results or [])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, stmt, params=None):
+        self.executed.append(str(stmt))
+        return self.results.pop(0) if self.results else _Result([])
+
+    def begin_nested(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _Engine:
+    def __init__(self):
+        self.connections = 0
+        self.conn = _Conn()
+
+    def connect(self):
+        self.connections += 1
+        return self.conn
+
+
+def _table(name="orders", rows=None, size=0):
+    return TableInfo(name, rows, size)
+
+
+def test_sample_sql_uses_tablesample_only_on_large_tables():
+    assert sample_sql(_table(rows=500), 5) == 'SELECT * FROM "orders" LIMIT 5'
+    assert sample_sql(_table(rows=None), 5) == 'SELECT * FROM "orders" LIMIT 5'
+    assert sample_sql(_table(rows=10_000_000), 5) == 'SELECT * FROM "orders" TABLESAMPLE SYSTEM (0.0010) LIMIT 5'
+    assert sample_sql(_table('we"ird', rows=20_000), 100, sampled=False) == 'SELECT * FROM "we""ird" LIMIT 100'
+
+
+def test_sample_rows_falls_back_when_sampled_pages_are_short():
+    conn = _Conn([_Result([(1,)], ["id"]), _Result([(1,), (2,)], ["id"])])
+    columns, rows = sample_rows(conn, _table(rows=1_000_000), 2)  # type: ignore[arg-type]
+    assert (columns, rows) == (["id"], [(1,), (2,)])
+    assert "TABLESAMPLE" in conn.executed[0] and "TABLESAMPLE" not in conn.executed[1]
+
+
+def test_exact_row_counts_is_one_statement():
+    conn = _Conn([_Result([(0, 3), (1, 7)])])
+    assert exact_row_counts(conn, ["a", "b"]) == {"a": 3, "b": 7}  # type: ignore[arg-type]
+    assert conn.executed == ['SELECT 0 AS i, count(*) AS n FROM "a" UNION ALL SELECT 1 AS i, count(*) AS n FROM "b"']
+
+
+def test_schema_version_is_a_sequence_bumped_without_row_locks():
+    ddl = "\n".join(SCHEMA_VERSION_DDL)
+    assert "CREATE SEQUENCE IF NOT EXISTS ai.schema_version_seq" in ddl
+    assert "UPDATE" not in ddl and "nextval('ai.schema_version_seq')" in ddl
+    # DDL on temporary objects and on the ai schema (knowledge tables, sessions) is ignored
+    assert "schema_name IS DISTINCT FROM 'ai'" in ddl and "NOT is_temporary" in ddl
+    assert "ON ddl_command_end" in ddl and "ON sql_drop" in ddl
+
+    assert schema_version(_Conn([_Result([(7,)])])) == 7  # type: ignore[arg-type]
+    conn = _Conn([_Result([(0,)])])
+    assert schema_version(conn) == 0  # type: ignore[arg-type]
+    assert "FROM ai.schema_version_seq" in conn.executed[0]
+
+
+def test_schema_trigger_installed_once_or_upgraded():
+    installed = _Conn([_Result([(True,)])])
+    assert install_schema_trigger(installed) is True  # type: ignore[arg-type]
+    assert len(installed.executed) == 1
+
+    # Missing, or an older install without the sequence: (re-)run the DDL
+    missing = _Conn([_Result([(False,)])])
+    assert install_schema_trigger(missing) is True  # type: ignore[arg-type]
+    assert missing.executed[1:] == SCHEMA_VERSION_DDL
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(monkeypatch, tracked, versions):
+    engine = _Engine()
+    clock = _Clock()
+    monkeypatch.setattr(snapshot_module, "install_schema_trigger", lambda conn: tracked)
+    monkeypatch.setattr(snapshot_module, "schema_version", lambda conn: versions[0])
+
+    def loader(conn, version, now):
+        return SchemaSnapshot({}, version, now)
+
+    return SchemaCache(engine, ttl=60, loader=loader, clock=clock), engine, clock  # type: ignore[arg-type]
+
+
+def test_cache_reloads_on_ddl_version_change(monkeypatch):
+    versions = [1]
+    cache, engine, clock = _cache(monkeypatch, True, versions)
+    first = cache.get()
+    assert cache.get() is first and cache.loads == 1
+    versions[0] = 2
+    assert cache.get().version == 2 and cache.loads == 2
+    clock.now += 61
+    cache.get()
+    assert cache.loads == 3
+
+
+def test_untracked_cache_serves_from_memory_until_ttl(monkeypatch):
+    cache, engine, clock = _cache(monkeypatch, False, [None])
+    first = cache.get()
+    connections = engine.connections
+    clock.now += 30
+    assert cache.get() is first
+    assert engine.connections == connections  # no connection while fresh
+    clock.now += 31
+    assert cache.get() is not first and cache.loads == 2
+
+
+def _snapshot():
+    orders = TableInfo(
+        "orders",
+        1_234_567,
+        10**9,
+        columns=[ColumnInfo("id", "bigint", False), ColumnInfo("note", "text", True)],
+        primary_key=["id"],
+        indexes=[
+            IndexInfo("orders_pkey", "CREATE UNIQUE INDEX orders_pkey ON public.orders USING btree (id)", True, True),
+            IndexInfo("orders_note", "CREATE INDEX orders_note ON public.orders USING btree (note)", False, False),
+        ],
+    )
+    fresh = TableInfo("fresh", None, 8192)
+    huge_unanalyzed = TableInfo("staging", None, 10**10)
+    return SchemaSnapshot({t.name: t for t in (orders, fresh, huge_unanalyzed)}, 1, 0.0)
+
+
+def _tool(monkeypatch, counted):
+    monkeypatch.setattr(introspect, "get_engine", lambda url: _Engine())
+    monkeypatch.setattr(introspect, "get_schema_cache", lambda engine: SimpleNamespace(get=_snapshot))
+
+    def counts(conn, tables):
+        counted.append(list(tables))
+        return {name: 42 for name in tables}
+
+    monkeypatch.setattr(introspect, "exact_row_counts", counts)
+    return introspect.create_introspect_schema_tool("postgresql+psycopg://x").entrypoint  # type: ignore[attr-defined]
+
+
+def test_listing_uses_estimates_and_counts_only_small_unanalyzed_tables(monkeypatch):
+    counted: list[list[str]] = []
+    tool = _tool(monkeypatch, counted)
+    assert tool() == (
+        "## Tables\n\n- **fresh** (42 rows)\n- **orders** (~1,234,567 rows)\n- **staging** (row count unknown)"
+    )
+    assert counted == [["fresh"]]
+    tool(exact_counts=True)
+    assert counted[-1] == ["fresh", "orders", "staging"]
+
+
+def test_table_detail_comes_from_the_snapshot(monkeypatch):
+    tool = _tool(monkeypatch, [])
+    output = tool(table_name="orders")
+    assert "_~1,234,567 rows_" in output
+    assert "| note | text | Yes |" in output
+    assert "**Primary Key:** id" in output
+    assert "- `CREATE INDEX orders_note ON public.orders USING btree (note)`" in output
+    assert "orders_pkey" not in output
+    assert tool(table_name="missing").startswith("Table 'missing' not found. Available: fresh, orders, staging")
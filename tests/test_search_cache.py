@@ -0,0 +1,134 @@
+"""Tests for the versioned knowledge search cache (fake versions and sessions, no database)."""
+
+from types import SimpleNamespace
+
+import pytest
+from agno.filters import EQ
+from agno.knowledge.document import Document
+from agno.vectordb.search import SearchType
+from fakes import FakeEmbedder, RecordingSession
+
+import backend.db.full_text as full_text
+from backend.db.full_text import FullTextPgVector
+from backend.db.search_cache import SearchCache, filters_key, normalize_query
+
+
+_ROW = SimpleNamespace(id="1", name="doc", meta_data={}, content="pool sizing", embedding=None, usage=None)
+
+
+@pytest.fixture
+def cached_vector_db(monkeypatch):
+    cache = SearchCache(size=10)
+    versions = {"ai.docs": 1}
+    monkeypatch.setattr(full_text, "get_search_cache", lambda: cache)
+    monkeypatch.setattr(full_text, "SEARCH_CACHE_ENABLED", True)
+    monkeypatch.setattr(full_text, "table_version", lambda db: versions[f"{db.schema}.{db.table_name}"])
+    monkeypatch.setattr(cache, "is_tracked", lambda db: True)
+
+    vector_db = FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai", table_name="docs", embedder=FakeEmbedder()
+    )
+    vector_db._table_ready = True
+    executed: list[str] = []
+    vector_db.Session = lambda: RecordingSession(executed, [_ROW])  # type: ignore[assignment]
+    return vector_db, executed, versions, cache
+
+
+def test_normalize_query_and_filters_key():
+    assert normalize_query("  How do I   Configure\tPools? ") == "how do i configure pools?"
+    assert filters_key({"b": 1, "a": "x"}) == filters_key({"a": "x", "b": 1})
+    assert filters_key([EQ("type", "pdf")]) != filters_key([EQ("type", "csv")])
+    assert filters_key(None) == ""
+
+
+def test_search_cache_checks_version_and_evicts():
+    cache = SearchCache(size=2)
+    doc = Document(content="a", name="a")
+    cache.put(("t", "q1", "hybrid", 5, ""), 1, [doc])
+    assert cache.get(("t", "q1", "hybrid", 5, ""), 2) is None
+    hit = cache.get(("t", "q1", "hybrid", 5, ""), 1)
+    assert hit is not None and hit[0].content == "a"
+    # Returned documents are copies
+    hit[0].content = "mutated"
+    assert cache.get(("t", "q1", "hybrid", 5, ""), 1)[0].content == "a"
+
+    cache.put(("t", "q2", "hybrid", 5, ""), 1, [])
+    cache.put(("t", "q3", "hybrid", 5, ""), 1, [])
+    assert cache.get(("t", "q1", "hybrid", 5, ""), 1) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_repeat_search_skips_embedding_and_query(cached_vector_db):
+    vector_db, executed, _, cache = cached_vector_db
+    first = vector_db.search("Pool sizing", limit=5)
+    executed_after_first = len(executed)
+    second = vector_db.search("  pool   SIZING ", limit=5)
+
+    assert [d.content for d in second] == [d.content for d in first] == ["pool sizing"]
+    assert len(vector_db.embedder.calls) == 1
+    assert len(executed) == executed_after_first
+    assert cache.hits == 1
+
+
+def test_version_change_invalidates(cached_vector_db):
+    vector_db, executed, versions, _ = cached_vector_db
+    vector_db.search("pool sizing")
+    versions["ai.docs"] = 2  # e.g. Knowledge.insert or a pipeline upsert fired the trigger
+    vector_db.search("pool sizing")
+    assert len(vector_db.embedder.calls) == 2
+
+
+def test_key_includes_search_type_limit_and_filters(cached_vector_db):
+    vector_db, _, _, cache = cached_vector_db
+    vector_db.search("pool sizing", limit=5)
+    vector_db.search("pool sizing", limit=10)
+    vector_db.search("pool sizing", limit=5, filters={"type": "pdf"})
+    vector_db.search_type = SearchType.keyword
+    vector_db.search("pool sizing", limit=5)
+    assert cache.hits == 0
+
+
+def test_failed_searches_are_not_cached(cached_vector_db):
+    vector_db, executed, _, cache = cached_vector_db
+    vector_db.embedder.get_embedding = lambda text: []  # what agno embedders return when the API call fails
+    assert vector_db.search("pool sizing") == []
+    vector_db.search_type = SearchType.hybrid
+    assert vector_db.search("pool sizing") == []
+    vector_db.search_type = SearchType.vector
+    del vector_db.embedder.get_embedding
+
+    def failing():
+        raise RuntimeError("connection refused")
+
+    vector_db.Session = failing  # type: ignore[assignment]
+    assert vector_db.search("pool sizing") == []
+    assert len(cache._entries) == 0
+
+    vector_db.Session = lambda: RecordingSession(executed, [_ROW])  # type: ignore[assignment]
+    assert [d.content for d in vector_db.search("pool sizing")] == ["pool sizing"]
+    assert len(cache._entries) == 1
+
+
+def test_full_text_migration_bumps_table_version(monkeypatch):
+    executed: list[str] = []
+
+    class _Conn(RecordingSession):
+        def execution_options(self, **kwargs):
+            return self
+
+        def execute(self, stmt, params=None):
+            executed.append(str(stmt))
+
+    engine = SimpleNamespace(connect=lambda: _Conn(executed), begin=lambda: _Conn(executed))
+    vector_db = FullTextPgVector(
+        db_url="postgresql+psycopg://ai:ai@localhost:1/ai", table_name="docs", embedder=FakeEmbedder()
+    )
+    vector_db.db_engine = engine  # type: ignore[assignment]
+    monkeypatch.setattr(vector_db, "table_exists", lambda: True)
+    monkeypatch.setattr(full_text, "index_status", lambda db, name: None)
+    monkeypatch.setattr(full_text, "tsv_column_expression", lambda db: None)
+
+    full_text.migrate_full_text(vector_db)
+    assert executed[0].startswith('ALTER TABLE "ai"."docs" ADD COLUMN content_tsv')
+    assert any(statement.startswith("CREATE OR REPLACE TRIGGER ai_table_version") for statement in executed)
+    assert executed[-1] == "SELECT nextval(CAST(:sequence AS regclass))"
@@ -0,0 +1,115 @@
+"""Tests for query-focused search snippets and the search_content tool (fake knowledge, no database)."""
+
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+import backend.tools.search as search
+from backend.knowledge.snippets import ELLIPSIS, extract_snippet, extract_snippets, query_terms
+from backend.scripts.benchmark_search_snippets import RunStats, run_stats, summarize
+
+_FILLER = "Nothing relevant is said in this sentence at all. "
+
+
+def _document(*passages: str, filler: int = 20) -> str:
+    return (_FILLER * filler).join(("", *passages, ""))
+
+
+def test_query_terms_drop_stopwords_and_stem():
+    assert query_terms("How do I create my first agents?") == ["create", "first", "agent"]
+    assert query_terms("Agents, agent, AGENT") == ["agent"]
+    # Only stopwords: keep them rather than match nothing
+    assert query_terms("what is it") == ["what", "is", "it"]
+    assert query_terms("") == []
+
+
+def test_snippet_is_centered_on_the_match_and_highlighted():
+    content = _document("Configure the connection pool with pool_size and max_overflow.")
+    snippet = extract_snippet(content, query_terms("pool_size"), budget=200)
+    assert "**pool_size**" in snippet
+    assert snippet.startswith(ELLIPSIS) and snippet.endswith(ELLIPSIS)
+    # Leading text is not returned when the match is further in
+    assert not snippet.startswith(_FILLER[:20])
+    assert len(snippet.replace("**", "")) <= 200 + 2 * len(ELLIPSIS) + 2
+
+
+def test_snippet_prefers_the_window_with_more_distinct_terms():
+    content = _document("Embedding alone.", "Embedding cache sizing, embedding cache hits.", "Cache alone.")
+    snippet = extract_snippet(content, query_terms("embedding cache"), budget=120)
+    assert "**Embedding** **cache** sizing" in snippet
+    assert "alone" not in snippet
+
+
+def test_snippet_returns_several_windows_in_document_order():
+    content = _document("First: tokens are counted.", "Second: tokens are cached.", filler=30)
+    snippet = extract_snippet(content, query_terms("tokens"), budget=400, window=150)
+    assert snippet.index("First") < snippet.index("Second")
+    assert snippet.count("**tokens**") == 2
+    assert f"{ELLIPSIS} " in snippet
+
+
+def test_snippet_words_are_not_cut_at_window_edges():
+    content = _document("The hybrid search mode combines keyword and vector ranking.")
+    snippet = extract_snippet(content, query_terms("hybrid"), budget=90)
+    inner = snippet.strip(f" {ELLIPSIS}")
+    assert inner.split()[0] in _FILLER.split() or inner.startswith("The")
+    assert inner.split()[-1].strip(".") in (_FILLER + "ranking combines keyword and vector").split()
+
+
+def test_short_content_is_returned_whole_and_no_match_falls_back_to_leading_text():
+    assert extract_snippet("Agents call tools.", ["tool"], budget=100) == "Agents call **tools**."
+    content = _FILLER * 10
+    assert extract_snippet(content, ["absent"], budget=50) == content[:50].strip() + "..."
+
+
+def test_budget_is_shared_and_unused_share_moves_on():
+    long = _document("The answer is here.", filler=40)
+    snippets = extract_snippets(["tiny answer", long, long], "answer", budget=900, window=100)
+    assert snippets[0] == "tiny **answer**"
+    lengths = [len(s.replace("**", "").replace(ELLIPSIS, "")) for s in snippets[1:]]
+    # The other two split what the first one did not use
+    assert all(300 < length <= 460 for length in lengths)
+
+
+def test_head_mode_keeps_leading_text():
+    content = _document("match deep inside")
+    (snippet,) = extract_snippets([content], "match", budget=100, mode="head")
+    assert snippet == content[:100] + "..."
+
+
+@pytest.fixture
+def knowledge(monkeypatch):
+    documents = [SimpleNamespace(name="Pooling", content=_document("Set pool_recycle to avoid stale connections."))]
+    fake = SimpleNamespace(calls=[], search=lambda **kwargs: fake.calls.append(kwargs) or documents)
+    monkeypatch.setattr(search, "_knowledge", fake)
+    return fake
+
+
+def test_search_content_returns_focused_snippets(knowledge):
+    output = search.search_content.entrypoint("pool_recycle", max_results=3)  # type: ignore[attr-defined]
+    assert knowledge.calls == [{"query": "pool_recycle", "max_results": 3, "search_type": "keyword"}]
+    assert output.startswith("**1. Pooling**\n")
+    assert "**pool_recycle**" in output
+    assert "stale connections" in output
+
+
+def test_benchmark_run_stats_and_summary():
+    result = SimpleNamespace(
+        tools=[
+            SimpleNamespace(tool_name="search_content", result="x" * 40),
+            SimpleNamespace(tool_name="read_file", result="y"),
+            SimpleNamespace(tool_name="search_content", result="z" * 10),
+        ],
+        metrics=SimpleNamespace(input_tokens=1000, output_tokens=200),
+    )
+    stats = run_stats("q", True, result)
+    assert stats.tool_calls == Counter(search_content=2, read_file=1)
+    assert (stats.snippet_chars, stats.total_tokens) == (50, 1200)
+
+    summary = summarize([stats, RunStats(question="q", passed=False, input_tokens=500)])
+    assert summary["pass_rate"] == 0.5
+    assert summary["tool_calls"] == 1.5
+    assert summary["search_content"] == 1.0
+    assert summary["total_tokens"] == 850
+    assert summarize([]) == {}
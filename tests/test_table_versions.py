@@ -0,0 +1,63 @@
+"""Tests for the shared table version triggers and reads (fake connection, no database)."""
+
+import hashlib
+
+from backend.db.table_versions import VERSIONS_DDL, sequence_name, table_versions, track_tables, trigger_ddl
+
+
+class _Conn:
+    def __init__(self, rows=(), fail_on=None):
+        self.rows = list(rows)
+        self.fail_on = fail_on
+        self.executed: list[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def begin_nested(self):
+        return self
+
+    def execute(self, stmt, params=None):
+        self.executed.append(str(stmt))
+        if self.fail_on and self.fail_on in str(stmt):
+            raise RuntimeError("permission denied")
+        return iter(self.rows)
+
+
+def test_trigger_function_cannot_fail_or_block_writers():
+    (function,) = [statement for statement in VERSIONS_DDL if "FUNCTION" in statement]
+    assert "SECURITY DEFINER SET search_path = pg_catalog, pg_temp" in function
+    assert "EXCEPTION WHEN others THEN" in function
+    assert "nextval(" in function and "INSERT" not in function and "UPDATE" not in function
+
+
+def test_trigger_is_statement_level_on_all_writes():
+    ddl = trigger_ddl("public", 'race "wins"')
+    assert 'TRIGGER ai_table_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "public"."race ""wins"""' in ddl
+    assert ddl.endswith("FOR EACH STATEMENT EXECUTE FUNCTION ai.bump_table_version()")
+
+
+def test_sequence_name_matches_the_trigger_and_fits_any_table():
+    name = sequence_name("public", "x" * 63)
+    assert name == "ai.tv_" + hashlib.md5(f"public.{'x' * 63}".encode()).hexdigest()
+    assert len(name.split(".", 1)[1]) <= 63
+
+
+def test_track_tables_creates_sequence_before_trigger_and_reports_failure():
+    conn = _Conn()
+    assert track_tables(conn, "public", ["race_wins"])
+    assert conn.executed[-2] == f"CREATE SEQUENCE IF NOT EXISTS {sequence_name('public', 'race_wins')}"
+    assert conn.executed[-1].startswith("CREATE OR REPLACE TRIGGER ai_table_version")
+    assert not track_tables(_Conn(fail_on="CREATE SEQUENCE"), "public", ["race_wins"])
+
+
+def test_untracked_and_missing_tables_have_no_version():
+    conn = _Conn(rows=[("race_wins", 16384, 7, True), ("drivers", 16390, 3, False)])
+    assert table_versions(conn, "public", ["race_wins", "drivers", "gone"]) == {
+        "race_wins": (16384, 7),
+        "drivers": None,
+        "gone": None,
+    }
@@ -0,0 +1,218 @@
+"""Tests for conditional URL refresh against a local HTTP fixture server (fake knowledge, no database)."""
+
+import asyncio
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from fakes import FakeEmbedder
+
+import backend.knowledge.url_refresh as url_refresh
+from backend.knowledge.url_refresh import (
+    FETCH_KEY,
+    URL_SOURCE_KEY,
+    insert_url_source,
+    refresh_url_sources,
+    url_sources,
+)
+
+_LAST_MODIFIED = "Mon, 19 Oct 2026 06:00:00 GMT"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # path -> body; "/etag*" paths send an ETag, "/lastmod*" send Last-Modified, others neither
+    pages: dict[str, bytes] = {}
+    requests: list[tuple[str, dict[str, str]]] = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, dict(self.headers)))
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.path.startswith("/etag") and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path.startswith("/lastmod") and self.headers.get("If-Modified-Since") == _LAST_MODIFIED:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.path.startswith("/etag"):
+            self.send_header("ETag", etag)
+        if self.path.startswith("/lastmod"):
+            self.send_header("Last-Modified", _LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.pages = {}
+    _Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class _FakeKnowledge:
+    """Contents rows in a dict; vector rows replaced per content id instead of written to a table."""
+
+    def __init__(self):
+        self.rows: dict[str, SimpleNamespace] = {}
+        self.inserts: list[dict] = []
+        self.replaced: dict[str, list[dict]] = {}
+        self.contents_db = SimpleNamespace(
+            get_knowledge_content=self.rows.get,
+            upsert_knowledge_content=lambda knowledge_row: self.rows.__setitem__(knowledge_row.id, knowledge_row),
+        )
+        self.vector_db = SimpleNamespace(embedder=FakeEmbedder())
+
+    def insert(self, name, url, metadata=None, description=None, **kwargs):
+        self.inserts.append({"name": name, "url": url, "metadata": metadata, **kwargs})
+        row_id = f"id-{name}"
+        self.rows[row_id] = SimpleNamespace(
+            id=row_id, name=name, description=description, metadata=metadata, file_type="url", updated_at=0
+        )
+
+    def get_content(self):
+        contents = [SimpleNamespace(**vars(row)) for row in self.rows.values()]
+        return contents, len(contents)
+
+
+@pytest.fixture(autouse=True)
+def _replace_rows(monkeypatch):
+    def replace(vector_db, content_id, records):
+        vector_db.knowledge.replaced[content_id] = records
+        return len(records)
+
+    monkeypatch.setattr(url_refresh, "replace_content_rows", replace)
+
+
+def _knowledge():
+    knowledge = _FakeKnowledge()
+    knowledge.vector_db.knowledge = knowledge
+    return knowledge
+
+
+def _refresh(knowledge):
+    return asyncio.run(refresh_url_sources(knowledge, concurrency=4))
+
+
+def test_insert_url_source_records_url():
+    knowledge = _knowledge()
+    insert_url_source(knowledge, "Docs", "https://example.com/docs.md")
+    assert knowledge.inserts[0]["metadata"] == {URL_SOURCE_KEY: "https://example.com/docs.md"}
+    assert knowledge.inserts[0]["skip_if_exists"] is True
+
+
+def test_first_refresh_reingests_then_304s(server):
+    _Handler.pages = {"/etag/a.md": b"alpha", "/lastmod/b.md": b"beta"}
+    knowledge = _knowledge()
+    insert_url_source(knowledge, "A", f"{server}/etag/a.md")
+    insert_url_source(knowledge, "B", f"{server}/lastmod/b.md")
+    knowledge.inserts.clear()
+
+    # No validators recorded yet: both bodies are new
+    report = _refresh(knowledge)
+    assert report.counts == {"updated": 2}
+    assert sorted(knowledge.replaced) == ["id-A", "id-B"]
+    assert knowledge.inserts == []  # ingested from the fetched bodies
+    assert [path for path, _ in _Handler.requests].count("/etag/a.md") == 1
+    record = knowledge.replaced["id-A"][0]
+    assert record["content"] == "alpha" and record["name"] == "A"
+    assert record["content_hash"] == url_refresh.url_content_hash("A", None, f"{server}/etag/a.md")
+    fetch_a = knowledge.rows["id-A"].metadata[FETCH_KEY]
+    assert fetch_a["etag"] and fetch_a["body_sha256"] == hashlib.sha256(b"alpha").hexdigest()
+    assert knowledge.rows["id-B"].metadata[FETCH_KEY]["last_modified"] == _LAST_MODIFIED
+
+    # Second run sends validators and gets 304s: nothing re-embedded
+    _Handler.requests.clear()
+    knowledge.inserts.clear()
+    report = _refresh(knowledge)
+    assert report.counts == {"not_modified": 2}
+    assert knowledge.inserts == []
+    headers = {path: h for path, h in _Handler.requests}
+    assert headers["/etag/a.md"]["If-None-Match"] == fetch_a["etag"]
+    assert headers["/lastmod/b.md"]["If-Modified-Since"] == _LAST_MODIFIED
+    assert knowledge.rows["id-A"].metadata[FETCH_KEY]["status"] == 304
+
+
+def test_only_changed_source_is_reingested(server):
+    _Handler.pages = {"/etag/a.md": b"alpha", "/etag/b.md": b"beta"}
+    knowledge = _knowledge()
+    insert_url_source(knowledge, "A", f"{server}/etag/a.md")
+    insert_url_source(knowledge, "B", f"{server}/etag/b.md")
+    _refresh(knowledge)
+    knowledge.replaced.clear()
+
+    _Handler.pages["/etag/b.md"] = b"beta v2"
+    report = _refresh(knowledge)
+    assert {r.name: r.status for r in report.results} == {"A": "not_modified", "B": "updated"}
+    assert list(knowledge.replaced) == ["id-B"]
+    assert knowledge.replaced["id-B"][0]["filters"][URL_SOURCE_KEY] == f"{server}/etag/b.md"
+
+
+def test_same_body_without_validators_is_unchanged(server):
+    _Handler.pages = {"/plain.md": b"plain"}
+    knowledge = _knowledge()
+    insert_url_source(knowledge, "Plain", f"{server}/plain.md")
+    _refresh(knowledge)
+    knowledge.inserts.clear()
+
+    report = _refresh(knowledge)
+    assert report.counts == {"unchanged": 1}
+    assert knowledge.inserts == []
+
+
+def test_http_error_is_recorded_and_keeps_vectors(server):
+    knowledge = _knowledge()
+    insert_url_source(knowledge, "Gone", f"{server}/etag/missing.md")
+    knowledge.inserts.clear()
+
+    report = _refresh(knowledge)
+    assert report.results[0].status == "failed"
+    assert report.results[0].http_status == 404
+    assert knowledge.replaced == {} and knowledge.inserts == []
+    assert knowledge.rows["id-Gone"].metadata[FETCH_KEY]["error"] == "HTTP 404"
+
+
+def test_failed_embedding_keeps_previous_rows(server):
+    _Handler.pages = {"/etag/a.md": b"alpha"}
+    knowledge = _knowledge()
+    insert_url_source(knowledge, "A", f"{server}/etag/a.md")
+    knowledge.vector_db.embedder.fail = True
+
+    report = _refresh(knowledge)
+    assert report.results[0].status == "failed"
+    assert knowledge.replaced == {}
+    fetch = knowledge.rows["id-A"].metadata[FETCH_KEY]
+    assert "body_sha256" not in fetch and "embedding service down" in fetch["error"]
+
+    # Embedders that swallow the error return empty embeddings instead
+    knowledge.vector_db.embedder.fail, knowledge.vector_db.embedder.empty = False, True
+    assert _refresh(knowledge).results[0].status == "failed"
+    assert knowledge.replaced == {}
+
+
+def test_non_url_rows_and_legacy_defaults():
+    knowledge = _knowledge()
+    knowledge.rows["pdf"] = SimpleNamespace(id="pdf", name="report.pdf", description=None, metadata={}, file_type="pdf")
+    # Row inserted before source URLs were recorded: resolved from DEFAULT_URL_SOURCES by name
+    knowledge.rows["legacy"] = SimpleNamespace(
+        id="legacy", name="Agno Introduction", description=None, metadata=None, file_type="url"
+    )
+    sources = url_sources(knowledge)
+    assert [(content.id, url) for content, url in sources] == [("legacy", "https://docs.agno.com/introduction.md")]
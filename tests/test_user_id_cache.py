@@ -0,0 +1,66 @@
+"""Tests for the shared OID -> internal user ID cache."""
+
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.auth.user_id_cache import UserIdCache
+
+
+def _session_returning(value):
+    session = AsyncMock()
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = value
+    session.execute.return_value = result
+    return session
+
+
+def test_resolve_queries_once_then_hits_cache():
+    cache = UserIdCache()
+    user_id = uuid.uuid4()
+    session = _session_returning(user_id)
+
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(cache.resolve(session, "oid-1")) == user_id
+    assert loop.run_until_complete(cache.resolve(session, "oid-1")) == user_id
+    assert session.execute.await_count == 1
+    loop.close()
+
+
+def test_negative_result_cached_until_short_ttl_expires():
+    cache = UserIdCache(negative_ttl=30.0)
+    session = _session_returning(None)
+    loop = asyncio.new_event_loop()
+
+    with patch("backend.auth.user_id_cache.time.monotonic", return_value=100.0):
+        assert loop.run_until_complete(cache.resolve(session, "unknown")) is None
+        assert loop.run_until_complete(cache.resolve(session, "unknown")) is None
+    assert session.execute.await_count == 1
+
+    with patch("backend.auth.user_id_cache.time.monotonic", return_value=131.0):
+        loop.run_until_complete(cache.resolve(session, "unknown"))
+    assert session.execute.await_count == 2
+    loop.close()
+
+
+def test_prime_replaces_negative_entry():
+    """SyncService primes after the user upsert, so a just-synced user resolves immediately."""
+    cache = UserIdCache()
+    cache.prime("oid-1", None)
+    user_id = uuid.uuid4()
+    cache.prime("oid-1", user_id)
+    assert cache.lookup("oid-1") == (True, user_id)
+
+    cache.invalidate("oid-1")
+    assert cache.lookup("oid-1") == (False, None)
+
+
+def test_lru_eviction():
+    cache = UserIdCache(max_entries=2)
+    ids = [uuid.uuid4() for _ in range(3)]
+    cache.prime("a", ids[0])
+    cache.prime("b", ids[1])
+    cache.lookup("a")  # touch a so b is least recently used
+    cache.prime("c", ids[2])
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, ids[0])
@@ -0,0 +1,132 @@
+"""Tests for SQL fingerprints and validated query upserts (fake store and knowledge, no database)."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import backend.tools.save_query as save_query
+from backend.db.validated_queries import FINGERPRINT_KEY, ValidatedQuery, normalize_sql, question_key, sql_fingerprint
+
+WINS = """
+SELECT dc.year, dc.name AS champion_name, COUNT(rw.name) AS race_wins
+FROM drivers_championship dc
+JOIN race_wins rw ON dc.name = rw.name -- join on driver
+WHERE dc.position = '1' AND dc.year >= 2010
+GROUP BY dc.year, dc.name
+ORDER BY dc.year DESC
+LIMIT 50;
+"""
+
+
+def test_fingerprint_ignores_formatting_case_comments_and_literals():
+    reformatted = (
+        "select DC.year, dc.NAME as champion_name, count(rw.name) as race_wins from drivers_championship dc "
+        "join race_wins rw on dc.name=rw.name /* driver */ where dc.position = '2' and dc.year >= 1990 "
+        "group by dc.year, dc.name order by dc.year desc limit 10"
+    )
+    assert sql_fingerprint(WINS) == sql_fingerprint(reformatted)
+    assert normalize_sql("SELECT a FROM t WHERE x = -1.5e3 AND s = E'it''s' AND d = $$x$$") == (
+        "select a from t where x = ? and s = ? and d = ?"
+    )
+
+
+def test_fingerprint_collapses_literal_lists_but_keeps_structure():
+    assert normalize_sql("select a from t where id in (1, -2, 3)") == "select a from t where id in ( ? )"
+    assert sql_fingerprint("select a from t where id in (1)") == sql_fingerprint("select a from t where id in (4, 5)")
+    # Subtraction, quoted identifiers and different columns change the fingerprint
+    assert normalize_sql("select x - 1 from t") == "select x - ? from t"
+    assert sql_fingerprint('select "Name" from t') != sql_fingerprint('select "name" from t')
+    assert sql_fingerprint("select a from t") != sql_fingerprint("select b from t")
+    assert sql_fingerprint(WINS) != sql_fingerprint(WINS.replace("DESC", "ASC"))
+
+
+def test_question_key_ignores_case_whitespace_and_trailing_punctuation():
+    assert question_key("  Who won   the 2019 title? ") == question_key("who won the 2019 title")
+
+
+class _FakeStore:
+    def __init__(self):
+        self.rows: dict[str, ValidatedQuery] = {}
+        self.inserted: dict[str, str] = {}  # fingerprint -> content id of the latest insert
+
+    def get(self, fingerprint):
+        return self.rows.get(fingerprint)
+
+    def find(self, question=None, sql=None):
+        if sql and sql_fingerprint(sql) in self.rows:
+            return self.rows[sql_fingerprint(sql)]
+        return next(
+            (row for row in self.rows.values() if question_key(row.question) == question_key(question or "")), None
+        )
+
+    def content_id_of(self, fingerprint, exclude=None):
+        content_id = self.inserted.get(fingerprint)
+        return None if content_id == exclude else content_id
+
+    def save(self, sql, payload, content_id):
+        fingerprint = sql_fingerprint(sql)
+        saves = self.rows[fingerprint].saves + 1 if fingerprint in self.rows else 1
+        self.rows[fingerprint] = ValidatedQuery(
+            fingerprint, payload["name"], payload["question"], payload["query"], payload, content_id, saves
+        )
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    store = _FakeStore()  # Shared by both tools, like the table
+    monkeypatch.setattr(save_query, "ValidatedQueryStore", lambda knowledge: store)
+    calls: list[tuple] = []
+
+    def insert(**kwargs):
+        calls.append(("insert", kwargs))
+        store.inserted[kwargs["metadata"][FINGERPRINT_KEY]] = f"content-{kwargs['name']}"
+
+    knowledge = SimpleNamespace(
+        insert=insert, remove_content_by_id=lambda content_id: calls.append(("remove", content_id))
+    )
+    save = save_query.create_save_validated_query_tool(knowledge).entrypoint  # type: ignore[arg-type]
+    lookup = save_query.create_lookup_validated_query_tool(knowledge).entrypoint  # type: ignore[arg-type]
+    return save, lookup, calls
+
+
+def test_saving_same_sql_under_another_name_replaces_it(tools):
+    save, _, calls = tools
+
+    assert save(name="wins_by_champion", question="Race wins per champion?", query=WINS) == (
+        "Saved query 'wins_by_champion' to knowledge base."
+    )
+    message = save(name="champion_wins", question="How many wins did champions get?", query=WINS.lower())
+
+    assert message == "Updated validated query 'wins_by_champion' (same SQL) as 'champion_wins'."
+    inserts = [kwargs for kind, kwargs in calls if kind == "insert"]
+    assert [kwargs["metadata"][FINGERPRINT_KEY] for kwargs in inserts] == [sql_fingerprint(WINS)] * 2
+    assert all(kwargs["upsert"] for kwargs in inserts)
+    # The old content is removed only after the new one is in
+    assert [kind for kind, _ in calls] == ["insert", "insert", "remove"]
+    assert calls[-1] == ("remove", "content-wins_by_champion")
+
+
+def test_resaving_identical_content_keeps_it(tools):
+    save, _, calls = tools
+    save(name="wins_by_champion", question="Race wins per champion?", query=WINS)
+    save(name="wins_by_champion", question="Race wins per champion?", query=WINS)
+    # The upsert rewrote the same content id, so there is nothing to remove
+    assert [kind for kind, _ in calls] == ["insert", "insert"]
+
+
+def test_lookup_by_question_or_sql(tools):
+    save, lookup, _ = tools
+    save(name="wins_by_champion", question="Race wins per champion?", query=WINS)
+
+    by_question = json.loads(lookup(question="race wins per champion"))
+    assert by_question["name"] == "wins_by_champion"
+    assert json.loads(lookup(query=WINS.replace("2010", "2000")))["query"] == WINS.strip()
+    assert lookup(question="Fastest lap in 2020?") == "No validated query found."
+    assert lookup() == "Error: Question or query required."
+
+
+def test_dangerous_queries_are_still_rejected(tools):
+    save, _, calls = tools
+    assert save(name="x", question="q", query="DELETE FROM race_wins") == "Error: Only SELECT queries can be saved."
+    assert calls == []
@@ -0,0 +1,206 @@
+"""Tests for ANN index specs and build planning (fake vector DB, no database)."""
+
+from types import SimpleNamespace
+
+import pytest
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+
+from backend.db import vector_index
+from backend.db.vector_index import (
+    IndexStatus,
+    ann_column,
+    build_index,
+    build_statements,
+    index_ddl,
+    index_name,
+    ivfflat_lists,
+    set_search_params,
+    vector_index_config,
+    vector_storage,
+)
+from backend.scripts.benchmark_vector_index import percentile, recall_at_k, search_sql
+
+
+def _vector_db(index, table="docs", distance=Distance.cosine):
+    return SimpleNamespace(schema="ai", table_name=table, distance=distance, vector_index=index)
+
+
+class _Connection:
+    """Pooled connection stand-in that records statements and can fail on one of them."""
+
+    def __init__(self, fail_on=None):
+        self.executed: list[str] = []
+        self.fail_on = fail_on
+
+    def execution_options(self, **_):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+    def execute(self, statement):
+        self.executed.append(str(statement))
+        if self.fail_on and self.fail_on in str(statement):
+            raise RuntimeError("build failed")
+
+
+def test_hnsw_config_overrides_and_defaults():
+    spec = vector_index_config("hnsw", m=32, ef_search=100)
+    assert isinstance(spec, HNSW)
+    assert (spec.m, spec.ef_search) == (32, 100)
+    assert spec.ef_construction == 64
+    assert "maintenance_work_mem" in spec.configuration
+
+
+def test_ivfflat_config_dynamic_and_fixed_lists():
+    dynamic = vector_index_config("ivfflat")
+    assert isinstance(dynamic, Ivfflat) and dynamic.dynamic_lists
+    fixed = vector_index_config("IVFFLAT", lists=250, probes=4)
+    assert isinstance(fixed, Ivfflat)
+    assert (fixed.lists, fixed.dynamic_lists, fixed.probes) == (250, False, 4)
+
+
+def test_none_and_unknown_index_type():
+    assert vector_index_config("none") is None
+    with pytest.raises(ValueError, match="Unknown vector index type"):
+        vector_index_config("btree")
+
+
+def test_set_search_params_updates_spec_and_rejects_mismatch():
+    knowledge = SimpleNamespace(vector_db=_vector_db(vector_index_config("hnsw")))
+    set_search_params(knowledge, ef_search=200)
+    assert knowledge.vector_db.vector_index.ef_search == 200
+    with pytest.raises(ValueError, match="probes applies to IVFFlat"):
+        set_search_params(knowledge, probes=5)
+
+    vector_db = _vector_db(vector_index_config("ivfflat"))
+    set_search_params(vector_db, probes=20)
+    assert vector_db.vector_index.probes == 20
+
+
+def test_index_name_and_ivfflat_lists():
+    assert index_name(_vector_db(HNSW())) == "docs_hnsw_index"
+    assert index_name(_vector_db(Ivfflat())) == "docs_ivfflat_index"
+    assert index_name(_vector_db(HNSW(name="custom_idx"))) == "custom_idx"
+
+    dynamic = Ivfflat(dynamic_lists=True)
+    assert ivfflat_lists(dynamic, 500) == 1
+    assert ivfflat_lists(dynamic, 250_000) == 250
+    assert ivfflat_lists(dynamic, 4_000_000) == 2000
+    assert ivfflat_lists(Ivfflat(lists=64, dynamic_lists=False), 4_000_000) == 64
+
+
+def test_index_ddl_is_concurrent_and_uses_distance_ops():
+    hnsw = index_ddl(_vector_db(HNSW(m=16, ef_construction=64)), "docs_hnsw_index")
+    assert hnsw.startswith('CREATE INDEX CONCURRENTLY IF NOT EXISTS "docs_hnsw_index" ON "ai"."docs"')
+    assert "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)" in hnsw
+
+    ivf = index_ddl(_vector_db(Ivfflat(dynamic_lists=True), distance=Distance.l2), "idx", rows=50_000)
+    assert "USING ivfflat (embedding vector_l2_ops) WITH (lists = 50)" in ivf
+
+
+def test_build_statements_plans():
+    vector_db = _vector_db(HNSW())
+
+    action, statements = build_statements(vector_db, None)
+    assert action == "created" and len(statements) == 1
+
+    valid = IndexStatus(name="docs_hnsw_index", method="hnsw", valid=True, size_bytes=1)
+    assert build_statements(vector_db, valid) == ("exists", [])
+
+    invalid = IndexStatus(name="docs_hnsw_index", method="hnsw", valid=False, size_bytes=0)
+    action, statements = build_statements(vector_db, invalid)
+    assert action == "rebuilt"
+    assert statements[0] == 'DROP INDEX CONCURRENTLY IF EXISTS "ai"."docs_hnsw_index"'
+    assert statements[1].startswith("CREATE INDEX CONCURRENTLY")
+
+    # Forced rebuild builds alongside the live index, then swaps names
+    action, statements = build_statements(vector_db, valid, force=True)
+    assert action == "rebuilt"
+    assert '"docs_hnsw_index_new"' in statements[1]
+    assert statements[-1] == 'ALTER INDEX "ai"."docs_hnsw_index_new" RENAME TO "docs_hnsw_index"'
+
+
+def test_build_statements_swaps_on_method_change():
+    vector_db = _vector_db(Ivfflat(dynamic_lists=True, name="docs_idx"))
+    live = IndexStatus(name="docs_idx", method="hnsw", valid=True, size_bytes=1)
+    action, statements = build_statements(vector_db, live, rows=10_000)
+    assert action == "rebuilt"
+    assert "USING ivfflat" in statements[1] and "lists = 10" in statements[1]
+
+
+def test_benchmark_recall_and_percentile():
+    assert recall_at_k([1, 2, 3, 4], [4, 3, 9, 8]) == 0.5
+    assert recall_at_k([], [1]) == 1.0
+    latencies = [float(i) for i in range(1, 101)]
+    assert percentile(latencies, 50) == 50.0
+    assert percentile(latencies, 95) == 95.0
+    assert percentile([], 95) == 0.0
+
+
+def test_vector_storage_validation():
+    assert vector_storage("HALFVEC") == "halfvec"
+    with pytest.raises(ValueError, match="Unknown vector storage"):
+        vector_storage("int8")
+
+
+def test_quantized_storage_ddl():
+    halfvec = _vector_db(HNSW(m=16, ef_construction=64), distance=Distance.l2)
+    halfvec.vector_storage, halfvec.dimensions = "halfvec", 1536
+    assert "USING hnsw ((embedding::halfvec(1536)) halfvec_l2_ops)" in index_ddl(halfvec, "idx")
+
+    binary = _vector_db(Ivfflat(lists=100, dynamic_lists=False))
+    binary.vector_storage, binary.dimensions = "binary", 1536
+    assert ann_column(binary) == ("(binary_quantize(embedding)::bit(1536))", "bit_hamming_ops")
+    assert "USING ivfflat ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)" in index_ddl(binary, "idx")
+
+
+def test_build_statements_swaps_on_storage_change():
+    vector_db = _vector_db(HNSW())
+    vector_db.vector_storage, vector_db.dimensions = "halfvec", 1536
+    live = IndexStatus(
+        name="docs_hnsw_index",
+        method="hnsw",
+        valid=True,
+        size_bytes=1,
+        definition="CREATE INDEX docs_hnsw_index ON ai.docs USING hnsw (embedding vector_cosine_ops)",
+    )
+    action, statements = build_statements(vector_db, live)
+    assert action == "rebuilt"
+    assert "halfvec_cosine_ops" in statements[1]
+
+    live.definition = live.definition.replace(
+        "embedding vector_cosine_ops", "((embedding)::halfvec(1536)) halfvec_cosine_ops"
+    )
+    assert build_statements(vector_db, live) == ("exists", [])
+
+
+def test_benchmark_search_sql_rescores_reduced_modes():
+    assert (
+        search_sql("full", 8, 40)
+        == "SELECT id FROM ai.ann_benchmark ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    )
+    binary = search_sql("binary", 8, 40)
+    assert "ORDER BY (binary_quantize(embedding)::bit(8)) <~>" in binary
+    assert "LIMIT 40) c ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k" in binary
+
+
+@pytest.mark.parametrize("fail_on", [None, "CREATE INDEX"])
+def test_build_index_resets_session_settings(monkeypatch, fail_on):
+    conn = _Connection(fail_on)
+    vector_db = _vector_db(vector_index_config("hnsw"))
+    vector_db.table_exists = lambda: True
+    vector_db.db_engine = SimpleNamespace(connect=lambda: conn)
+    monkeypatch.setattr(vector_index, "index_status", lambda *_: None)
+
+    if fail_on:
+        with pytest.raises(RuntimeError):
+            build_index(vector_db)
+    else:
+        assert build_index(vector_db).action == "created"
+    settings = list(vector_db.vector_index.configuration)
+    assert settings and conn.executed[-len(settings) :] == [f"RESET {key}" for key in settings]